@@ -9,8 +9,8 @@ Modular Market Intelligence Terminal - Bloomberg Edition (Refined UX)
 import streamlit as st
 import pandas as pd
 import datetime
-import yfinance as yf
 import time
+import threading
 import sys
 import os
 import numpy as np
@@ -34,33 +34,12 @@ except Exception as e:
     logger.error(f"Failed to redirect stdout/stderr: {e}")
 
 # Import architecture
-from architecture_modular import REGISTRY, AnalysisResult
-from plugins_core import *  # Auto-registers plugins
-from plugins_advanced import *  # Auto-registers plugins
-from plugins_correlation import * # Auto-registers Correlation Analysis plugin
-from plugins_volume import * # Auto-registers Volume Analysis plugin
-from plugins_fundamentals import * # Auto-registers Fundamental Analysis plugin
-from plugins_attribution import * # Auto-registers Attribution Analysis plugin
-from plugins_forensic import * # Auto-registers Forensic Analysis plugin
-from plugins_whale import * # Auto-registers Whale Analysis plugin
-from plugins_dashboard import * # Auto-registers Dashboard plugins (Risk, Action, Macro)
-from plugins_watch import * # Auto-registers Watch List plugin
-from plugins_screener import * # Auto-registers Announcements/Screener plugin
-from plugins_honest import * # Auto-registers Change Detection plugin
-from plugins_state import * # Auto-registers Market State plugin
-from plugins_portfolio import * # Auto-registers Portfolio plugin
-from plugins_portfolio_xray import * # Auto-registers X-Ray plugin
-from plugins_pro import * # Auto-registers Pro plugins (Alerts, Macro, News)
-from plugins_alpha import * # Auto-registers Alpha Fusion
-from plugins_chart import * # Auto-registers Interactive Chart Plugin
-from plugins_macro_regime import * # Auto-registers Macro Regime Plugin
-from plugins_backtester import * # Auto-registers Backtester Plugin
-from plugins_index_dna import * # Auto-registers Index DNA Plugin
-from plugins_sector_rotation import * # Auto-registers Sector Rotation Plugin
-from plugins_global_macro import * # Auto-registers Global Macro Bridge Plugin
+from architecture_modular import REGISTRY, JOB_MANAGER, RESULT_CACHE, AnalysisResult
+from plugin_manifest import PLUGIN_MANIFEST
+from import_profile import profile_imports
 from ui_components import render_news_ticker, render_aggrid
 from ui_styles import apply_terminal_style
-from market_symbols import INDICES, STOCKS, get_stock_dict
+from market_symbols import INDICES, STOCKS, get_stock_dict, HUD_METRICS, WATCHLIST_TOP_STOCKS, get_major_indices
 
 # Import config
 try:
@@ -73,6 +52,16 @@ except ImportError:
     st.stop()
 
 from data_fetcher import MultiAssetDataFetcher
+from services.single_flight import single_flight
+from services.rate_limiter import upstox_rate_limiter
+from services.market_feed import market_feed
+from feature_frame import get_feature_frame
+from config import MARKET_FEED_SETTINGS, JOB_SETTINGS
+from warmup_daemon import download_hud_quotes, read_hud_snapshot, read_warmup_status
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Plugins are listed up front and imported when their tab opens (see plugin_manifest)
+REGISTRY.add_manifest(PLUGIN_MANIFEST)
 
 # Configure Page
 st.set_page_config(page_title="Bloomberg Terminal", page_icon="🏛️", layout="wide")
@@ -84,14 +73,96 @@ st.set_page_config(page_title="Bloomberg Terminal", page_icon="🏛️", layout=
 def get_session_key(plugin_name):
     return f"result_{plugin_name}"
 
+def format_age(seconds):
+    """Compact age: 45s / 12m / 3h"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
 def clear_all_results(rerun=True):
-    """Clears all analysis results from session state"""
+    """Clears all analysis results from session state (and cancels running jobs)"""
+    cancel_jobs()
     for key in list(st.session_state.keys()):
         if key.startswith("result_"):
             del st.session_state[key]
     if rerun:
         st.rerun()
 
+# Plugins behind the Dashboard tab's "Run tab" action (independent, so they run side by side)
+DASHBOARD_TAB_PLUGINS = ["Index DNA", "Global Macro Bridge", "Macro Regime", "Market State", "Risk Radar"]
+
+JOBS_KEY = "plugin_jobs"  # {plugin name: PluginJob} for runs still in flight
+
+def submit_plugins(names, context, refresh=False):
+    """
+    Starts a background job for the plugins (DAG scheduler on the job pool) and
+    records its handle per plugin in session state. Never blocks the script thread.
+    Results already in session state feed downstream plugins (e.g. Options Analysis -> Market State).
+    Results come from the shared result cache when fresh; refresh forces a recompute.
+    """
+    jobs = st.session_state.setdefault(JOBS_KEY, {})
+    for name in names:
+        if name in jobs:
+            jobs[name].cancel()
+    prior = {
+        name: st.session_state[get_session_key(name)]
+        for name in REGISTRY.names() if get_session_key(name) in st.session_state
+    }
+    # Worker threads need the script context for st.cache_data access
+    ctx = get_script_run_ctx()
+    job = JOB_MANAGER.submit(
+        names, context, prior_results=prior, refresh=refresh,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    )
+    for name in names:
+        jobs[name] = job
+    return job
+
+def collect_job_results():
+    """Moves finished plugin results from jobs into session state. True if anything new arrived."""
+    jobs = st.session_state.get(JOBS_KEY, {})
+    changed = False
+    for name, job in list(jobs.items()):
+        if job.cancelled():
+            jobs.pop(name, None)
+            continue
+        for done_name, result in job.take_results().items():
+            st.session_state[get_session_key(done_name)] = result
+            changed = True
+        if job.done() or job.status.get(name) in ('done', 'skipped'):
+            jobs.pop(name, None)
+            changed = True
+    return changed
+
+def cancel_jobs(symbol=None):
+    """Cancels running jobs (all, or those started for a different symbol)"""
+    jobs = st.session_state.get(JOBS_KEY, {})
+    for name, job in list(jobs.items()):
+        if symbol is None or job.symbol != symbol:
+            job.cancel()
+            jobs.pop(name, None)
+
+@st.fragment(run_every=JOB_SETTINGS['poll_interval'])
+def render_job_progress(plugin_name):
+    """Auto-refreshing progress for a plugin's background job; reruns the app when results land"""
+    job = st.session_state.get(JOBS_KEY, {}).get(plugin_name)
+    if job is None or collect_job_results():
+        st.rerun()
+    
+    state = job.status.get(plugin_name, 'queued')
+    fraction, message = job.progress.get(plugin_name, (0.0, ""))
+    text = f"{state.capitalize()} · {job.elapsed:.0f}s" + (f" · {message}" if message else "")
+    c_prog, c_cancel = st.columns([8, 2])
+    with c_prog:
+        st.progress(fraction, text=text)
+    with c_cancel:
+        if st.button("■", key=f"cancel_{plugin_name}", help="Cancel"):
+            job.cancel()
+            collect_job_results()  # Drops every handle of the cancelled job
+            st.rerun()
+
 def render_plugin_ui(plugin, context):
     """
     Renders the UI for a single plugin:
@@ -120,6 +191,11 @@ def render_plugin_ui(plugin, context):
         st.error(f"⚠️ Config: {', '.join(missing_config)}")
         return
 
+    # Running in the background: progress only, the rest of the page stays live
+    if plugin.name in st.session_state.get(JOBS_KEY, {}):
+        render_job_progress(plugin.name)
+        return
+
     # Check if we have a result
     if session_key in st.session_state:
         result = st.session_state[session_key]
@@ -129,19 +205,19 @@ def render_plugin_ui(plugin, context):
             c1, c2 = st.columns(2)
             with c1:
                 if st.button("↻", key=f"refresh_{plugin.name}", help="Refresh"):
-                    with st.spinner("..."):
-                        try:
-                            logger.info(f"Refreshing plugin: {plugin.name}")
-                            new_result = plugin.analyze(context)
-                            st.session_state[session_key] = new_result
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Failed: {e}")
+                    logger.info(f"Refreshing plugin: {plugin.name}")
+                    submit_plugins([plugin.name], context, refresh=True)
+                    st.rerun()
             with c2:
                 if st.button("✕", key=f"clear_{plugin.name}", help="Close"):
                     del st.session_state[session_key]
                     st.rerun()
         
+        # Staleness of results served from the shared cache
+        if result.cached and result.timestamp:
+            age = (datetime.datetime.now() - datetime.datetime.fromisoformat(result.timestamp)).total_seconds()
+            st.caption(f"Cached · computed {format_age(age)} ago ({result.timestamp[11:]})")
+        
         # Render the plugin result
         st.markdown("---")
         try:
@@ -153,15 +229,8 @@ def render_plugin_ui(plugin, context):
     else:
         # Run Button
         if st.button(f"▶ Run", key=f"run_{plugin.name}", type="secondary"):
-            with st.spinner("..."):
-                try:
-                    logger.info(f"Running plugin: {plugin.name}")
-                    result = plugin.analyze(context)
-                    st.session_state[session_key] = result
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Failed: {e}")
-                    logger.exception(f"Plugin {plugin.name} failed")
+            submit_plugins([plugin.name], context)
+            st.rerun()
 
 def main():
     apply_terminal_style()
@@ -193,6 +262,57 @@ def main():
                     st.code("".join(logs), language="text")
             except:
                 st.caption("No logs available")
+            
+            fetch_stats = single_flight.stats()
+            st.caption(
+                f"Fetch dedup: {fetch_stats['dedup_hits']} hits / {fetch_stats['requests']} requests "
+                f"({fetch_stats['executions']} downloads, {fetch_stats['in_flight']} in flight)"
+            )
+            
+            feed_stats = market_feed.stats()
+            st.caption(
+                f"Market feed: {'streaming' if feed_stats['streaming'] else 'offline'}, "
+                f"{feed_stats['quotes']} quotes / {feed_stats['subscriptions']} subscribed, "
+                f"{feed_stats['ticks']} ticks, {feed_stats['connects']} connects, {feed_stats['errors']} errors"
+            )
+            
+            warmup = read_warmup_status()
+            if warmup:
+                failed = [name for name, t in warmup['tasks'].items() if t['status'] != 'ok']
+                st.caption(
+                    f"Warm-up daemon: {'ready' if warmup['ready'] else 'warming'} (updated {warmup['updated'][11:19]})"
+                    + (f", not ready: {', '.join(failed)}" if failed else "")
+                )
+            else:
+                st.caption("Warm-up daemon: not running (python warmup_daemon.py)")
+            
+            cache_stats = RESULT_CACHE.stats()
+            st.caption(
+                f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1e6:.1f} MB), "
+                f"{cache_stats['evictions']} evictions"
+            )
+            
+            load_profile = REGISTRY.load_profile
+            if load_profile:
+                loaded = sorted(load_profile.items(), key=lambda kv: -kv[1]['seconds'])
+                st.caption(
+                    f"Plugin modules loaded: {len(loaded)} in {sum(m['seconds'] for _, m in loaded):.2f}s — " +
+                    ", ".join(f"{mod} {m['seconds'] * 1000:.0f}ms" + (" (failed)" if m['error'] else "") for mod, m in loaded[:5])
+                )
+            if st.button("Profile cold start", key="profile_imports", help="python -X importtime over every plugin module"):
+                with st.spinner("Profiling imports..."):
+                    modules = sorted({spec.module for spec in PLUGIN_MANIFEST})
+                    st.session_state['import_profile'] = profile_imports(["data_fetcher", "ui_components", *modules])
+            if 'import_profile' in st.session_state:
+                st.dataframe(st.session_state['import_profile'], hide_index=True, use_container_width=True)
+            
+            for endpoint, m in upstox_rate_limiter.metrics().items():
+                st.caption(
+                    f"Upstox {endpoint}: queue {m['queue_depth']} (max {m['max_queue_depth']}), "
+                    f"wait avg {m['avg_wait_ms']:.0f}ms / max {m['max_wait_ms']:.0f}ms, "
+                    f"429s {m['throttled']}, {m['rate']:.1f} req/s"
+                )
 
     # ==========================================
     # MASTER GRID LAYOUT
@@ -202,27 +322,42 @@ def main():
         # --- ROW 1: INDICES (HUD) ---
         # Compact row
         cols = st.columns(6)
-        metrics = [
-            ("NIFTY 50", "^NSEI"), ("SENSEX", "^BSESN"), ("S&P 500", "^GSPC"),
-            ("NASDAQ", "^IXIC"), ("USD/INR", "INR=X"), ("GOLD", "GC=F")
-        ]
+        metrics = HUD_METRICS
         
         # Quick fetch for HUD
+        # Indian benchmarks are read from the live quote table (Upstox feed); the global
+        # tickers are re-downloaded at most every hud_refresh seconds, not on every rerun,
+        # and not at all while the warm-up daemon keeps its HUD snapshot fresh
         try:
-            hud_data = yf.download([m[1] for m in metrics], period="2d", progress=False)['Close']
+            hud_quotes = {}  # {ticker: (value, delta_pct)}
+            hud_fetcher = MultiAssetDataFetcher()
+            if hud_fetcher.upstox:
+                hud_fetcher.upstox.start_market_feed()
+                upstox_hud = {"^NSEI": "Nifty 50", "^BSESN": "SENSEX"}
+                live = hud_fetcher.upstox.get_batch_stock_quotes(list(upstox_hud.values()))
+                for sym, name in upstox_hud.items():
+                    if name in live:
+                        hud_quotes[sym] = (live[name]['ltp'], live[name]['change_pct'])
+            
+            yf_syms = [m[1] for m in metrics if m[1] not in hud_quotes]
+            hud_cache = st.session_state.get('hud_cache')
+            if yf_syms and (
+                not hud_cache
+                or time.time() - hud_cache['ts'] > MARKET_FEED_SETTINGS['hud_refresh']
+                or set(yf_syms) - set(hud_cache['quotes'])
+            ):
+                snapshot = read_hud_snapshot()
+                if snapshot and not set(yf_syms) - set(snapshot['quotes']):
+                    hud_cache = {'ts': snapshot['ts'], 'quotes': {k: tuple(v) for k, v in snapshot['quotes'].items()}}
+                else:
+                    hud_cache = {'ts': time.time(), 'quotes': download_hud_quotes(yf_syms)}
+                st.session_state.hud_cache = hud_cache
+            
+            for sym in yf_syms:
+                hud_quotes[sym] = hud_cache['quotes'].get(sym, (0.0, 0.0))
             
             for i, (label, sym) in enumerate(metrics):
-                val = 0.0
-                delta = 0.0
-                if sym in hud_data.columns:
-                    series = hud_data[sym].dropna()
-                    if len(series) >= 2:
-                        val = series.iloc[-1]
-                        prev = series.iloc[-2]
-                        delta = ((val - prev) / prev) * 100
-                    elif len(series) == 1:
-                        val = series.iloc[-1]
-                
+                val, delta = hud_quotes.get(sym, (0.0, 0.0))
                 with cols[i]:
                     st.metric(label, f"{val:,.2f}", f"{delta:+.2f}%")
         except Exception as e:
@@ -298,6 +433,8 @@ def main():
                 'GEMINI_API_KEY': GEMINI_API_KEY
             }
         }
+        # Plugins read this session's keys back at render time (they get no context there)
+        st.session_state['context_config'] = context['config']
         
         # PRE-FETCH PRICE DATA for Key Levels
         price_data = None
@@ -312,118 +449,143 @@ def main():
                 context['date_range']['end']
             )
             context['price_data'] = price_data # Inject into context for plugins
+            # Shared indicator cache: each SMA/RSI/ATR/OBV is computed once per render, not per plugin
+            context['features'] = get_feature_frame(price_data, context['symbol'])
         except Exception as e:
             logger.error(f"Price data fetch failed: {e}")
+        
+        # Background jobs: drop those started for another symbol, pick up finished results
+        cancel_jobs(symbol=context['symbol'])
+        collect_job_results()
 
         with col_left:
             # Main Analysis Area
             # Added "Sector Rotation" tab
+            # Lazy tabs: only the open tab runs, so only its plugin modules get imported
             tab_dash, tab_port, tab_tech, tab_fund, tab_options, tab_ai, tab_quant, tab_sector = st.tabs([
                 "Dashboard", "Portfolio", "Technicals", "Fundamentals", "Options Chain", "AI Insights", "Quant Lab", "Sector Rotation"
-            ])
-
-            with tab_dash:
-                # Add Index DNA and Macro Regime here
-                render_plugin_ui(REGISTRY.get_plugin("Index DNA"), context)
-                st.markdown("---")
-                render_plugin_ui(REGISTRY.get_plugin("Global Macro Bridge"), context)
-                st.markdown("---")
-                render_plugin_ui(REGISTRY.get_plugin("Macro Regime"), context)
-                st.markdown("---")
-                c_d1, c_d2 = st.columns(2)
-                with c_d1:
-                    render_plugin_ui(REGISTRY.get_plugin("Market State"), context)
-                    render_plugin_ui(REGISTRY.get_plugin("Action Items"), context)
-                with c_d2:
-                    render_plugin_ui(REGISTRY.get_plugin("Risk Radar"), context)
-                    render_plugin_ui(REGISTRY.get_plugin("Real-Time Alerts"), context)
+            ], key="main_tab", on_change="rerun")
+
+            if tab_dash.open:
+                with tab_dash:
+                    if st.button("▶ Run tab", key="run_tab_dashboard", help="Run all dashboard panels in parallel"):
+                        logger.info(f"Dashboard tab: submitting {len(DASHBOARD_TAB_PLUGINS)} plugins")
+                        submit_plugins(DASHBOARD_TAB_PLUGINS, context)
+                        st.rerun()
+                
+                    # Add Index DNA and Macro Regime here
+                    render_plugin_ui(REGISTRY.get_plugin("Index DNA"), context)
+                    st.markdown("---")
+                    render_plugin_ui(REGISTRY.get_plugin("Global Macro Bridge"), context)
+                    st.markdown("---")
+                    render_plugin_ui(REGISTRY.get_plugin("Macro Regime"), context)
+                    st.markdown("---")
+                    c_d1, c_d2 = st.columns(2)
+                    with c_d1:
+                        render_plugin_ui(REGISTRY.get_plugin("Market State"), context)
+                        render_plugin_ui(REGISTRY.get_plugin("Action Items"), context)
+                    with c_d2:
+                        render_plugin_ui(REGISTRY.get_plugin("Risk Radar"), context)
+                        render_plugin_ui(REGISTRY.get_plugin("Real-Time Alerts"), context)
             
-            with tab_port:
-                render_plugin_ui(REGISTRY.get_plugin("My Portfolio"), context)
-                render_plugin_ui(REGISTRY.get_plugin("Portfolio X-Ray"), context)
-
-            with tab_tech:
-                # --- KEY LEVELS SUB-SECTION (Bloomberg Logic) ---
-                if price_data is not None and not price_data.empty:
-                    # Rename columns to standard Title Case if needed
-                    df = price_data.copy()
-                    if isinstance(df.columns, pd.MultiIndex):
-                        df.columns = df.columns.get_level_values(0)
-                    col_map = {c: c.capitalize() for c in df.columns}
-                    df.rename(columns=col_map, inplace=True)
+            if tab_port.open:
+                with tab_port:
+                    render_plugin_ui(REGISTRY.get_plugin("My Portfolio"), context)
+                    render_plugin_ui(REGISTRY.get_plugin("Portfolio X-Ray"), context)
+
+            if tab_tech.open:
+                with tab_tech:
+                    # --- KEY LEVELS SUB-SECTION (Bloomberg Logic) ---
+                    if price_data is not None and not price_data.empty:
+                        # Rename columns to standard Title Case if needed
+                        df = price_data.copy()
+                        if isinstance(df.columns, pd.MultiIndex):
+                            df.columns = df.columns.get_level_values(0)
+                        col_map = {c: c.capitalize() for c in df.columns}
+                        df.rename(columns=col_map, inplace=True)
                     
-                    if 'Close' in df.columns and 'High' in df.columns and 'Low' in df.columns:
-                        latest = df.iloc[-1]
-                        prev = df.iloc[-2] if len(df) > 1 else latest
+                        if 'Close' in df.columns and 'High' in df.columns and 'Low' in df.columns:
+                            latest = df.iloc[-1]
+                            prev = df.iloc[-2] if len(df) > 1 else latest
                         
-                        # 1. Pivot Points (Classic)
-                        # P = (High + Low + Close) / 3 (using Previous Day)
-                        pp = (prev['High'] + prev['Low'] + prev['Close']) / 3
-                        r1 = (2 * pp) - prev['Low']
-                        s1 = (2 * pp) - prev['High']
+                            # 1. Pivot Points (Classic)
+                            # P = (High + Low + Close) / 3 (using Previous Day)
+                            pp = (prev['High'] + prev['Low'] + prev['Close']) / 3
+                            r1 = (2 * pp) - prev['Low']
+                            s1 = (2 * pp) - prev['High']
                         
-                        # 2. 52-Week High/Low Proximity
-                        # Filter last 252 trading days (approx 1 year)
-                        df_1y = df.tail(252)
-                        high_52w = df_1y['High'].max()
-                        low_52w = df_1y['Low'].min()
-                        current_price = latest['Close']
+                            # 2. 52-Week High/Low Proximity
+                            # Filter last 252 trading days (approx 1 year)
+                            df_1y = df.tail(252)
+                            high_52w = df_1y['High'].max()
+                            low_52w = df_1y['Low'].min()
+                            current_price = latest['Close']
                         
-                        prox_high = ((current_price - high_52w) / high_52w) * 100
-                        prox_low = ((current_price - low_52w) / low_52w) * 100
+                            prox_high = ((current_price - high_52w) / high_52w) * 100
+                            prox_low = ((current_price - low_52w) / low_52w) * 100
                         
-                        # 3. Relative Volume (RVOL)
-                        # Current Vol / 20-Day Avg Vol
-                        if 'Volume' in df.columns:
-                            avg_vol_20 = df['Volume'].rolling(20).mean().iloc[-1]
-                            curr_vol = latest['Volume']
-                            rvol = curr_vol / avg_vol_20 if avg_vol_20 > 0 else 0
-                        else:
-                            rvol = 0
+                            # 3. Relative Volume (RVOL)
+                            # Current Vol / 20-Day Avg Vol
+                            if 'Volume' in df.columns:
+                                avg_vol_20 = df['Volume'].rolling(20).mean().iloc[-1]
+                                curr_vol = latest['Volume']
+                                rvol = curr_vol / avg_vol_20 if avg_vol_20 > 0 else 0
+                            else:
+                                rvol = 0
                         
-                        st.subheader("🔑 Key Levels")
-                        k1, k2, k3, k4 = st.columns(4)
-                        k1.metric("Pivot (P)", f"₹{pp:,.2f}")
-                        k2.metric("Resistance (R1)", f"₹{r1:,.2f}")
-                        k3.metric("Support (S1)", f"₹{s1:,.2f}")
-                        k4.metric("RVOL (20D)", f"{rvol:.2f}x")
+                            st.subheader("🔑 Key Levels")
+                            k1, k2, k3, k4 = st.columns(4)
+                            k1.metric("Pivot (P)", f"₹{pp:,.2f}")
+                            k2.metric("Resistance (R1)", f"₹{r1:,.2f}")
+                            k3.metric("Support (S1)", f"₹{s1:,.2f}")
+                            k4.metric("RVOL (20D)", f"{rvol:.2f}x")
                         
-                        k5, k6 = st.columns(2)
-                        k5.metric("52W High Prox", f"{prox_high:.2f}%", f"High: ₹{high_52w:,.2f}")
-                        k6.metric("52W Low Prox", f"{prox_low:+.2f}%", f"Low: ₹{low_52w:,.2f}")
+                            k5, k6 = st.columns(2)
+                            k5.metric("52W High Prox", f"{prox_high:.2f}%", f"High: ₹{high_52w:,.2f}")
+                            k6.metric("52W Low Prox", f"{prox_low:+.2f}%", f"Low: ₹{low_52w:,.2f}")
                         
-                        st.markdown("---")
+                            st.markdown("---")
 
-                # --- INTERACTIVE CHART (Proposal 1) ---
-                render_plugin_ui(REGISTRY.get_plugin("Interactive Chart"), context)
-                st.markdown("---")
+                    # --- INTERACTIVE CHART (Proposal 1) ---
+                    render_plugin_ui(REGISTRY.get_plugin("Interactive Chart"), context)
+                    st.markdown("---")
 
-                c_t1, c_t2 = st.columns(2)
-                with c_t1:
-                     render_plugin_ui(REGISTRY.get_plugin("Volume Analysis"), context)
-                with c_t2:
-                     render_plugin_ui(REGISTRY.get_plugin("Whale Hunter"), context)
+                    c_t1, c_t2 = st.columns(2)
+                    with c_t1:
+                         render_plugin_ui(REGISTRY.get_plugin("Volume Analysis"), context)
+                    with c_t2:
+                         render_plugin_ui(REGISTRY.get_plugin("Whale Hunter"), context)
+                    
+                    st.markdown("---")
+                    render_plugin_ui(REGISTRY.get_plugin("Universe OBV Scan"), context)
 
-            with tab_fund:
-                render_plugin_ui(REGISTRY.get_plugin("Fundamental Analysis"), context)
-                render_plugin_ui(REGISTRY.get_plugin("Forensic Lab"), context)
+            if tab_fund.open:
+                with tab_fund:
+                    render_plugin_ui(REGISTRY.get_plugin("Fundamental Analysis"), context)
+                    render_plugin_ui(REGISTRY.get_plugin("Forensic Lab"), context)
             
-            with tab_options:
-                c_o1, c_o2 = st.columns(2)
-                with c_o1:
-                    render_plugin_ui(REGISTRY.get_plugin("Options Analysis"), context)
-                with c_o2:
-                    render_plugin_ui(REGISTRY.get_plugin("Futures Analysis"), context)
-
-            with tab_ai:
-                render_plugin_ui(REGISTRY.get_plugin("Alpha Fusion"), context)
-                render_plugin_ui(REGISTRY.get_plugin("AI Insights"), context)
+            if tab_options.open:
+                with tab_options:
+                    c_o1, c_o2 = st.columns(2)
+                    with c_o1:
+                        render_plugin_ui(REGISTRY.get_plugin("Options Analysis"), context)
+                    with c_o2:
+                        render_plugin_ui(REGISTRY.get_plugin("Futures Analysis"), context)
+
+            if tab_ai.open:
+                with tab_ai:
+                    render_plugin_ui(REGISTRY.get_plugin("Alpha Fusion"), context)
+                    render_plugin_ui(REGISTRY.get_plugin("AI Insights"), context)
             
-            with tab_quant:
-                render_plugin_ui(REGISTRY.get_plugin("Quant Lab"), context)
+            if tab_quant.open:
+                with tab_quant:
+                    render_plugin_ui(REGISTRY.get_plugin("Quant Lab"), context)
                 
-            with tab_sector:
-                render_plugin_ui(REGISTRY.get_plugin("Sector Rotation & Swing"), context)
+            if tab_sector.open:
+                with tab_sector:
+                    render_plugin_ui(REGISTRY.get_plugin("Sector Rotation & Swing"), context)
+                    st.markdown("---")
+                    render_plugin_ui(REGISTRY.get_plugin("Market Swing Scan"), context)
 
         with col_right:
             # Watchlist Area
@@ -433,13 +595,10 @@ def main():
             wl_mode = st.radio("List", ["Top Stocks", "Major Indices"], horizontal=True, label_visibility="collapsed")
             
             if wl_mode == "Top Stocks":
-                watchlist_symbols = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ITC.NS', 'SBIN.NS', 'BAJFINANCE.NS', 'BHARTIARTL.NS']
+                watchlist_symbols = WATCHLIST_TOP_STOCKS
             else:
                 # Filter for Indian Indices (NSE/BSE) from INDICES map
-                watchlist_symbols = [
-                    v for k, v in INDICES.items() 
-                    if any(x in k.upper() for x in ["NIFTY", "SENSEX", "BANK", "VIX"])
-                ]
+                watchlist_symbols = get_major_indices()
 
             try:
                 # Fetch live data using MultiAssetDataFetcher (Upstox First)
@@ -471,15 +630,14 @@ def main():
                         df = w_data_map[sym][0]
                         if not df.empty and len(df) >= 1:
                             curr = df['close'].iloc[-1]
-                            # Calculate change
-                            if len(df) >= 2:
+                            # Calculate change (intraday bars carry the previous close and day volume in attrs)
+                            prev = df.attrs.get('prev_close')
+                            if not prev and len(df) >= 2:
                                 prev = df['close'].iloc[-2]
-                                chg = ((curr - prev) / prev) * 100
-                            else:
-                                chg = 0.0
+                            chg = ((curr - prev) / prev) * 100 if prev else 0.0
                             
                             # Get Volume
-                            vol = df['volume'].iloc[-1] if 'volume' in df.columns else 0
+                            vol = df.attrs.get('volume', df['volume'].iloc[-1] if 'volume' in df.columns else 0)
                             
                             # Format Volume (K, M, B)
                             if vol >= 1_000_000_000:
@@ -7,10 +7,25 @@ Modular Plugin Architecture
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Set, Callable, Tuple, Hashable
+from dataclasses import dataclass, replace
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import datetime
+import hashlib
+import importlib
+import logging
+import sys
+import threading
+import time
+import numpy as np
 import pandas as pd
 
+from config import RESULT_CACHE_SETTINGS, JOB_SETTINGS
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class AnalysisResult:
@@ -59,6 +74,21 @@ class AnalysisPlugin(ABC):
         """List of config keys required (e.g., ['api_key'])"""
         return []
     
+    @property
+    def provides(self) -> List[str]:
+        """Keys of result.data published to downstream plugins (e.g., ['option_chain', 'pcr'])"""
+        return []
+    
+    @property
+    def requires(self) -> List[str]:
+        """Context keys this plugin consumes from upstream plugins (run after their providers)"""
+        return []
+    
+    @property
+    def cache_ttl(self) -> int:
+        """Seconds a result may be served from the shared result cache (0 = never cached)"""
+        return RESULT_CACHE_SETTINGS['ttl'].get(self.name, RESULT_CACHE_SETTINGS['default_ttl'])
+    
     @abstractmethod
     def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
         """
@@ -83,16 +113,72 @@ class AnalysisPlugin(ABC):
         pass
 
 
+@dataclass(frozen=True)
+class PluginSpec:
+    """Manifest entry: enough to list a plugin without importing its module"""
+    name: str
+    category: str
+    module: str
+
+
 class PluginRegistry:
-    """Registry for all plugins"""
+    """
+    Registry for all plugins.
+    Plugins are either registered directly (@register_plugin at import) or listed in a
+    manifest and imported on first use (get_plugin / get_by_category / get_all).
+    """
     
     def __init__(self):
         self.plugins: Dict[str, AnalysisPlugin] = {}
         self.categories: Dict[str, List[str]] = {}
+        self.manifest: Dict[str, PluginSpec] = {}
+        # module -> {'seconds', 'modules' (new sys.modules entries), 'error'}
+        self.load_profile: Dict[str, Dict[str, Any]] = {}
+        self._load_lock = threading.RLock()
+    
+    def add_manifest(self, specs: List[PluginSpec]):
+        """List plugins without importing them"""
+        for spec in specs:
+            self.manifest[spec.name] = spec
+            names = self.categories.setdefault(spec.category, [])
+            if spec.name not in names:
+                names.append(spec.name)
+    
+    def _import(self, module: str):
+        """Import a plugin module once (its @register_plugin calls fill the registry), timing it"""
+        with self._load_lock:
+            if module in self.load_profile:
+                return
+            before = len(sys.modules)
+            start = time.perf_counter()
+            error = None
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Plugin module {module} failed to import: {e}")
+            self.load_profile[module] = {
+                'seconds': time.perf_counter() - start,
+                'modules': len(sys.modules) - before,
+                'error': error,
+            }
+            logger.info(f"Loaded plugin module {module} in {self.load_profile[module]['seconds'] * 1000:.0f}ms")
+    
+    def is_loaded(self, name: str) -> bool:
+        return name in self.plugins
+    
+    def names(self) -> List[str]:
+        """Every known plugin name (manifest + registered), without importing anything"""
+        return list(dict.fromkeys([*self.manifest, *self.plugins]))
     
     def register(self, plugin: AnalysisPlugin):
         """Register a plugin"""
         name = plugin.name
+        spec = self.manifest.get(name)
+        if spec is not None and type(plugin).__module__ != spec.module:
+            # Same display name in two modules: the manifest decides which one serves it
+            logger.debug(f"Skipping {name} from {type(plugin).__module__} (manifest: {spec.module})")
+            return
         self.plugins[name] = plugin
         
         # Add to category
@@ -104,25 +190,429 @@ class PluginRegistry:
             self.categories[category].append(name)
     
     def get_plugin(self, name: str) -> Optional[AnalysisPlugin]:
-        """Get plugin by name"""
+        """Get plugin by name (imports its module on first use)"""
+        if name not in self.plugins and name in self.manifest:
+            self._import(self.manifest[name].module)
         return self.plugins.get(name)
     
     def get_by_category(self, category: str) -> List[AnalysisPlugin]:
         """Get all plugins in category"""
         names = self.categories.get(category, [])
-        return [self.plugins[name] for name in names]
+        return [p for p in (self.get_plugin(name) for name in names) if p is not None]
     
     def get_all(self) -> List[AnalysisPlugin]:
-        """Get all plugins"""
-        return list(self.plugins.values())
+        """Get all plugins (imports every manifest module)"""
+        return [p for p in (self.get_plugin(name) for name in self.names()) if p is not None]
     
     def get_enabled_defaults(self) -> List[str]:
         """Get plugins enabled by default"""
         return [name for name, p in self.plugins.items() if p.enabled_by_default]
+    
+    def providers(self, key: str) -> List[str]:
+        """Loaded plugins that publish a context key"""
+        return [name for name, p in self.plugins.items() if key in p.provides]
+    
+    def build_dag(self, names: List[str], include_upstream: bool = False) -> Dict[str, Set[str]]:
+        """
+        Dependency graph {plugin: upstream plugins} for a run.
+        Edges only point at plugins in the run unless include_upstream pulls providers in.
+        Raises ValueError on cycles.
+        """
+        dag: Dict[str, Set[str]] = {}
+        pending = [n for n in names if self.get_plugin(n) is not None]
+        while pending:
+            name = pending.pop()
+            if name in dag:
+                continue
+            dag[name] = set()
+            for key in self.plugins[name].requires:
+                for provider in self.providers(key):
+                    if provider == name:
+                        continue
+                    if include_upstream and provider not in dag:
+                        pending.append(provider)
+                    if include_upstream or provider in names:
+                        dag[name].add(provider)
+        
+        # Kahn's algorithm: anything left over sits on a cycle
+        indegree = {n: len(deps) for n, deps in dag.items()}
+        ready = [n for n, d in indegree.items() if d == 0]
+        seen = 0
+        while ready:
+            node = ready.pop()
+            seen += 1
+            for n, deps in dag.items():
+                if node in deps:
+                    indegree[n] -= 1
+                    if indegree[n] == 0:
+                        ready.append(n)
+        if seen != len(dag):
+            raise ValueError(f"Plugin dependency cycle among: {sorted(n for n, d in indegree.items() if d > 0)}")
+        
+        return dag
+
+
+def _estimate_size(obj: Any, depth: int = 0) -> int:
+    """Rough payload size in bytes (DataFrames / arrays by buffer, containers recursively)"""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if depth < 6 and isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_estimate_size(k, depth + 1) + _estimate_size(v, depth + 1) for k, v in obj.items())
+    if depth < 6 and isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(_estimate_size(v, depth + 1) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def _copy_payload(obj: Any, depth: int = 0) -> Any:
+    """Copy of a result payload: DataFrames / arrays copied, containers rebuilt, other objects shared"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return obj.copy()
+    if depth < 6 and isinstance(obj, dict):
+        return {k: _copy_payload(v, depth + 1) for k, v in obj.items()}
+    if depth < 6 and isinstance(obj, (list, tuple, set)):
+        return type(obj)(_copy_payload(v, depth + 1) for v in obj)
+    return obj
+
+
+def _content_digest(obj: Any, digest=None, depth: int = 0):
+    """Feed obj's values into a sha256 (DataFrames / arrays by content, containers recursively)"""
+    digest = digest or hashlib.sha256()
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        labels = list(obj.columns) if isinstance(obj, pd.DataFrame) else [obj.name]
+        digest.update(repr((type(obj).__name__, obj.shape, labels)).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+        except TypeError:  # Unhashable cells (dicts / lists)
+            digest.update(obj.to_json(default_handler=repr).encode())
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr((obj.dtype.str, obj.shape)).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes() if obj.dtype != object else repr(obj.tolist()).encode())
+    elif depth < 6 and isinstance(obj, dict):
+        digest.update(b'{')
+        for k in sorted(obj, key=repr):
+            digest.update(repr(k).encode())
+            _content_digest(obj[k], digest, depth + 1)
+        digest.update(b'}')
+    elif depth < 6 and isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for v in obj:
+            _content_digest(v, digest, depth + 1)
+        digest.update(b']')
+    else:
+        digest.update(repr(obj).encode())
+    return digest
+
+
+def _config_fingerprint(config: Dict[str, Any]) -> str:
+    """Stable digest of the config values (secrets never stored in the key itself)"""
+    payload = repr(sorted((str(k), repr(v)) for k, v in (config or {}).items()))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Process-wide AnalysisResult cache shared by every browser session.
+    - Key: (plugin name, symbol, date range, config fingerprint, upstream inputs digest)
+    - Per-plugin TTL (AnalysisPlugin.cache_ttl), LRU eviction within max_bytes
+    - Hits come back with cached=True and the original computation timestamp
+    - Every caller gets its own copy of result.data (DataFrames, arrays and containers), so a
+      session mutating its result never changes another session's; other objects are shared
+    - Concurrent misses for the same key run the plugin once (own single-flight registry,
+      separate from the fetch dedup stats)
+    """
+    
+    def __init__(self, max_bytes: int = RESULT_CACHE_SETTINGS['max_bytes'], enabled: bool = RESULT_CACHE_SETTINGS['enabled']):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # key -> (expires_at monotonic, size, result)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, AnalysisResult]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._flight = SingleFlight()
+    
+    @staticmethod
+    def make_key(plugin: AnalysisPlugin, context: Dict[str, Any]) -> Tuple:
+        date_range = context.get('date_range') or {}
+        symbol = (
+            context.get('symbol'),
+            context.get('upstox_symbol'),
+            tuple(context.get('symbols_to_compare') or ()),
+        )
+        # Upstream inputs change the result by value, not just by presence
+        # (e.g. Market State with another option chain for the same symbol and range)
+        upstream = {k: context[k] for k in plugin.requires if context.get(k) is not None}
+        upstream_digest = _content_digest(upstream).hexdigest()[:16] if upstream else None
+        fingerprint = _config_fingerprint(context.get('config') or {})
+        return (plugin.name, symbol, (date_range.get('start'), date_range.get('end')), fingerprint, upstream_digest)
+    
+    def get(self, key: Hashable) -> Optional[AnalysisResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, size, result = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+        return replace(result, data=_copy_payload(result.data), cached=True)
+    
+    def put(self, key: Hashable, result: AnalysisResult, ttl: float):
+        """Store a successful result for ttl seconds (oversized or failed results are skipped)"""
+        if ttl <= 0 or not result.success:
+            return
+        size = _estimate_size(result.data)
+        if size > self.max_bytes:
+            logger.info(f"Result cache: {key[0]} result too large to cache ({size / 1e6:.1f} MB)")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, size, replace(result, data=_copy_payload(result.data)))
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+    
+    def _drop(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+    
+    def get_or_run(self, plugin: AnalysisPlugin, context: Dict[str, Any], refresh: bool = False) -> AnalysisResult:
+        """
+        Cached result for the plugin's inputs, or run plugin.analyze once and cache it.
+        refresh skips the lookup but still stores the fresh result for other sessions.
+        """
+        ttl = plugin.cache_ttl if self.enabled else 0
+        if ttl <= 0:
+            return self._stamp(plugin.analyze(context))
+        
+        key = self.make_key(plugin, context)
+        if not refresh:
+            hit = self.get(key)
+            if hit is not None:
+                return hit
+        
+        def compute():
+            result = self._stamp(plugin.analyze(context))
+            self.put(key, result, ttl)
+            return result
+        
+        # Coalesced callers share one result object: hand each its own payload
+        result = self._flight.do((key, refresh), compute)
+        return replace(result, data=_copy_payload(result.data))
+    
+    @staticmethod
+    def _stamp(result: AnalysisResult) -> AnalysisResult:
+        if result.timestamp is None:
+            result.timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+        return result
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        stats['coalesced'] = self._flight.stats()['dedup_hits']
+        return stats
+
+
+class PluginJob:
+    """
+    Handle for a background plugin run (kept in st.session_state).
+    Tracks per-plugin status / progress and collects results as each plugin finishes.
+    Cancellation is cooperative: no new plugins start, and running plugins can poll
+    context['cancel_event'].
+    """
+    
+    def __init__(self, names: List[str], symbol: Optional[str] = None):
+        self.names = list(names)
+        self.symbol = symbol
+        self.started = time.time()
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._lock = threading.Lock()
+        self.status: Dict[str, str] = {name: 'queued' for name in names}  # queued | running | done | skipped
+        self.progress: Dict[str, Tuple[float, str]] = {}
+        self.results: Dict[str, AnalysisResult] = {}
+        self._taken: Set[str] = set()
+    
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self.started
+    
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+    
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    def on_start(self, name: str):
+        with self._lock:
+            self.status[name] = 'running'
+    
+    def on_progress(self, name: str, fraction: float, message: str = ""):
+        with self._lock:
+            self.progress[name] = (min(max(float(fraction), 0.0), 1.0), message)
+    
+    def on_result(self, name: str, result: AnalysisResult):
+        with self._lock:
+            self.status[name] = 'done'
+            self.progress[name] = (1.0, "")
+            self.results[name] = result
+    
+    def on_skip(self, name: str):
+        with self._lock:
+            self.status[name] = 'skipped'
+    
+    def take_results(self) -> Dict[str, AnalysisResult]:
+        """Results finished since the last call (partial results while the job runs)"""
+        with self._lock:
+            new = {name: r for name, r in self.results.items() if name not in self._taken}
+            self._taken.update(new)
+        return new
+
+
+class PluginScheduler:
+    """
+    Runs a set of plugins over their dependency DAG.
+    Independent plugins run concurrently on a thread pool; each plugin gets a copy of the
+    context with its upstream plugins' provided keys merged in.
+    """
+    
+    def __init__(self, registry: PluginRegistry, max_workers: int = 6, cache: Optional[ResultCache] = None):
+        self.registry = registry
+        self.max_workers = max_workers
+        self.cache = cache
+    
+    def upstream_context(self, plugin: AnalysisPlugin, context: Dict[str, Any], results: Dict[str, AnalysisResult]) -> Dict[str, Any]:
+        """Context for one plugin: shared context + the keys it requires, from successful provider results"""
+        plugin_context = dict(context)
+        for key in plugin.requires:
+            for provider in self.registry.providers(key):
+                result = results.get(provider)
+                if result is not None and result.success and key in result.data:
+                    plugin_context[key] = result.data[key]
+                    break
+        return plugin_context
+    
+    def _run_one(self, plugin: AnalysisPlugin, context: Dict[str, Any], refresh: bool = False, job: Optional[PluginJob] = None) -> AnalysisResult:
+        if job is not None:
+            job.on_start(plugin.name)
+            context['cancel_event'] = job.cancel_event
+            context['report_progress'] = lambda fraction, message="": job.on_progress(plugin.name, fraction, message)
+        try:
+            logger.info(f"Running plugin: {plugin.name}")
+            if self.cache is not None:
+                return self.cache.get_or_run(plugin, context, refresh)
+            return plugin.analyze(context)
+        except Exception as e:
+            logger.exception(f"Plugin {plugin.name} failed")
+            return AnalysisResult(success=False, data={}, error=str(e))
+    
+    def run(
+        self,
+        names: List[str],
+        context: Dict[str, Any],
+        prior_results: Optional[Dict[str, AnalysisResult]] = None,
+        include_upstream: bool = False,
+        initializer: Optional[Callable[[], None]] = None,
+        refresh: bool = False,
+        job: Optional[PluginJob] = None
+    ) -> Dict[str, AnalysisResult]:
+        """
+        Run plugins (and, with include_upstream, their providers) in dependency order.
+        prior_results (e.g. results already in session state) feed requires for providers
+        that are not part of this run. initializer runs in each worker thread.
+        refresh bypasses the result cache lookup (fresh results are still cached).
+        job (see JobManager) receives status / progress / results as plugins finish;
+        once it is cancelled no further plugins start.
+        Returns {plugin name: AnalysisResult} for every plugin that ran.
+        """
+        dag = self.registry.build_dag(names, include_upstream)
+        available = dict(prior_results or {})
+        results: Dict[str, AnalysisResult] = {}
+        if not dag:
+            return results
+        
+        remaining = {n: set(deps) for n, deps in dag.items()}
+        workers = max(1, min(self.max_workers, len(dag)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plugin", initializer=initializer) as pool:
+            running = {}
+            while remaining or running:
+                if job is not None and job.cancelled():
+                    for name in remaining:
+                        job.on_skip(name)
+                    remaining.clear()
+                
+                # 1. Submit everything whose upstream is done
+                for name in [n for n, deps in remaining.items() if not deps]:
+                    plugin = self.registry.get_plugin(name)
+                    plugin_context = self.upstream_context(plugin, context, available)
+                    running[pool.submit(self._run_one, plugin, plugin_context, refresh, job)] = name
+                    del remaining[name]
+                
+                if not running:
+                    break
+                
+                # 2. Wait for any to finish, then unblock its dependents
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = available[name] = future.result()
+                    if job is not None:
+                        job.on_result(name, results[name])
+                    for deps in remaining.values():
+                        deps.discard(name)
+        
+        return results
+
+
+class JobManager:
+    """
+    Runs scheduler jobs on a worker pool so the Streamlit script thread never waits on
+    plugin.analyze(). submit() returns a PluginJob immediately; the UI polls it.
+    """
+    
+    def __init__(self, scheduler: PluginScheduler, max_jobs: int = JOB_SETTINGS['max_jobs']):
+        self.scheduler = scheduler
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="plugin-job")
+    
+    def submit(
+        self,
+        names: List[str],
+        context: Dict[str, Any],
+        prior_results: Optional[Dict[str, AnalysisResult]] = None,
+        refresh: bool = False,
+        initializer: Optional[Callable[[], None]] = None
+    ) -> PluginJob:
+        job = PluginJob(names, context.get('symbol'))
+        job.future = self._pool.submit(
+            self.scheduler.run, names, context,
+            prior_results=prior_results, initializer=initializer, refresh=refresh, job=job
+        )
+        return job
 
 
 # Global registry
 REGISTRY = PluginRegistry()
+RESULT_CACHE = ResultCache()
+SCHEDULER = PluginScheduler(REGISTRY, cache=RESULT_CACHE)
+JOB_MANAGER = JobManager(SCHEDULER)
 
 
 def register_plugin(plugin_class):
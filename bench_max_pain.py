@@ -0,0 +1,116 @@
+"""
+Max Pain Benchmark
+Compares the vectorized UpstoxOptionsService.calculate_max_pain with the previous
+strike-by-strike df.apply implementation on the NIFTY chains in nifty_samples.json
+(one chain per expiry) plus a 200-strike BANKNIFTY-sized chain.
+
+nifty_samples.json holds instrument records, not market data, so OI is synthetic
+(seeded, reproducible).
+
+Usage: python bench_max_pain.py
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.upstox_options import UpstoxOptionsService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nifty_samples.json")
+
+
+def legacy_max_pain(df: pd.DataFrame, spot: float) -> dict:
+    """The original O(n^2) implementation, kept as the reference"""
+    if df.empty:
+        return {"max_pain_strike": 0, "distance_pct": 0}
+
+    strikes = df['strike'].unique()
+    pain_data = []
+    for expiration_price in strikes:
+        call_pain = df.apply(
+            lambda row: max(0, expiration_price - row['strike']) * row['CE_OI'], axis=1
+        ).sum()
+        put_pain = df.apply(
+            lambda row: max(0, row['strike'] - expiration_price) * row['PE_OI'], axis=1
+        ).sum()
+        pain_data.append({'strike': expiration_price, 'pain': call_pain + put_pain})
+
+    pain_df = pd.DataFrame(pain_data)
+    max_pain_strike = pain_df.loc[pain_df['pain'].idxmin()]['strike']
+    distance_pct = ((max_pain_strike - spot) / spot) * 100 if spot > 0 else 0
+    return {"max_pain_strike": max_pain_strike, "distance_pct": distance_pct}
+
+
+def synthetic_chain(strikes, rng) -> pd.DataFrame:
+    """Chain with OI peaking around the middle strike, like a real expiry"""
+    strikes = np.sort(np.asarray(strikes, dtype=float))
+    centre = strikes[len(strikes) // 2]
+    width = max((strikes[-1] - strikes[0]) / 6, 1.0)
+    bell = np.exp(-((strikes - centre) / width) ** 2)
+    return pd.DataFrame({
+        'strike': strikes,
+        'CE_OI': np.round(bell * rng.integers(50_000, 500_000, len(strikes))),
+        'PE_OI': np.round(bell * rng.integers(50_000, 500_000, len(strikes))),
+    })
+
+
+def load_sample_chains(rng) -> dict:
+    """{expiry: chain} built from the CE/PE strikes listed in nifty_samples.json"""
+    with open(SAMPLES_PATH, 'rb') as f:
+        records = json.loads(f.read().decode('utf-16'))
+
+    strikes_by_expiry = defaultdict(set)
+    for r in records:
+        if r.get('instrument_type') in ('CE', 'PE'):
+            strikes_by_expiry[r['expiry']].add(r['strike_price'])
+
+    return {
+        pd.Timestamp(expiry, unit='ms').strftime('%Y-%m-%d'): synthetic_chain(sorted(strikes), rng)
+        for expiry, strikes in sorted(strikes_by_expiry.items())
+    }
+
+
+def bench(label: str, df: pd.DataFrame, service: UpstoxOptionsService) -> tuple:
+    spot = float(df['strike'].median())
+
+    start = time.perf_counter()
+    old = legacy_max_pain(df, spot)
+    old_time = time.perf_counter() - start
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        new = service.calculate_max_pain(df, spot)
+    new_time = (time.perf_counter() - start) / runs
+
+    assert new['max_pain_strike'] == old['max_pain_strike'], label
+    print(f"{label:<22}{len(df):>8}{old_time * 1000:>14.1f}{new_time * 1000:>12.2f}{old_time / new_time:>10.0f}x")
+    return old_time, new_time
+
+
+def main():
+    rng = np.random.default_rng(42)
+    service = UpstoxOptionsService.__new__(UpstoxOptionsService)  # no auth needed for the math
+
+    chains = load_sample_chains(rng)
+    chains["BANKNIFTY (200 strikes)"] = synthetic_chain(np.arange(40_000, 60_000, 100), rng)
+
+    print(f"{'chain':<22}{'strikes':>8}{'legacy ms':>14}{'numpy ms':>12}{'speedup':>11}")
+    totals = np.array([bench(label, df, service) for label, df in chains.items()]).sum(axis=0)
+    print(f"{'TOTAL':<22}{'':>8}{totals[0] * 1000:>14.1f}{totals[1] * 1000:>12.2f}{totals[0] / totals[1]:>10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
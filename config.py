@@ -347,3 +347,153 @@ CACHE_SETTINGS = {
     'news_data': 1800,          # 30 minutes
     'correlation_data': 3600,   # 1 hour
 }
+
+# ============================================================================
+# PLUGIN RESULT CACHE
+# ============================================================================
+
+# Cross-session AnalysisResult cache (architecture_modular.ResultCache).
+# Keyed by (plugin, symbol, date range, config fingerprint); LRU within max_bytes.
+RESULT_CACHE_SETTINGS = {
+    'enabled': True,
+    'max_bytes': 256 * 1024 * 1024,  # Estimated size of all cached result payloads
+    'default_ttl': 300,              # Seconds, for plugins without an entry below
+    'ttl': {
+        # Live market data: seconds
+        'Options Analysis': 30,
+        'Greeks Analysis': 30,
+        'Futures Analysis': 30,
+        'Market State': 60,
+        'Market Breadth': 30,
+        'Real-Time Alerts': 30,
+        'Important Watch List': 60,
+        # Filings / fundamentals: hours
+        'Fundamentals': 6 * 3600,
+        'Fundamental Analysis': 6 * 3600,
+        'Forensic Lab': 12 * 3600,
+        'Company Filings': 6 * 3600,
+        'Insider Trading': 6 * 3600,
+        'Index DNA': 3600,
+        'Global Macro Bridge': 900,
+        'Macro Regime': 900,
+        'Universe OBV Scan': 1800,
+        'Market Swing Scan': 900,
+        # Account-specific: never shared
+        'My Portfolio': 0,
+        'Portfolio X-Ray': 0,
+        'Portfolio Tracker': 0,
+    },
+}
+
+# Background plugin jobs (architecture_modular.JobManager): analyze() never runs on the script thread
+JOB_SETTINGS = {
+    'max_jobs': 4,          # Concurrent jobs per process (each job runs its plugins on the scheduler pool)
+    'poll_interval': 1.0,   # Seconds between UI progress refreshes (st.fragment run_every)
+}
+
+# ============================================================================
+# DATA FETCH ENGINE
+# ============================================================================
+
+DATA_FETCH_SETTINGS = {
+    'batch_chunk_size': 20,    # Symbols per yf.download shard
+    'max_workers': 4,          # Concurrent shards (keep low: Yahoo throttles bursts)
+    'shard_retries': 2,        # Extra attempts for shards that failed as a whole
+    'retry_backoff': 1.0,      # Seconds, doubled per retry round
+}
+
+# ============================================================================
+# UPSTOX RATE LIMITS
+# ============================================================================
+
+# Token buckets per endpoint family (first path segment after /v2/).
+# Kept well under Upstox's published per-user limits since all plugins share them.
+UPSTOX_RATE_LIMITS = {
+    'default':           {'rate': 10, 'burst': 10},   # requests/sec, bucket size
+    'market-quote':      {'rate': 10, 'burst': 20},
+    'option':            {'rate': 5,  'burst': 10},
+    'historical-candle': {'rate': 5,  'burst': 10},
+    'portfolio':         {'rate': 2,  'burst': 5},
+}
+
+UPSTOX_BACKOFF = {
+    'max_retries': 3,       # Retries after a 429 before giving up
+    'base_delay': 0.5,      # Seconds, doubled per consecutive 429
+    'max_delay': 8.0,
+    'min_rate_factor': 0.1, # A throttled bucket never drops below 10% of its configured rate
+    'recovery': 1.05,       # Rate multiplier per successful call until back at the configured rate
+}
+
+# ============================================================================
+# MARKET DATA FEED
+# ============================================================================
+
+# Upstox market-data websocket -> in-memory last-quote table (services/market_feed.py)
+MARKET_FEED_SETTINGS = {
+    'enabled': True,
+    'mode': 'full',              # full | ltpc. Only full carries traded volume (vtt): bars aggregated from an
+                                 # ltpc stream have zero volume (no RVOL / OBV). Upstox caps full mode at fewer keys.
+    'max_quote_age': 15,         # Seconds a quote is served from memory when the feed is not streaming it
+    'reconnect_delay': 1.0,      # Seconds, doubled per failed reconnect
+    'max_reconnect_delay': 30.0,
+    'hud_refresh': 60,           # Seconds between yfinance refreshes of the non-Upstox HUD tickers
+}
+
+# ============================================================================
+# INTRADAY BAR AGGREGATION
+# ============================================================================
+
+# Live/polled quotes -> OHLCV bars (services/bar_aggregator.py)
+BAR_AGGREGATOR_SETTINGS = {
+    'ring_size': {'1m': 750, '5m': 600, '15m': 200},  # Bars kept in memory per symbol (~2 / 8 / 8 sessions)
+    'flush_interval': 30,    # Seconds between incremental writes of completed bars to the bar store
+    'serve_interval': '5m',  # Interval fetch_multiple_assets returns for ranges <= 7 days
+    'min_bars': 2,           # Fewer bars than this -> fall back to the quote snapshot
+}
+
+# ============================================================================
+# WARM-UP DAEMON
+# ============================================================================
+
+# Standalone prefetch worker (python warmup_daemon.py) for the default workspace.
+# Fills the bar store / HUD snapshot so a new session's first paint reads local data.
+WARMUP_SETTINGS = {
+    'timezone': 'Asia/Kolkata',
+    'pre_open': '08:45',         # Market-hours schedule starts (IST, weekdays)
+    'post_close': '16:00',       # ...and ends
+    'intervals': {               # Task -> (seconds in market hours, seconds otherwise)
+        'hud': (60, 1800),
+        'watchlists': (120, 3600),
+        'primary': (600, 6 * 3600),
+        'nifty50': (1800, 6 * 3600),
+        'sectors': (1800, 6 * 3600),
+    },
+    'primary_symbols': ['^NSEI'],  # Default workspace symbol(s): 365-day history
+    'hud_grace': 120,              # Seconds past the next scheduled HUD refresh the snapshot stays valid
+    'tick': 15,                    # Scheduler wake-up (seconds)
+}
+
+# ============================================================================
+# UPSTOX CANDLE HISTORY
+# ============================================================================
+
+# Bar store interval -> (v3 candle unit, candle interval, max days per request).
+# Requests are split into chunks of at most that many days and fetched in parallel.
+UPSTOX_HISTORY_INTERVALS = {
+    '1m':  ('minutes', 1, 28),    # Upstox: minute candles <= 15 min span one month per request
+    '5m':  ('minutes', 5, 28),
+    '15m': ('minutes', 15, 28),
+    '30m': ('minutes', 30, 88),   # > 15 min and hourly: one quarter
+    '1h':  ('hours', 1, 88),
+    '1d':  ('days', 1, 365),      # API allows a decade; yearly chunks keep requests parallel
+}
+
+# ============================================================================
+# MARKET-WIDE SCANS
+# ============================================================================
+
+# Market Swing Scan (plugins_sector_rotation): every NSE EQ symbol with local daily bars
+SWING_SCAN_SETTINGS = {
+    'batch_size': 500,       # Symbols aligned into one indicator panel at a time
+    'lookback_days': 60,     # Calendar days of bars read per symbol (SMA20/RSI14/RVOL20)
+}
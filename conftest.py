@@ -0,0 +1,43 @@
+"""Shared pytest fixtures and test data helpers"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def host_tz(monkeypatch):
+    """Run the test on a host whose local time zone is not IST (UTC-5 / UTC-4)"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield "America/New_York"
+    monkeypatch.undo()
+    time.tzset()
+
+
+def make_ohlcv(n, seed=0, start="2023-01-02", end=None, drift=0.0, vol=0.012,
+               spread=0.01, open_ratio=1.0, max_volume=10_000):
+    """
+    Synthetic daily bars: a seeded geometric random walk on business days.
+    spread: high / low distance from the close, or a (low, high) range drawn per bar.
+    end: anchor the index on its last bar instead of `start`.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(drift, vol, n)))
+    if isinstance(spread, tuple):
+        spread = rng.uniform(*spread, n)
+    index = pd.bdate_range(start, periods=n) if end is None else pd.bdate_range(end=end, periods=n)
+    return pd.DataFrame({
+        'open': close * open_ratio,
+        'high': close * (1 + spread),
+        'low': close * (1 - spread),
+        'close': close,
+        'volume': rng.integers(1_000, max_volume, n).astype(float),
+    }, index=index)
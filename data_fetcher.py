@@ -1,7 +1,9 @@
 """
 Data Fetcher - Multi-asset data acquisition
 Fetches price data for primary asset and all related assets for correlation analysis.
-Prioritizes Upstox for ALL Indian assets (Spot/Latest Price) and falls back to Yahoo Finance.
+Prioritizes Upstox for ALL Indian assets (Spot/Latest Price, candle history) and falls back to Yahoo Finance.
+History is served from the local bar store (services/bar_store.py); only missing ranges are downloaded.
+Short Upstox ranges (<= 7 days) return intraday bars built from quotes (services/bar_aggregator.py).
 """
 
 import yfinance as yf
@@ -10,13 +12,21 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 import datetime
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from config import DATA_FETCH_SETTINGS, BAR_AGGREGATOR_SETTINGS
+from services.bar_store import bar_store, has_sessions
+from services.bar_aggregator import bar_aggregator
+from services.single_flight import single_flight
+
 # Upstox Integration
 try:
     from api_config import UPSTOX_API_KEY, UPSTOX_API_SECRET
     from upstox_fo_complete import UpstoxAuth, UpstoxFOData
     from services.instrument_service import instrument_service
+    from services.rate_limiter import upstox_rate_limiter, PRIORITY_INTERACTIVE
     from market_symbols import INDICES
     UPSTOX_AVAILABLE = True
 except ImportError:
@@ -24,6 +34,10 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Per-symbol reply for a download over a range without business days (nothing to fetch)
+NO_DATA = "No data"
+
+
 class MultiAssetDataFetcher:
     """
     Fetch data for multiple assets simultaneously.
@@ -56,40 +70,112 @@ class MultiAssetDataFetcher:
     ) -> pd.DataFrame:
         """
         Fetch single asset data (Full History for Charts/Backtest)
+        Reads the local bar store first. Uncovered intervals (per the store's coverage
+        metadata) are fetched in one call and spliced into the partition.
+        Concurrent requests for the same range share one in-flight fetch.
+        """
+        key = self._flight_key('asset', symbol, start_date, end_date)
+        return single_flight.do(key, lambda: self._fetch_asset(symbol, start_date, end_date)).copy()
+    
+    @staticmethod
+    def _flight_key(path: str, symbol: str, start_date, end_date, interval: str = '1d') -> Tuple:
+        """
+        Single-flight key: (path, symbol, interval, range).
+        path separates fetch_asset (shares a DataFrame) from the batch path (shares (df, err)).
         """
-        logger.info(f"Fetching {symbol} (Historical)...")
+        return (
+            path,
+            symbol,
+            interval,
+            pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+            pd.Timestamp(end_date).strftime('%Y-%m-%d')
+        )
+    
+    def _fetch_asset(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        cached = bar_store.slice(bar_store.read(symbol), start_date, end_date)
+        missing = bar_store.missing_ranges(symbol, start_date, end_date)
+        
+        if not missing:
+            if cached.empty:
+                raise ValueError(f"No data for {symbol}")
+            logger.info(f"Fetching {symbol} (Historical) from bar store: {len(cached)} bars")
+            return cached
+        
+        # One download spanning every uncovered interval
+        fetch_start = min(s for s, _ in missing)
+        fetch_end = max(e for _, e in missing)
+        logger.info(f"Fetching {symbol} (Historical)... uncovered {[(s.date(), e.date()) for s, e in missing]}")
         
         try:
-            # Single fetch usually safe with threads (default) or False
-            data = yf.download(
-                symbol,
-                start=start_date,
-                end=end_date,
-                progress=False,
-                auto_adjust=False # Changed for stability
-            )
+            fresh = self._download_history(symbol, fetch_start, fetch_end)
+            if not fresh.empty:
+                bar_store.merge(symbol, fresh)
+            # Bars cover the range; an empty reply only does when the range has no sessions
+            if not fresh.empty or not has_sessions(fetch_start, fetch_end):
+                bar_store.record_coverage(symbol, fetch_start, fetch_end)
             
-            if data is None or data.empty:
+            data = bar_store.slice(bar_store.read(symbol), start_date, end_date)
+            if data.empty:
                 raise ValueError(f"No data for {symbol}")
             
-            # Standardize columns
-            if isinstance(data.columns, pd.MultiIndex):
-                try:
-                    data.columns = [col[0].lower() if isinstance(col, tuple) else col.lower() for col in data.columns]
-                except:
-                    data.columns = [str(c).lower() for c in data.columns]
-            else:
-                data.columns = [str(col).lower() for col in data.columns]
-            
-            if not isinstance(data.index, pd.DatetimeIndex):
-                data.index = pd.to_datetime(data.index)
-
             return data
             
         except Exception as e:
+            if not cached.empty:
+                logger.warning(f"Refresh failed for {symbol}, serving {len(cached)} stored bars: {e}")
+                return cached
             logger.error(f"Failed to fetch {symbol}: {e}")
             raise
     
+    def _resolve_upstox_key(self, symbol: str) -> Tuple[str, Optional[str]]:
+        """yfinance ticker -> (Upstox lookup symbol, instrument_key or None)"""
+        lookup_sym = symbol
+        index_ticker_to_name = {v: k for k, v in INDICES.items()}
+        
+        # Check if it's a known index ticker
+        if symbol in index_ticker_to_name:
+            lookup_sym = index_ticker_to_name[symbol]
+        
+        # Special Manual overrides
+        elif symbol == '^NSEI': lookup_sym = 'Nifty 50'
+        elif symbol == '^NSEBANK': lookup_sym = 'Nifty Bank'
+        elif symbol == '^NSEMDCP100': lookup_sym = 'Nifty Midcap 100'
+        elif symbol == 'NIFTY_MIDCAP_100.NS': lookup_sym = 'Nifty Midcap 100'
+        
+        # Standard Stock Handling
+        elif symbol.endswith('.NS'):
+            lookup_sym = symbol.replace('.NS', '')
+        
+        return lookup_sym, instrument_service.resolve_instrument_key(lookup_sym)
+    
+    def _download_history(self, symbol: str, start_date, end_date) -> pd.DataFrame:
+        """
+        Single-symbol download (Upstox candles when resolvable, else yfinance), bar store format.
+        Empty means the range has no sessions; a failed download raises.
+        """
+        if self.upstox:
+            _, key = self._resolve_upstox_key(symbol)
+            if key:
+                try:
+                    candles = self.upstox.get_candles(key, '1d', start_date, end_date)
+                    if not candles.empty:
+                        return candles
+                except Exception as e:
+                    logger.warning(f"Upstox candles failed for {symbol}, using yfinance: {e}")
+        
+        # Single fetch usually safe with threads (default) or False
+        data = yf.download(
+            symbol,
+            start=pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+            end=pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+            progress=False,
+            auto_adjust=False # Changed for stability
+        )
+        # yfinance reports failures as an empty frame: no bars for a range with sessions is a failure
+        if data is None or (data.empty and has_sessions(start_date, end_date)):
+            raise ValueError(f"yfinance download failed for {symbol}: {'no response' if data is None else 'empty reply'}")
+        return bar_store.normalize(data)
+    
     def fetch_multiple_assets(
         self,
         symbols: List[str],
@@ -98,17 +184,39 @@ class MultiAssetDataFetcher:
     ) -> Dict[str, Tuple[Optional[pd.DataFrame], Optional[str]]]:
         """
         Fetch multiple assets. 
-        PRIORITY: Upstox (Resolution via Instrument Master) -> Synthetic DataFrame
-        FALLBACK: yfinance
+        PRIORITY: Upstox (Resolution via Instrument Master)
+          - <= 7 days: live quote + intraday bars (aggregated quotes, intraday candle backfill)
+          - > 7 days: daily candle history, backfilled into the bar store
+        FALLBACK: yfinance (global assets, unresolvable symbols, failed candle chunks)
         
-        NOTE: Upstox Batch Quote API only provides SPOT (LTP/Close). 
-        If the requested duration is long (> 7 days), we assume HISTORY is needed 
-        and skip Upstox Spot to force yfinance (until Upstox Candle API is integrated).
+        Symbols already being fetched by another caller (same range) are awaited
+        through the single-flight registry instead of being downloaded again.
         """
         results = {}
         if not symbols:
             return results
 
+        keys = {self._flight_key('batch', sym, start_date, end_date): sym for sym in symbols}
+        
+        def fetch_owned(owned_keys):
+            fetched = self._fetch_multiple_assets([keys[k] for k in owned_keys], start_date, end_date)
+            return {k: fetched.get(keys[k]) for k in owned_keys}
+        
+        flights = single_flight.do_many(list(keys.keys()), fetch_owned)
+        
+        for key, sym in keys.items():
+            df, err = flights.get(key) or (None, "No data")
+            results[sym] = (df.copy() if df is not None else None, err)
+        
+        return results
+    
+    def _fetch_multiple_assets(
+        self,
+        symbols: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Dict[str, Tuple[Optional[pd.DataFrame], Optional[str]]]:
+        results = {}
         unique_symbols = list(set(symbols))
         
         # Check duration
@@ -121,42 +229,22 @@ class MultiAssetDataFetcher:
             
         use_upstox_spot = self.upstox and duration_days <= 7
         
-        # 1. Identify Upstox-eligible symbols
+        # 1. Identify Upstox-eligible symbols (quotes + intraday bars, or candle history)
         upstox_candidates = {} # {yf_symbol: upstox_lookup_symbol}
-        yf_symbols = []
-        
-        # Create reverse map for indices (Ticker -> Name)
-        index_ticker_to_name = {v: k for k, v in INDICES.items()}
+        upstox_keys = {} # {yf_symbol: instrument_key}
         
-        if use_upstox_spot:
+        if self.upstox:
             for sym in unique_symbols:
-                # Resolve key
-                lookup_sym = sym
-                
-                # Check if it's a known index ticker
-                if sym in index_ticker_to_name:
-                    lookup_sym = index_ticker_to_name[sym]
-                
-                # Special Manual overrides
-                elif sym == '^NSEI': lookup_sym = 'Nifty 50'
-                elif sym == '^NSEBANK': lookup_sym = 'Nifty Bank'
-                elif sym == '^NSEMDCP100': lookup_sym = 'Nifty Midcap 100'
-                elif sym == 'NIFTY_MIDCAP_100.NS': lookup_sym = 'Nifty Midcap 100'
-                
-                # Standard Stock Handling
-                elif sym.endswith('.NS'):
-                    lookup_sym = sym.replace('.NS', '')
-                
-                # Check if resolvable
-                key = instrument_service.resolve_instrument_key(lookup_sym)
-                
+                lookup_sym, key = self._resolve_upstox_key(sym)
                 if key:
                     upstox_candidates[sym] = lookup_sym
-                else:
-                    yf_symbols.append(sym)
+                    upstox_keys[sym] = key
+        
+        if use_upstox_spot:
+            yf_symbols = [sym for sym in unique_symbols if sym not in upstox_candidates]
         else:
             if self.upstox:
-                logger.info(f"Request duration {duration_days} days > 7. Skipping Upstox Spot (LTP only) to fetch History via YF.")
+                logger.info(f"Request duration {duration_days} days > 7. Using Upstox candle history ({len(upstox_keys)} symbols) + YF.")
             yf_symbols = unique_symbols
         
         # 2. Fetch from Upstox (Spot Quotes)
@@ -165,7 +253,27 @@ class MultiAssetDataFetcher:
             try:
                 # Pass the LIST of mapped symbols
                 # get_batch_stock_quotes handles the internal resolution to keys
-                quotes = self.upstox.get_batch_stock_quotes(list(upstox_candidates.values()))
+                # Short-window requests back the watchlist/HUD: jump ahead of bulk scans
+                with upstox_rate_limiter.priority(PRIORITY_INTERACTIVE):
+                    quotes = self.upstox.get_batch_stock_quotes(list(upstox_candidates.values()))
+                
+                # Real intraday history: bars aggregated from live/polled quotes,
+                # topped up from the intraday candle API where too few exist yet
+                serve_interval = BAR_AGGREGATOR_SETTINGS['serve_interval']
+                min_bars = BAR_AGGREGATOR_SETTINGS['min_bars']
+                bars_by_sym = {
+                    sym: bar_aggregator.bars(upstox_keys[sym], serve_interval, start_date, end_date)
+                    for sym in upstox_candidates
+                }
+                thin = {upstox_keys[sym]: upstox_keys[sym] for sym, bars in bars_by_sym.items() if len(bars) < min_bars}
+                if thin:
+                    try:
+                        self.upstox.backfill(thin, start_date, end_date, serve_interval, priority=PRIORITY_INTERACTIVE)
+                        for sym in bars_by_sym:
+                            if upstox_keys[sym] in thin:
+                                bars_by_sym[sym] = bar_aggregator.bars(upstox_keys[sym], serve_interval, start_date, end_date)
+                    except Exception as e:
+                        logger.error(f"Upstox intraday backfill error: {e}")
                 
                 # Process results
                 for yf_sym, u_sym in upstox_candidates.items():
@@ -177,11 +285,15 @@ class MultiAssetDataFetcher:
                          pass
                     
                     if quote_data:
-                        # Construct Synthetic DataFrame
                         prev = quote_data.get('close') 
                         ltp = quote_data.get('ltp')
                         
-                        if prev and ltp:
+                        bars = bars_by_sym[yf_sym]
+                        if len(bars) >= min_bars:
+                            bars.attrs.update(interval=serve_interval, prev_close=prev, volume=quote_data.get('volume', 0))
+                            results[yf_sym] = (bars, None)
+                        elif prev and ltp:
+                            # Not enough bars yet: Construct Synthetic DataFrame
                             # Create DataFrame with 2 rows
                             idx = [datetime.datetime.now() - datetime.timedelta(days=1), datetime.datetime.now()]
                             df_synth = pd.DataFrame({
@@ -203,60 +315,169 @@ class MultiAssetDataFetcher:
                 # Fallback failed ones
                 yf_symbols.extend([s for s in upstox_candidates.keys() if s not in results])
 
-        # 3. Fetch remaining from yfinance
+        # 3. Fetch remaining history (bar store first, download only uncovered ranges):
+        #    Upstox candles for every symbol the instrument master resolves, yfinance for the rest
         if yf_symbols:
-            logger.info(f"Fetching {len(yf_symbols)} assets via yfinance (Fallback)...")
-            try:
-                # Batch download with THREADS=FALSE to avoid NoneType error
-                data = yf.download(
-                    yf_symbols,
-                    start=start_date,
-                    end=end_date,
-                    progress=False,
-                    auto_adjust=False, # Changed for stability
-                    group_by='ticker',
-                    threads=False # CRITICAL FIX for TypeError
-                )
+            to_download = []
+            spans = {}  # {symbol: (start, end)} spanning that symbol's own uncovered ranges
+            
+            for sym in yf_symbols:
+                cached = bar_store.slice(bar_store.read(sym), start_date, end_date)
+                missing = bar_store.missing_ranges(sym, start_date, end_date)
+                
+                if not missing:
+                    # Fully covered (an empty slice means the window only holds holidays)
+                    results[sym] = (cached, None) if not cached.empty else (None, NO_DATA)
+                    continue
                 
-                if data is not None and not data.empty:
-                    is_multi = isinstance(data.columns, pd.MultiIndex)
+                to_download.append(sym)
+                spans[sym] = (min(s for s, _ in missing), max(e for _, e in missing))
+            
+            candle_keys = {sym: upstox_keys[sym] for sym in to_download if sym in upstox_keys}
+            if candle_keys:
+                try:
+                    backfilled = self.upstox.backfill(candle_keys, start_date, end_date)
+                except Exception as e:
+                    logger.error(f"Upstox candle backfill error: {e}")
+                    backfilled = {}
+                
+                for sym, stored in backfilled.items():
+                    # Fully covered now -> done; partial failures fall through to yfinance
+                    if not stored.empty and 'close' in stored.columns and not bar_store.missing_ranges(sym, start_date, end_date):
+                        results[sym] = (stored, None)
+                to_download = [sym for sym in to_download if sym not in results]
+            
+            if to_download:
+                logger.info(f"Fetching {len(to_download)} assets via yfinance (Fallback), {len(yf_symbols) - len(to_download)} served from bar store / Upstox...")
+                # Symbols sharing a missing span download together; nobody re-fetches another symbol's gap
+                groups = {}
+                for sym in to_download:
+                    groups.setdefault(spans[sym], []).append(sym)
+                
+                for (download_start, download_end), group in groups.items():
+                    downloaded = self._download_batch(group, download_start, download_end)
                     
-                    for sym in yf_symbols:
-                        try:
-                            sym_data = pd.DataFrame()
-                            if len(yf_symbols) == 1:
-                                sym_data = data
-                            elif is_multi and sym in data.columns.levels[0]:
-                                sym_data = data[sym].copy()
-                            
-                            if not sym_data.empty:
-                                # Clean
-                                sym_data.dropna(how='all', inplace=True)
-                                if not sym_data.empty:
-                                    # Normalize columns
-                                    if isinstance(sym_data.columns, pd.MultiIndex):
-                                        sym_data.columns = [c[0].lower() for c in sym_data.columns]
-                                    else:
-                                        sym_data.columns = [str(c).lower() for c in sym_data.columns]
-                                    
-                                    if 'close' in sym_data.columns:
-                                        results[sym] = (sym_data, None)
-                                    else:
-                                        results[sym] = (None, "Missing close")
-                                else:
-                                    results[sym] = (None, "Empty data")
-                            else:
-                                results[sym] = (None, "No data")
-                        except Exception as ex:
-                            results[sym] = (None, str(ex))
-                else:
-                    # Mark all as failed
-                    for sym in yf_symbols:
-                        results[sym] = (None, "YF batch returned empty")
+                    for sym in group:
+                        sym_data, err = downloaded.get(sym, (None, "No response"))
+                        if sym_data is not None:
+                            bar_store.merge(sym, sym_data)
+                        # Bars cover the window; no bars only cover a window without sessions
+                        if sym_data is not None or not has_sessions(download_start, download_end):
+                            bar_store.record_coverage(sym, download_start, download_end)
                         
-            except Exception as e:
-                logger.error(f"YF batch failed: {e}")
-                for sym in yf_symbols:
-                    results[sym] = (None, str(e))
+                        stored = bar_store.slice(bar_store.read(sym), start_date, end_date)
+                        if not stored.empty and 'close' in stored.columns:
+                            results[sym] = (stored, None)
+                        else:
+                            results[sym] = (None, err or "Empty data")
 
         return results
+    
+    def _download_batch(
+        self,
+        symbols: List[str],
+        start_date,
+        end_date
+    ) -> Dict[str, Tuple[Optional[pd.DataFrame], Optional[str]]]:
+        """
+        Sharded yfinance download.
+        Symbols are split into chunks of DATA_FETCH_SETTINGS['batch_chunk_size'] and fetched on a
+        bounded thread pool; shards that fail as a whole (exception / empty reply for a range with
+        sessions) are retried alone, per-symbol misses are kept as-is. Returns {symbol: (df, err)}.
+        """
+        chunk_size = max(1, DATA_FETCH_SETTINGS['batch_chunk_size'])
+        max_workers = max(1, DATA_FETCH_SETTINGS['max_workers'])
+        shards = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+        
+        results = {}
+        for attempt in range(DATA_FETCH_SETTINGS['shard_retries'] + 1):
+            if attempt:
+                time.sleep(DATA_FETCH_SETTINGS['retry_backoff'] * 2 ** (attempt - 1))
+                logger.info(f"Retrying {len(shards)} failed yfinance shard(s) (attempt {attempt + 1})")
+            
+            if len(shards) == 1:
+                outcomes = [self._download_chunk(shards[0], start_date, end_date)]
+            else:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(shards))) as pool:
+                    outcomes = list(pool.map(lambda shard: self._download_chunk(shard, start_date, end_date), shards))
+            
+            failed = []
+            for shard, (shard_results, ok) in zip(shards, outcomes):
+                results.update(shard_results)
+                if not ok:
+                    failed.append(shard)
+            
+            shards = failed
+            if not shards:
+                break
+        
+        if shards:
+            logger.warning(f"{sum(len(s) for s in shards)} symbols failed after {DATA_FETCH_SETTINGS['shard_retries'] + 1} attempts")
+        
+        return results
+    
+    def _download_chunk(
+        self,
+        symbols: List[str],
+        start_date,
+        end_date
+    ) -> Tuple[Dict[str, Tuple[Optional[pd.DataFrame], Optional[str]]], bool]:
+        """
+        One yfinance batch call, split per symbol and normalized to the bar store format.
+        Returns (results, ok) - ok is False when the whole call failed and is worth retrying.
+        """
+        results = {}
+        try:
+            # THREADS=FALSE inside a shard (avoids the NoneType error); parallelism comes from the shard pool
+            data = yf.download(
+                symbols,
+                start=pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+                end=pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+                progress=False,
+                auto_adjust=False, # Changed for stability
+                group_by='ticker',
+                threads=False # CRITICAL FIX for TypeError
+            )
+            
+            if data is None:
+                return {sym: (None, "YF batch returned no response") for sym in symbols}, False
+            if data.empty:
+                # yfinance swallows per-ticker exceptions (429s, timeouts) into an empty frame,
+                # so an empty reply only counts as clean when the range has no business days
+                if has_sessions(start_date, end_date):
+                    return {sym: (None, "yfinance: empty reply") for sym in symbols}, False
+                return {sym: (None, NO_DATA) for sym in symbols}, True
+            
+            for sym in symbols:
+                try:
+                    sym_data = self._extract_symbol(data, sym, single=len(symbols) == 1)
+                    
+                    # Clean + normalize columns (drops the all-NaN rows of symbols without bars)
+                    if not sym_data.empty:
+                        sym_data = bar_store.normalize(sym_data)
+                    if sym_data.empty:
+                        # Others in the shard have bars, so this ticker failed or has none (delisted)
+                        results[sym] = (None, "yfinance: no bars")
+                    elif 'close' not in sym_data.columns:
+                        results[sym] = (None, "Missing close")
+                    else:
+                        results[sym] = (sym_data, None)
+                except Exception as ex:
+                    results[sym] = (None, str(ex))
+                    
+        except Exception as e:
+            logger.error(f"YF batch failed: {e}")
+            return {sym: (None, str(e)) for sym in symbols}, False
+        
+        return results, True
+    
+    @staticmethod
+    def _extract_symbol(data: pd.DataFrame, symbol: str, single: bool = False) -> pd.DataFrame:
+        """Pull one ticker's OHLCV out of a (possibly multi-ticker) yfinance frame"""
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol in data.columns.get_level_values(0):
+                return data[symbol].copy()
+            if symbol in data.columns.get_level_values(1):
+                return data.xs(symbol, axis=1, level=1).copy()
+            return pd.DataFrame()
+        return data.copy() if single else pd.DataFrame()
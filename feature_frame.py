@@ -0,0 +1,149 @@
+"""
+Feature Frame
+Lazily computed, memoized indicator series shared by every plugin in a render.
+- One FeatureFrame per (symbol, data version); the version is a content hash of the OHLCV frame
+- Accessors (sma, ema, rsi, atr, obv, log_returns...) compute on first use and are cached
+- app_modular attaches the frame for the selected symbol as context['features']
+Formulas match the ones the plugins used inline (simple-average RSI, rolling-mean ATR).
+Returned series are shared: treat them as read-only.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from volume_kernels import obv_kernel
+
+logger = logging.getLogger(__name__)
+
+# Frames kept in the process-wide registry (LRU)
+MAX_FRAMES = 128
+
+
+def data_version(df: pd.DataFrame) -> int:
+    """Content hash of the frame (index + values): changes whenever the bars change"""
+    if df is None or df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df, index=True).sum())
+
+
+class FeatureFrame:
+    """
+    Indicator cache over one OHLCV DataFrame.
+    Column lookup is case-insensitive and tolerates yfinance MultiIndex columns.
+    """
+
+    def __init__(self, df: pd.DataFrame, symbol: Optional[str] = None, version: Optional[int] = None):
+        self.df = df
+        self.symbol = symbol
+        self.version = data_version(df) if version is None else version
+        self._lock = threading.RLock()
+        self._cache: Dict[Hashable, pd.Series] = {}
+        self._columns = self._column_map(df)
+
+    @staticmethod
+    def _column_map(df: pd.DataFrame) -> Dict[str, Hashable]:
+        if df is None:
+            return {}
+        columns = {}
+        for col in df.columns:
+            name = col[0] if isinstance(col, tuple) else col
+            columns.setdefault(str(name).lower(), col)
+        return columns
+
+    @property
+    def key(self) -> Tuple[Optional[str], int]:
+        return (self.symbol, self.version)
+
+    def __len__(self):
+        return 0 if self.df is None else len(self.df)
+
+    def _memo(self, key: Hashable, compute: Callable[[], pd.Series]) -> pd.Series:
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+            return self._cache[key]
+
+    def column(self, name: str) -> pd.Series:
+        """Raw OHLCV column ('close', 'Close', ('Close', 'X.NS') all resolve)"""
+        col = self._columns.get(name.lower())
+        if col is None:
+            raise KeyError(f"Column '{name}' not in price data")
+        series = self.df[col]
+        return series.iloc[:, 0] if isinstance(series, pd.DataFrame) else series
+
+    # ------------------------------------------------------------------
+    # Indicators
+    # ------------------------------------------------------------------
+
+    def sma(self, window: int, column: str = 'close') -> pd.Series:
+        return self._memo(('sma', window, column), lambda: self.column(column).rolling(window).mean())
+
+    def ema(self, span: int, column: str = 'close') -> pd.Series:
+        return self._memo(('ema', span, column), lambda: self.column(column).ewm(span=span, adjust=False).mean())
+
+    def rolling_std(self, window: int, column: str = 'close') -> pd.Series:
+        return self._memo(('std', window, column), lambda: self.column(column).rolling(window).std())
+
+    def rsi(self, period: int = 14) -> pd.Series:
+        def compute():
+            delta = self.column('close').diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+        return self._memo(('rsi', period), compute)
+
+    def true_range(self) -> pd.Series:
+        def compute():
+            high, low = self.column('high'), self.column('low')
+            prev_close = self.column('close').shift()
+            return pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+        return self._memo(('true_range',), compute)
+
+    def atr(self, period: int = 14) -> pd.Series:
+        return self._memo(('atr', period), lambda: self.true_range().rolling(period).mean())
+
+    def obv(self) -> pd.Series:
+        """On-Balance Volume: cumulative volume signed by the close-to-close direction (starts at 0)"""
+        def compute():
+            close = self.column('close')
+            return pd.Series(obv_kernel(close.to_numpy(), self.column('volume').to_numpy()), index=close.index)
+        return self._memo(('obv',), compute)
+
+    def returns(self) -> pd.Series:
+        return self._memo(('returns',), lambda: self.column('close').pct_change())
+
+    def log_returns(self) -> pd.Series:
+        def compute():
+            close = self.column('close')
+            return np.log(close / close.shift(1))
+        return self._memo(('log_returns',), compute)
+
+
+# ----------------------------------------------------------------------------
+# Registry: the same bars give back the same FeatureFrame (and its cached series)
+# ----------------------------------------------------------------------------
+
+_frames: "OrderedDict[Tuple[Optional[str], int], FeatureFrame]" = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def get_feature_frame(df: pd.DataFrame, symbol: Optional[str] = None) -> FeatureFrame:
+    """Memoized FeatureFrame for (symbol, data version)"""
+    key = (symbol, data_version(df))
+    with _frames_lock:
+        frame = _frames.get(key)
+        if frame is not None:
+            _frames.move_to_end(key)
+            return frame
+
+        frame = FeatureFrame(df, symbol, version=key[1])
+        _frames[key] = frame
+        while len(_frames) > MAX_FRAMES:
+            _frames.popitem(last=False)
+        return frame
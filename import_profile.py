@@ -0,0 +1,61 @@
+"""
+Import-Time Profiler
+Cold-start import cost, in the format of `python -X importtime`.
+- profile_imports(modules) imports them in a fresh interpreter with -X importtime
+- parse_importtime turns the stderr report into a table (self / cumulative microseconds)
+Used by the System Logs expander to track cold-start regressions.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+from typing import List
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(report: str) -> pd.DataFrame:
+    """
+    Parse `import time:   self [us] | cumulative | imported package` lines.
+    Nesting depth comes from the indentation of the package name (2 spaces per level).
+    """
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        rows.append({
+            'module': stripped,
+            'self_us': int(parts[0]),
+            'cumulative_us': int(parts[1]),
+            'depth': (len(name) - len(stripped) - 1) // 2,
+        })
+    return pd.DataFrame(rows, columns=['module', 'self_us', 'cumulative_us', 'depth'])
+
+
+def profile_imports(modules: List[str], top: int = 25, timeout: float = 120.0) -> pd.DataFrame:
+    """
+    Import modules in a fresh interpreter with -X importtime.
+    Returns the top entries by cumulative time (top-level imports first in ties).
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR, capture_output=True, text=True, timeout=timeout
+    )
+    if proc.returncode != 0:
+        logger.warning(f"Import profile exited with {proc.returncode}: {proc.stderr.strip().splitlines()[-1:]}")
+
+    df = parse_importtime(proc.stderr)
+    if df.empty:
+        return df
+    return df.sort_values(['cumulative_us', 'depth'], ascending=[False, True]).head(top).reset_index(drop=True)
@@ -0,0 +1,298 @@
+"""
+Indicator Panel
+Universe-wide indicators over symbols x time matrices.
+- N symbols are aligned on the union of their dates into 2-D close/high/low/volume arrays
+  (one row per symbol, time on the last axis); dates a symbol has no bar are NaN
+- SMA/EMA/RSI/ATR/RVOL/Bollinger run once for every row (no per-symbol Python loop), over each
+  symbol's own bars (on_bars): a date only other symbols traded is skipped, not a NaN in the window
+- Formulas match FeatureFrame (simple-average RSI, rolling-mean ATR), so a one-symbol panel
+  gives the same numbers as get_feature_frame(df)
+- snapshot() is the screening view: each indicator at every symbol's last bar
+Returned arrays are shared: treat them as read-only.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+# ----------------------------------------------------------------------------
+# Kernels (1-D or 2-D, time on the last axis)
+# ----------------------------------------------------------------------------
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """pandas rolling(window).mean(): NaN until the window is full or while it holds a NaN"""
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).mean(axis=-1)
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """pandas rolling(window).std() (sample, ddof=1)"""
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).std(axis=-1, ddof=1)
+    return out
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    pandas ewm(span, adjust=False).mean(). The recursion runs over time with all rows
+    at once; missing bars carry the previous value (ignore_na=True).
+    """
+    x = np.asarray(x, dtype=float)
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty(x.shape)
+    prev = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        xt = x[..., t]
+        prev = np.where(np.isnan(xt), prev, np.where(np.isnan(prev), xt, alpha * xt + (1 - alpha) * prev))
+        out[..., t] = prev
+    return out
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    out = np.full(np.shape(x), np.nan)
+    out[..., 1:] = np.diff(x, axis=-1)
+    return out
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Simple-average RSI (as FeatureFrame.rsi, where the first delta counts as 0).
+    NaN until `period` consecutive closes exist, so symbols listed later in the
+    panel start where their own series would.
+    """
+    delta = diff(close)
+    with np.errstate(invalid='ignore'):
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - (100 / (1 + gain / loss))
+    return np.where(np.isnan(rolling_mean(close, period)), np.nan, values)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """max(high - low, |high - prev close|, |low - prev close|), skipping missing terms"""
+    prev_close = np.full(np.shape(close), np.nan)
+    prev_close[..., 1:] = close[..., :-1]
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def _packing(valid: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Per-row order that moves each row's valid entries to the front (stable), or None
+    when no row has a gap (valid entries contiguous, so packing would change nothing).
+    """
+    count = valid.sum(axis=-1)
+    first = np.argmax(valid, axis=-1)
+    last = valid.shape[-1] - 1 - np.argmax(valid[..., ::-1], axis=-1)
+    if ((count == 0) | (count == last - first + 1)).all():
+        return None
+    return np.argsort(~valid, axis=-1, kind='stable')
+
+
+def on_bars(kernel: Callable[..., np.ndarray], *arrays: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Run a time-axis kernel over each row's own bars.
+    Every row's `valid` entries (default: non-NaN in the first array) are packed to the
+    front, the kernel runs on the packed rows and the results are scattered back, so a
+    row sees exactly its own series - as if the kernel had run on that symbol alone.
+    Positions outside `valid` are NaN.
+    """
+    arrays = [np.asarray(a, dtype=float) for a in arrays]
+    valid = ~np.isnan(arrays[0]) if valid is None else valid
+    order = _packing(valid)
+    if order is None:
+        return np.where(valid, kernel(*arrays), np.nan)
+
+    packed = kernel(*(np.take_along_axis(a, order, axis=-1) for a in arrays))
+    out = np.empty(packed.shape)
+    np.put_along_axis(out, order, packed, axis=-1)
+    return np.where(valid, out, np.nan)
+
+
+def last_valid(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Each row's value at its last `valid` position (NaN for rows without any)"""
+    position = np.where(valid, np.arange(valid.shape[-1]), -1).max(axis=-1, initial=-1)
+    out = np.take_along_axis(values, np.maximum(position, 0)[:, None], axis=-1)[:, 0]
+    return np.where(position >= 0, out, np.nan)
+
+
+# ----------------------------------------------------------------------------
+# Panel
+# ----------------------------------------------------------------------------
+
+def column_map(df: pd.DataFrame) -> Dict[str, Hashable]:
+    """Lowercase field -> column, tolerating title case and yfinance MultiIndex columns"""
+    columns = {}
+    for col in df.columns:
+        columns.setdefault(str(col[0] if isinstance(col, tuple) else col).lower(), col)
+    return columns
+
+
+class IndicatorPanel:
+    """
+    Indicator cache over an aligned universe of OHLCV frames.
+    Every accessor returns a (symbols x time) array; row i belongs to self.symbols[i].
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        frames = {sym: df for sym, df in frames.items() if df is not None and not df.empty}
+        self.symbols: List[str] = list(frames)
+        self._lock = threading.RLock()
+        self._cache: Dict[Hashable, np.ndarray] = {}
+
+        # Shared date index: the union of every symbol's bars
+        indexes = [df.index for df in frames.values()]
+        if not indexes:
+            self.index: pd.Index = pd.DatetimeIndex([])
+        elif all(ix.equals(indexes[0]) for ix in indexes[1:]) and indexes[0].is_monotonic_increasing:
+            self.index = indexes[0]
+        else:
+            self.index = indexes[0].append(indexes[1:]).unique().sort_values()
+
+        for name in FIELDS:
+            setattr(self, name, np.full((len(self.symbols), len(self.index)), np.nan))
+        for row, df in enumerate(frames.values()):
+            positions = slice(None) if df.index.equals(self.index) else self.index.get_indexer(df.index)
+            columns = column_map(df)
+            for name in FIELDS:
+                col = columns.get(name)
+                if col is not None:
+                    values = df[col]
+                    if isinstance(values, pd.DataFrame):
+                        values = values.iloc[:, 0]
+                    getattr(self, name)[row, positions] = values.to_numpy(dtype=float)
+
+        # Dates each symbol has a bar, and the position of its last one (-1: no close at all)
+        self.has_bar = ~np.isnan(self.close)
+        self.bars = self.has_bar.sum(axis=1)
+        self.last_bar = np.where(self.has_bar, np.arange(self.has_bar.shape[1]), -1).max(axis=1, initial=-1)
+
+    @classmethod
+    def from_data_map(cls, data_map: Dict[str, Tuple[Optional[pd.DataFrame], Optional[str]]]) -> "IndicatorPanel":
+        """Panel over MultiAssetDataFetcher.fetch_multiple_assets output ({symbol: (df, error)})"""
+        return cls({sym: df for sym, (df, _) in data_map.items()})
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _memo(self, key: Hashable, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+            return self._cache[key]
+
+    def field(self, name: str) -> np.ndarray:
+        if name not in FIELDS:
+            raise KeyError(f"Unknown field '{name}'")
+        return getattr(self, name)
+
+    def row(self, symbol: str) -> int:
+        return self.symbols.index(symbol)
+
+    # ------------------------------------------------------------------
+    # Indicators
+    # ------------------------------------------------------------------
+
+    def _on_bars(self, kernel: Callable[..., np.ndarray], *arrays: np.ndarray) -> np.ndarray:
+        return on_bars(kernel, *arrays, valid=self.has_bar)
+
+    def sma(self, window: int, field: str = 'close') -> np.ndarray:
+        return self._memo(('sma', window, field),
+                          lambda: self._on_bars(lambda x: rolling_mean(x, window), self.field(field)))
+
+    def ema(self, span: int, field: str = 'close') -> np.ndarray:
+        # The recursion already skips missing bars; only the gaps themselves are blanked
+        return self._memo(('ema', span, field),
+                          lambda: np.where(self.has_bar, ema(self.field(field), span), np.nan))
+
+    def rolling_std(self, window: int, field: str = 'close') -> np.ndarray:
+        return self._memo(('std', window, field),
+                          lambda: self._on_bars(lambda x: rolling_std(x, window), self.field(field)))
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        return self._memo(('rsi', period), lambda: self._on_bars(lambda c: rsi(c, period), self.close))
+
+    def true_range(self) -> np.ndarray:
+        return self._memo(('true_range',), lambda: self._on_bars(true_range, self.high, self.low, self.close))
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        return self._memo(('atr', period), lambda: self._on_bars(lambda tr: rolling_mean(tr, period), self.true_range()))
+
+    def rvol(self, window: int = 20) -> np.ndarray:
+        """Relative volume: volume / its `window`-bar average (0 where the average is not positive)"""
+        def compute():
+            avg = self.sma(window, 'volume')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(avg > 0, self.volume / avg, np.where(np.isnan(avg), np.nan, 0.0))
+        return self._memo(('rvol', window), compute)
+
+    def bollinger(self, window: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(middle, upper, lower) bands"""
+        def compute():
+            mid, std = self.sma(window), self.rolling_std(window)
+            return np.stack([mid, mid + num_std * std, mid - num_std * std])
+        bands = self._memo(('bollinger', window, num_std), compute)
+        return bands[0], bands[1], bands[2]
+
+    def pct_change(self) -> np.ndarray:
+        """Close vs the symbol's previous bar, in percent (gaps in the shared index are skipped)"""
+        def compute():
+            prev = pd.DataFrame(self.close.T).ffill().to_numpy().T
+            prev = np.concatenate([np.full((len(self), 1), np.nan), prev[:, :-1]], axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(prev != 0, (self.close / prev - 1) * 100, np.nan)
+        return self._memo(('pct_change',), compute)
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def last(self, values: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Value at each symbol's last bar (NaN for symbols without any).
+        rows: the panel rows `values` was computed for, when it covers a subset.
+        """
+        last_bar = self.last_bar if rows is None else self.last_bar[rows]
+        out = np.take_along_axis(values, np.maximum(last_bar, 0)[:, None], axis=-1)[:, 0]
+        return np.where(last_bar >= 0, out, np.nan)
+
+    def to_frame(self, values: np.ndarray) -> pd.DataFrame:
+        """Dates x symbols DataFrame of an indicator matrix (for display / pandas interop)"""
+        return pd.DataFrame(np.asarray(values).T, index=self.index, columns=self.symbols)
+
+    def snapshot(self) -> pd.DataFrame:
+        """One row per symbol with the standard screening indicators at its last bar"""
+        start = time.perf_counter()
+        mid, upper, lower = self.bollinger(20, 2.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_pct = (self.close - lower) / (upper - lower)
+        snap = pd.DataFrame({
+            'close': self.last(self.close),
+            'change_pct': self.last(self.pct_change()),
+            'sma20': self.last(self.sma(20)),
+            'sma50': self.last(self.sma(50)),
+            'ema20': self.last(self.ema(20)),
+            'rsi14': self.last(self.rsi(14)),
+            'atr14': self.last(self.atr(14)),
+            'rvol20': self.last(self.rvol(20)),
+            'bb_pct': self.last(bb_pct),
+            'bars': self.bars,
+        }, index=pd.Index(self.symbols, name='symbol'))
+        logger.info(f"Indicator snapshot: {len(self)} symbols x {len(self.index)} bars "
+                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return snap
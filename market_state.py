@@ -11,6 +11,8 @@ import pandas as pd
 import numpy as np
 from enum import Enum
 
+from feature_frame import FeatureFrame, get_feature_frame
+
 class TrendState(Enum):
     BULLISH_STRONG = "Strong Uptrend"
     BULLISH_WEAK = "Weak Uptrend"
@@ -56,15 +58,16 @@ class MarketState:
         return f"{self.trend.value} | Volatility: {self.volatility.value}"
 
 class MarketStateAnalyzer:
-    def __init__(self, price_data: pd.DataFrame):
+    def __init__(self, price_data: pd.DataFrame, features: Optional[FeatureFrame] = None):
         self.data = price_data
         self.bars = len(price_data)
+        self.features = features or get_feature_frame(price_data)
         
     def _analyze_trend(self) -> TrendState:
         if self.bars < 50: return TrendState.INSUFFICIENT_DATA
         
-        sma20 = self.data['close'].rolling(20).mean().iloc[-1]
-        sma50 = self.data['close'].rolling(50).mean().iloc[-1]
+        sma20 = self.features.sma(20).iloc[-1]
+        sma50 = self.features.sma(50).iloc[-1]
         price = self.data['close'].iloc[-1]
         
         if price > sma20 > sma50: return TrendState.BULLISH_STRONG
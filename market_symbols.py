@@ -110,6 +110,22 @@ SECTOR_CONSTITUENTS = {
     "NIFTY INFRA": ["LT.NS", "ULTRACEMCO.NS", "GRASIM.NS", "SIEMENS.NS", "ABB.NS", "HAL.NS", "BEL.NS", "INDIGO.NS", "CONCOR.NS", "GMRINFRA.NS"]
 }
 
+# Default workspace (HUD row + watchlist), shared by the app and the warm-up daemon
+HUD_METRICS = [
+    ("NIFTY 50", "^NSEI"), ("SENSEX", "^BSESN"), ("S&P 500", "^GSPC"),
+    ("NASDAQ", "^IXIC"), ("USD/INR", "INR=X"), ("GOLD", "GC=F")
+]
+
+WATCHLIST_TOP_STOCKS = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ITC.NS', 'SBIN.NS', 'BAJFINANCE.NS', 'BHARTIARTL.NS']
+
+def get_major_indices():
+    """Indian benchmark indices for the 'Major Indices' watchlist"""
+    return [v for k, v in INDICES.items() if any(x in k.upper() for x in ["NIFTY", "SENSEX", "BANK", "VIX"])]
+
+def get_sector_indices():
+    """{name: ticker} of NSE sectoral/thematic indices + NIFTY 50 (Sector Rotation universe)"""
+    return {k: v for k, v in INDICES.items() if "NIFTY" in k and "VIX" not in k and "NEXT" not in k and "MIDCAP" not in k}
+
 # Helper to get all symbols
 def get_all_symbols():
     return list(INDICES.values()) + list(MACRO_ASSETS.values()) + STOCKS
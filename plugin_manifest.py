@@ -0,0 +1,60 @@
+"""
+Plugin Manifest
+Every UI plugin by (name, category, module), so the registry can list them
+without importing their modules (and their yfinance / plotly / bs4 / genai / sklearn deps).
+A module is imported the first time one of its plugins is requested.
+Where two modules register the same name, the module listed here wins.
+"""
+
+from architecture_modular import PluginSpec
+
+PLUGIN_MANIFEST = [
+    # Market
+    PluginSpec("VIX Analysis", "market", "plugins_core"),
+    PluginSpec("Market Breadth", "market", "plugins_core"),
+    PluginSpec("Risk Radar", "market", "plugins_dashboard"),
+    PluginSpec("Action Items", "market", "plugins_dashboard"),
+    PluginSpec("Change Detection", "market", "plugins_honest"),
+    PluginSpec("Market State", "market", "plugins_state"),
+    PluginSpec("Real-Time Alerts", "market", "plugins_pro"),
+    PluginSpec("Index DNA", "market", "plugins_index_dna"),
+    PluginSpec("Sector Rotation & Swing", "market", "plugins_sector_rotation"),
+    PluginSpec("Market Swing Scan", "market", "plugins_sector_rotation"),
+
+    # Macro
+    PluginSpec("Global Markets", "macro", "plugins_pro"),
+    PluginSpec("Bond Market", "macro", "plugins_core"),
+    PluginSpec("Market Attribution", "macro", "plugins_attribution"),
+    PluginSpec("Macro Heatmap", "macro", "plugins_dashboard"),
+    PluginSpec("Important Watch List", "macro", "plugins_watch"),
+    PluginSpec("Economic Indicators", "macro", "plugins_pro"),
+    PluginSpec("Macro Regime", "macro", "plugins_macro_regime"),
+    PluginSpec("Global Macro Bridge", "macro", "plugins_global_macro"),
+
+    # Asset
+    PluginSpec("Options Analysis", "asset", "plugins_advanced"),
+    PluginSpec("Greeks Analysis", "asset", "plugins_advanced"),
+    PluginSpec("Futures Analysis", "asset", "plugins_advanced"),
+    PluginSpec("Fundamentals", "asset", "plugins_advanced"),
+    PluginSpec("Correlation Analysis", "asset", "plugins_correlation"),
+    PluginSpec("Volume Analysis", "asset", "plugins_volume"),
+    PluginSpec("Fundamental Analysis", "asset", "plugins_fundamentals"),
+    PluginSpec("Forensic Lab", "asset", "plugins_forensic"),
+    PluginSpec("Whale Hunter", "asset", "plugins_whale"),
+    PluginSpec("Universe OBV Scan", "asset", "plugins_whale"),
+    PluginSpec("Portfolio Tracker", "asset", "plugins_pro"),
+    PluginSpec("Alpha Fusion", "asset", "plugins_alpha"),
+    PluginSpec("Interactive Chart", "asset", "plugins_chart"),
+
+    # Sentiment
+    PluginSpec("Market News", "sentiment", "plugins_core"),
+    PluginSpec("AI Insights", "sentiment", "plugins_advanced"),
+    PluginSpec("Company Filings", "sentiment", "plugins_screener"),
+    PluginSpec("News Sentiment", "sentiment", "plugins_pro"),
+    PluginSpec("Insider Trading", "sentiment", "plugins_pro"),
+
+    # Portfolio / Quant
+    PluginSpec("My Portfolio", "portfolio", "plugins_portfolio"),
+    PluginSpec("Portfolio X-Ray", "portfolio", "plugins_portfolio_xray"),
+    PluginSpec("Quant Lab", "ai", "plugins_backtester"),
+]
@@ -122,12 +122,32 @@ class OptionsAnalysisPlugin(AnalysisPlugin):
     def requires_config(self):
         return ['UPSTOX_API_KEY', 'UPSTOX_API_SECRET']
     
+    @property
+    def provides(self):
+        return ['option_chain', 'spot_price', 'pcr', 'max_pain', 'oi']
+    
+    def _upstox_client(self, config: Dict[str, Any]):
+        """Upstox client from the context config keys, else None"""
+        if not config.get('UPSTOX_API_KEY') or not config.get('UPSTOX_API_SECRET'):
+            return None
+        return UpstoxFOData(UpstoxAuth(config['UPSTOX_API_KEY'], config['UPSTOX_API_SECRET']))
+    
+    def _session_config(self) -> Dict[str, Any]:
+        """This session's context config (render gets no context), else the api_config keys"""
+        config = st.session_state.get('context_config')
+        if config:
+            return config
+        try:
+            from api_config import UPSTOX_API_KEY, UPSTOX_API_SECRET
+        except ImportError:
+            return {}
+        return {'UPSTOX_API_KEY': UPSTOX_API_KEY, 'UPSTOX_API_SECRET': UPSTOX_API_SECRET}
+    
     def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
         try:
-            api_key = context.get('config', {}).get('UPSTOX_API_KEY')
-            api_secret = context.get('config', {}).get('UPSTOX_API_SECRET')
+            fo_data = self._upstox_client(context.get('config', {}))
             
-            if not api_key or not api_secret:
+            if fo_data is None:
                 return AnalysisResult(
                     success=False,
                     data={},
@@ -136,10 +156,6 @@ class OptionsAnalysisPlugin(AnalysisPlugin):
             
             symbol = context.get('upstox_symbol', 'Nifty 50')
             
-            # Fetch data
-            auth = UpstoxAuth(api_key, api_secret)
-            fo_data = UpstoxFOData(auth)
-            
             option_chain, spot_price = fo_data.get_option_chain(symbol, max_distance_pct=12.0)
             
             if option_chain.empty:
@@ -156,6 +172,7 @@ class OptionsAnalysisPlugin(AnalysisPlugin):
             return AnalysisResult(
                 success=True,
                 data={
+                    'symbol': symbol,
                     'option_chain': option_chain,
                     'spot_price': spot_price,
                     'pcr': pcr_data,
@@ -197,8 +214,26 @@ class OptionsAnalysisPlugin(AnalysisPlugin):
         
         option_chain = data.get('option_chain')
         spot_price = data.get('spot_price')
+        symbol = data.get('symbol', 'Nifty 50')
+        atm_state_key = f"result_{self.name}_atm_{symbol}"  # cleared with the other results on UPDATE VIEW
         
-        if option_chain is not None and not option_chain.empty and spot_price:
+        # Live refresh pulls only the ~22 near-ATM contracts (keys from the instrument index)
+        if spot_price and st.button("⚡ Refresh ATM quotes", key="btn_atm_refresh"):
+            try:
+                fo_data = self._upstox_client(self._session_config())
+                if fo_data is None:
+                    st.warning("Upstox API keys not configured")
+                else:
+                    st.session_state[atm_state_key] = fo_data.get_atm_option_quotes(symbol, spot_price, n_strikes=5)
+            except Exception as e:
+                logger.error(f"ATM refresh failed: {e}")
+        
+        live_atm = st.session_state.get(atm_state_key)
+        
+        if live_atm is not None and not live_atm.empty:
+            atm_chain = live_atm
+            st.caption("Live ATM quotes (targeted)")
+        elif option_chain is not None and not option_chain.empty and spot_price:
             # Find ATM index
             atm_idx = (option_chain['strike'] - spot_price).abs().idxmin()
             
@@ -207,6 +242,10 @@ class OptionsAnalysisPlugin(AnalysisPlugin):
             end_idx = min(len(option_chain), atm_idx + 6)
             
             atm_chain = option_chain.iloc[start_idx:end_idx].copy()
+        else:
+            atm_chain = None
+        
+        if atm_chain is not None:
             
             # Format for display
             # Column names from upstox_fo_complete.py are Uppercase (CE_LTP, PE_LTP, etc.)
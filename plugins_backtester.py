@@ -1,19 +1,49 @@
 """
 Signal Backtester Plugin (Quant Lab)
-Simple vector backtester for technical signals.
+Rule backtests and parameter sweeps on the vectorized engine (services/backtest_engine.py),
+plus a cross-sectional top-K portfolio mode over index constituents (services/portfolio_backtest.py).
 """
 
 import streamlit as st
+import datetime
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 import logging
 
 from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
+from data_fetcher import MultiAssetDataFetcher
+from index_composition import INDEX_WEIGHTS
+from indicator_panel import IndicatorPanel
+from services.backtest_engine import BacktestEngine, RuleError, compile_rule, parse_range
+from services.portfolio_backtest import REBALANCE_PERIODS, SCORERS, PortfolioBacktester, PortfolioResult
 
 logger = logging.getLogger(__name__)
 
+# Preset name -> (entry rule, exit rule)
+PRESETS = {
+    "Golden Cross (SMA20 > SMA50)": ("SMA20 > SMA50", ""),
+    "Price > SMA200": ("close > SMA200", ""),
+    "RSI Oversold (<30)": ("RSI < 30", ""),
+    "SMA Cross + RSI Filter (sweep)": ("SMA(fast) > SMA(slow) and RSI(14) < rsi_max", ""),
+    "RSI Mean Reversion (sweep)": ("RSI(period) < entry_level", "RSI(period) > exit_level"),
+}
+
+# Single-symbol history loaded for rule tests (years); the default sweep windows below
+# (SMA up to 240) need several years so most combinations are not pure warm-up
+DEFAULT_HISTORY_YEARS = 10
+
+# Default sweep values for the parameters the presets use
+PARAM_DEFAULTS = {
+    'fast': "5:50:5",
+    'slow': "60:240:20",
+    'rsi_max': "50:95:5",
+    'period': "7,14,21",
+    'entry_level': "20:40:5",
+    'exit_level': "50:70:5",
+}
+
 @register_plugin
 class BacktesterPlugin(AnalysisPlugin):
     """
@@ -47,87 +77,115 @@ class BacktesterPlugin(AnalysisPlugin):
         if price_data is None or price_data.empty:
             return AnalysisResult(success=False, data={}, error="Price data unavailable")
             
-        return AnalysisResult(success=True, data={'price_data': price_data})
+        return AnalysisResult(success=True, data={'price_data': price_data, 'symbol': context.get('symbol')})
+
+    def load_history(self, symbol: str, years: int) -> pd.DataFrame:
+        """Daily bars for `symbol` over the last `years` (local bar store first, like the portfolio mode)"""
+        end_date = datetime.datetime.now() + datetime.timedelta(days=1)
+        start_date = end_date - datetime.timedelta(days=int(365.25 * years))
+        return MultiAssetDataFetcher().fetch_asset(
+            symbol, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        )
 
-    def run_backtest(self, df: pd.DataFrame, entry_rule: str, exit_rule: str) -> Dict:
+    def run_backtest(self, df: pd.DataFrame, entry_rule: str, exit_rule: str = "",
+                     params: Optional[Dict[str, List[float]]] = None, **settings) -> Dict:
         """
-        Run a simple vector backtest
+        Run a vectorized backtest (services.backtest_engine).
+        entry_rule: a PRESETS name or a rule expression; settings go to BacktestEngine
+        (cost_bps, slippage_bps, sizing, size, target_vol, stop_loss).
         """
-        # Prepare Indicators
-        data = df.copy()
-        data['SMA_20'] = data['close'].rolling(20).mean()
-        data['SMA_50'] = data['close'].rolling(50).mean()
-        data['SMA_200'] = data['close'].rolling(200).mean()
-        
-        # RSI
-        delta = data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        data['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Logic Evaluation
-        # We'll use simple string parsing for safety (restricted scope)
-        # Allowed tokens: close, open, high, low, volume, SMA_20, SMA_50, SMA_200, RSI, >, <, >=, <=, ==, and, or
-        
-        def evaluate_condition(condition_str, df):
-            try:
-                # Map friendly names to df columns
-                token_map = {
-                    'Price': 'df["close"]',
-                    'SMA20': 'df["SMA_20"]',
-                    'SMA50': 'df["SMA_50"]',
-                    'SMA200': 'df["SMA_200"]',
-                    'RSI': 'df["RSI"]',
-                    'Volume': 'df["volume"]'
-                }
-                
-                eval_str = condition_str
-                for key, val in token_map.items():
-                    eval_str = eval_str.replace(key, val)
-                
-                # Safe eval? Using pandas eval is better but strictly we'd parse.
-                # For this prototype, we'll assume valid pandas syntax generated by UI
-                return pd.eval(eval_str)
-            except Exception as e:
-                logger.error(f"Backtest rule error: {e}")
-                return pd.Series([False]*len(df), index=df.index)
-
-        # Generate Signals
-        # 1 = Long, 0 = Cash
-        data['signal'] = 0
-        
-        if entry_rule == "Golden Cross (SMA20 > SMA50)":
-            data.loc[data['SMA_20'] > data['SMA_50'], 'signal'] = 1
-        elif entry_rule == "Price > SMA200":
-            data.loc[data['close'] > data['SMA_200'], 'signal'] = 1
-        elif entry_rule == "RSI Oversold (<30)":
-            data.loc[data['RSI'] < 30, 'signal'] = 1
-        
-        # Calculate Returns
-        # Shift signal by 1 because we enter at Close of Signal Day (or Open of next)
-        # Here assuming entering on Close of signal day (vector approximation)
-        data['strategy_returns'] = data['close'].pct_change() * data['signal'].shift(1)
-        data['buy_hold_returns'] = data['close'].pct_change()
-        
-        # Equity Curve
-        data['strategy_equity'] = (1 + data['strategy_returns']).cumprod()
-        data['buy_hold_equity'] = (1 + data['buy_hold_returns']).cumprod()
-        
-        # Metrics
-        total_return = (data['strategy_equity'].iloc[-1] - 1) * 100
-        bh_return = (data['buy_hold_equity'].iloc[-1] - 1) * 100
-        win_rate = len(data[data['strategy_returns'] > 0]) / len(data[data['strategy_returns'] != 0]) * 100 if len(data[data['strategy_returns'] != 0]) > 0 else 0
+        rule, preset_exit = PRESETS.get(entry_rule, (entry_rule, ""))
+        result = BacktestEngine(df, **settings).run(rule, exit_rule or preset_exit or None, params)
+        best = result.grid.iloc[0]
         
         return {
-            'equity_curve': data[['strategy_equity', 'buy_hold_equity']],
+            'equity_curve': result.curve(),
             'metrics': {
-                'Total Return': total_return,
-                'Buy & Hold': bh_return,
-                'Win Rate': win_rate
-            }
+                'Total Return': best['Total Return'],
+                'Buy & Hold': (result.buy_hold.iloc[-1] - 1) * 100,
+                'Win Rate': best['Win Rate'],
+                'Sharpe': best['Sharpe'],
+                'Max Drawdown': best['Max Drawdown'],
+                'Trades': int(best['Trades']),
+            },
+            'grid': result.grid,
+            'best_params': result.best,
+            'seconds': result.seconds
         }
 
+    def run_portfolio_backtest(self, index_id: str, years: int, score: str, top_k: int, schedule: str,
+                               cost_bps: float, slippage_bps: float) -> PortfolioResult:
+        """Top-K backtest over the constituents of an INDEX_WEIGHTS index (daily bars, local store first)"""
+        tickers = list(INDEX_WEIGHTS[index_id])
+        end_date = datetime.datetime.now() + datetime.timedelta(days=1)
+        start_date = end_date - datetime.timedelta(days=int(365.25 * years))
+        data_map = MultiAssetDataFetcher().fetch_multiple_assets(
+            tickers, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        )
+        panel = IndicatorPanel.from_data_map(data_map)
+        if not len(panel):
+            raise ValueError(f"No price data for {index_id} constituents")
+        return PortfolioBacktester(panel, cost_bps, slippage_bps).run(score, top_k, schedule)
+
+    def render_portfolio(self):
+        """Cross-sectional mode: rank an index's constituents, hold the top K"""
+        c1, c2, c3 = st.columns(3)
+        index_id = c1.selectbox("Universe", list(INDEX_WEIGHTS), key="pf_universe")
+        score = c2.selectbox("Rank By", list(SCORERS), key="pf_score")
+        schedule = c3.selectbox("Rebalance", list(REBALANCE_PERIODS), index=1, key="pf_schedule")
+        
+        k1, k2, k3, k4 = st.columns(4)
+        top_k = k1.number_input("Top K", 1, 50, 10, key="pf_top_k")
+        years = k2.slider("Years", 1, 10, 5, key="pf_years")
+        cost_bps = k3.number_input("Commission (bps)", 0.0, 100.0, 3.0, 0.5, key="pf_cost")
+        slippage_bps = k4.number_input("Slippage (bps)", 0.0, 100.0, 5.0, 0.5, key="pf_slippage")
+        
+        if not st.button("Run Portfolio Test"):
+            return
+        
+        try:
+            with st.spinner(f"Loading {len(INDEX_WEIGHTS[index_id])} constituents..."):
+                res = self.run_portfolio_backtest(index_id, years, score, int(top_k), schedule, cost_bps, slippage_bps)
+        except Exception as e:
+            logger.error(f"Portfolio backtest failed: {e}", exc_info=True)
+            st.error(f"Portfolio backtest failed: {e}")
+            return
+        
+        metrics = res.metrics
+        st.caption(f"{res.weights.shape[1]} symbols · {len(res.weights)} rebalances · computed in {res.seconds:.2f}s")
+        m1, m2, m3, m4, m5 = st.columns(5)
+        m1.metric("Total Return", f"{metrics['Total Return']:.1f}%",
+                  delta=f"{metrics['Total Return'] - metrics['Benchmark Return']:.1f}% vs EW")
+        m2.metric("CAGR", f"{metrics['CAGR']:.1f}%")
+        m3.metric("Sharpe", f"{metrics['Sharpe']:.2f}")
+        m4.metric("Max Drawdown", f"{metrics['Max Drawdown']:.1f}%")
+        m5.metric("Turnover / yr", f"{metrics['Annual Turnover']:.0f}%")
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=res.equity.index, y=res.equity, name=f'Top {int(top_k)}', line=dict(color='#00FFA3')))
+        fig.add_trace(go.Scatter(x=res.benchmark.index, y=res.benchmark, name='Equal-Weight Universe', line=dict(color='gray', dash='dash')))
+        fig.add_trace(go.Scatter(x=res.drawdown.index, y=res.drawdown * 100, name='Drawdown %', yaxis='y2',
+                                 fill='tozeroy', line=dict(color='rgba(255,80,80,0.6)')))
+        fig.update_layout(
+            title="Portfolio Equity",
+            height=400,
+            margin=dict(t=30, b=10, l=10, r=10),
+            yaxis2=dict(overlaying='y', side='right', showgrid=False, title='DD %'),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        holdings = res.holdings()
+        st.markdown("**Latest Holdings**")
+        st.write(", ".join(sym.replace('.NS', '') for sym in holdings.iloc[-1]) or "Cash")
+        with st.expander("Rebalance Log"):
+            log = pd.DataFrame({
+                'Holdings': holdings.apply(lambda syms: ", ".join(s.replace('.NS', '') for s in syms)),
+                'Turnover %': (res.turnover * 100).round(1),
+            })
+            st.dataframe(log.iloc[::-1], use_container_width=True)
+
     def render(self, result: AnalysisResult):
         st.subheader(f"{self.icon} {self.name}")
         
@@ -135,31 +193,106 @@ class BacktesterPlugin(AnalysisPlugin):
             st.error(f"Backtester error: {result.error}")
             return
             
+        mode = st.radio("Mode", ["Single Symbol", "Portfolio (Top-K)"], horizontal=True,
+                        label_visibility="collapsed", key="bt_mode")
+        if mode != "Single Symbol":
+            self.render_portfolio()
+            return
+        
         price_data = result.data['price_data']
+        symbol = result.data.get('symbol')
         
         # Configuration
-        c1, c2, c3 = st.columns([2, 2, 1])
+        c1, c2 = st.columns([2, 3])
         
         with c1:
-            strategy = st.selectbox(
-                "Select Strategy",
-                ["Golden Cross (SMA20 > SMA50)", "Price > SMA200", "RSI Oversold (<30)"]
-            )
+            strategy = st.selectbox("Select Strategy", list(PRESETS) + ["Custom"])
+            years = st.slider("History (years)", 1, 20, DEFAULT_HISTORY_YEARS, key="bt_years",
+                              help="Daily bars loaded for the test; long windows need long history")
+        
+        preset_entry, preset_exit = PRESETS.get(strategy, ("", ""))[:2]
+        with c2:
+            entry_rule = st.text_input("Entry Rule", value=preset_entry, key=f"bt_entry_{strategy}",
+                                       help="e.g. SMA(fast) > SMA(slow) and RSI(14) < rsi_max. Free names are sweep parameters.")
+        exit_rule = st.text_input("Exit Rule (optional)", value=preset_exit, key=f"bt_exit_{strategy}",
+                                  help="Empty: hold while the entry rule is true")
+        
+        if not entry_rule.strip():
+            st.info("Enter an entry rule, e.g. close > SMA(50) and RSI(14) < 70")
+            return
+        
+        # Parameters found in the rules get a value list each (sweep = every combination)
+        try:
+            rule_params = compile_rule(entry_rule).params
+            if exit_rule.strip():
+                rule_params += [p for p in compile_rule(exit_rule).params if p not in rule_params]
+        except RuleError as e:
+            st.error(f"Rule error: {e}")
+            return
         
-        with c3:
-            run = st.button("Run Test")
+        params = {}
+        if rule_params:
+            st.caption("Parameter sweep: comma list or start:stop:step")
+            cols = st.columns(len(rule_params))
+            for col, name in zip(cols, rule_params):
+                with col:
+                    spec = st.text_input(name, value=PARAM_DEFAULTS.get(name, "10,20"), key=f"bt_param_{name}")
+                try:
+                    params[name] = parse_range(spec)
+                except ValueError as e:
+                    st.error(f"{name}: {e}")
+                    return
+        
+        with st.expander("Costs, Sizing & Risk"):
+            k1, k2, k3, k4 = st.columns(4)
+            cost_bps = k1.number_input("Commission (bps)", 0.0, 100.0, 3.0, 0.5)
+            slippage_bps = k2.number_input("Slippage (bps)", 0.0, 100.0, 2.0, 0.5)
+            sizing = k3.selectbox("Sizing", ["fixed", "volatility"],
+                                  help="fixed: size x equity; volatility: scaled to a 15% annualized target, capped at size")
+            size = k4.number_input("Size (fraction of equity)", 0.1, 1.0, 1.0, 0.1)
+            stop_pct = st.slider("Stop-Loss % (0 = off)", 0.0, 20.0, 0.0, 0.5)
+        
+        n_combos = int(np.prod([len(v) for v in params.values()])) if params else 1
+        run = st.button(f"Run Test ({n_combos} combination{'s' if n_combos > 1 else ''})")
             
         if run:
-            res = self.run_backtest(price_data, strategy, "")
+            if symbol:
+                try:
+                    with st.spinner(f"Loading {years}Y of {symbol}..."):
+                        price_data = self.load_history(symbol, years)
+                except Exception as e:
+                    logger.warning(f"History load failed for {symbol}, using the page data: {e}")
+                    st.warning(f"Could not load {years}Y history ({e}); testing on the {len(price_data)} loaded bars")
+            
+            longest = max((max(values) for values in params.values()), default=0)
+            if longest >= len(price_data) / 2:
+                st.warning(f"Windows up to {longest:g} bars on {len(price_data)} bars: "
+                           f"most of the history is indicator warm-up - load more years or shorten the sweep")
+            
+            try:
+                res = self.run_backtest(
+                    price_data, entry_rule, exit_rule, params,
+                    cost_bps=cost_bps, slippage_bps=slippage_bps, sizing=sizing, size=size,
+                    stop_loss=stop_pct / 100 if stop_pct > 0 else None
+                )
+            except (RuleError, KeyError, ValueError) as e:
+                st.error(f"Backtest failed: {e}")
+                return
             metrics = res['metrics']
             curve = res['equity_curve']
             
+            if res['best_params']:
+                best = ", ".join(f"{k}={v:g}" for k, v in res['best_params'].items())
+                st.caption(f"{len(res['grid'])} combinations in {res['seconds']:.2f}s · best by Sharpe: {best}")
+            
             # Metrics Row
-            m1, m2, m3 = st.columns(3)
+            m1, m2, m3, m4, m5 = st.columns(5)
             m1.metric("Strategy Return", f"{metrics['Total Return']:.2f}%", 
                      delta=f"{metrics['Total Return'] - metrics['Buy & Hold']:.2f}% vs B&H")
             m2.metric("Buy & Hold", f"{metrics['Buy & Hold']:.2f}%")
-            m3.metric("Win Rate", f"{metrics['Win Rate']:.1f}%")
+            m3.metric("Sharpe", f"{metrics['Sharpe']:.2f}")
+            m4.metric("Max Drawdown", f"{metrics['Max Drawdown']:.1f}%")
+            m5.metric("Win Rate", f"{metrics['Win Rate']:.1f}%", delta=f"{metrics['Trades']} trades", delta_color="off")
             
             # Chart
             fig = go.Figure()
@@ -174,3 +307,7 @@ class BacktesterPlugin(AnalysisPlugin):
                 plot_bgcolor='rgba(0,0,0,0)'
             )
             st.plotly_chart(fig, use_container_width=True)
+            
+            if len(res['grid']) > 1:
+                st.markdown("**Top Combinations**")
+                st.dataframe(res['grid'].head(25).round(2), use_container_width=True, hide_index=True)
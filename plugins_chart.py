@@ -11,6 +11,7 @@ from typing import Dict, Any
 import logging
 
 from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
+from feature_frame import get_feature_frame
 
 logger = logging.getLogger(__name__)
 
@@ -66,10 +67,11 @@ class InteractiveChartPlugin(AnalysisPlugin):
              return AnalysisResult(success=False, data={}, error=f"Missing columns: {[c for c in required if c not in df.columns]}")
 
         # Calculate Indicators
-        # SMA
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        df['SMA_200'] = df['Close'].rolling(window=200).mean()
+        # SMA (shared with the other plugins via the context's feature frame)
+        features = context.get('features') or get_feature_frame(price_data, symbol)
+        df['SMA_20'] = features.sma(20)
+        df['SMA_50'] = features.sma(50)
+        df['SMA_200'] = features.sma(200)
         
         # VWAP
         df['Typical_Price'] = (df['High'] + df['Low'] + df['Close']) / 3
@@ -137,7 +137,7 @@ class MarketBreadthPlugin(AnalysisPlugin):
     
     @property
     def name(self) -> str:
-        return "Market Overview"
+        return "Market Breadth"
     
     @property
     def icon(self) -> str:
@@ -151,43 +151,35 @@ class MarketBreadthPlugin(AnalysisPlugin):
     def category(self) -> str:
         return "market"
     
-    @property
-    def requires_config(self):
-        return ['UPSTOX_API_KEY', 'UPSTOX_API_SECRET']
-    
     def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
         try:
+            # {display name: (Upstox index name, Yahoo ticker)}
             indices = {
-                'NIFTY 50': 'Nifty 50',
-                'Bank Nifty': 'Bank Nifty',
-                'Midcap 100': 'Nifty Midcap 100',
-                'Smallcap 100': 'Nifty Smallcap 100'
+                'NIFTY 50': ('Nifty 50', '^NSEI'),
+                'Bank Nifty': ('Bank Nifty', '^NSEBANK'),
+                'Midcap 100': ('Nifty Midcap 100', 'NIFTY_MIDCAP_100.NS'), # Corrected symbol
+                'Smallcap 100': ('Nifty Smallcap 100', '^CNXSC')
             }
             
-            # Check for Upstox
             api_key = context.get('config', {}).get('UPSTOX_API_KEY')
             api_secret = context.get('config', {}).get('UPSTOX_API_SECRET')
             
             results = {}
-            source = "Yahoo Finance"
             
             if api_key and api_secret:
                 try:
-                    auth = UpstoxAuth(api_key, api_secret)
-                    fo_data = UpstoxFOData(auth)
-                    source = "Upstox (Real-time)"
+                    fo_data = UpstoxFOData(UpstoxAuth(api_key, api_secret))
+                    # One lookup for all four: served from the live quote table when the
+                    # feed holds them, otherwise a single batched quote call
+                    quotes = fo_data.get_batch_stock_quotes([u for u, _ in indices.values()])
                     
-                    for name, symbol in indices.items():
-                        quote = fo_data.get_spot_quote(symbol)
+                    for name, (upstox_symbol, _) in indices.items():
+                        quote = quotes.get(upstox_symbol)
                         if quote:
-                            results[name] = {
-                                'price': quote['ltp'],
-                                'change': quote['change'],
-                                'change_pct': quote['change_pct']
-                            }
+                            results[name] = {'price': quote['ltp'], 'change': quote['change_pct']}
                         else:
-                            # Fallback if Upstox fails for specific symbol
-                            results[name] = {'price': None, 'change': None, 'change_pct': None}
+                            results[name] = {'price': None, 'change': None}
+                    source = "Upstox (Real-time)"
                 except Exception as e:
                     logger.error(f"Upstox breadth fetch failed: {e}")
                     results = {} # Trigger fallback
@@ -195,238 +187,22 @@ class MarketBreadthPlugin(AnalysisPlugin):
             # Fallback to yfinance if Upstox failed or not configured
             if not results:
                 source = "Yahoo Finance (Delayed)"
-                yf_map = {
-                    'NIFTY 50': '^NSEI',
-                    'Bank Nifty': '^NSEBANK',
-                    'Midcap 100': 'NIFTY_MIDCAP_100.NS',
-                    'Smallcap 100': '^CNXSC'
-                }
-                
-                for name, symbol in yf_map.items():
+                for name, (_, symbol) in indices.items():
                     try:
                         ticker = yf.Ticker(symbol)
                         data = ticker.history(period="5d")
                         
                         if not data.empty:
                             current = data['Close'].iloc[-1]
-                            prev = data['Close'].iloc[-2] if len(data) > 1 else data['Open'].iloc[-1]
-                            change = current - prev
-                            change_pct = (change / prev) * 100
+                            prev = data['Close'].iloc[0]
+                            change = ((current / prev) - 1) * 100
                             
                             results[name] = {
                                 'price': current,
-                                'change': change,
-                                'change_pct': change_pct
+                                'change': change
                             }
                     except:
-                        results[name] = {'price': None, 'change': None, 'change_pct': None}
-            
-            # Market breadth interpretation
-            positive = sum(1 for v in results.values() if v['change_pct'] and v['change_pct'] > 0)
-            total = len([v for v in results.values() if v['change_pct'] is not None])
-            
-            if total > 0:
-                breadth_pct = (positive / total) * 100
-                
-                if breadth_pct >= 75:
-                    breadth = "STRONG BULLISH"
-                elif breadth_pct >= 50:
-                    breadth = "MILDLY BULLISH"
-                elif breadth_pct >= 25:
-                    breadth = "MILDLY BEARISH"
-                else:
-                    breadth = "STRONG BEARISH"
-            else:
-                breadth = "UNKNOWN"
-            
-            return AnalysisResult(
-                success=True,
-                data={
-                    'indices': results,
-                    'breadth': breadth,
-                    'breadth_pct': breadth_pct if total > 0 else 0,
-                    'source': source
-                }
-            )
-            
-        except Exception as e:
-            return AnalysisResult(success=False, data={}, error=str(e))
-    
-    def render(self, result: AnalysisResult):
-        if not result.success:
-            st.error(f"Breadth error: {result.error}")
-            return
-        
-        data = result.data
-        
-        st.subheader(f"{self.icon} {self.name}")
-        st.caption(f"Data Source: {data['source']}")
-        
-        cols = st.columns(len(data['indices']))
-        
-        for col, (name, info) in zip(cols, data['indices'].items()):
-            with col:
-                if info['price']:
-                    is_pos = info['change_pct'] > 0 if info['change_pct'] is not None else None
-                    change_txt = f"{info['change_pct']:+.2f}%" if info['change_pct'] is not None else "0.00%"
-                    render_metric_card(
-                        name,
-                        f"₹{info['price']:,.2f}",
-                        change_txt,
-                        is_positive=is_pos
-                    )
-                else:
-                    render_metric_card(name, "N/A", "0.00%")
-
-    """VIX (Fear Index) Analysis"""
-    
-    @property
-    def name(self) -> str:
-        return "VIX Analysis"
-    
-    @property
-    def icon(self) -> str:
-        return "😱"
-    
-    @property
-    def description(self) -> str:
-        return "India VIX - Market fear gauge"
-    
-    @property
-    def category(self) -> str:
-        return "market"
-    
-    def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
-        try:
-            # Fetch India VIX
-            vix = yf.Ticker("^INDIAVIX")
-            vix_data = vix.history(period="1mo")
-            
-            if vix_data.empty:
-                return AnalysisResult(
-                    success=False,
-                    data={},
-                    error="VIX data unavailable"
-                )
-            
-            current_vix = vix_data['Close'].iloc[-1]
-            vix_change = ((current_vix / vix_data['Close'].iloc[0]) - 1) * 100
-            vix_52w_high = vix_data['Close'].max()
-            vix_52w_low = vix_data['Close'].min()
-            
-            # Interpretation
-            if current_vix < 12:
-                sentiment = "COMPLACENT"
-                interpretation = "Very low fear - market complacent, breakout possible"
-            elif current_vix < 18:
-                sentiment = "NORMAL"
-                interpretation = "Normal volatility - stable market conditions"
-            elif current_vix < 25:
-                sentiment = "ELEVATED"
-                interpretation = "Elevated fear - increased uncertainty"
-            else:
-                sentiment = "PANIC"
-                interpretation = "Extreme fear - potential capitulation/reversal"
-            
-            return AnalysisResult(
-                success=True,
-                data={
-                    'current': current_vix,
-                    'change_1m': vix_change,
-                    '52w_high': vix_52w_high,
-                    '52w_low': vix_52w_low,
-                    'sentiment': sentiment,
-                    'interpretation': interpretation,
-                    'history': vix_data
-                }
-            )
-            
-        except Exception as e:
-            return AnalysisResult(success=False, data={}, error=str(e))
-    
-    def render(self, result: AnalysisResult):
-        if not result.success:
-            st.error(f"VIX error: {result.error}")
-            return
-        
-        data = result.data
-        
-        st.subheader(f"{self.icon} {self.name}")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("India VIX", f"{data['current']:.2f}")
-        col2.metric("1M Change", f"{data['change_1m']:+.2f}%")
-        col3.metric("52W High", f"{data['52w_high']:.2f}")
-        col4.metric("52W Low", f"{data['52w_low']:.2f}")
-        
-        sentiment_color = {
-            'COMPLACENT': '🟢',
-            'NORMAL': '🔵',
-            'ELEVATED': '🟡',
-            'PANIC': '🔴'
-        }.get(data['sentiment'], '⚪')
-        
-        st.info(f"{sentiment_color} **{data['sentiment']}**: {data['interpretation']}")
-        
-        # Chart
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=data['history'].index,
-            y=data['history']['Close'],
-            name='VIX',
-            line=dict(color='red', width=2)
-        ))
-        fig.update_layout(title="India VIX - 1 Month", height=300)
-        st.plotly_chart(fig, use_container_width=True)
-
-
-@register_plugin
-class MarketBreadthPlugin(AnalysisPlugin):
-    """Multi-index market breadth"""
-    
-    @property
-    def name(self) -> str:
-        return "Market Breadth"
-    
-    @property
-    def icon(self) -> str:
-        return "📊"
-    
-    @property
-    def description(self) -> str:
-        return "NIFTY 50, Bank Nifty, Midcap, Smallcap"
-    
-    @property
-    def category(self) -> str:
-        return "market"
-    
-    def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
-        try:
-            indices = {
-                'NIFTY 50': '^NSEI',
-                'Bank Nifty': '^NSEBANK',
-                'Midcap 100': 'NIFTY_MIDCAP_100.NS', # Corrected symbol
-                'Smallcap 100': '^CNXSC'
-            }
-            
-            results = {}
-            
-            for name, symbol in indices.items():
-                try:
-                    ticker = yf.Ticker(symbol)
-                    data = ticker.history(period="5d")
-                    
-                    if not data.empty:
-                        current = data['Close'].iloc[-1]
-                        prev = data['Close'].iloc[0]
-                        change = ((current / prev) - 1) * 100
-                        
-                        results[name] = {
-                            'price': current,
-                            'change': change
-                        }
-                except:
-                    results[name] = {'price': None, 'change': None}
+                        results[name] = {'price': None, 'change': None}
             
             # Market breadth interpretation
             positive = sum(1 for v in results.values() if v['change'] and v['change'] > 0)
@@ -451,7 +227,8 @@ class MarketBreadthPlugin(AnalysisPlugin):
                 data={
                     'indices': results,
                     'breadth': breadth,
-                    'breadth_pct': breadth_pct if total > 0 else 0
+                    'breadth_pct': breadth_pct if total > 0 else 0,
+                    'source': source
                 }
             )
             
@@ -468,6 +245,7 @@ class MarketBreadthPlugin(AnalysisPlugin):
         st.subheader(f"{self.icon} {self.name}")
         
         st.markdown(f"**Market Breadth: {data['breadth']}** ({data['breadth_pct']:.0f}% positive)")
+        st.caption(f"Data Source: {data.get('source', 'Yahoo Finance (Delayed)')}")
         
         cols = st.columns(len(data['indices']))
         
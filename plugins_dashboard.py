@@ -12,6 +12,7 @@ from typing import Dict, Any, List
 import logging
 
 from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
+from feature_frame import get_feature_frame
 from plugins_forensic import ForensicLab
 from plugins_attribution import AttributionEngine
 from upstox_fo_complete import UpstoxAuth, UpstoxFOData
@@ -342,7 +343,8 @@ class ActionItemsPlugin(AnalysisPlugin):
         if price_data is not None:
             close = price_data['close']
             if len(close) > 200:
-                sma200 = close.rolling(200).mean().iloc[-1]
+                features = context.get('features') or get_feature_frame(price_data, context.get('symbol'))
+                sma200 = features.sma(200).iloc[-1]
                 current = close.iloc[-1]
                 if current > sma200:
                     signals.append({'source': 'Trend', 'type': 'Bullish', 'msg': 'Price above 200 DMA'})
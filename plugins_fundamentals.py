@@ -679,17 +679,28 @@ class FundamentalAnalysisPlugin(AnalysisPlugin):
         if not symbol:
             return AnalysisResult(success=False, data={}, error="No symbol provided for fundamental analysis.")
 
+        # Background jobs supply progress / cancellation hooks (absent on direct calls)
+        report = context.get('report_progress') or (lambda fraction, message="": None)
+        cancel = context.get('cancel_event')
+
         try:
             # Use FundamentalAnalyzer (bbt2 version) for core yfinance data, red flags, positive signals
+            report(0.05, "Company profile")
             fa = FundamentalAnalyzer(symbol)
             profile = fa.get_company_profile()
             key_metrics = fa.get_key_metrics()
+            report(0.3, "Holders & red flags")
             institutional_holders = fa.get_institutional_holders()
             red_flags = fa.detect_financial_red_flags()
             positive_signals = fa.detect_positive_signals()
+            report(0.5, "News")
             recent_news = fa.get_recent_news()
 
+            if cancel is not None and cancel.is_set():
+                return AnalysisResult(success=False, data={}, error="Cancelled")
+
             # Use ScreenerFundamentalsFetcher (bbt10 version) for screener.in specific ratios
+            report(0.6, "screener.in ratios")
             sf_fetcher = ScreenerFundamentalsFetcher(symbol)
             screener_ratios = sf_fetcher.get_comprehensive_screener_ratios()
             
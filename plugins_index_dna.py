@@ -6,6 +6,7 @@ Answers: "What is driving the market today?"
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import datetime
@@ -16,6 +17,7 @@ from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
 from index_composition import INDEX_WEIGHTS, STOCK_SECTORS, ETF_MAPPING
 from market_symbols import INDICES
 from data_fetcher import MultiAssetDataFetcher
+from indicator_panel import IndicatorPanel
 
 logger = logging.getLogger(__name__)
 
@@ -111,31 +113,31 @@ class IndexDNAPlugin(AnalysisPlugin):
                     logger.info(f"DEBUG: Sample Data for {sample_t}:")
                     logger.info(data_map[sample_t][0].tail())
             
-            for stock, weight in constituents.items():
-                if stock in data_map and data_map[stock][0] is not None:
-                    df = data_map[stock][0]
-                    if not df.empty and len(df) >= 2:
-                        close_curr = df['close'].iloc[-1]
-                        close_prev = df['close'].iloc[-2]
-                        
-                        # Guard against zero division
-                        if close_prev == 0:
-                            change_pct = 0.0
-                        else:
-                            change_pct = ((close_curr - close_prev) / close_prev) * 100
-                        
-                        # Contribution points approximation
-                        contrib_score = weight * change_pct
-                        
-                        attribution.append({
-                            'Symbol': stock.replace('.NS', ''),
-                            'Sector': STOCK_SECTORS.get(stock, 'Other'),
-                            'Weight': weight,
-                            'Price': close_curr,
-                            'Change %': change_pct,
-                            'Contribution': contrib_score
-                        })
-                        total_weighted_change += contrib_score
+            # Day change for every constituent in one panel pass
+            panel = IndicatorPanel.from_data_map(
+                {stock: data_map[stock] for stock in constituents if stock in data_map}
+            )
+            closes = panel.last(panel.close)
+            # Guard against zero division: a zero previous close counts as no change
+            changes = np.nan_to_num(panel.last(panel.pct_change()))
+            
+            for i in np.flatnonzero(panel.bars >= 2):
+                stock = panel.symbols[i]
+                weight = constituents[stock]
+                change_pct = changes[i]
+                
+                # Contribution points approximation
+                contrib_score = weight * change_pct
+                
+                attribution.append({
+                    'Symbol': stock.replace('.NS', ''),
+                    'Sector': STOCK_SECTORS.get(stock, 'Other'),
+                    'Weight': weight,
+                    'Price': closes[i],
+                    'Change %': change_pct,
+                    'Contribution': contrib_score
+                })
+                total_weighted_change += contrib_score
             
             if not attribution:
                  logger.warning("Index DNA: No attribution data calculated.")
@@ -16,6 +16,7 @@ from upstox_fo_complete import UpstoxAuth, UpstoxFOData
 from index_composition import ETF_MAPPING, INDEX_WEIGHTS, STOCK_SECTORS
 from ui_components import render_aggrid
 from data_fetcher import MultiAssetDataFetcher
+from feature_frame import get_feature_frame
 from services.instrument_service import instrument_service # Import service for key resolution
 
 logger = logging.getLogger(__name__)
@@ -204,8 +205,9 @@ class PortfolioXRayPlugin(AnalysisPlugin):
                         df = etf_data_map[yf_sym][0]
                         if not df.empty and len(df) > 20:
                             close = df['close'].iloc[-1]
-                            sma20 = df['close'].rolling(20).mean().iloc[-1]
-                            sma50 = df['close'].rolling(50).mean().iloc[-1]
+                            features = get_feature_frame(df, yf_sym)
+                            sma20 = features.sma(20).iloc[-1]
+                            sma50 = features.sma(50).iloc[-1]
                             
                             if close > sma20: trend_score += 1
                             if close > sma50: trend_score += 1
@@ -2,6 +2,7 @@
 Sector Rotation Alpha Plugin
 Visualizes money flow between sectors using Relative Rotation Graphs (RRG) logic
 and identifies "Swing Trading" breakout candidates within leading sectors.
+Market Swing Scan runs the same swing filters over every NSE EQ symbol with local bars.
 """
 
 import streamlit as st
@@ -9,12 +10,18 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import datetime
-from typing import Dict, Any, List
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import logging
 
 from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
-from market_symbols import INDICES, SECTOR_CONSTITUENTS
+from market_symbols import INDICES, SECTOR_CONSTITUENTS, get_sector_indices
 from data_fetcher import MultiAssetDataFetcher
+from config import SWING_SCAN_SETTINGS
+from index_composition import STOCK_SECTORS
+from indicator_panel import IndicatorPanel, diff, last_valid, on_bars, rolling_mean, rolling_std, rsi as rsi_kernel
+from services.bar_store import bar_store
+from services.instrument_service import instrument_service
 # We need UpstoxFOData for the derivatives check, likely passed in context or re-instantiated if needed.
 # Ideally use the one from context if available, or lightweight instantiation.
 try:
@@ -26,6 +33,190 @@ except:
 
 logger = logging.getLogger(__name__)
 
+SWING_COLUMNS = ['Symbol', 'Sector', 'Price', 'RSI', 'RVOL', 'Setup Score', 'OI Signal', 'OI',
+                 'Target (5%)', 'Stop Loss (-2%)', 'Pattern']
+
+
+# ----------------------------------------------------------------------------
+# Swing filters (shared by the sector drill-down and the market-wide scan)
+# ----------------------------------------------------------------------------
+
+def _record_stage(stages: Dict[str, Dict], name: str, kind: str, n_in: int, n_out: int, start: float):
+    """Accumulate a stage's symbol counts and wall time (summed over batches)"""
+    stage = stages.setdefault(name, {'Stage': name, 'Type': kind, 'In': 0, 'Out': 0, 'Time (ms)': 0.0})
+    stage['In'] += n_in
+    stage['Out'] += n_out
+    stage['Time (ms)'] += (time.perf_counter() - start) * 1000
+
+
+def swing_filters(panel: IndicatorPanel, stages: Optional[Dict[str, Dict]] = None) -> Dict[str, np.ndarray]:
+    """
+    Filters 1-4 for every symbol of a panel at once.
+    Trend and the RSI band prune (each stage only sees the previous one's survivors);
+    volatility contraction and RVOL are measured on the survivors for the setup score.
+    Windows run over each symbol's own bars, so a no-trade day in the shared index
+    (common for illiquid EQ symbols) does not blank its SMA / RSI.
+    Returns arrays aligned with 'rows' (panel rows that passed): close, rsi, volatility, rvol.
+    """
+    stages = {} if stages is None else stages
+
+    def own_bars(kernel, rows, *arrays):
+        return on_bars(kernel, *arrays, valid=panel.has_bar[rows])
+
+    # Filter 1: Trend (Price > SMA20) - Basic Bullishness
+    start = time.perf_counter()
+    rows = np.flatnonzero(panel.bars >= 20)
+    closes = panel.last(panel.close[rows], rows)
+    with np.errstate(invalid='ignore'):
+        keep = closes > panel.last(own_bars(lambda c: rolling_mean(c, 20), rows, panel.close[rows]), rows)
+    _record_stage(stages, "Trend: Price > SMA20", 'filter', len(panel), int(keep.sum()), start)
+    rows, closes = rows[keep], closes[keep]
+
+    # Filter 2: RSI (Momentum check), Swing Sweet Spot: RSI 50-75
+    start = time.perf_counter()
+    rsis = panel.last(own_bars(lambda c: rsi_kernel(c, 14), rows, panel.close[rows]), rows)
+    with np.errstate(invalid='ignore'):
+        keep = (rsis >= 50) & (rsis <= 75)
+    _record_stage(stages, "RSI 50-75", 'filter', len(rows), int(keep.sum()), start)
+    rows, closes, rsis = rows[keep], closes[keep], rsis[keep]
+
+    # Filter 3: Volatility Contraction / Consolidation
+    start = time.perf_counter()
+    close = panel.close[rows]
+    volatility = panel.last(own_bars(lambda r: rolling_mean(r, 3), rows, (panel.high[rows] - panel.low[rows]) / close), rows)
+    with np.errstate(invalid='ignore'):
+        _record_stage(stages, "Volatility contraction (< 3%)", 'score', len(rows), int((volatility < 0.03).sum()), start)
+
+    # Filter 4: Relative Volume (RVOL)
+    start = time.perf_counter()
+    volume = panel.volume[rows]
+    avg = own_bars(lambda v: rolling_mean(v, 20), rows, volume)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rvols = np.nan_to_num(panel.last(np.where(avg > 0, volume / avg, 0.0), rows))
+    _record_stage(stages, "RVOL > 1.2", 'score', len(rows), int((rvols > 1.2).sum()), start)
+
+    return {'rows': rows, 'close': closes, 'rsi': rsis, 'volatility': volatility, 'rvol': rvols}
+
+
+def swing_candidate(stock: str, sector: str, close: float, curr_rsi: float, rvol: float,
+                    volatility: float, oi_data: Dict) -> Dict[str, Any]:
+    """OI confirmation + setup score for one survivor of swing_filters"""
+    is_tight = volatility < 0.03
+    has_volume = rvol > 1.2 # At least 20% above avg
+    
+    # --- OI CONFIRMATION ---
+    oi_interp = oi_data.get('interpretation', 'No Data')
+    oi_value = oi_data.get('oi', 0)
+    
+    # Refine Interpretation based on Price & OI
+    # If we have real OI data
+    deriv_signal = "Neutral"
+    if oi_interp == "Long Buildup":
+        deriv_signal = "Bullish (Long Buildup)"
+    elif oi_interp == "Short Covering":
+        deriv_signal = "Bullish (Short Covering)"
+    
+    # Score the setup
+    score = 0
+    if is_tight: score += 1
+    if has_volume: score += 1
+    if curr_rsi > 60: score += 1 
+    if "Bullish" in deriv_signal: score += 2 # Big bonus for F&O confirmation
+    if rvol > 2.0: score += 1 # Huge Volume Spike
+    
+    return {
+        'Symbol': stock,
+        'Sector': sector,
+        'Price': close,
+        'RSI': curr_rsi,
+        'RVOL': rvol,
+        'Setup Score': score,
+        'OI Signal': deriv_signal,
+        'OI': oi_value,
+        'Target (5%)': close * 1.05,
+        'Stop Loss (-2%)': close * 0.98,
+        'Pattern': 'VCP' if is_tight else ('Momentum' if curr_rsi > 60 else 'Trend')
+    }
+
+
+def relative_rotation(panel: IndicatorPanel, bench_close: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (RS-Ratio, RS-Momentum) of every panel row against the benchmark, as of the last date
+    both traded. RS only exists where the row and the benchmark both have a bar (inner join);
+    the rolling windows run over those common dates only.
+    """
+    bench = bench_close.reindex(panel.index).to_numpy(dtype=float)
+    rs = 100 * (panel.close / bench)
+    common = ~np.isnan(rs)
+    rs_ratio = on_bars(lambda x: 100 + ((x - rolling_mean(x, 10)) / rolling_std(x, 10)), rs, valid=common)  # Trend
+    rs_mom = on_bars(lambda r: 100 + (diff(r) * 10), rs_ratio, valid=common)                                  # ROC of Ratio
+    return last_valid(rs_ratio, common), last_valid(rs_mom, common)
+
+
+def universe_symbols(store=bar_store) -> List[str]:
+    """Instrument-master EQ symbols (as SYMBOL.NS) that have daily bars in the local store"""
+    equities = {f"{sym}.NS" for sym in instrument_service.get_equity_symbols()}
+    return [sym for sym in store.symbols() if sym in equities]
+
+
+def scan_universe(
+    symbols: List[str],
+    start_date,
+    end_date,
+    store=bar_store,
+    futures_oi: Optional[Callable[[List[str]], Dict[str, Dict]]] = None,
+    batch_size: int = SWING_SCAN_SETTINGS['batch_size'],
+    report: Optional[Callable[[float, str], None]] = None,
+    cancel_event=None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Swing filters over local bars for every symbol, batch_size symbols per panel.
+    Only the survivors of all batches go to the (single, batched) futures OI lookup.
+    Returns (candidates ranked by Setup Score then RVOL, per-stage counts and time).
+    """
+    stages: Dict[str, Dict] = {}
+    survivors = []
+
+    for b in range(0, len(symbols), batch_size):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        batch = symbols[b:b + batch_size]
+
+        start = time.perf_counter()
+        panel = IndicatorPanel({sym: store.slice(store.read(sym), start_date, end_date) for sym in batch})
+        _record_stage(stages, "Load + align local bars", 'load', len(batch), len(panel), start)
+
+        result = swing_filters(panel, stages)
+        survivors.extend(zip(
+            [panel.symbols[i] for i in result['rows']],
+            result['close'], result['rsi'], result['rvol'], result['volatility']
+        ))
+        if report:
+            done = min(b + batch_size, len(symbols))
+            report(done / max(len(symbols), 1), f"{done}/{len(symbols)} symbols, {len(survivors)} setups")
+
+    # Phase 3 - DERIVATIVES CONFIRMATION, one batch for all survivors
+    start = time.perf_counter()
+    oi_map = {}
+    if futures_oi and survivors:
+        try:
+            oi_map = futures_oi([s[0] for s in survivors])
+        except Exception as e:
+            logger.error(f"Futures Batch Fetch Failed: {e}")
+    candidates = [
+        swing_candidate(stock, STOCK_SECTORS.get(stock, 'Other'), close, curr_rsi, rvol, volatility, oi_map.get(stock, {}))
+        for stock, close, curr_rsi, rvol, volatility in survivors
+    ]
+    confirmed = sum("Bullish" in c['OI Signal'] for c in candidates)
+    _record_stage(stages, "Futures OI confirmation", 'score', len(survivors), confirmed, start)
+
+    ranked = pd.DataFrame(candidates, columns=SWING_COLUMNS)
+    ranked = ranked.sort_values(['Setup Score', 'RVOL'], ascending=False).reset_index(drop=True)
+    timings = pd.DataFrame(list(stages.values()))
+    timings['Pruned'] = timings['In'] - timings['Out']
+    return ranked, timings
+
+
 @register_plugin
 class SectorRotationPlugin(AnalysisPlugin):
     """
@@ -52,16 +243,19 @@ class SectorRotationPlugin(AnalysisPlugin):
     def enabled_by_default(self) -> bool:
         return True
     
+    def _upstox_client(self, context: Dict[str, Any]):
+        """Upstox client if keys exist (for derivatives check), else None"""
+        if UPSTOX_AVAILABLE and context['config'].get('UPSTOX_API_KEY'):
+            try:
+                auth = UpstoxAuth(context['config']['UPSTOX_API_KEY'], context['config']['UPSTOX_API_SECRET'])
+                return UpstoxFOData(auth)
+            except Exception as e:
+                logger.warning(f"Sector Rotation: Upstox client init failed: {e}")
+        return None
+
     def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
         try:
-            # Initialize Upstox Client if keys exist (for derivatives check)
-            upstox_client = None
-            if UPSTOX_AVAILABLE and context['config'].get('UPSTOX_API_KEY'):
-                try:
-                    auth = UpstoxAuth(context['config']['UPSTOX_API_KEY'], context['config']['UPSTOX_API_SECRET'])
-                    upstox_client = UpstoxFOData(auth)
-                except Exception as e:
-                    logger.warning(f"Sector Rotation: Upstox client init failed: {e}")
+            upstox_client = self._upstox_client(context)
 
             # --- PHASE 1: SECTOR RRG ANALYSIS ---
             
@@ -69,7 +263,7 @@ class SectorRotationPlugin(AnalysisPlugin):
             benchmark_sym = INDICES.get(benchmark, '^NSEI')
             
             # Filter only Indian Sectoral/Thematic indices + Benchmark
-            sectors = {k: v for k, v in INDICES.items() if "NIFTY" in k and "VIX" not in k and "NEXT" not in k and "MIDCAP" not in k}
+            sectors = get_sector_indices()
             all_tickers = list(sectors.values())
             
             fetcher = MultiAssetDataFetcher()
@@ -92,52 +286,45 @@ class SectorRotationPlugin(AnalysisPlugin):
             rrg_data = []
             leading_sectors = []
             
-            for name, ticker in sectors.items():
-                if name == benchmark: continue
-                
-                if ticker in data_map and data_map[ticker][0] is not None:
-                    df = data_map[ticker][0]
-                    if df.empty or len(df) < 20: continue
-                    
-                    # Align indices
-                    closes = df['close']
-                    bench_closes = bench_df['close']
-                    merged = pd.concat([closes, bench_closes], axis=1, join='inner')
-                    merged.columns = ['Sector', 'Bench']
-                    
-                    # RRG Logic (Simplified)
-                    rs = 100 * (merged['Sector'] / merged['Bench'])
-                    rs_mean = rs.rolling(window=10).mean()
-                    rs_std = rs.rolling(window=10).std()
-                    
-                    # RS Ratio (Trend)
-                    rs_ratio = 100 + ((rs - rs_mean) / rs_std)
-                    
-                    # RS Momentum (ROC of Ratio)
-                    rs_mom = 100 + ((rs_ratio - rs_ratio.shift(1)) * 10)
-                    
-                    curr_ratio = rs_ratio.iloc[-1]
-                    curr_mom = rs_mom.iloc[-1]
-                    
-                    # Quadrant
-                    if curr_ratio > 100 and curr_mom > 100: quadrant = "Leading"
-                    elif curr_ratio > 100 and curr_mom < 100: quadrant = "Weakening"
-                    elif curr_ratio < 100 and curr_mom < 100: quadrant = "Lagging"
-                    else: quadrant = "Improving"
-                    
-                    rrg_data.append({
-                        'Symbol': name,
-                        'Ticker': ticker,
-                        'RS_Ratio': curr_ratio,
-                        'RS_Momentum': curr_mom,
-                        'Quadrant': quadrant,
-                        'PctChange': ((df['close'].iloc[-1]/df['close'].iloc[-2])-1)*100
-                    })
+            # All sectors in one panel; RS is measured on the dates each shares with the benchmark
+            sector_names = [name for name in sectors if name != benchmark]
+            panel = IndicatorPanel.from_data_map(
+                {sectors[name]: data_map.get(sectors[name], (None, None)) for name in sector_names}
+            )
+            
+            # RRG Logic (Simplified), every sector at once
+            curr_ratios, curr_moms = relative_rotation(panel, bench_df['close'])
+            pct_changes = panel.last(panel.pct_change())
+            
+            for name in sector_names:
+                ticker = sectors[name]
+                if ticker not in panel.symbols: continue
+                i = panel.row(ticker)
+                if panel.bars[i] < 20: continue
                     
-                    # Identify Focus Sectors for Phase 2
-                    # We want Leading (Strong trend) or Improving (Momentum shift)
-                    if quadrant in ["Leading", "Improving"]:
-                        leading_sectors.append(name)
+                curr_ratio = curr_ratios[i]
+                curr_mom = curr_moms[i]
+                if np.isnan(curr_ratio) or np.isnan(curr_mom): continue  # Too few common dates for RS
+                
+                # Quadrant
+                if curr_ratio > 100 and curr_mom > 100: quadrant = "Leading"
+                elif curr_ratio > 100 and curr_mom < 100: quadrant = "Weakening"
+                elif curr_ratio < 100 and curr_mom < 100: quadrant = "Lagging"
+                else: quadrant = "Improving"
+                
+                rrg_data.append({
+                    'Symbol': name,
+                    'Ticker': ticker,
+                    'RS_Ratio': curr_ratio,
+                    'RS_Momentum': curr_mom,
+                    'Quadrant': quadrant,
+                    'PctChange': pct_changes[i]
+                })
+                
+                # Identify Focus Sectors for Phase 2
+                # We want Leading (Strong trend) or Improving (Momentum shift)
+                if quadrant in ["Leading", "Improving"]:
+                    leading_sectors.append(name)
             
             # --- PHASE 2: STOCK DRILL-DOWN ---
             # For the top sectors, find constituent stocks that are primed for a move.
@@ -181,72 +368,17 @@ class SectorRotationPlugin(AnalysisPlugin):
                     except Exception as e:
                         logger.error(f"Futures Batch Fetch Failed: {e}")
 
-                for stock, (df, err) in stock_data.items():
-                    if df is None or df.empty or len(df) < 20: continue
-                    
-                    close = df['close'].iloc[-1]
-                    sma20 = df['close'].rolling(20).mean().iloc[-1]
-                    
-                    # Filter 1: Trend (Price > SMA20) - Basic Bullishness
-                    if close > sma20:
-                        
-                        # Filter 2: RSI (Momentum check)
-                        delta = df['close'].diff()
-                        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-                        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-                        rs_val = gain / loss
-                        rsi = 100 - (100 / (1 + rs_val))
-                        curr_rsi = rsi.iloc[-1]
-                        
-                        # Swing Sweet Spot: RSI 50-70
-                        if 50 <= curr_rsi <= 75:
-                            
-                            # Filter 3: Volatility Contraction / Consolidation
-                            recent_volatility = ((df['high'] - df['low']) / df['close']).rolling(3).mean().iloc[-1]
-                            is_tight = recent_volatility < 0.03
-                            
-                            # Filter 4: Relative Volume (RVOL)
-                            vol_sma = df['volume'].rolling(20).mean().iloc[-1]
-                            curr_vol = df['volume'].iloc[-1]
-                            rvol = curr_vol / vol_sma if vol_sma > 0 else 0
-                            
-                            has_volume = rvol > 1.2 # At least 20% above avg
-                            
-                            # --- OI CONFIRMATION ---
-                            oi_data = futures_oi_map.get(stock, {})
-                            oi_interp = oi_data.get('interpretation', 'No Data')
-                            oi_value = oi_data.get('oi', 0)
-                            
-                            # Refine Interpretation based on Price & OI
-                            # If we have real OI data
-                            deriv_signal = "Neutral"
-                            if oi_interp == "Long Buildup":
-                                deriv_signal = "Bullish (Long Buildup)"
-                            elif oi_interp == "Short Covering":
-                                deriv_signal = "Bullish (Short Covering)"
-                            
-                            # Score the setup
-                            score = 0
-                            if is_tight: score += 1
-                            if has_volume: score += 1
-                            if curr_rsi > 60: score += 1 
-                            if "Bullish" in deriv_signal: score += 2 # Big bonus for F&O confirmation
-                            if rvol > 2.0: score += 1 # Huge Volume Spike
-                            
-                            # Add to candidates
-                            swing_candidates.append({
-                                'Symbol': stock,
-                                'Sector': stock_sector_map.get(stock, 'Unknown'),
-                                'Price': close,
-                                'RSI': curr_rsi,
-                                'RVOL': rvol,
-                                'Setup Score': score,
-                                'OI Signal': deriv_signal,
-                                'OI': oi_value,
-                                'Target (5%)': close * 1.05,
-                                'Stop Loss (-2%)': close * 0.98,
-                                'Pattern': 'VCP' if is_tight else ('Momentum' if curr_rsi > 60 else 'Trend')
-                            })
+                # Filters 1-4 for every candidate in one panel pass
+                panel = IndicatorPanel.from_data_map(stock_data)
+                survivors = swing_filters(panel)
+                
+                for j, i in enumerate(survivors['rows']):
+                    stock = panel.symbols[i]
+                    swing_candidates.append(swing_candidate(
+                        stock, stock_sector_map.get(stock, 'Unknown'),
+                        survivors['close'][j], survivors['rsi'][j], survivors['rvol'][j],
+                        survivors['volatility'][j], futures_oi_map.get(stock, {})
+                    ))
 
             return AnalysisResult(
                 success=True,
@@ -362,3 +494,85 @@ class SectorRotationPlugin(AnalysisPlugin):
             else:
                 st.warning("No high-probability swing setups found in the top sectors today.")
 
+
+@register_plugin
+class MarketSwingScanPlugin(SectorRotationPlugin):
+    """
+    Full-universe mode of the swing scanner: no sector pre-selection, every EQ symbol
+    in the instrument master that has local daily bars (nothing is downloaded).
+    """
+
+    @property
+    def name(self) -> str:
+        return "Market Swing Scan"
+
+    @property
+    def icon(self) -> str:
+        return "🛰️"
+
+    @property
+    def description(self) -> str:
+        return "Swing filters (trend, RSI, contraction, RVOL, futures OI) across the whole market."
+
+    @property
+    def enabled_by_default(self) -> bool:
+        return False
+
+    def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
+        try:
+            symbols = universe_symbols()
+            if not symbols:
+                return AnalysisResult(success=False, data={}, error="No local bar data for EQ symbols (run the warm-up daemon or a backfill)")
+
+            end_date = datetime.datetime.now() + datetime.timedelta(days=1)
+            start_date = end_date - datetime.timedelta(days=SWING_SCAN_SETTINGS['lookback_days'])
+            upstox_client = self._upstox_client(context)
+
+            logger.info(f"Market Swing Scan: {len(symbols)} symbols with local bars")
+            candidates, stages = scan_universe(
+                symbols, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                futures_oi=upstox_client.get_batch_futures_oi if upstox_client else None,
+                report=context.get('report_progress'),
+                cancel_event=context.get('cancel_event')
+            )
+            return AnalysisResult(
+                success=True,
+                data={'candidates': candidates, 'stages': stages, 'universe': len(symbols)}
+            )
+
+        except Exception as e:
+            logger.error(f"Market Swing Scan failed: {e}", exc_info=True)
+            return AnalysisResult(success=False, data={}, error=str(e))
+
+    def render(self, result: AnalysisResult):
+        st.subheader(f"{self.icon} {self.name}")
+
+        if not result.success:
+            st.error(f"Analysis failed: {result.error}")
+            return
+
+        candidates = result.data.get('candidates', pd.DataFrame())
+        stages = result.data.get('stages', pd.DataFrame())
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Universe", result.data.get('universe', 0))
+        c2.metric("Setups", len(candidates))
+        c3.metric("Scan Time", f"{stages['Time (ms)'].sum():.0f} ms" if not stages.empty else "-")
+
+        st.markdown("**Filter Stages**")
+        st.dataframe(
+            stages.style.format({'Time (ms)': '{:.1f}'}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        if candidates.empty:
+            st.warning("No swing setups passed the trend and RSI filters.")
+            return
+
+        st.markdown("**Ranked Candidates**")
+        st.dataframe(
+            candidates[['Symbol', 'Sector', 'Price', 'RSI', 'RVOL', 'Setup Score', 'OI Signal', 'Pattern', 'Target (5%)']],
+            use_container_width=True,
+            hide_index=True
+        )
@@ -37,39 +37,27 @@ class MarketStatePlugin(AnalysisPlugin):
     def category(self) -> str:
         return "market"
     
+    @property
+    def requires(self):
+        # Supplied by the Options Analysis plugin when it runs upstream (see PluginScheduler)
+        return ['option_chain', 'pcr', 'oi']
+    
     def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
         price_data = context.get('price_data')
         if price_data is None:
             return AnalysisResult(False, {}, "No price data")
-            
-        # Get Options Data if available (re-fetch or check context?)
-        # For simplicity, we check if we have Upstox keys and fetch minimal info or rely on what's available
-        # Ideally, `context` should have an `option_chain` if the OptionsPlugin ran. 
-        # But plugins order isn't guaranteed. We'll instantiate minimal needed if missing.
         
-        option_chain = None
-        pcr_data = None
-        oi_analysis = None
-        
-        api_key = context.get('config', {}).get('UPSTOX_API_KEY')
-        upstox_symbol = context.get('upstox_symbol')
-        
-        if api_key and upstox_symbol:
-            try:
-                # Reuse existing auth logic if possible or lightweight check
-                # This is a bit heavy for a "state" check, but necessary for accuracy
-                pass 
-            except: pass
-
-        analyzer = MarketStateAnalyzer(price_data)
-        # Pass None for options if we don't want to re-fetch heavy data here. 
-        # Ideally this plugin runs AFTER Options plugin and reads from context.
-        # BUT for now, let's just do price-based state to be fast.
+        # Options inputs are optional: without them the state is price-based only
+        option_chain = context.get('option_chain')
+        pcr_data = context.get('pcr')
+        oi_analysis = context.get('oi')
         
-        state = analyzer.analyze(None, None, None)
+        features = context.get('features')
+        analyzer = MarketStateAnalyzer(price_data, features)
+        state = analyzer.analyze(option_chain, pcr_data, oi_analysis)
         
         # Validated Indicators
-        indicators = ValidatedIndicators(price_data)
+        indicators = ValidatedIndicators(price_data, features)
         rsi = indicators.rsi()
         atr = indicators.atr()
         
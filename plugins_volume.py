@@ -15,6 +15,8 @@ from datetime import datetime
 from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
 from data_fetcher import MultiAssetDataFetcher # Assuming DataFetcher from bbt10 can fetch multiple symbols
 from ui_components import render_aggrid
+from feature_frame import FeatureFrame, get_feature_frame
+from volume_kernels import divergence_pairs
 
 logger = logging.getLogger(__name__)
 
@@ -25,13 +27,15 @@ class VolumeAnalyzer:
     Answers: Is this breakout real? Are smart money accumulating? Volume drying up?
     """
     
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, features: Optional[FeatureFrame] = None):
         """
         Initialize volume analyzer
         
         Args:
             data: OHLCV DataFrame with 'Open', 'High', 'Low', 'Close', 'Volume'
+            features: Shared indicator cache for the same bars (built if not given)
         """
+        self.features = features or get_feature_frame(data)
         self.data = data.copy()
         # Ensure column names are lowercase for consistency if needed, assuming they are consistent here
         self.data.columns = [col.lower() for col in self.data.columns]
@@ -113,17 +117,7 @@ class VolumeAnalyzer:
         Returns:
             OBV series
         """
-        obv = [0]
-        
-        for i in range(1, len(self.data)):
-            if self.data['close'].iloc[i] > self.data['close'].iloc[i-1]:
-                obv.append(obv[-1] + self.data['volume'].iloc[i])
-            elif self.data['close'].iloc[i] < self.data['close'].iloc[i-1]:
-                obv.append(obv[-1] - self.data['volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
-        
-        return pd.Series(obv, index=self.data.index)
+        return self.features.obv()
     
     def detect_obv_divergence(self, window: int = 20) -> List[Dict]:
         """
@@ -136,55 +130,29 @@ class VolumeAnalyzer:
         Returns:
             List of divergence events
         """
-        df = self.data.copy()
-        df['obv'] = self.calculate_obv()
-        
-        # Find price peaks and troughs
-        df['price_peak'] = df['close'] == df['close'].rolling(window=window, center=True).max()
-        df['price_trough'] = df['close'] == df['close'].rolling(window=window, center=True).min()
-        
-        # Find OBV peaks and troughs
-        df['obv_peak'] = df['obv'] == df['obv'].rolling(window=window, center=True).max()
-        df['obv_trough'] = df['obv'] == df['obv'].rolling(window=window, center=True).min()
+        close = self.data['close'].to_numpy(dtype=float)
+        obv = self.calculate_obv().to_numpy(dtype=float)
+        dates = self.data.index
+        pairs = divergence_pairs(close, obv, window)
         
         divergences = []
         
         # Bearish divergence: Price higher high, OBV lower high
-        price_peaks = df[df['price_peak']].index
-        for i in range(1, len(price_peaks)):
-            date1, date2 = price_peaks[i-1], price_peaks[i]
-            
-            price_higher = df.loc[date2, 'close'] > df.loc[date1, 'close']
-            obv_lower = df.loc[date2, 'obv'] < df.loc[date1, 'obv']
-            
-            if price_higher and obv_lower:
-                divergences.append({
-                    'type': 'bearish',
-                    'date': date2,
-                    'description': 'Price making higher high, but OBV lower = distribution',
-                    'price1': df.loc[date1, 'close'],
-                    'price2': df.loc[date2, 'close'],
-                    'obv1': df.loc[date1, 'obv'],
-                    'obv2': df.loc[date2, 'obv']
-                })
-        
         # Bullish divergence: Price lower low, OBV higher low
-        price_troughs = df[df['price_trough']].index
-        for i in range(1, len(price_troughs)):
-            date1, date2 = price_troughs[i-1], price_troughs[i]
-            
-            price_lower = df.loc[date2, 'close'] < df.loc[date1, 'close']
-            obv_higher = df.loc[date2, 'obv'] > df.loc[date1, 'obv']
-            
-            if price_lower and obv_higher:
+        for kind, prev_key, description in (
+            ('bearish', 'prev_peak', 'Price making higher high, but OBV lower = distribution'),
+            ('bullish', 'prev_trough', 'Price making lower low, but OBV higher = accumulation'),
+        ):
+            for i in np.flatnonzero(pairs[kind]):
+                j = pairs[prev_key][i]
                 divergences.append({
-                    'type': 'bullish',
-                    'date': date2,
-                    'description': 'Price making lower low, but OBV higher = accumulation',
-                    'price1': df.loc[date1, 'close'],
-                    'price2': df.loc[date2, 'close'],
-                    'obv1': df.loc[date1, 'obv'],
-                    'obv2': df.loc[date2, 'obv']
+                    'type': kind,
+                    'date': dates[i],
+                    'description': description,
+                    'price1': close[j],
+                    'price2': close[i],
+                    'obv1': obv[j],
+                    'obv2': obv[i]
                 })
         
         return divergences
@@ -417,7 +385,7 @@ class VolumeAnalysisPlugin(AnalysisPlugin):
             )
 
         try:
-            volume_analyzer = VolumeAnalyzer(df) # Pass the normalized DF
+            volume_analyzer = VolumeAnalyzer(df, context.get('features')) # Pass the normalized DF
             vol_report = volume_analyzer.generate_volume_report()
 
             return AnalysisResult(
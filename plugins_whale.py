@@ -7,12 +7,15 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 import logging
 
 from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
 from ui_components import render_aggrid
+from feature_frame import FeatureFrame, get_feature_frame
+from volume_kernels import divergence_pairs, scan_obv_divergence
+from index_composition import INDEX_WEIGHTS
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +27,16 @@ class WhaleHunter:
     Delivery % scanner, OBV divergences, dark pool logic
     """
     
-    def __init__(self, data: pd.DataFrame, symbol: str):
+    def __init__(self, data: pd.DataFrame, symbol: str, features: Optional[FeatureFrame] = None):
         """
         Initialize whale hunter
         
         Args:
             data: OHLCV data with volume
             symbol: Symbol identifier
+            features: Shared indicator cache for the same bars (built if not given)
         """
+        self.features = features or get_feature_frame(data, symbol)
         self.data = data.copy()
         self.symbol = symbol
         
@@ -115,99 +120,39 @@ class WhaleHunter:
         Precise OBV divergence detection
         SPECIFIC ALERT: Price lower low, OBV higher low = HIDDEN BULLISHNESS
         """
-        df = self.data.copy()
-        
-        # Calculate OBV
-        obv = [0]
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > df['close'].iloc[i-1]:
-                obv.append(obv[-1] + df['volume'].iloc[i])
-            elif df['close'].iloc[i] < df['close'].iloc[i-1]:
-                obv.append(obv[-1] - df['volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
-        
-        df['obv'] = obv
-        
-        # Find local peaks and troughs
-        df['price_local_max'] = df['close'].rolling(window=window, center=True).max()
-        df['price_local_min'] = df['close'].rolling(window=window, center=True).min()
-        
-        df['obv_local_max'] = df['obv'].rolling(window=window, center=True).max()
-        df['obv_local_min'] = df['obv'].rolling(window=window, center=True).min()
+        close = self.data['close'].to_numpy(dtype=float)
+        obv = self.features.obv().to_numpy(dtype=float)
+        dates = self.data.index
         
-        df['is_price_peak'] = df['close'] == df['price_local_max']
-        df['is_price_trough'] = df['close'] == df['price_local_min']
-        
-        df['is_obv_peak'] = df['obv'] == df['obv_local_max']
-        df['is_obv_trough'] = df['obv'] == df['obv_local_min']
+        # Pivots + consecutive-pivot comparisons in one vectorized pass
+        pairs = divergence_pairs(close, obv, window, sensitivity, relative_obv=True)
         
         divergences = []
         
         # BULLISH DIVERGENCE: Price makes lower low, OBV makes higher low
-        price_troughs = df[df['is_price_trough']].index
-        
-        for i in range(1, len(price_troughs)):
-            date1, date2 = price_troughs[i-1], price_troughs[i]
-            
-            price1 = df.loc[date1, 'close']
-            price2 = df.loc[date2, 'close']
-            
-            obv1 = df.loc[date1, 'obv']
-            obv2 = df.loc[date2, 'obv']
-            
-            # Price lower low
-            price_lower = (price2 - price1) / price1 < -sensitivity
-            
-            # OBV higher low
-            obv_higher = (obv2 - obv1) / abs(obv1) > sensitivity if obv1 != 0 else False
-            
-            if price_lower and obv_higher:
-                divergences.append({
-                    'type': 'BULLISH',
-                    'date': date2,
-                    'price1': price1,
-                    'price2': price2,
-                    'price_change_pct': ((price2 - price1) / price1) * 100,
-                    'obv1': obv1,
-                    'obv2': obv2,
-                    'obv_change_pct': ((obv2 - obv1) / abs(obv1)) * 100 if obv1 != 0 else 0,
-                    'description': 'HIDDEN BULLISHNESS: Price lower low but OBV higher low',
-                    'signal_strength': min(100, abs((price2 - price1) / price1) * 100 * 5),
-                    'action': 'BUY SIGNAL - Smart money accumulating despite price weakness'
-                })
-        
         # BEARISH DIVERGENCE: Price makes higher high, OBV makes lower high
-        price_peaks = df[df['is_price_peak']].index
-        
-        for i in range(1, len(price_peaks)):
-            date1, date2 = price_peaks[i-1], price_peaks[i]
-            
-            price1 = df.loc[date1, 'close']
-            price2 = df.loc[date2, 'close']
-            
-            obv1 = df.loc[date1, 'obv']
-            obv2 = df.loc[date2, 'obv']
-            
-            # Price higher high
-            price_higher = (price2 - price1) / price1 > sensitivity
-            
-            # OBV lower high
-            obv_lower = (obv2 - obv1) / abs(obv1) < -sensitivity if obv1 != 0 else False
-            
-            if price_higher and obv_lower:
+        for kind, prev_key, description, action in (
+            ('BULLISH', 'prev_trough', 'HIDDEN BULLISHNESS: Price lower low but OBV higher low',
+             'BUY SIGNAL - Smart money accumulating despite price weakness'),
+            ('BEARISH', 'prev_peak', 'DISTRIBUTION ALERT: Price higher high but OBV lower high',
+             'SELL SIGNAL - Smart money distributing despite price strength'),
+        ):
+            for i in np.flatnonzero(pairs[kind.lower()]):
+                j = pairs[prev_key][i]
+                price1, price2 = close[j], close[i]
+                obv1, obv2 = obv[j], obv[i]
                 divergences.append({
-                    'type': 'BEARISH',
-                    'date': date2,
+                    'type': kind,
+                    'date': dates[i],
                     'price1': price1,
                     'price2': price2,
                     'price_change_pct': ((price2 - price1) / price1) * 100,
                     'obv1': obv1,
                     'obv2': obv2,
-                    'obv_change_pct': ((obv2 - obv1) / abs(obv1)) * 100 if obv1 != 0 else 0,
-                    'description': 'DISTRIBUTION ALERT: Price higher high but OBV lower high',
+                    'obv_change_pct': ((obv2 - obv1) / abs(obv1)) * 100,
+                    'description': description,
                     'signal_strength': min(100, abs((price2 - price1) / price1) * 100 * 5),
-                    'action': 'SELL SIGNAL - Smart money distributing despite price strength'
+                    'action': action
                 })
         
         return divergences
@@ -345,16 +290,7 @@ class WhaleHunter:
     
     def calculate_obv(self) -> pd.Series:
         """Calculate On-Balance Volume"""
-        obv = [0]
-        for i in range(1, len(self.data)):
-            if self.data['close'].iloc[i] > self.data['close'].iloc[i-1]:
-                obv.append(obv[-1] + self.data['volume'].iloc[i])
-            elif self.data['close'].iloc[i] < self.data['close'].iloc[i-1]:
-                obv.append(obv[-1] - self.data['volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
-        
-        return pd.Series(obv, index=self.data.index)
+        return self.features.obv()
     
     def generate_whale_report(self) -> Dict:
         """
@@ -433,7 +369,7 @@ class WhaleAnalysisPlugin(AnalysisPlugin):
             return AnalysisResult(success=False, data={}, error="Price data unavailable")
             
         try:
-            hunter = WhaleHunter(primary_data, symbol)
+            hunter = WhaleHunter(primary_data, symbol, context.get('features'))
             report = hunter.generate_whale_report()
             
             return AnalysisResult(
@@ -499,3 +435,73 @@ class WhaleAnalysisPlugin(AnalysisPlugin):
                 st.write(f"**Action**: {latest['action']}")
         else:
             st.info("Price and volume are moving in sync (no divergence).")
+
+
+@register_plugin
+class UniverseDivergenceScanPlugin(AnalysisPlugin):
+    """
+    OBV divergence scan over every INDEX_WEIGHTS constituent (one matrix pass)
+    """
+    
+    lookback = 30  # Signals from each symbol's last N bars
+    
+    @property
+    def name(self) -> str:
+        return "Universe OBV Scan"
+    
+    @property
+    def icon(self) -> str:
+        return "🔭"
+    
+    @property
+    def description(self) -> str:
+        return "Latest OBV divergences across all index constituents"
+    
+    @property
+    def category(self) -> str:
+        return "asset"
+    
+    def analyze(self, context: Dict[str, Any]) -> AnalysisResult:
+        from data_fetcher import MultiAssetDataFetcher
+        
+        try:
+            universe = sorted({sym for weights in INDEX_WEIGHTS.values() for sym in weights})
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=365)
+            
+            fetcher = MultiAssetDataFetcher()
+            data_map = fetcher.fetch_multiple_assets(
+                universe, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+            )
+            frames = {sym: df for sym, (df, _) in data_map.items() if df is not None}
+            if not frames:
+                return AnalysisResult(success=False, data={}, error="No constituent data available")
+            
+            signals = scan_obv_divergence(frames, lookback=self.lookback)
+            return AnalysisResult(
+                success=True,
+                data={'signals': signals, 'universe_size': len(universe), 'scanned': len(frames),
+                      'lookback': self.lookback}
+            )
+        except Exception as e:
+            logger.error(f"Universe OBV scan failed: {e}")
+            return AnalysisResult(success=False, data={}, error=str(e))
+    
+    def render(self, result: AnalysisResult):
+        if not result.success:
+            st.warning(f"Universe scan unavailable: {result.error}")
+            return
+        
+        signals = result.data['signals']
+        st.caption(f"Scanned {result.data['scanned']}/{result.data['universe_size']} constituents · "
+                   f"last {result.data['lookback']} bars")
+        if signals.empty:
+            st.info("No OBV divergences across the universe.")
+            return
+        
+        display = signals.copy()
+        display['date'] = pd.to_datetime(display['date']).dt.strftime('%Y-%m-%d')
+        display['price_change_pct'] = display['price_change_pct'].map(lambda x: f"{x:+.2f}%")
+        display['obv_change_pct'] = display['obv_change_pct'].map(lambda x: f"{x:+.1f}%")
+        display.columns = ['Symbol', 'Signal', 'Date', 'Price Δ', 'OBV Δ', 'Bars Ago']
+        render_aggrid(display, height=300)
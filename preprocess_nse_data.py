@@ -1,13 +1,24 @@
 """
 Pre-processes the NSE.json file to create instrument_master.json.
 Now captures ALL Equity symbols for ETF decomposition.
+
+Pipeline mode (default): the file is split into byte ranges parsed on a process pool,
+an unchanged input (same content hash) is skipped, and the master is only rewritten
+when one of its segments actually changed.
 """
 
+import re
 import json
 import logging
 import os
+import hashlib
+import argparse
 import ijson
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from services.instrument_index import write_instrument_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,18 +28,287 @@ logger = logging.getLogger(__name__)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NSE_JSON_PATH = os.path.join(BASE_DIR, "NSE.json")
 OUTPUT_PATH = os.path.join(BASE_DIR, "instrument_master.json")
+INDEX_PATH = os.path.join(BASE_DIR, "instrument_master.bin")
+META_PATH = os.path.join(BASE_DIR, "instrument_master.meta.json")
+
+# Pipeline tuning
+SHARD_SIZE = 32 * 1024 * 1024  # bytes per shard
+HASH_BLOCK = 8 * 1024 * 1024
+
+SEGMENTS = ("EQ_MAP", "INDICES", "FUTURES", "EXPIRIES", "OPTIONS")
+
+# Candidate split point between two records of the top-level array. The regex can also
+# match inside a nested array or a string value; _parse_shard rejects such splits and
+# _parse_parallel then falls back to a serial parse.
+RECORD_BOUNDARY = re.compile(rb"}\s*,\s*{")
+
+
+class ShardBoundaryError(ValueError):
+    """A shard does not start and end on top-level record boundaries"""
+
+
+def _new_partial() -> Dict:
+    """Accumulator filled record by record (one per shard in pipeline mode)"""
+    return {
+        "EQ_MAP": {},
+        "INDICES": {},
+        "FUTURES": {},
+        "raw_expiries": {},  # Underlying -> set of expiry ms
+        "raw_options": {},   # Underlying -> List of (expiry, strike, type, key, lot_size)
+        "count": 0
+    }
+
+
+def _process_instrument(instrument: Dict, partial: Dict):
+    partial["count"] += 1
+
+    segment = instrument.get('segment')
+    symbol = instrument.get('trading_symbol')
+    key = instrument.get('instrument_key')
+    name = instrument.get('name')
+
+    # 1. Capture ALL Equities
+    if segment == 'NSE_EQ' and instrument.get('instrument_type') == 'EQ':
+        if symbol and key:
+            partial["EQ_MAP"][symbol] = {
+                "key": key,
+                "name": name
+            }
+
+    # 2. Capture Indices (Spot)
+    elif segment == 'NSE_INDEX':
+        if symbol and key:
+            partial["INDICES"][symbol] = key
+            # Handle variants based on Upstox 'trading_symbol'
+            if symbol == "NIFTY":
+                partial["INDICES"]["^NSEI"] = key
+                partial["INDICES"]["Nifty 50"] = key
+            elif symbol == "BANKNIFTY":
+                partial["INDICES"]["^NSEBANK"] = key
+                partial["INDICES"]["Nifty Bank"] = key
+                partial["INDICES"]["Bank Nifty"] = key
+            elif symbol == "NIFTY MIDCAP 100":
+                partial["INDICES"]["NIFTY_MIDCAP_100.NS"] = key
+                partial["INDICES"]["^NSEMDCP100"] = key
+                partial["INDICES"]["Nifty Midcap 100"] = key
 
-def preprocess_nse_data():
+    # 3. Capture Futures & Options for Expiries
+    elif segment == 'NSE_FO':
+        inst_type = instrument.get('instrument_type')
+        underlying = instrument.get('underlying_symbol') or instrument.get('name')
+        expiry = instrument.get('expiry')
+
+        if underlying and expiry:
+            # Capture Expiry
+            partial["raw_expiries"].setdefault(underlying, set()).add(int(expiry))
+
+            # Capture Futures Details
+            if inst_type == 'FUT' and key:
+                partial["FUTURES"].setdefault(underlying, []).append({
+                    "key": key,
+                    "expiry": int(expiry)
+                })
+
+            # Capture Option Contracts
+            elif inst_type in ('CE', 'PE') and key and instrument.get('strike_price') is not None:
+                partial["raw_options"].setdefault(underlying, []).append((
+                    int(expiry),
+                    float(instrument['strike_price']),
+                    inst_type,
+                    key,
+                    int(instrument.get('lot_size') or 0)
+                ))
+
+
+def _merge_partials(partials: List[Dict]) -> Dict:
+    """Combine shard results in file order (later records win, like a serial pass)"""
+    merged = _new_partial()
+    for partial in partials:
+        merged["count"] += partial["count"]
+        merged["EQ_MAP"].update(partial["EQ_MAP"])
+        merged["INDICES"].update(partial["INDICES"])
+        for underlying, futures in partial["FUTURES"].items():
+            merged["FUTURES"].setdefault(underlying, []).extend(futures)
+        for underlying, expiries in partial["raw_expiries"].items():
+            merged["raw_expiries"].setdefault(underlying, set()).update(expiries)
+        for underlying, options in partial["raw_options"].items():
+            merged["raw_options"].setdefault(underlying, []).extend(options)
+    return merged
+
+
+def _build_master(partial: Dict) -> Dict:
     instrument_master = {
-        "EQ_MAP": {}, # Symbol -> Instrument Key
-        "INDICES": {}, # Symbol -> Instrument Key
-        "FUTURES": {},  # Underlying Symbol -> List of {key, expiry}
-        "EXPIRIES": {} # Underlying Symbol -> List of sorted "YYYY-MM-DD"
+        "EQ_MAP": partial["EQ_MAP"], # Symbol -> Instrument Key
+        "INDICES": partial["INDICES"], # Symbol -> Instrument Key
+        "FUTURES": partial["FUTURES"],  # Underlying Symbol -> List of {key, expiry}
+        "EXPIRIES": {}, # Underlying Symbol -> List of sorted "YYYY-MM-DD"
+        "OPTIONS": {} # Underlying Symbol -> Columnar {expiry, strike, type, key, lot_size} sorted by expiry/strike/type
     }
-    
-    # Helper to track raw expiries to avoid duplicates before sorting
-    raw_expiries = {} 
 
+    # Process Futures Sorting
+    for underlying in instrument_master["FUTURES"]:
+        instrument_master["FUTURES"][underlying].sort(key=lambda x: x['expiry'])
+
+    # Process Expiries
+    for underlying, exp_set in partial["raw_expiries"].items():
+        sorted_exp = sorted(list(exp_set))
+        # Convert to YYYY-MM-DD
+        formatted_exp = []
+        for ts in sorted_exp:
+            try:
+                dt = datetime.fromtimestamp(ts / 1000)
+                formatted_exp.append(dt.strftime('%Y-%m-%d'))
+            except Exception:
+                pass
+        instrument_master["EXPIRIES"][underlying] = formatted_exp
+
+    # Process Options (columnar: ~5x smaller than a list of dicts)
+    for underlying, contracts in partial["raw_options"].items():
+        contracts.sort()
+        instrument_master["OPTIONS"][underlying] = {
+            "expiry": [c[0] for c in contracts],
+            "strike": [c[1] for c in contracts],
+            "type": [c[2] for c in contracts],
+            "key": [c[3] for c in contracts],
+            "lot_size": [c[4] for c in contracts]
+        }
+
+    return instrument_master
+
+
+# ----------------------------------------------------------------------
+# Serial parse
+# ----------------------------------------------------------------------
+
+def _parse_serial(path: str) -> Dict:
+    partial = _new_partial()
+    with open(path, 'rb') as f:
+        # ijson iteratively parses the file to save memory
+        for instrument in ijson.items(f, 'item'):
+            _process_instrument(instrument, partial)
+            if partial["count"] % 100000 == 0:
+                logger.info(f"Processed {partial['count']} instruments...")
+    return partial
+
+
+# ----------------------------------------------------------------------
+# Sharded parse
+# ----------------------------------------------------------------------
+
+def _shard_ranges(path: str, shard_size: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Byte ranges that each start at a record's '{' and end before the next one"""
+    shard_size = shard_size or SHARD_SIZE
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(min(size, 4096))
+        first = head.find(b"{")
+        if first < 0:
+            return []
+
+        starts = [first]
+        target = first + shard_size
+        while target < size:
+            f.seek(target)
+            window = f.read(1024 * 1024)
+            match = RECORD_BOUNDARY.search(window)
+            if not match:
+                target += len(window)
+                if not window:
+                    break
+                continue
+            boundary = target + match.end() - 1  # position of the next record's '{'
+            starts.append(boundary)
+            target = boundary + shard_size
+
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _parse_shard(path: str, start: int, end: int) -> Dict:
+    """
+    Parse the records in [start, end) - runs in a worker process.
+    Raises ShardBoundaryError unless the shard is a run of whole top-level objects:
+    the first record starts at `start`, the last one ends at `end` (or at the array's ']').
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        try:
+            text = f.read(end - start).decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise ShardBoundaryError(f"Shard {start}-{end} splits a character: {e}") from e
+
+    partial = _new_partial()
+    decoder = json.JSONDecoder()
+    pos, length = 0, len(text)
+    while True:
+        # Skip separators; a ']' may only close the array at the very end of the file
+        while pos < length and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length or (text[pos] == "]" and not text[pos + 1:].strip()):
+            break
+        try:
+            instrument, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError as e:
+            raise ShardBoundaryError(f"Shard {start}-{end} is not a run of whole records: {e}") from e
+        if not isinstance(instrument, dict):
+            raise ShardBoundaryError(f"Shard {start}-{end} holds a non-object value at offset {start + pos}")
+        _process_instrument(instrument, partial)
+    return partial
+
+
+def _parse_parallel(path: str, workers: Optional[int] = None) -> Dict:
+    ranges = _shard_ranges(path)
+    if len(ranges) <= 1:
+        return _parse_serial(path)
+
+    logger.info(f"Parsing {len(ranges)} shards on {workers or os.cpu_count()} processes")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_shard, path, start, end) for start, end in ranges]
+        partials = []
+        try:
+            for i, future in enumerate(futures):
+                partials.append(future.result())
+                logger.info(f"Shard {i + 1}/{len(ranges)} done ({partials[-1]['count']} instruments)")
+        except ShardBoundaryError as e:
+            # A split landed inside a record (nested array, '},{' in a string): parse the whole file
+            for future in futures:
+                future.cancel()
+            logger.warning(f"{e}; falling back to a serial parse")
+            return _parse_serial(path)
+    return _merge_partials(partials)
+
+
+# ----------------------------------------------------------------------
+# Change detection
+# ----------------------------------------------------------------------
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _segment_digest(segment) -> str:
+    return hashlib.sha256(json.dumps(segment, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _load_meta() -> Dict:
+    try:
+        with open(META_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(meta: Dict):
+    tmp_path = f"{META_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, META_PATH)
+
+
+def preprocess_nse_data(parallel: bool = True, workers: Optional[int] = None, force: bool = False):
     logger.info(f"Starting processing of {NSE_JSON_PATH}")
 
     try:
@@ -36,91 +316,55 @@ def preprocess_nse_data():
             logger.error(f"NSE.json not found at {NSE_JSON_PATH}")
             return
 
-        with open(NSE_JSON_PATH, 'rb') as f:
-            # ijson iteratively parses the file to save memory
-            parser = ijson.items(f, 'item')
-            
-            count = 0
-            for instrument in parser:
-                count += 1
-                if count % 100000 == 0:
-                    logger.info(f"Processed {count} instruments...")
-
-                segment = instrument.get('segment')
-                symbol = instrument.get('trading_symbol')
-                key = instrument.get('instrument_key')
-                name = instrument.get('name')
-                
-                # 1. Capture ALL Equities
-                if segment == 'NSE_EQ' and instrument.get('instrument_type') == 'EQ':
-                    if symbol and key:
-                        instrument_master["EQ_MAP"][symbol] = {
-                            "key": key,
-                            "name": name
-                        }
-                
-                # 2. Capture Indices (Spot)
-                elif segment == 'NSE_INDEX':
-                    if symbol and key:
-                        instrument_master["INDICES"][symbol] = key
-                        # Handle variants based on Upstox 'trading_symbol'
-                        if symbol == "NIFTY":
-                            instrument_master["INDICES"]["^NSEI"] = key
-                            instrument_master["INDICES"]["Nifty 50"] = key
-                        elif symbol == "BANKNIFTY":
-                            instrument_master["INDICES"]["^NSEBANK"] = key
-                            instrument_master["INDICES"]["Nifty Bank"] = key
-                            instrument_master["INDICES"]["Bank Nifty"] = key
-                        elif symbol == "NIFTY MIDCAP 100":
-                            instrument_master["INDICES"]["NIFTY_MIDCAP_100.NS"] = key
-                            instrument_master["INDICES"]["^NSEMDCP100"] = key
-                            instrument_master["INDICES"]["Nifty Midcap 100"] = key
-
-                # 3. Capture Futures & Options for Expiries
-                elif segment == 'NSE_FO':
-                    inst_type = instrument.get('instrument_type')
-                    underlying = instrument.get('underlying_symbol') or instrument.get('name')
-                    expiry = instrument.get('expiry')
-                    
-                    if underlying and expiry:
-                        # Capture Expiry
-                        if underlying not in raw_expiries:
-                            raw_expiries[underlying] = set()
-                        raw_expiries[underlying].add(int(expiry))
-
-                        # Capture Futures Details
-                        if inst_type == 'FUT' and key:
-                            if underlying not in instrument_master["FUTURES"]:
-                                instrument_master["FUTURES"][underlying] = []
-                            instrument_master["FUTURES"][underlying].append({
-                                "key": key,
-                                "expiry": int(expiry)
-                            })
-
-        # Process Futures Sorting
-        for underlying in instrument_master["FUTURES"]:
-            instrument_master["FUTURES"][underlying].sort(key=lambda x: x['expiry'])
-            
-        # Process Expiries
-        for underlying, exp_set in raw_expiries.items():
-            sorted_exp = sorted(list(exp_set))
-            # Convert to YYYY-MM-DD
-            formatted_exp = []
-            for ts in sorted_exp:
-                try:
-                    dt = datetime.fromtimestamp(ts / 1000)
-                    formatted_exp.append(dt.strftime('%Y-%m-%d'))
-                except Exception:
-                    pass
-            instrument_master["EXPIRIES"][underlying] = formatted_exp
-
-        with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-            json.dump(instrument_master, f, indent=2)
-        
-        logger.info(f"✓ Instrument master created with {len(instrument_master['EQ_MAP'])} equities, {len(instrument_master['FUTURES'])} futures roots, and {len(instrument_master['EXPIRIES'])} expiry maps.")
+        # 1. Skip unchanged input
+        meta = _load_meta()
+        stat = os.stat(NSE_JSON_PATH)
+        source_hash = None
+        outputs_exist = os.path.exists(OUTPUT_PATH)
+        if not force and outputs_exist and meta.get("source_size") == stat.st_size:
+            source_hash = _file_sha256(NSE_JSON_PATH)
+            if meta.get("source_sha256") == source_hash:
+                logger.info("✓ NSE.json unchanged since last run, skipping")
+                return
+
+        # 2. Parse
+        partial = _parse_parallel(NSE_JSON_PATH, workers) if parallel else _parse_serial(NSE_JSON_PATH)
+        instrument_master = _build_master(partial)
+        logger.info(f"Parsed {partial['count']} instruments")
+
+        # 3. Diff against the previous master
+        digests = {name: _segment_digest(instrument_master[name]) for name in SEGMENTS}
+        previous = meta.get("segments", {}) if outputs_exist else {}
+        changed = [name for name in SEGMENTS if previous.get(name) != digests[name]]
+
+        if changed or force:
+            logger.info(f"Changed segments: {', '.join(changed) or 'none (forced)'}")
+            with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+                json.dump(instrument_master, f, indent=2)
+
+            # Binary index (memory-mapped by InstrumentService, stamped with the JSON it mirrors)
+            write_instrument_index(instrument_master, INDEX_PATH, OUTPUT_PATH)
+        else:
+            # Same content: leave the files (and mapped index pages) untouched
+            logger.info("No segment changed, master left as is")
+
+        _save_meta({
+            "source_size": stat.st_size,
+            "source_sha256": source_hash or _file_sha256(NSE_JSON_PATH),
+            "segments": digests,
+            "updated": datetime.now().isoformat(timespec='seconds')
+        })
+
+        logger.info(f"✓ Instrument master created with {len(instrument_master['EQ_MAP'])} equities, {len(instrument_master['FUTURES'])} futures roots, {len(instrument_master['EXPIRIES'])} expiry maps and {sum(len(o['key']) for o in instrument_master['OPTIONS'].values())} option contracts.")
 
     except Exception as e:
         logger.error(f"Preprocessing failed: {e}")
 
 if __name__ == "__main__":
-    preprocess_nse_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build instrument_master.json / .bin from NSE.json")
+    parser.add_argument("--serial", action="store_true", help="Single-process ijson pass")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if NSE.json is unchanged")
+    args = parser.parse_args()
+
+    preprocess_nse_data(parallel=not args.serial, workers=args.workers, force=args.force)
@@ -8,6 +8,8 @@ import numpy as np
 import logging
 from typing import Dict
 
+from feature_frame import get_feature_frame
+
 logger = logging.getLogger(__name__)
 
 class AlphaEngine:
@@ -22,35 +24,31 @@ class AlphaEngine:
 
     def _calculate_indicators(self):
         """Calculates Technical Indicators manually to avoid dependencies"""
-        close = self.df['Close']
+        features = get_feature_frame(self.df)
         
         # 1. SMAs
-        self.df['SMA_20'] = close.rolling(window=20).mean()
-        self.df['SMA_50'] = close.rolling(window=50).mean()
-        self.df['SMA_200'] = close.rolling(window=200).mean()
+        self.df['SMA_20'] = features.sma(20)
+        self.df['SMA_50'] = features.sma(50)
+        self.df['SMA_200'] = features.sma(200)
         
         # 2. RSI (14)
-        delta = close.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        self.df['RSI'] = 100 - (100 / (1 + rs))
+        self.df['RSI'] = features.rsi(14)
         
         # 3. MACD (12, 26, 9)
-        exp12 = close.ewm(span=12, adjust=False).mean()
-        exp26 = close.ewm(span=26, adjust=False).mean()
+        exp12 = features.ema(12)
+        exp26 = features.ema(26)
         self.df['MACD'] = exp12 - exp26
         self.df['Signal'] = self.df['MACD'].ewm(span=9, adjust=False).mean()
         self.df['MACD_Hist'] = self.df['MACD'] - self.df['Signal']
         
         # 4. Bollinger Bands (20, 2)
-        std = close.rolling(window=20).std()
+        std = features.rolling_std(20)
         self.df['BB_Upper'] = self.df['SMA_20'] + (std * 2)
         self.df['BB_Lower'] = self.df['SMA_20'] - (std * 2)
         self.df['BB_Width'] = (self.df['BB_Upper'] - self.df['BB_Lower']) / self.df['SMA_20']
         
         # 5. Volatility (Annualized)
-        self.df['Log_Ret'] = np.log(close / close.shift(1))
+        self.df['Log_Ret'] = features.log_returns()
         self.df['Volatility'] = self.df['Log_Ret'].rolling(window=21).std() * np.sqrt(252)
 
     def get_momentum_score(self) -> float:
@@ -138,3 +136,38 @@ class AlphaEngine:
             "rating": rating,
             "indicators": self.df.iloc[-1].to_dict()
         }
+
+
+def alpha_score_panel(panel) -> np.ndarray:
+    """
+    AlphaEngine's total score (momentum + trend + volatility, 0-100) at every bar for
+    every symbol of an IndicatorPanel, as a (symbols x time) array. NaN where a symbol
+    has no bar.
+    """
+    from indicator_panel import ema
+
+    close = panel.close
+    sma20, sma50, sma200 = panel.sma(20), panel.sma(50), panel.sma(200)
+    rsi = panel.rsi(14)
+    macd = panel.ema(12) - panel.ema(26)
+    signal = ema(macd, 9)
+    hist = macd - signal
+    prev_hist = np.concatenate([np.full((len(panel), 1), np.nan), hist[:, :-1]], axis=1)
+
+    std = panel.rolling_std(20)
+    upper = sma20 + std * 2
+    lower = sma20 - std * 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = (upper - lower) / sma20
+        # BB_Width.tail(126).mean() as of each bar
+        avg_width = pd.DataFrame(width.T).rolling(126, min_periods=1).mean().to_numpy().T
+
+        momentum = np.select([(rsi > 50) & (rsi < 70), (rsi > 40) & (rsi <= 50), rsi >= 70], [15, 5, 10], 0)
+        momentum = momentum + 15 * (macd > signal) + 10 * ((hist > 0) & (hist > prev_hist))
+
+        trend = 10 * (close > sma20) + 10 * (close > sma50) + 10 * (close > sma200) + 5 * (sma20 > sma50)
+
+        volatility = 15 * (width < avg_width) + 15 * ((close > sma20) & ((upper - close) / close < 0.02))
+
+    total = np.minimum(momentum, 40) + np.minimum(trend, 30) + np.minimum(volatility, 30)
+    return np.where(np.isnan(close), np.nan, total.astype(float))
@@ -0,0 +1,493 @@
+"""
+Backtest Engine - Vectorized, Parameterized Rule Backtests
+Rules are plain expressions over price fields and indicators, e.g.
+    "SMA(fast) > SMA(slow) and RSI(14) < rsi_max"
+- Parsed with ast and compiled to NumPy (whitelisted nodes only, nothing is eval'd)
+- Free names in a rule are grid parameters: each gets its own array axis, time is the
+  last axis, so a fast x slow x rsi_max sweep is one broadcast computation
+- Long-only, signal on the close, costs + slippage on turnover, fixed or volatility-target
+  sizing, optional stop-loss (close-based)
+"""
+
+import ast
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicator_panel import column_map
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+ALIASES = {'price': 'close', 'Price': 'close', 'Volume': 'volume', 'RSI': ('RSI', 14), 'ATR': ('ATR', 14)}
+INDICATORS = ('SMA', 'EMA', 'RSI', 'ATR', 'STD')
+# Legacy tokens of the Quant Lab presets: SMA20, EMA50, ...
+_FIXED_TOKEN = ('SMA', 'EMA', 'STD')
+
+
+class RuleError(ValueError):
+    """A rule that does not parse or uses something outside the rule language"""
+
+
+# ----------------------------------------------------------------------------
+# Indicator kernels: one row per window, time on the last axis
+# ----------------------------------------------------------------------------
+
+def _rolling_mean(x: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """Rolling means of a 1-D series for several windows at once (cumsum differences)"""
+    csum = np.concatenate([[0.0], np.cumsum(x)])
+    t = np.arange(1, len(x) + 1)
+    start = t[None, :] - windows[:, None]
+    out = (csum[t][None, :] - csum[np.maximum(start, 0)]) / windows[:, None]
+    out[start < 0] = np.nan
+    return out
+
+
+def _rolling_std(x: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """Sample (ddof=1) rolling std for several windows; values are de-meaned first for precision"""
+    x = x - x.mean()
+    mean = _rolling_mean(x, windows)
+    mean_sq = _rolling_mean(x * x, windows)
+    n = windows[:, None].astype(float)
+    var = np.maximum(mean_sq - mean * mean, 0.0) * n / (n - 1)
+    return np.sqrt(var)
+
+
+def _ema(x: np.ndarray, spans: np.ndarray) -> np.ndarray:
+    """ewm(span, adjust=False).mean() for several spans: one recursion over time"""
+    alpha = 2.0 / (spans + 1.0)
+    out = np.empty((len(spans), len(x)))
+    prev = np.full(len(spans), x[0])
+    for t in range(len(x)):
+        prev = alpha * x[t] + (1 - alpha) * prev
+        out[:, t] = prev
+    return out
+
+
+def _rsi(close: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """Simple-average RSI (FeatureFrame.rsi) for several periods"""
+    delta = np.concatenate([[0.0], np.diff(close)])
+    gain = _rolling_mean(np.where(delta > 0, delta, 0.0), periods)
+    loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def _atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _rolling_mean(tr, periods)
+
+
+# ----------------------------------------------------------------------------
+# Rule compiler
+# ----------------------------------------------------------------------------
+
+_COMPARE = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less,
+    ast.LtE: np.less_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_BINARY = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide,
+    ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or,
+}
+
+# A compiled node: evaluator -> array broadcastable to (*grid shape, time)
+Node = Callable[["_Evaluator"], np.ndarray]
+
+
+@dataclass
+class Rule:
+    """A compiled rule: `params` are the free names a grid has to supply"""
+    source: str
+    params: List[str]
+    _fn: Node = field(repr=False)
+
+    def evaluate(self, evaluator: "_Evaluator") -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.asarray(self._fn(evaluator), dtype=bool)
+
+
+def compile_rule(source: str) -> Rule:
+    """
+    Parse a rule into a NumPy expression.
+    Language: price fields (close, open, high, low, volume; Price/Volume), indicators
+    SMA(n) EMA(n) RSI(n) ATR(n) STD(n) (n an integer or a grid parameter; bare RSI/ATR
+    mean period 14; SMA20-style tokens), CROSS_ABOVE(a, b) / CROSS_BELOW(a, b),
+    numbers, + - * /, comparisons (chained too), and/or/not, & | ~.
+    Any other name is a grid parameter.
+    """
+    if not source or not source.strip():
+        raise RuleError("Empty rule")
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise RuleError(f"Cannot parse rule '{source}': {e.msg}") from None
+
+    params: List[str] = []
+
+    def param(name: str) -> Node:
+        if name not in params:
+            params.append(name)
+        return lambda ev: ev.param(name)
+
+    def window(node: ast.AST) -> Tuple[str, object]:
+        """Indicator argument: ('const', int) or ('param', name)"""
+        if isinstance(node, ast.Constant) and isinstance(node.value, int) and node.value > 0:
+            return ('const', node.value)
+        if isinstance(node, ast.Name):
+            param(node.id)
+            return ('param', node.id)
+        raise RuleError(f"Indicator windows must be positive integers or parameters, got '{ast.unparse(node)}'")
+
+    def indicator(kind: str, arg: Tuple[str, object]) -> Node:
+        return lambda ev: ev.indicator(kind, arg)
+
+    def build(node: ast.AST) -> Node:
+        if isinstance(node, ast.Expression):
+            return build(node.body)
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda ev: value
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            alias = ALIASES.get(name, name)
+            if isinstance(alias, tuple):
+                return indicator(alias[0], ('const', alias[1]))
+            if alias in PRICE_FIELDS:
+                return lambda ev: ev.field(alias)
+            for kind in _FIXED_TOKEN:
+                if name.startswith(kind) and name[len(kind):].isdigit() and int(name[len(kind):]) > 0:
+                    return indicator(kind, ('const', int(name[len(kind):])))
+            return param(name)
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise RuleError(f"Unsupported call '{ast.unparse(node)}'")
+            fname = node.func.id.upper()
+            if fname in INDICATORS:
+                if len(node.args) != 1:
+                    raise RuleError(f"{fname} takes one window argument")
+                return indicator(fname, window(node.args[0]))
+            if fname in ('CROSS_ABOVE', 'CROSS_BELOW'):
+                if len(node.args) != 2:
+                    raise RuleError(f"{fname} takes two arguments")
+                a, b = build(node.args[0]), build(node.args[1])
+                above = fname == 'CROSS_ABOVE'
+                return lambda ev: ev.cross(a(ev), b(ev), above)
+            raise RuleError(f"Unknown function '{node.func.id}'")
+
+        if isinstance(node, ast.Compare):
+            operands = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = []
+            for op in node.ops:
+                if type(op) not in _COMPARE:
+                    raise RuleError(f"Unsupported comparison in '{ast.unparse(node)}'")
+                ops.append(_COMPARE[type(op)])
+
+            def compare(ev):
+                values = [o(ev) for o in operands]
+                result = ops[0](values[0], values[1])
+                for op, left, right in zip(ops[1:], values[1:], values[2:]):
+                    result = np.logical_and(result, op(left, right))
+                return result
+            return compare
+
+        if isinstance(node, ast.BoolOp):
+            parts = [build(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def boolop(ev):
+                result = parts[0](ev)
+                for part in parts[1:]:
+                    result = combine(result, part(ev))
+                return result
+            return boolop
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            left, right, fn = build(node.left), build(node.right), _BINARY[type(node.op)]
+            return lambda ev: fn(left(ev), right(ev))
+
+        if isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, (ast.Not, ast.Invert)):
+                return lambda ev: np.logical_not(operand(ev))
+            if isinstance(node.op, ast.USub):
+                return lambda ev: np.negative(operand(ev))
+
+        raise RuleError(f"Unsupported expression '{ast.unparse(node)}'")
+
+    return Rule(source=source, params=params, _fn=build(tree))
+
+
+class _Evaluator:
+    """Evaluation context: price arrays, grid axes and an indicator cache"""
+
+    def __init__(self, engine: "BacktestEngine", grid: Dict[str, np.ndarray]):
+        self.engine = engine
+        self.grid = grid
+        self.axes = {name: i for i, name in enumerate(grid)}
+        self._cache: Dict[Tuple, np.ndarray] = {}
+
+    def _on_axis(self, values: np.ndarray, name: str) -> np.ndarray:
+        """(n, T) or (n,) values for parameter `name` reshaped onto its grid axis"""
+        shape = [1] * (len(self.grid) + 1)
+        shape[self.axes[name]] = len(self.grid[name])
+        if values.ndim == 2:
+            shape[-1] = values.shape[1]
+        return values.reshape(shape)
+
+    def param(self, name: str) -> np.ndarray:
+        if name not in self.grid:
+            raise RuleError(f"No values for parameter '{name}'")
+        return self._on_axis(self.grid[name].astype(float), name)
+
+    def field(self, name: str) -> np.ndarray:
+        return self.engine.prices[name]
+
+    def indicator(self, kind: str, arg: Tuple[str, object]) -> np.ndarray:
+        key = (kind, arg)
+        if key not in self._cache:
+            mode, value = arg
+            if mode == 'const':
+                self._cache[key] = self.engine.indicator(kind, np.array([value]))[0]
+            else:
+                windows = self.grid.get(value)
+                if windows is None:
+                    raise RuleError(f"No values for parameter '{value}'")
+                if np.any(windows <= 0) or np.any(windows != np.round(windows)):
+                    raise RuleError(f"Parameter '{value}' is used as a window: values must be positive integers")
+                self._cache[key] = self._on_axis(self.engine.indicator(kind, windows.astype(int)), value)
+        return self._cache[key]
+
+    @staticmethod
+    def cross(a, b, above: bool) -> np.ndarray:
+        a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+        prev_a = np.concatenate([np.full(a.shape[:-1] + (1,), np.nan), a[..., :-1]], axis=-1)
+        prev_b = np.concatenate([np.full(b.shape[:-1] + (1,), np.nan), b[..., :-1]], axis=-1)
+        if above:
+            return (a > b) & (prev_a <= prev_b)
+        return (a < b) & (prev_a >= prev_b)
+
+
+# ----------------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------------
+
+@dataclass
+class BacktestResult:
+    """
+    Grid sweep output. `grid` has one row per parameter combination (params + metrics),
+    best (highest Sharpe) first; `equity` holds every curve, shaped (*axes, time).
+    """
+    grid: pd.DataFrame
+    axes: Dict[str, np.ndarray]
+    equity: np.ndarray
+    buy_hold: pd.Series
+    seconds: float
+
+    @property
+    def best(self) -> Dict[str, float]:
+        return {name: self.grid.iloc[0][name] for name in self.axes}
+
+    def curve(self, **params) -> pd.DataFrame:
+        """strategy_equity / buy_hold_equity for one combination (default: the best)"""
+        params = params or self.best
+        position = tuple(int(np.flatnonzero(values == params[name])[0]) for name, values in self.axes.items())
+        return pd.DataFrame({
+            'strategy_equity': self.equity[position],
+            'buy_hold_equity': self.buy_hold.values,
+        }, index=self.buy_hold.index)
+
+
+class BacktestEngine:
+    """
+    Vectorized long-only backtester over one OHLCV frame.
+    costs: commission + slippage in basis points, charged on every unit of turnover.
+    sizing: 'fixed' (size x equity) or 'volatility' (size scaled to target_vol annualized,
+    20-bar realized volatility, capped at size).
+    stop_loss: fraction below the entry close that forces an exit; re-entry needs the
+    entry rule to turn false and true again.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        cost_bps: float = 0.0,
+        slippage_bps: float = 0.0,
+        sizing: str = 'fixed',
+        size: float = 1.0,
+        target_vol: float = 0.15,
+        stop_loss: Optional[float] = None,
+        periods_per_year: int = 252
+    ):
+        if sizing not in ('fixed', 'volatility'):
+            raise ValueError(f"Unknown sizing '{sizing}'")
+        columns = column_map(df)
+        if 'close' not in columns:
+            raise KeyError("Column 'close' not in price data")
+        data = df[df[columns['close']].notna()]
+
+        self.index = data.index
+        self.prices = {}
+        for name in PRICE_FIELDS:
+            col = columns.get(name, columns['close'] if name != 'volume' else None)
+            self.prices[name] = data[col].to_numpy(dtype=float) if col is not None else np.zeros(len(data))
+        self.cost = (cost_bps + slippage_bps) / 1e4
+        self.sizing = sizing
+        self.size = size
+        self.target_vol = target_vol
+        self.stop_loss = stop_loss
+        self.periods_per_year = periods_per_year
+
+    def __len__(self):
+        return len(self.index)
+
+    def indicator(self, kind: str, windows: np.ndarray) -> np.ndarray:
+        p = self.prices
+        if kind == 'SMA':
+            return _rolling_mean(p['close'], windows)
+        if kind == 'EMA':
+            return _ema(p['close'], windows.astype(float))
+        if kind == 'STD':
+            return _rolling_std(p['close'], windows)
+        if kind == 'RSI':
+            return _rsi(p['close'], windows)
+        if kind == 'ATR':
+            return _atr(p['high'], p['low'], p['close'], windows)
+        raise RuleError(f"Unknown indicator '{kind}'")
+
+    # ------------------------------------------------------------------
+    # Positions
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _hold(entry: np.ndarray, exit_: np.ndarray) -> np.ndarray:
+        """In the market from an entry bar until an exit bar (exit wins ties): forward fill over time"""
+        T = entry.shape[-1]
+        marks = np.where(exit_, 0, np.where(entry, 1, -1)).astype(np.int8)
+        idx = np.where(marks >= 0, np.arange(T), -1)
+        last = np.maximum.accumulate(idx, axis=-1)
+        held = np.take_along_axis(marks, np.maximum(last, 0), axis=-1)
+        return (last >= 0) & (held == 1)
+
+    def _hold_with_stop(self, entry: np.ndarray, exit_: np.ndarray) -> np.ndarray:
+        """Stops depend on the entry price, so this walks time - every combination at once"""
+        close = self.prices['close']
+        floor = 1 - self.stop_loss
+        pos = np.zeros(entry.shape[:-1], dtype=bool)
+        armed = np.ones(entry.shape[:-1], dtype=bool)
+        entry_px = np.zeros(entry.shape[:-1])
+        out = np.zeros(entry.shape, dtype=bool)
+        for t in range(entry.shape[-1]):
+            e, x = entry[..., t], exit_[..., t]
+            stopped = pos & (close[t] <= entry_px * floor)
+            pos &= ~(stopped | x)
+            armed = (armed & ~stopped) | ~e
+            new = ~pos & e & ~x & armed
+            entry_px = np.where(new, close[t], entry_px)
+            pos |= new
+            out[..., t] = pos
+        return out
+
+    def _weights(self) -> np.ndarray:
+        """Exposure per bar for a held position"""
+        if self.sizing == 'fixed':
+            return np.full(len(self), self.size)
+        returns = np.concatenate([[np.nan], np.diff(np.log(self.prices['close']))])
+        vol = pd.Series(returns).rolling(20).std().to_numpy() * math.sqrt(self.periods_per_year)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = np.minimum(self.size, self.target_vol / vol)
+        return np.nan_to_num(weights, nan=0.0, posinf=self.size)
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self, entry: str, exit: Optional[str] = None, params: Optional[Dict[str, Sequence[float]]] = None) -> BacktestResult:
+        """
+        Backtest entry/exit rules for every combination of `params`.
+        Without an exit rule the position is simply "entry rule is true" (state signal).
+        """
+        start = time.perf_counter()
+        entry_rule = compile_rule(entry)
+        exit_rule = compile_rule(exit) if exit and exit.strip() else None
+
+        used = entry_rule.params + [p for p in (exit_rule.params if exit_rule else []) if p not in entry_rule.params]
+        params = params or {}
+        missing = [p for p in used if p not in params]
+        if missing:
+            raise RuleError(f"No values for parameter(s): {', '.join(missing)}")
+        axes = {name: np.asarray(params[name], dtype=float) for name in used}
+
+        ev = _Evaluator(self, axes)
+        shape = tuple(len(v) for v in axes.values()) + (len(self),)
+        entry_sig = np.broadcast_to(entry_rule.evaluate(ev), shape)
+        exit_sig = np.broadcast_to(exit_rule.evaluate(ev) if exit_rule else ~entry_sig, shape)
+
+        position = self._hold_with_stop(entry_sig, exit_sig) if self.stop_loss else self._hold(entry_sig, exit_sig)
+
+        # Signal on the close of day t, exposure earns day t+1's return
+        close = self.prices['close']
+        returns = np.concatenate([[0.0], close[1:] / close[:-1] - 1])
+        weight = position * self._weights()
+        prev_weight = np.concatenate([np.zeros(shape[:-1] + (1,)), weight[..., :-1]], axis=-1)
+        strategy = prev_weight * returns - self.cost * np.abs(weight - prev_weight)
+        equity = np.cumprod(1 + strategy, axis=-1)
+
+        grid = self._metrics(axes, strategy, equity, position)
+        buy_hold = pd.Series(np.cumprod(1 + returns), index=self.index)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Backtest: {len(grid)} combinations x {len(self)} bars in {elapsed:.2f}s")
+        return BacktestResult(grid=grid, axes=axes, equity=equity, buy_hold=buy_hold, seconds=elapsed)
+
+    def _metrics(self, axes: Dict[str, np.ndarray], strategy: np.ndarray, equity: np.ndarray,
+                 position: np.ndarray) -> pd.DataFrame:
+        n = strategy.shape[-1]
+        years = max(n / self.periods_per_year, 1e-9)
+        final = equity[..., -1]
+        drawdown = equity / np.maximum.accumulate(equity, axis=-1) - 1
+        std = strategy.std(axis=-1)
+        active = strategy != 0
+        wins = (strategy > 0).sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(std > 0, strategy.mean(axis=-1) / std * math.sqrt(self.periods_per_year), 0.0)
+            win_rate = np.where(active.any(axis=-1), wins / active.sum(axis=-1) * 100, 0.0)
+        trades = (position[..., 1:] & ~position[..., :-1]).sum(axis=-1) + position[..., 0]
+
+        metrics = {
+            'Total Return': (final - 1) * 100,
+            'CAGR': (np.maximum(final, 0) ** (1 / years) - 1) * 100,
+            'Sharpe': sharpe,
+            'Max Drawdown': drawdown.min(axis=-1) * 100,
+            'Win Rate': win_rate,
+            'Trades': trades,
+            'Exposure': position.mean(axis=-1) * 100,
+        }
+        combos = list(itertools.product(*axes.values())) if axes else [()]
+        grid = pd.DataFrame(combos, columns=list(axes))
+        for name, values in metrics.items():
+            grid[name] = np.asarray(values).reshape(-1)
+        return grid.sort_values('Sharpe', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def parse_range(spec: str) -> List[float]:
+    """'10,20,50' or 'start:stop:step' (stop inclusive) -> values"""
+    spec = spec.strip()
+    if ':' in spec:
+        parts = [float(p) for p in spec.split(':')]
+        if len(parts) != 3 or parts[2] <= 0:
+            raise ValueError(f"Range must be start:stop:step, got '{spec}'")
+        start, stop, step = parts
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = [float(p) for p in spec.split(',') if p.strip()]
+    return [int(v) if float(v).is_integer() else float(v) for v in values]
@@ -0,0 +1,171 @@
+"""
+Intraday Bar Aggregator
+Turns streamed or polled quotes into 1m/5m/15m OHLCV bars.
+- One fixed-size NumPy ring buffer per (instrument_key, interval); the newest slot is the open bar
+- Volume per bar is the delta of the quote's cumulative day volume
+- Completed bars are appended to the bar store (partition = instrument_key, interval) every
+  flush_interval seconds, so intraday history survives restarts
+Fed by market_feed listeners: every tick and every HTTP-seeded quote lands here.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import BAR_AGGREGATOR_SETTINGS
+from .bar_store import bar_store, BarStore, MARKET_TZ
+from .market_feed import market_feed
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {'1m': 60, '5m': 300, '15m': 900}
+
+
+class BarRing:
+    """Fixed-capacity OHLCV ring; bars are keyed by bucket start (epoch seconds)"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buckets = np.zeros(capacity, dtype=np.int64)
+        self.ohlcv = np.zeros((capacity, 5), dtype=np.float64)
+        self.head = 0    # Next slot to write
+        self.count = 0
+
+    @property
+    def last_bucket(self) -> Optional[int]:
+        return int(self.buckets[(self.head - 1) % self.capacity]) if self.count else None
+
+    def add(self, bucket: int, price: float, volume: float):
+        """Open a new bar or update the current one. Late quotes for closed bars are dropped."""
+        last = self.last_bucket
+        if last is not None and bucket < last:
+            return
+        if last == bucket:
+            row = self.ohlcv[(self.head - 1) % self.capacity]
+            row[1] = max(row[1], price)
+            row[2] = min(row[2], price)
+            row[3] = price
+            row[4] += volume
+            return
+
+        self.buckets[self.head] = bucket
+        self.ohlcv[self.head] = (price, price, price, price, volume)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(buckets, ohlcv) oldest first"""
+        order = (np.arange(self.count) + self.head - self.count) % self.capacity
+        return self.buckets[order], self.ohlcv[order]
+
+
+def _to_frame(buckets: np.ndarray, ohlcv: np.ndarray) -> pd.DataFrame:
+    # Exchange wall-clock (IST), tz-naive: same convention as the downloaded candles
+    index = pd.to_datetime(np.asarray(buckets, dtype=np.int64), unit='s', utc=True)
+    index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    return pd.DataFrame(ohlcv, index=index, columns=['open', 'high', 'low', 'close', 'volume'])
+
+
+class BarAggregator:
+    """
+    Quote -> bar builder for every instrument_key the feed sees.
+    on_quote() is the market_feed listener; bars() merges persisted and in-memory bars.
+    """
+
+    def __init__(self, store: BarStore = bar_store, intervals: Optional[List[str]] = None):
+        self.store = store
+        self.intervals = intervals or list(BAR_AGGREGATOR_SETTINGS['ring_size'])
+        self._lock = threading.Lock()
+        self._rings: Dict[Tuple[str, str], BarRing] = {}
+        self._last_volume: Dict[str, float] = {}
+        self._flushed: Dict[Tuple[str, str], int] = {}  # Last persisted bucket
+        self._last_flush = time.time()
+
+    def _ring(self, key: str, interval: str) -> BarRing:
+        ring = self._rings.get((key, interval))
+        if ring is None:
+            ring = BarRing(BAR_AGGREGATOR_SETTINGS['ring_size'][interval])
+            self._rings[(key, interval)] = ring
+        return ring
+
+    def on_quote(self, key: str, quote: Dict):
+        """Fold one quote into every interval's current bar"""
+        price = quote.get('ltp')
+        if not price:
+            return
+        ts = quote.get('ts') or time.time()
+
+        with self._lock:
+            # 1. Volume traded since the previous quote (cumulative day volume resets each session)
+            volume = 0.0
+            cumulative = quote.get('volume')
+            if cumulative is not None:
+                last = self._last_volume.get(key)
+                if last is not None:
+                    volume = cumulative - last if cumulative >= last else float(cumulative)
+                self._last_volume[key] = cumulative
+
+            # 2. Update each interval
+            for interval in self.intervals:
+                seconds = INTERVAL_SECONDS[interval]
+                self._ring(key, interval).add(int(ts // seconds * seconds), float(price), volume)
+
+            due = time.time() - self._last_flush >= BAR_AGGREGATOR_SETTINGS['flush_interval']
+
+        if due:
+            self.flush()
+
+    def flush(self, include_open: bool = False) -> int:
+        """
+        Append bars completed since the last flush to the bar store.
+        The open bar is only written with include_open (e.g. on shutdown). Returns bars written.
+        """
+        pending = []
+        with self._lock:
+            self._last_flush = time.time()
+            for (key, interval), ring in self._rings.items():
+                buckets, ohlcv = ring.arrays()
+                mask = buckets > self._flushed.get((key, interval), -1)
+                if not include_open:
+                    mask[-1:] = False
+                if mask.any():
+                    pending.append((key, interval, buckets[mask], ohlcv[mask]))
+                    self._flushed[(key, interval)] = int(buckets[mask][-1])
+
+        for key, interval, buckets, ohlcv in pending:
+            self.store.merge(key, _to_frame(buckets, ohlcv), interval)
+        return sum(len(b) for _, _, b, _ in pending)
+
+    def bars(self, key: str, interval: str = '1m', start_date=None, end_date=None) -> pd.DataFrame:
+        """Persisted + in-memory bars (memory wins on overlap), optionally sliced to [start, end)"""
+        stored = self.store.read(key, interval)
+        with self._lock:
+            ring = self._rings.get((key, interval))
+            live = _to_frame(*ring.arrays()) if ring is not None and ring.count else None
+
+        frames = [f for f in (stored, live) if f is not None and not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames) if len(frames) > 1 else frames[0].copy()
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+
+        if start_date is not None and end_date is not None:
+            df = BarStore.slice(df, start_date, end_date)
+        return df
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'series': len(self._rings),
+                'symbols': len({key for key, _ in self._rings}),
+                'bars_in_memory': sum(r.count for r in self._rings.values()),
+            }
+
+
+# Global instance (aggregates everything the shared feed ingests)
+bar_aggregator = BarAggregator()
+market_feed.add_listener(bar_aggregator.on_quote)
@@ -0,0 +1,346 @@
+"""
+Bar Store
+Persistent on-disk OHLCV cache with one partition per (symbol, interval).
+Each partition carries coverage metadata (downloaded intervals, first/last bar,
+known holes such as exchange holidays) so MultiAssetDataFetcher only downloads
+the parts of a requested range it has never seen.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from urllib.parse import quote, unquote
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config import CACHE_SETTINGS
+
+# Parquet needs pyarrow (installed with streamlit). Fall back to pickle without it.
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BAR_STORE_DIR = os.path.join(BASE_DIR, "data_cache", "bars")
+
+FILE_EXT = ".parquet" if PARQUET_AVAILABLE else ".pkl"
+
+# Partition timestamps are exchange wall-clock time (IST), tz-naive, whatever the host's TZ:
+# streamed bars (bar_aggregator) and downloaded candles (upstox_history) share one partition
+MARKET_TZ = "Asia/Kolkata"
+
+
+class BarStore:
+    """
+    Columnar bar cache.
+    - Layout: <root>/<interval>/<quoted symbol>.parquet
+    - Index: tz-naive DatetimeIndex in exchange time (MARKET_TZ), columns lowercase (open, high, low, close, volume...)
+    - Coverage: <root>/<interval>/<quoted symbol>.meta.json
+    - Writes are atomic (tmp file + os.replace) so several Streamlit workers can share it
+    """
+
+    def __init__(self, root: str = BAR_STORE_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        # (symbol, interval) -> (file mtime, DataFrame): avoids re-reading unchanged partitions
+        self._frames: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+        # (symbol, interval) -> (file mtime, coverage dict)
+        self._meta: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+
+    # ------------------------------------------------------------------
+    # Partition I/O
+    # ------------------------------------------------------------------
+
+    def _path(self, symbol: str, interval: str = "1d") -> str:
+        return os.path.join(self.root, interval, quote(symbol, safe="") + FILE_EXT)
+
+    def _meta_path(self, symbol: str, interval: str = "1d") -> str:
+        return os.path.join(self.root, interval, quote(symbol, safe="") + ".meta.json")
+
+    def read(self, symbol: str, interval: str = "1d") -> Optional[pd.DataFrame]:
+        """Load the stored partition (None if the symbol has never been cached)"""
+        path = self._path(symbol, interval)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._frames.get((symbol, interval))
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+            try:
+                if PARQUET_AVAILABLE:
+                    df = pd.read_parquet(path)
+                else:
+                    df = pd.read_pickle(path)
+            except Exception as e:
+                logger.error(f"Bar store read failed for {symbol} ({interval}): {e}")
+                return None
+
+            self._frames[(symbol, interval)] = (mtime, df)
+            return df
+
+    def write(self, symbol: str, df: pd.DataFrame, interval: str = "1d") -> None:
+        """Replace the stored partition"""
+        if df is None or df.empty:
+            return
+
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with self._lock:
+            try:
+                if PARQUET_AVAILABLE:
+                    df.to_parquet(tmp_path)
+                else:
+                    df.to_pickle(tmp_path)
+                os.replace(tmp_path, path)
+                self._frames[(symbol, interval)] = (os.path.getmtime(path), df)
+            except Exception as e:
+                logger.error(f"Bar store write failed for {symbol} ({interval}): {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def merge(self, symbol: str, new_df: pd.DataFrame, interval: str = "1d") -> pd.DataFrame:
+        """
+        Splice freshly downloaded bars into the partition.
+        Overlapping timestamps take the new values (the last bar may have been partial).
+        """
+        new_df = self.normalize(new_df)
+        existing = self.read(symbol, interval)
+
+        if existing is None or existing.empty:
+            merged = new_df
+        elif new_df is None or new_df.empty:
+            return existing
+        else:
+            merged = pd.concat([existing, new_df])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+        self.write(symbol, merged, interval)
+        return merged
+
+    def symbols(self, interval: str = "1d") -> List[str]:
+        """All symbols with a stored partition"""
+        folder = os.path.join(self.root, interval)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(unquote(f[:-len(FILE_EXT)]) for f in os.listdir(folder) if f.endswith(FILE_EXT))
+
+    def last_updated(self, symbol: str, interval: str = "1d") -> Optional[float]:
+        """Epoch seconds of the last write (None if not stored)"""
+        try:
+            return os.path.getmtime(self._path(symbol, interval))
+        except OSError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Range helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def normalize(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Lowercase columns, tz-naive sorted DatetimeIndex, no empty rows"""
+        if df is None or df.empty:
+            return df
+
+        df = df.copy()
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = [str(c[0]).lower() for c in df.columns]
+        else:
+            df.columns = [str(c).lower() for c in df.columns]
+
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df.index = pd.to_datetime(df.index)
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+
+        df = df.dropna(how="all")
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def slice(df: Optional[pd.DataFrame], start_date, end_date) -> pd.DataFrame:
+        """Bars in [start_date, end_date) - same end-exclusive semantics as yfinance"""
+        if df is None or df.empty:
+            return pd.DataFrame()
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        return df[(df.index >= start) & (df.index < end)].copy()
+
+    def missing_ranges(
+        self,
+        symbol: str,
+        start_date,
+        end_date,
+        interval: str = "1d"
+    ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Uncovered sub-ranges of [start_date, end_date) that contain at least one business day.
+        Today's session is never marked covered (its bar is partial); it is re-fetched
+        once the partition is older than the price_data TTL.
+        """
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+        if start >= end:
+            return []
+
+        meta = self.coverage(symbol, interval)
+        covered = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in meta.get('covered', [])]
+
+        # Bars can't exist beyond today
+        today = pd.Timestamp.now().normalize()
+        horizon = min(end, today + pd.Timedelta(days=1))
+        age = time.time() - (meta.get('updated') or 0)
+
+        ranges = []
+        for range_start, range_end in _subtract_intervals((start, horizon), covered):
+            if range_end > today and age <= CACHE_SETTINGS['price_data']:
+                range_end = today
+            if has_sessions(range_start, range_end):
+                ranges.append((range_start, range_end))
+
+        return ranges
+
+    # ------------------------------------------------------------------
+    # Coverage metadata
+    # ------------------------------------------------------------------
+
+    def coverage(self, symbol: str, interval: str = "1d") -> Dict:
+        """
+        Coverage metadata for a partition:
+        {'first_bar', 'last_bar', 'covered': [[start, end), ...], 'holes': [...], 'updated'}
+        Partitions written before metadata existed count as covering first..last bar.
+        """
+        path = self._meta_path(symbol, interval)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+
+        if mtime is not None:
+            with self._lock:
+                cached = self._meta.get((symbol, interval))
+                if cached and cached[0] == mtime:
+                    return cached[1]
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    self._meta[(symbol, interval)] = (mtime, meta)
+                    return meta
+                except Exception as e:
+                    logger.error(f"Bar store coverage read failed for {symbol} ({interval}): {e}")
+
+        df = self.read(symbol, interval)
+        if df is None or df.empty:
+            return {}
+
+        first_bar = df.index[0].normalize()
+        last_bar = df.index[-1].normalize()
+        return {
+            'first_bar': first_bar.strftime('%Y-%m-%d'),
+            'last_bar': last_bar.strftime('%Y-%m-%d'),
+            'covered': [[first_bar.strftime('%Y-%m-%d'), (last_bar + pd.Timedelta(days=1)).strftime('%Y-%m-%d')]],
+            'holes': [],
+            'updated': self.last_updated(symbol, interval)
+        }
+
+    def record_coverage(self, symbol: str, start_date, end_date, interval: str = "1d") -> Dict:
+        """
+        Mark [start_date, end_date) as downloaded and refresh first/last bar and holes.
+        Holes are business days inside covered ranges without a bar (holidays, suspensions).
+        """
+        today = pd.Timestamp.now().normalize()
+        start = pd.Timestamp(start_date).normalize()
+        end = min(pd.Timestamp(end_date).normalize(), today)  # Today's session is never final
+
+        meta = self.coverage(symbol, interval)
+        intervals = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in meta.get('covered', [])]
+        if start < end:
+            intervals.append((start, end))
+        covered = _merge_intervals(intervals)
+
+        df = self.read(symbol, interval)
+        holes = []
+        first_bar = last_bar = None
+        if df is not None and not df.empty:
+            bar_days = df.index.normalize()
+            first_bar = bar_days[0].strftime('%Y-%m-%d')
+            last_bar = bar_days[-1].strftime('%Y-%m-%d')
+            for range_start, range_end in covered:
+                business_days = pd.bdate_range(range_start, range_end - pd.Timedelta(days=1))
+                holes.extend(d.strftime('%Y-%m-%d') for d in business_days.difference(bar_days))
+
+        meta = {
+            'first_bar': first_bar,
+            'last_bar': last_bar,
+            'covered': [[s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')] for s, e in covered],
+            'holes': holes,
+            'updated': time.time()
+        }
+
+        path = self._meta_path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+                os.replace(tmp_path, path)
+                self._meta[(symbol, interval)] = (os.path.getmtime(path), meta)
+            except Exception as e:
+                logger.error(f"Bar store coverage write failed for {symbol} ({interval}): {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        return meta
+
+
+def has_sessions(start_date, end_date) -> bool:
+    """True if [start_date, end_date) holds at least one business day (a download should return bars)"""
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    return start < end and len(pd.bdate_range(start, end - pd.Timedelta(days=1))) > 0
+
+
+def _merge_intervals(intervals: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Union of half-open [start, end) intervals, sorted"""
+    merged = []
+    for start, end in sorted(i for i in intervals if i[0] < i[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract_intervals(
+    window: Tuple[pd.Timestamp, pd.Timestamp],
+    covered: List[Tuple[pd.Timestamp, pd.Timestamp]]
+) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Parts of the half-open window not inside any covered interval"""
+    cursor, end = window
+    gaps = []
+    for cov_start, cov_end in _merge_intervals(covered):
+        if cov_end <= cursor or cov_start >= end:
+            continue
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+# Global instance
+bar_store = BarStore()
@@ -0,0 +1,365 @@
+"""
+Instrument Index
+Compact binary form of instrument_master.json, memory-mapped at startup.
+
+Layout (little-endian):
+- Header: magic, version, section count, size + mtime of the JSON it was built from
+- Directory: (name, offset, nbytes) per section, sections 8-byte aligned
+- Interned string table: uint32 offsets + UTF-8 blob (every symbol/key/name stored once)
+- Per map: rows sorted by symbol + an open-addressing hash table (crc32, linear probing)
+  so lookups are O(1) and never parse anything
+- Options: per underlying, contracts sorted by (expiry, strike, CE/PE) for range scans
+
+Pages are shared between processes (Streamlit workers) through the OS page cache.
+"""
+
+import os
+import mmap
+import struct
+import zlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BBTIDX01"
+VERSION = 2
+HEADER = struct.Struct("<8sIIQQ")       # magic, version, n_sections, source_size, source_mtime_ns
+DIR_ENTRY = struct.Struct("<16sQQ")     # name, offset, nbytes
+
+# Row layouts per section
+EQ_ROW = np.dtype([('sym', '<u4'), ('key', '<u4'), ('name', '<u4')])
+INDEX_ROW = np.dtype([('sym', '<u4'), ('key', '<u4')])
+ROOT_ROW = np.dtype([('sym', '<u4'), ('start', '<u4'), ('count', '<u4')])
+FUT_ROW = np.dtype([('key', '<u4'), ('expiry', '<i8')])
+OPT_ROW = np.dtype([('expiry', '<u4'), ('strike', '<f8'), ('type', 'u1'), ('key', '<u4'), ('lot_size', '<u4')])
+
+OPTION_TYPES = ('CE', 'PE')
+
+SECTION_DTYPES = {
+    'str_offsets': np.dtype('<u4'),
+    'str_blob': np.dtype('u1'),
+    'eq_rows': EQ_ROW,
+    'eq_hash': np.dtype('<i4'),
+    'idx_rows': INDEX_ROW,
+    'idx_hash': np.dtype('<i4'),
+    'fut_roots': ROOT_ROW,
+    'fut_hash': np.dtype('<i4'),
+    'fut_rows': FUT_ROW,
+    'exp_roots': ROOT_ROW,
+    'exp_hash': np.dtype('<i4'),
+    'exp_rows': np.dtype('<u4'),        # YYYYMMDD
+    'opt_roots': ROOT_ROW,
+    'opt_hash': np.dtype('<i4'),
+    'opt_rows': OPT_ROW,
+}
+
+
+def _hash(value: bytes) -> int:
+    return zlib.crc32(value)
+
+
+def _source_stamp(source_path: Optional[str]) -> Tuple[int, int]:
+    try:
+        stat = os.stat(source_path)
+        return stat.st_size, stat.st_mtime_ns
+    except (OSError, TypeError):
+        return 0, 0
+
+
+class _StringTable:
+    """Interns strings while building"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[bytes] = []
+
+    def add(self, value: Optional[str]) -> int:
+        value = value or ""
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value.encode('utf-8'))
+        return self.ids[value]
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        lengths = np.array([len(v) for v in self.values], dtype=np.int64)
+        offsets = np.zeros(len(self.values) + 1, dtype='<u4')
+        offsets[1:] = np.cumsum(lengths)
+        blob = np.frombuffer(b"".join(self.values), dtype='u1')
+        return offsets, blob
+
+
+def _hash_table(symbols: List[bytes]) -> np.ndarray:
+    """Open-addressing table (load factor <= 0.5) mapping hash slot -> row"""
+    size = 8
+    while size < 2 * len(symbols):
+        size *= 2
+    table = np.full(size, -1, dtype='<i4')
+    mask = size - 1
+    for row, sym in enumerate(symbols):
+        slot = _hash(sym) & mask
+        while table[slot] != -1:
+            slot = (slot + 1) & mask
+        table[slot] = row
+    return table
+
+
+def write_instrument_index(master: Dict, path: str, source_path: Optional[str] = None) -> str:
+    """
+    Serialize an instrument master dict ({EQ_MAP, INDICES, FUTURES, EXPIRIES}) to the binary index.
+    source_path: the JSON it mirrors (its size/mtime are stamped for staleness checks).
+    """
+    strings = _StringTable()
+    sections = {}
+
+    # 1. Equities
+    eq_items = sorted(master.get("EQ_MAP", {}).items())
+    sections['eq_rows'] = np.array(
+        [(strings.add(sym), strings.add(v.get('key')), strings.add(v.get('name'))) for sym, v in eq_items],
+        dtype=EQ_ROW
+    )
+    sections['eq_hash'] = _hash_table([sym.encode('utf-8') for sym, _ in eq_items])
+
+    # 2. Indices
+    idx_items = sorted(master.get("INDICES", {}).items())
+    sections['idx_rows'] = np.array([(strings.add(sym), strings.add(key)) for sym, key in idx_items], dtype=INDEX_ROW)
+    sections['idx_hash'] = _hash_table([sym.encode('utf-8') for sym, _ in idx_items])
+
+    # 3. Futures: one root per underlying pointing at its expiry-sorted rows
+    fut_items = sorted(master.get("FUTURES", {}).items())
+    roots, rows = [], []
+    for sym, contracts in fut_items:
+        contracts = sorted(contracts, key=lambda c: c.get('expiry') or 0)
+        roots.append((strings.add(sym), len(rows), len(contracts)))
+        rows.extend((strings.add(c['key']), int(c.get('expiry') or 0)) for c in contracts)
+    sections['fut_roots'] = np.array(roots, dtype=ROOT_ROW)
+    sections['fut_hash'] = _hash_table([sym.encode('utf-8') for sym, _ in fut_items])
+    sections['fut_rows'] = np.array(rows, dtype=FUT_ROW)
+
+    # 4. Expiries as sorted YYYYMMDD integers
+    exp_items = sorted(master.get("EXPIRIES", {}).items())
+    roots, rows = [], []
+    for sym, dates in exp_items:
+        values = sorted({int(d.replace("-", "")) for d in dates})
+        roots.append((strings.add(sym), len(rows), len(values)))
+        rows.extend(values)
+    sections['exp_roots'] = np.array(roots, dtype=ROOT_ROW)
+    sections['exp_hash'] = _hash_table([sym.encode('utf-8') for sym, _ in exp_items])
+    sections['exp_rows'] = np.array(rows, dtype='<u4')
+
+    # 5. Option contracts (columnar in the JSON master), expiry as local YYYYMMDD like EXPIRIES
+    opt_items = sorted(master.get("OPTIONS", {}).items())
+    roots, rows = [], []
+    for sym, cols in opt_items:
+        contracts = sorted(
+            (int(datetime.fromtimestamp(exp / 1000).strftime('%Y%m%d')), float(strike),
+             OPTION_TYPES.index(opt_type), strings.add(key), int(lot or 0))
+            for exp, strike, opt_type, key, lot in zip(cols['expiry'], cols['strike'], cols['type'], cols['key'], cols['lot_size'])
+        )
+        roots.append((strings.add(sym), len(rows), len(contracts)))
+        rows.extend(contracts)
+    sections['opt_roots'] = np.array(roots, dtype=ROOT_ROW)
+    sections['opt_hash'] = _hash_table([sym.encode('utf-8') for sym, _ in opt_items])
+    sections['opt_rows'] = np.array(rows, dtype=OPT_ROW)
+
+    sections['str_offsets'], sections['str_blob'] = strings.arrays()
+
+    # Lay out header + directory + aligned sections
+    names = list(SECTION_DTYPES)
+    offset = HEADER.size + DIR_ENTRY.size * len(names)
+    directory, payload = [], []
+    for name in names:
+        data = np.ascontiguousarray(sections[name], dtype=SECTION_DTYPES[name]).tobytes()
+        pad = (-offset) % 8
+        payload.append(b"\0" * pad + data)
+        offset += pad
+        directory.append(DIR_ENTRY.pack(name.encode('ascii'), offset, len(data)))
+        offset += len(data)
+
+    source_size, source_mtime = _source_stamp(source_path)
+    header = HEADER.pack(MAGIC, VERSION, len(names), source_size, source_mtime)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(b"".join(directory))
+        f.write(b"".join(payload))
+    os.replace(tmp_path, path)
+
+    logger.info(f"Instrument index written to {path} ({offset / 1024:.0f} KB, {len(strings.values)} strings)")
+    return path
+
+
+class InstrumentIndex:
+    """Read-only, memory-mapped view of an index file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_sections, self.source_size, self.source_mtime = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a v{VERSION} instrument index: {path}")
+
+        self._sections = {}
+        offsets = {}
+        for i in range(n_sections):
+            raw_name, offset, nbytes = DIR_ENTRY.unpack_from(self._mm, HEADER.size + i * DIR_ENTRY.size)
+            name = raw_name.rstrip(b"\0").decode('ascii')
+            dtype = SECTION_DTYPES[name]
+            self._sections[name] = np.frombuffer(self._mm, dtype=dtype, count=nbytes // dtype.itemsize, offset=offset)
+            offsets[name] = offset
+
+        self._str_offsets = self._sections['str_offsets']
+        self._str_base = offsets['str_blob']
+
+    def is_current(self, source_path: str) -> bool:
+        """True if the index was built from the JSON as it is on disk now"""
+        return _source_stamp(source_path) == (self.source_size, self.source_mtime)
+
+    # ------------------------------------------------------------------
+    # Primitives
+    # ------------------------------------------------------------------
+
+    def _bytes(self, string_id: int) -> bytes:
+        start = self._str_base + int(self._str_offsets[string_id])
+        end = self._str_base + int(self._str_offsets[string_id + 1])
+        return self._mm[start:end]
+
+    def string(self, string_id: int) -> str:
+        return self._bytes(string_id).decode('utf-8')
+
+    def _find(self, prefix: str, symbol: str) -> int:
+        """Row of symbol in a map (-1 if absent)"""
+        table = self._sections[f'{prefix}_hash']
+        rows = self._sections[f'{prefix}_rows' if prefix in ('eq', 'idx') else f'{prefix}_roots']
+        if not len(rows):
+            return -1
+
+        needle = symbol.encode('utf-8')
+        mask = len(table) - 1
+        slot = _hash(needle) & mask
+        while True:
+            row = int(table[slot])
+            if row < 0:
+                return -1
+            if self._bytes(int(rows[row]['sym'])) == needle:
+                return row
+            slot = (slot + 1) & mask
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def index_key(self, symbol: str) -> Optional[str]:
+        row = self._find('idx', symbol)
+        return self.string(int(self._sections['idx_rows'][row]['key'])) if row >= 0 else None
+
+    def equity(self, symbol: str) -> Optional[Dict[str, str]]:
+        row = self._find('eq', symbol)
+        if row < 0:
+            return None
+        entry = self._sections['eq_rows'][row]
+        return {"key": self.string(int(entry['key'])), "name": self.string(int(entry['name']))}
+
+    def equity_key(self, symbol: str) -> Optional[str]:
+        row = self._find('eq', symbol)
+        return self.string(int(self._sections['eq_rows'][row]['key'])) if row >= 0 else None
+
+    def equity_symbols(self) -> List[str]:
+        """Every EQ symbol, sorted"""
+        return [self.string(int(sym)) for sym in self._sections['eq_rows']['sym']]
+
+    def futures(self, underlying: str, after_ms: Optional[float] = None) -> List[Dict]:
+        """Futures for an underlying sorted by expiry, optionally only those expiring after after_ms"""
+        row = self._find('fut', underlying)
+        if row < 0:
+            return []
+        root = self._sections['fut_roots'][row]
+        start, count = int(root['start']), int(root['count'])
+        contracts = self._sections['fut_rows'][start:start + count]
+        if after_ms is not None:
+            contracts = contracts[np.searchsorted(contracts['expiry'], after_ms, side='right'):]
+        return [{"key": self.string(int(c['key'])), "expiry": int(c['expiry'])} for c in contracts]
+
+    def expiries(self, underlying: str) -> np.ndarray:
+        """Sorted YYYYMMDD expiries (empty array if unknown)"""
+        row = self._find('exp', underlying)
+        if row < 0:
+            return self._sections['exp_rows'][:0]
+        root = self._sections['exp_roots'][row]
+        start = int(root['start'])
+        return self._sections['exp_rows'][start:start + int(root['count'])]
+
+    def next_expiry(self, underlying: str, on_or_after: int) -> Optional[str]:
+        """First expiry >= on_or_after (YYYYMMDD) as YYYY-MM-DD"""
+        dates = self.expiries(underlying)
+        pos = int(np.searchsorted(dates, on_or_after, side='left'))
+        if pos >= len(dates):
+            return None
+        value = str(int(dates[pos]))
+        return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+
+    def option_contracts(
+        self,
+        underlying: str,
+        expiry: int,
+        strike_low: float = float('-inf'),
+        strike_high: float = float('inf')
+    ) -> np.ndarray:
+        """Contracts of one expiry (YYYYMMDD) with strike in [strike_low, strike_high], strike/type sorted"""
+        row = self._find('opt', underlying)
+        if row < 0:
+            return self._sections['opt_rows'][:0]
+        root = self._sections['opt_roots'][row]
+        start = int(root['start'])
+        contracts = self._sections['opt_rows'][start:start + int(root['count'])]
+
+        # Rows are sorted by (expiry, strike): two binary searches per bound
+        lo = np.searchsorted(contracts['expiry'], expiry, side='left')
+        hi = np.searchsorted(contracts['expiry'], expiry, side='right')
+        contracts = contracts[lo:hi]
+        lo = np.searchsorted(contracts['strike'], strike_low, side='left')
+        hi = np.searchsorted(contracts['strike'], strike_high, side='right')
+        return contracts[lo:hi]
+
+    def option_strikes(self, underlying: str, expiry: int) -> np.ndarray:
+        """Distinct strikes listed for one expiry"""
+        return np.unique(self.option_contracts(underlying, expiry)['strike'])
+
+
+_load_lock = threading.Lock()
+
+
+def load_instrument_index(path: str, source_path: Optional[str] = None) -> Optional[InstrumentIndex]:
+    """
+    Map the index at path. If it is missing or older than source_path (the JSON master),
+    rebuild it from the JSON first. Returns None if neither is usable.
+    """
+    with _load_lock:
+        if os.path.exists(path):
+            try:
+                index = InstrumentIndex(path)
+                if source_path is None or not os.path.exists(source_path) or index.is_current(source_path):
+                    return index
+                logger.info("Instrument index is stale, rebuilding from JSON master")
+            except Exception as e:
+                logger.warning(f"Instrument index unreadable ({e}), rebuilding")
+
+        if not source_path or not os.path.exists(source_path):
+            return None
+
+        try:
+            import json
+            with open(source_path, 'r', encoding='utf-8') as f:
+                master = json.load(f)
+            write_instrument_index(master, path, source_path)
+            return InstrumentIndex(path)
+        except Exception as e:
+            logger.error(f"Could not build instrument index: {e}")
+            return None
@@ -1,35 +1,51 @@
 """
 Instrument Service
-Handles loading and querying of Instrument Master and NSE.json
+Handles loading and querying of Instrument Master and NSE.json.
+Lookups go through the memory-mapped binary index (instrument_master.bin) when present;
+the JSON master is only parsed if something asks for the raw maps.
 """
 
 import os
 import json
+import time
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
+from .instrument_index import OPTION_TYPES, InstrumentIndex, load_instrument_index
+
 logger = logging.getLogger(__name__)
 
 # Paths
 # Assumes this file is in bbt10/services/, so we go up one level to bbt10/
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INSTRUMENT_MASTER_PATH = os.path.join(BASE_DIR, "instrument_master.json")
+INSTRUMENT_INDEX_PATH = os.path.join(BASE_DIR, "instrument_master.bin")
 NSE_JSON_PATH = os.path.join(BASE_DIR, "NSE.json")
 
 class InstrumentService:
     _instance = None
-    _master_data: Dict[str, Any] = {}
+    _master_data: Optional[Dict[str, Any]] = None
+    _index: Optional[InstrumentIndex] = None
     _nse_data: Optional[List[Dict]] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(InstrumentService, cls).__new__(cls)
-            cls._instance._load_master()
+            cls._instance._load_index()
         return cls._instance
 
+    def _load_index(self):
+        """Maps instrument_master.bin (built from the JSON master on first use or when stale)"""
+        self._index = load_instrument_index(INSTRUMENT_INDEX_PATH, INSTRUMENT_MASTER_PATH)
+        if self._index is not None:
+            logger.info(f"Instrument index mapped from {INSTRUMENT_INDEX_PATH}")
+        else:
+            self._load_master()
+
     def _load_master(self):
         """Loads instrument_master.json"""
+        self._master_data = {}
         if os.path.exists(INSTRUMENT_MASTER_PATH):
             try:
                 with open(INSTRUMENT_MASTER_PATH, 'r', encoding='utf-8') as f:
@@ -42,23 +58,30 @@ class InstrumentService:
 
     @property
     def master_data(self) -> Dict[str, Any]:
+        # Raw maps are only parsed on demand; lookups below use the index
+        if self._master_data is None:
+            self._load_master()
         return self._master_data
 
     @property
     def eq_map(self) -> Dict[str, Any]:
-        return self._master_data.get("EQ_MAP", {})
+        return self.master_data.get("EQ_MAP", {})
 
     @property
     def indices_map(self) -> Dict[str, Any]:
-        return self._master_data.get("INDICES", {})
+        return self.master_data.get("INDICES", {})
 
     @property
     def futures_map(self) -> Dict[str, Any]:
-        return self._master_data.get("FUTURES", {})
+        return self.master_data.get("FUTURES", {})
 
     @property
     def expiries_map(self) -> Dict[str, Any]:
-        return self._master_data.get("EXPIRIES", {})
+        return self.master_data.get("EXPIRIES", {})
+
+    @property
+    def options_map(self) -> Dict[str, Any]:
+        return self.master_data.get("OPTIONS", {})
 
     def get_nse_json_data(self) -> List[Dict]:
         """Lazy loads NSE.json data if needed"""
@@ -77,6 +100,9 @@ class InstrumentService:
     def resolve_instrument_key(self, symbol: str) -> Optional[str]:
         """Resolves instrument key for a symbol using Master or NSE.json"""
         # 1. Fast Lookup
+        if self._index is not None:
+            return self._index.index_key(symbol) or self._index.equity_key(symbol.replace(".NS", ""))
+        
         if symbol in self.indices_map:
             return self.indices_map[symbol]
         
@@ -108,6 +134,13 @@ class InstrumentService:
         """Get the next valid expiry date (YYYY-MM-DD) from cached data"""
         lookup_sym = self._resolve_underlying_key(symbol)
         
+        if self._index is not None:
+            today = int(datetime.now().strftime("%Y%m%d"))
+            next_expiry = self._index.next_expiry(lookup_sym, today)
+            if next_expiry is None and lookup_sym == "MIDCPNIFTY":
+                next_expiry = self._index.next_expiry("NIFTY MIDCAP 100", today)
+            return next_expiry
+        
         # Try direct
         expiries = self.expiries_map.get(lookup_sym)
         
@@ -126,6 +159,30 @@ class InstrumentService:
         
         return None
 
+    def get_upcoming_expiries(self, symbol: str, limit: Optional[int] = None) -> List[str]:
+        """Listed expiries (YYYY-MM-DD) from today onwards, nearest first"""
+        lookup_sym = self._resolve_underlying_key(symbol)
+        today_str = datetime.now().strftime("%Y-%m-%d")
+        
+        if self._index is not None:
+            dates = self._index.expiries(lookup_sym)
+            if not len(dates) and lookup_sym == "MIDCPNIFTY":
+                dates = self._index.expiries("NIFTY MIDCAP 100")
+            expiries = [f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}" for d in dates.tolist()]
+        else:
+            expiries = self.expiries_map.get(lookup_sym) or []
+            if not expiries and lookup_sym == "MIDCPNIFTY":
+                expiries = self.expiries_map.get("NIFTY MIDCAP 100") or []
+        
+        upcoming = [e for e in expiries if e >= today_str]
+        return upcoming[:limit] if limit else upcoming
+
+    def get_equity_symbols(self) -> List[str]:
+        """All NSE EQ symbols in the master (without the .NS suffix)"""
+        if self._index is not None:
+            return self._index.equity_symbols()
+        return sorted(self.eq_map)
+
     def get_futures_for_symbol(self, symbol: str) -> List[Dict]:
         """Get list of futures keys for a symbol, filtered by expiry"""
         # Mapping for Indices
@@ -140,6 +197,9 @@ class InstrumentService:
         else:
             lookup_sym = clean_sym
             
+        if self._index is not None:
+            return self._index.futures(lookup_sym, after_ms=time.time() * 1000)
+            
         # Try exact match first
         futures_list = []
         if lookup_sym in self.futures_map:
@@ -149,7 +209,6 @@ class InstrumentService:
             return []
             
         # Filter expired
-        import time
         current_ts = time.time() * 1000
         valid_futures = [f for f in futures_list if f.get('expiry') and f.get('expiry') > current_ts]
         
@@ -158,5 +217,56 @@ class InstrumentService:
         
         return valid_futures
 
+    def get_option_keys(
+        self,
+        underlying: str,
+        expiry: Optional[str] = None,
+        strike_range: Optional[Tuple[float, float]] = None
+    ) -> List[Dict]:
+        """
+        Option contracts for one expiry (YYYY-MM-DD, default: next expiry), optionally
+        limited to strikes in [low, high]. Sorted by strike, CE before PE:
+        [{strike, option_type, key, lot_size, expiry}, ...]
+        """
+        lookup_sym = self._resolve_underlying_key(underlying)
+        expiry = expiry or self.get_next_expiry(underlying)
+        if not expiry:
+            return []
+        low, high = strike_range if strike_range else (float('-inf'), float('inf'))
+        
+        if self._index is not None:
+            contracts = self._index.option_contracts(lookup_sym, int(expiry.replace("-", "")), low, high)
+            return [
+                {
+                    "strike": float(c['strike']),
+                    "option_type": OPTION_TYPES[int(c['type'])],
+                    "key": self._index.string(int(c['key'])),
+                    "lot_size": int(c['lot_size']),
+                    "expiry": expiry
+                }
+                for c in contracts
+            ]
+        
+        # JSON fallback (columnar lists)
+        cols = self.options_map.get(lookup_sym)
+        if not cols:
+            return []
+        contracts = [
+            {"strike": strike, "option_type": opt_type, "key": key, "lot_size": lot, "expiry": expiry}
+            for exp, strike, opt_type, key, lot in zip(cols['expiry'], cols['strike'], cols['type'], cols['key'], cols['lot_size'])
+            if low <= strike <= high and datetime.fromtimestamp(exp / 1000).strftime('%Y-%m-%d') == expiry
+        ]
+        contracts.sort(key=lambda c: (c['strike'], c['option_type']))
+        return contracts
+
+    def get_option_strikes(self, underlying: str, expiry: Optional[str] = None) -> List[float]:
+        """Distinct listed strikes for one expiry (default: next expiry)"""
+        expiry = expiry or self.get_next_expiry(underlying)
+        if not expiry:
+            return []
+        if self._index is not None:
+            return self._index.option_strikes(self._resolve_underlying_key(underlying), int(expiry.replace("-", ""))).tolist()
+        return sorted({c['strike'] for c in self.get_option_keys(underlying, expiry)})
+
 # Global instance
 instrument_service = InstrumentService()
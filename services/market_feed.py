@@ -0,0 +1,438 @@
+"""
+Market Data Feed
+Background ingestion of streaming ticks into a process-wide last-quote table.
+- QuoteTable: thread-safe {instrument_key: quote} shared by every service and plugin
+- UpstoxFeedSource: Upstox v3 market-data websocket (protobuf frames)
+- ReplaySource: replays recorded ticks (tests / offline)
+Readers never block on the network: a quote is either in memory and fresh, or the
+caller falls back to its own HTTP path (and seeds the table with the result).
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from config import MARKET_FEED_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+try:
+    from websockets.sync.client import connect as ws_connect
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+FEED_AUTHORIZE_URL = "https://api.upstox.com/v3/feed/market-data-feed/authorize"
+
+
+class QuoteTable:
+    """Last quote per instrument_key: ltp, close (previous close), change, change_pct, volume, ts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes: Dict[str, Dict] = {}
+        self.version = 0
+
+    def update(self, key: str, ltp: float, close: Optional[float] = None,
+               volume: Optional[float] = None, ts: Optional[float] = None):
+        with self._lock:
+            quote = dict(self._quotes.get(key, {}))
+            quote['ltp'] = float(ltp)
+            if close is not None:
+                quote['close'] = float(close)
+            if volume is not None:
+                quote['volume'] = volume
+            prev = quote.get('close')
+            quote['change'] = quote['ltp'] - prev if prev else 0.0
+            quote['change_pct'] = (quote['change'] / prev * 100) if prev else 0.0
+            quote['ts'] = ts if ts is not None else time.time()
+            self._quotes[key] = quote
+            self.version += 1
+            return dict(quote)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            quote = self._quotes.get(key)
+            return dict(quote) if quote else None
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._quotes)
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+            self.version += 1
+
+    def __len__(self):
+        return len(self._quotes)
+
+
+class MarketFeed:
+    """
+    Owns the quote table, the subscription set and the background source thread.
+    Sources call on_tick(); services call subscribe() / get() / snapshot().
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.quotes = QuoteTable()
+        self.max_age = max_age if max_age is not None else MARKET_FEED_SETTINGS['max_quote_age']
+        self._lock = threading.Lock()
+        self._keys: Set[str] = set()
+        self._source = None
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'ticks': 0, 'connects': 0, 'errors': 0, 'last_tick': None}
+        self._listeners: List[Callable[[str, Dict], None]] = []
+
+    # --- Subscriptions ---
+
+    def subscribe(self, keys: Iterable[str]) -> List[str]:
+        """Add keys to the stream; returns the ones that were new"""
+        with self._lock:
+            new = [k for k in dict.fromkeys(keys) if k and k not in self._keys]
+            self._keys.update(new)
+            source = self._source
+        if new and source is not None:
+            source.subscribe(new)
+        return new
+
+    def subscriptions(self) -> List[str]:
+        with self._lock:
+            return sorted(self._keys)
+
+    # --- Lifecycle ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def streaming(self) -> bool:
+        """True while a source is connected and delivering ticks"""
+        source = self._source
+        return self.running and source is not None and source.connected
+
+    def start(self, source) -> bool:
+        """Run source on a daemon thread. No-op if a source is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self._source = source
+            self._thread = threading.Thread(target=self._run, args=(source,), name="market-feed", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            source, thread = self._source, self._thread
+            self._source, self._thread = None, None
+        if source is not None:
+            source.stop()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, source):
+        try:
+            source.run(self)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Market feed source stopped: {e}")
+
+    # --- Ingestion ---
+
+    def add_listener(self, fn: Callable[[str, Dict], None]):
+        """fn(instrument_key, quote) after every update, streamed or seeded (e.g. bar aggregation)"""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def _notify(self, key: str, quote: Dict):
+        for fn in self._listeners:
+            try:
+                fn(key, quote)
+            except Exception as e:
+                logger.error(f"Market feed listener failed for {key}: {e}")
+
+    def on_tick(self, key: str, ltp: float, close: Optional[float] = None,
+                volume: Optional[float] = None, ts: Optional[float] = None):
+        self._notify(key, self.quotes.update(key, ltp, close, volume, ts))
+        self._stats['ticks'] += 1
+        self._stats['last_tick'] = time.time()
+
+    def seed(self, key: str, quote: Dict):
+        """Store a quote obtained over HTTP so the next reader is served from memory"""
+        if quote and quote.get('ltp') is not None:
+            self._notify(key, self.quotes.update(key, quote['ltp'], quote.get('close'), quote.get('volume')))
+
+    # --- Reads ---
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Fresh quote or None. A subscribed key on a live stream is always fresh (no tick
+        just means no trade); otherwise the quote must be younger than max_age.
+        """
+        quote = self.quotes.get(key)
+        if quote is None:
+            return None
+        if self.streaming and key in self._keys:
+            return quote
+        max_age = self.max_age if max_age is None else max_age
+        return quote if time.time() - quote['ts'] <= max_age else None
+
+    def snapshot(self, keys: Iterable[str], max_age: Optional[float] = None) -> Dict[str, Dict]:
+        """{key: quote} for the keys that are fresh in memory"""
+        out = {}
+        for key in keys:
+            quote = self.get(key, max_age)
+            if quote is not None:
+                out[key] = quote
+        return out
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats.update(
+            quotes=len(self.quotes),
+            subscriptions=len(self._keys),
+            running=self.running,
+            streaming=self.streaming,
+            source=type(self._source).__name__ if self._source is not None else None,
+        )
+        return stats
+
+
+class FeedSource(ABC):
+    """Base class: run(feed) blocks until stop(); subscribe() may be called from any thread"""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self.connected = False
+
+    @abstractmethod
+    def run(self, feed: MarketFeed):
+        """Deliver ticks via feed.on_tick() until stop() is called"""
+        pass
+
+    def subscribe(self, keys: List[str]):
+        pass
+
+    def stop(self):
+        self._stop.set()
+
+
+class ReplaySource(FeedSource):
+    """
+    Replays recorded ticks: an iterable of dicts or a JSONL path, one tick per line
+    {"instrument_key", "ltp", "cp" (previous close), "volume", "ts"}.
+    """
+
+    def __init__(self, ticks, interval: float = 0.0, loop: bool = False):
+        super().__init__()
+        self.ticks = ticks
+        self.interval = interval
+        self.loop = loop
+        self.done = threading.Event()
+
+    def _iter_ticks(self):
+        if isinstance(self.ticks, str):
+            with open(self.ticks, "r") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from self.ticks
+
+    def run(self, feed: MarketFeed):
+        self.connected = True
+        try:
+            while not self._stop.is_set():
+                for tick in self._iter_ticks():
+                    if self._stop.is_set():
+                        break
+                    feed.on_tick(tick['instrument_key'], tick['ltp'], tick.get('cp'), tick.get('volume'), tick.get('ts'))
+                    if self.interval:
+                        self._stop.wait(self.interval)
+                if not self.loop:
+                    break
+        finally:
+            self.done.set()
+            # Keep serving the replayed quotes as if the stream were still up
+            self._stop.wait()
+            self.connected = False
+
+
+class UpstoxFeedSource(FeedSource):
+    """
+    Upstox v3 market-data websocket.
+    1. GET /v3/feed/market-data-feed/authorize -> one-time wss:// URI
+    2. Send {"guid", "method": "sub", "data": {"mode", "instrumentKeys"}} as a binary frame
+    3. Decode FeedResponse protobuf frames into ticks
+    Reconnects with exponential backoff and re-subscribes everything the feed holds.
+    """
+
+    def __init__(self, service, mode: Optional[str] = None):
+        super().__init__()
+        self.service = service  # UpstoxBaseService: auth + rate-limited REST for the authorize call
+        self.mode = mode or MARKET_FEED_SETTINGS['mode']
+        self._pending_lock = threading.Lock()
+        self._pending: List[str] = []
+
+    def subscribe(self, keys: List[str]):
+        with self._pending_lock:
+            self._pending.extend(keys)
+
+    def _authorize(self) -> str:
+        data = self.service._make_api_call(FEED_AUTHORIZE_URL, {})
+        if data.get("status") != "success":
+            raise ConnectionError(f"Feed authorize failed: {data.get('errors')}")
+        return data["data"]["authorized_redirect_uri"]
+
+    def _subscription(self, keys: List[str]) -> bytes:
+        return json.dumps({
+            "guid": uuid.uuid4().hex,
+            "method": "sub",
+            "data": {"mode": self.mode, "instrumentKeys": keys},
+        }).encode("utf-8")
+
+    def run(self, feed: MarketFeed):
+        if not WEBSOCKETS_AVAILABLE:
+            logger.warning("websockets not installed; market feed disabled")
+            return
+
+        delay = MARKET_FEED_SETTINGS['reconnect_delay']
+        while not self._stop.is_set():
+            try:
+                with ws_connect(self._authorize(), max_size=None) as ws:
+                    self.connected = True
+                    feed._stats['connects'] += 1
+                    delay = MARKET_FEED_SETTINGS['reconnect_delay']
+                    with self._pending_lock:
+                        self._pending.clear()
+                    keys = feed.subscriptions()
+                    if keys:
+                        ws.send(self._subscription(keys))
+
+                    while not self._stop.is_set():
+                        with self._pending_lock:
+                            pending, self._pending = self._pending, []
+                        if pending:
+                            ws.send(self._subscription(pending))
+                        try:
+                            frame = ws.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        if isinstance(frame, bytes):
+                            # Stamp with receipt time: freshness is about the stream, not the last trade
+                            for key, ltp, close, _, volume in decode_feed_response(frame):
+                                feed.on_tick(key, ltp, close, volume)
+            except Exception as e:
+                feed._stats['errors'] += 1
+                logger.warning(f"Market feed disconnected: {e}; reconnecting in {delay:.0f}s")
+            finally:
+                self.connected = False
+            self._stop.wait(delay)
+            delay = min(delay * 2, MARKET_FEED_SETTINGS['max_reconnect_delay'])
+
+
+# ----------------------------------------------------------------------------
+# FeedResponse decoding
+# ----------------------------------------------------------------------------
+# Hand-rolled protobuf reader for the handful of MarketDataFeedV3.proto fields we use,
+# so the feed needs no generated module:
+#   FeedResponse { type = 1; map<string, Feed> feeds = 2; int64 currentTs = 3; ... }
+#   Feed         { oneof { LTPC ltpc = 1; FullFeed fullFeed = 2; FirstLevelWithGreeks firstLevelWithGreeks = 3; } }
+#   FullFeed     { oneof { MarketFullFeed marketFF = 1; IndexFullFeed indexFF = 2; } }  (each has LTPC ltpc = 1)
+#   MarketFullFeed       { ...; int64 vtt = 6; ... }   (volume traded today)
+#   FirstLevelWithGreeks { ...; int64 vtt = 4; ... }
+#   LTPC         { double ltp = 1; int64 ltt = 2; int64 ltq = 3; double cp = 4; }
+# ltpc mode and index feeds carry no volume.
+
+def _read_varint(buf: bytes, pos: int):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: bytes):
+    """Yield (field_number, wire_type, value) for one message"""
+    pos, end = 0, len(buf)
+    while pos < end:
+        tag, pos = _read_varint(buf, pos)
+        field, wire = tag >> 3, tag & 7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire == 2:
+            length, pos = _read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        elif wire == 5:
+            value, pos = buf[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported wire type {wire}")
+        yield field, wire, value
+
+
+def _ltpc(feed: bytes):
+    """(LTPC sub-message, cumulative day volume or None) of a Feed, whichever mode it was sent in"""
+    for field, wire, value in _fields(feed):
+        if wire != 2:
+            continue
+        if field == 1:
+            return value, None
+        if field == 3:
+            nested, vtt_field = value, 4
+        elif field == 2:
+            market = next(((f, v) for f, w, v in _fields(value) if w == 2 and f in (1, 2)), (None, b""))
+            nested, vtt_field = market[1], 6 if market[0] == 1 else None
+        else:
+            continue
+        ltpc = volume = None
+        for f, w, v in _fields(nested):
+            if f == 1 and w == 2:
+                ltpc = v
+            elif f == vtt_field and w == 0:
+                volume = v
+        return ltpc, volume
+    return None, None
+
+
+def decode_feed_response(payload: bytes) -> List[tuple]:
+    """[(instrument_key, ltp, previous_close, ts_seconds, day_volume)] from one FeedResponse frame"""
+    ticks = []
+    for field, wire, entry in _fields(payload):
+        if field != 2 or wire != 2:
+            continue
+        key, feed = None, b""
+        for f, w, v in _fields(entry):
+            if f == 1 and w == 2:
+                key = v.decode("utf-8")
+            elif f == 2 and w == 2:
+                feed = v
+        ltpc, volume = _ltpc(feed) if key else (None, None)
+        if not ltpc:
+            continue
+
+        ltp = close = ts = None
+        for f, w, v in _fields(ltpc):
+            if f == 1 and w == 1:
+                ltp = struct.unpack("<d", v)[0]
+            elif f == 2 and w == 0:
+                ts = v / 1000.0
+            elif f == 4 and w == 1:
+                close = struct.unpack("<d", v)[0]
+        if ltp is not None:
+            ticks.append((key, ltp, close or None, ts, volume))
+    return ticks
+
+
+# Global instance
+market_feed = MarketFeed()
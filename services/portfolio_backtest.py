@@ -0,0 +1,186 @@
+"""
+Portfolio Backtest - Cross-Sectional Top-K Strategies
+Rank a universe (e.g. NIFTY 50 constituents) by a score, hold the top K equal-weighted,
+rebalance on a calendar schedule.
+- Vectorized over symbols x dates: scores, ranks, selections, drift and turnover for
+  every rebalance are array operations on an IndicatorPanel (no per-date loop)
+- Trades happen at the rebalance close; holdings drift with prices until the next one
+- Costs (commission + slippage, bps) are charged on the traded notional
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicator_panel import IndicatorPanel
+from services.alpha_engine import alpha_score_panel
+
+logger = logging.getLogger(__name__)
+
+# Rebalance schedule -> pandas period of the last bar in each bucket
+REBALANCE_PERIODS = {'daily': 'D', 'weekly': 'W', 'monthly': 'M'}
+
+
+def momentum_score(panel: IndicatorPanel, lookback: int = 126, skip: int = 0) -> np.ndarray:
+    """Return from `lookback` bars ago to `skip` bars ago (12-1 momentum: lookback=252, skip=21)"""
+    close = panel.close
+    out = np.full(close.shape, np.nan)
+    if close.shape[1] > lookback:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[:, lookback:] = close[:, lookback - skip:close.shape[1] - skip] / close[:, :-lookback] - 1
+    return out
+
+
+SCORERS: Dict[str, Callable[[IndicatorPanel], np.ndarray]] = {
+    'Momentum 6M': lambda panel: momentum_score(panel, 126),
+    'Momentum 12-1': lambda panel: momentum_score(panel, 252, 21),
+    'Alpha Fusion': alpha_score_panel,
+}
+
+
+@dataclass
+class PortfolioResult:
+    equity: pd.Series              # Strategy equity (starts at 1)
+    benchmark: pd.Series           # Equal-weight eligible universe, same schedule and costs
+    weights: pd.DataFrame          # Target weights per rebalance date x symbol
+    turnover: pd.Series            # Traded notional / equity per rebalance (buys + sells)
+    metrics: Dict[str, float]
+    seconds: float
+
+    @property
+    def drawdown(self) -> pd.Series:
+        return self.equity / self.equity.cummax() - 1
+
+    def holdings(self) -> pd.Series:
+        """Symbols held after each rebalance"""
+        return self.weights.apply(lambda row: list(row[row > 0].index), axis=1)
+
+
+class PortfolioBacktester:
+    """
+    Cross-sectional backtester over an aligned universe panel.
+    Missing bars are valued at the last close; a symbol is only eligible at a
+    rebalance if it has a score and a close on that date.
+    """
+
+    def __init__(self, panel: IndicatorPanel, cost_bps: float = 10.0, slippage_bps: float = 5.0,
+                 periods_per_year: int = 252):
+        self.panel = panel
+        self.cost = (cost_bps + slippage_bps) / 1e4
+        self.periods_per_year = periods_per_year
+        # Prices for valuation: forward-filled so a gap does not zero a holding
+        self.prices = pd.DataFrame(panel.close.T).ffill().to_numpy().T
+
+    def rebalance_bars(self, schedule: str = 'weekly') -> np.ndarray:
+        """Positions of the last bar of every period (week / month) in the panel index"""
+        if schedule not in REBALANCE_PERIODS:
+            raise ValueError(f"Unknown rebalance schedule '{schedule}'")
+        periods = pd.DatetimeIndex(self.panel.index).to_period(REBALANCE_PERIODS[schedule])
+        codes = np.asarray(periods.asi8)
+        return np.flatnonzero(np.append(codes[1:] != codes[:-1], True))
+
+    def select_top_k(self, scores: np.ndarray, bars: np.ndarray, top_k: int) -> np.ndarray:
+        """Equal target weights (symbols x rebalances) for the top_k scores at every rebalance"""
+        at = scores[:, bars]
+        eligible = ~np.isnan(at) & ~np.isnan(self.panel.close[:, bars])
+        # Rank within each rebalance column, best first; ineligible symbols sort last
+        ranked = np.argsort(np.where(eligible, -at, np.inf), axis=0, kind='stable')
+        ranks = np.empty_like(ranked)
+        np.put_along_axis(ranks, ranked, np.arange(len(at))[:, None], axis=0)
+        chosen = eligible & (ranks < top_k)
+        count = chosen.sum(axis=0)
+        return np.where(chosen, 1.0 / np.maximum(count, 1), 0.0)
+
+    def simulate(self, targets: np.ndarray, bars: np.ndarray):
+        """
+        Daily equity for target weights set at `bars` closes.
+        Returns (equity, turnover per rebalance).
+        """
+        prices = self.prices
+        T = prices.shape[1]
+        # Segment k runs from the close of bars[k] to the close of bars[k + 1]
+        segment = np.searchsorted(bars, np.arange(T), side='left') - 1   # -1: before the first trade
+        has_trade = segment >= 0
+        seg = np.maximum(segment, 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.nan_to_num(prices / prices[:, bars[seg]], nan=1.0)     # per symbol since the last trade
+        weights = targets[:, seg]
+        relative = (1 - weights.sum(axis=0)) + (weights * growth).sum(axis=0)  # value / value at last trade
+        relative = np.where(has_trade, relative, 1.0)
+
+        # Drifted weights just before each rebalance -> turnover and costs
+        end_rel = relative[bars]
+        prev_targets = np.concatenate([np.zeros((len(targets), 1)), targets[:, :-1]], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drifted = np.where(end_rel > 0, prev_targets * growth[:, bars] / end_rel, 0.0)
+        drifted[:, 0] = 0.0                                                    # starts in cash
+        turnover = np.abs(targets - drifted).sum(axis=0)
+        after_cost = 1 - self.cost * turnover
+
+        # Value at each trade: chain the segments (bars[k] closes segment k - 1)
+        seg_growth = np.concatenate([[1.0], end_rel[1:]])
+        value_at_trade = np.cumprod(seg_growth * after_cost)
+        equity = np.where(has_trade, value_at_trade[seg] * relative, 1.0)
+        # The trade bar itself is valued after its costs, before any move
+        equity[bars] = value_at_trade
+        return equity, turnover
+
+    def run(self, score: str = 'Momentum 6M', top_k: int = 10, schedule: str = 'weekly',
+            scores: Optional[np.ndarray] = None) -> PortfolioResult:
+        """Top-K equal-weight strategy on `score` (a SCORERS name) or precomputed `scores`"""
+        start = time.perf_counter()
+        if scores is None:
+            if score not in SCORERS:
+                raise ValueError(f"Unknown score '{score}'")
+            scores = SCORERS[score](self.panel)
+
+        bars = self.rebalance_bars(schedule)
+        if not len(self.panel) or not len(bars):
+            raise ValueError("Empty universe panel")
+        targets = self.select_top_k(scores, bars, top_k)
+        equity, turnover = self.simulate(targets, bars)
+
+        # Benchmark: every eligible (scored, listed) symbol, same schedule and costs, so it
+        # sits in cash through the score warm-up exactly like the strategy
+        universe = self.select_top_k(scores, bars, len(self.panel))
+        benchmark, _ = self.simulate(universe, bars)
+
+        dates = self.panel.index[bars]
+        result = PortfolioResult(
+            equity=pd.Series(equity, index=self.panel.index),
+            benchmark=pd.Series(benchmark, index=self.panel.index),
+            weights=pd.DataFrame(targets.T, index=dates, columns=self.panel.symbols),
+            turnover=pd.Series(turnover, index=dates),
+            metrics={},
+            seconds=0.0,
+        )
+        result.metrics = self._metrics(result, targets, bars)
+        result.seconds = time.perf_counter() - start
+        logger.info(f"Portfolio backtest: {len(self.panel)} symbols x {len(self.panel.index)} bars, "
+                    f"{len(bars)} rebalances in {result.seconds:.2f}s")
+        return result
+
+    def _metrics(self, result: PortfolioResult, targets: np.ndarray, bars: np.ndarray) -> Dict[str, float]:
+        # Measure from the first invested rebalance: the cash warm-up (scores not yet
+        # defined) would otherwise dilute CAGR, Sharpe and turnover
+        first = int(np.argmax(targets.sum(axis=0) > 0))
+        equity = result.equity
+        returns = equity.pct_change().fillna(0.0).iloc[bars[first]:]   # includes the buy-in costs
+        years = max(len(returns) / self.periods_per_year, 1e-9)
+        std = returns.std()
+        turnover = result.turnover.iloc[first + 1:]  # the initial buy-in is not turnover
+        return {
+            'Total Return': (equity.iloc[-1] - 1) * 100,
+            'CAGR': (max(equity.iloc[-1], 0) ** (1 / years) - 1) * 100,
+            'Sharpe': returns.mean() / std * math.sqrt(self.periods_per_year) if std > 0 else 0.0,
+            'Max Drawdown': result.drawdown.min() * 100,
+            'Annual Turnover': turnover.sum() / years * 100,
+            'Avg Holdings': float((targets[:, first:] > 0).sum(axis=0).mean()),
+            'Benchmark Return': (result.benchmark.iloc[-1] - 1) * 100,
+        }
@@ -0,0 +1,191 @@
+"""
+Upstox Rate Limiter
+Shared per-endpoint token buckets with 429-aware adaptive backoff.
+Waiting callers are served by priority, so interactive requests (HUD, spot quotes)
+go ahead of bulk scans (batch quotes, futures OI sweeps).
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from config import UPSTOX_BACKOFF, UPSTOX_RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+_priority_override: ContextVar[Optional[int]] = ContextVar("upstox_priority", default=None)
+
+
+class TokenBucket:
+    """Classic token bucket whose rate shrinks on 429 and recovers on success"""
+
+    def __init__(self, rate: float, burst: float):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttle_streak = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token can be taken (0 = now)"""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def throttled(self, retry_after: Optional[float] = None) -> float:
+        """Server said 429: halve the rate, drain the bucket and pause. Returns the pause length."""
+        self.throttle_streak += 1
+        backoff = min(UPSTOX_BACKOFF['max_delay'], UPSTOX_BACKOFF['base_delay'] * 2 ** (self.throttle_streak - 1))
+        pause = max(backoff, retry_after or 0.0)
+
+        self.rate = max(self.base_rate * UPSTOX_BACKOFF['min_rate_factor'], self.rate / 2)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+        return pause
+
+    def succeeded(self):
+        self.throttle_streak = 0
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate * UPSTOX_BACKOFF['recovery'])
+
+
+class RateLimiter:
+    """
+    Process-wide limiter shared by every Upstox service.
+    - acquire(endpoint, priority): blocks until the endpoint's bucket grants a token
+    - throttled / succeeded: feedback from responses (adaptive backoff)
+    - metrics(): queue depth, wait time and throttle counts per endpoint
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict]] = None):
+        self.limits = limits or UPSTOX_RATE_LIMITS
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, list] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._seq = itertools.count()
+
+    @staticmethod
+    def endpoint_for(url: str) -> str:
+        """Endpoint family of an API url: https://api.upstox.com/v2/market-quote/quotes -> market-quote"""
+        parts = [p for p in urlparse(url).path.split("/") if p]
+        if parts and parts[0].startswith("v") and parts[0][1:].isdigit():
+            parts = parts[1:]
+        return parts[0] if parts else "default"
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        if endpoint not in self._buckets:
+            limit = self.limits.get(endpoint, self.limits['default'])
+            self._buckets[endpoint] = TokenBucket(limit['rate'], limit['burst'])
+            self._queues[endpoint] = []
+            self._stats[endpoint] = {
+                'requests': 0, 'total_wait': 0.0, 'max_wait': 0.0,
+                'max_queue_depth': 0, 'throttled': 0
+            }
+        return self._buckets[endpoint]
+
+    @contextmanager
+    def priority(self, level: int):
+        """Run a block of calls at the given priority: `with rate_limiter.priority(PRIORITY_BULK): ...`"""
+        token = _priority_override.set(level)
+        try:
+            yield
+        finally:
+            _priority_override.reset(token)
+
+    @staticmethod
+    def resolve_priority(default: Optional[int] = None) -> int:
+        """Priority set by an enclosing priority() block, else default, else interactive"""
+        override = _priority_override.get()
+        if override is not None:
+            return override
+        return PRIORITY_INTERACTIVE if default is None else default
+
+    def acquire(self, endpoint: str, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Wait for a token; returns the time spent waiting (seconds)"""
+        ticket = (priority, next(self._seq))
+        start = time.monotonic()
+
+        with self._cond:
+            bucket = self._bucket(endpoint)
+            queue = self._queues[endpoint]
+            stats = self._stats[endpoint]
+
+            heapq.heappush(queue, ticket)
+            stats['max_queue_depth'] = max(stats['max_queue_depth'], len(queue))
+
+            while True:
+                if queue[0] == ticket:
+                    delay = bucket.delay(time.monotonic())
+                    if delay <= 0:
+                        heapq.heappop(queue)
+                        bucket.take()
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+
+            # Next in line may be able to go now
+            self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            stats['requests'] += 1
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+
+        return waited
+
+    def throttled(self, endpoint: str, retry_after: Optional[float] = None) -> float:
+        """Report a 429; returns how long the endpoint is paused"""
+        with self._cond:
+            pause = self._bucket(endpoint).throttled(retry_after)
+            self._stats[endpoint]['throttled'] += 1
+            self._cond.notify_all()
+        logger.warning(f"Upstox rate limit hit on '{endpoint}', backing off {pause:.1f}s")
+        return pause
+
+    def succeeded(self, endpoint: str):
+        with self._cond:
+            self._bucket(endpoint).succeeded()
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-endpoint queue depth, wait times (ms), throttle count and current rate"""
+        with self._cond:
+            return {
+                endpoint: {
+                    'queue_depth': len(self._queues[endpoint]),
+                    'max_queue_depth': stats['max_queue_depth'],
+                    'requests': stats['requests'],
+                    'avg_wait_ms': stats['total_wait'] / stats['requests'] * 1000 if stats['requests'] else 0.0,
+                    'max_wait_ms': stats['max_wait'] * 1000,
+                    'throttled': stats['throttled'],
+                    'rate': self._buckets[endpoint].rate,
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+
+# Global instance
+upstox_rate_limiter = RateLimiter()
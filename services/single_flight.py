@@ -0,0 +1,120 @@
+"""
+Single-Flight Registry
+Process-wide request coalescing: concurrent callers asking for the same key
+(e.g. symbol, interval, date range) wait on one in-flight call instead of
+issuing duplicate downloads.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight execution that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Exception = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Go-style singleflight.
+    - do(key, fn): run fn once per key while it is in flight; duplicates wait and share the result
+    - do_many(keys, fn): batch version - fn receives only the keys nobody else is fetching
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {'requests': 0, 'executions': 0, 'dedup_hits': 0}
+
+    def _claim(self, key: Hashable):
+        """Returns (call, is_leader)"""
+        with self._lock:
+            self._stats['requests'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self._stats['dedup_hits'] += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._stats['executions'] += 1
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call, result: Any = None, error: Exception = None):
+        call.result = result
+        call.error = error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+        if call.followers:
+            logger.info(f"Single-flight: {call.followers} duplicate request(s) coalesced for {key}")
+
+    @staticmethod
+    def _wait(call: _Call) -> Any:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Execute fn for key, or wait for the identical call already in flight"""
+        call, leader = self._claim(key)
+        if not leader:
+            return self._wait(call)
+
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    def do_many(self, keys: Iterable[Hashable], fn: Callable[[list], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        Batch coalescing.
+        fn(owned_keys) must return {key: result} for the keys this caller leads;
+        keys led by other callers are awaited. Missing keys resolve to None.
+        """
+        owned, waiting = {}, {}
+        for key in dict.fromkeys(keys):
+            call, leader = self._claim(key)
+            (owned if leader else waiting)[key] = call
+
+        results = {}
+        if owned:
+            try:
+                batch = fn(list(owned.keys())) or {}
+            except Exception as e:
+                for key, call in owned.items():
+                    self._finish(key, call, error=e)
+                raise
+            for key, call in owned.items():
+                results[key] = batch.get(key)
+                self._finish(key, call, result=results[key])
+
+        # Only wait after publishing our own keys (no leader ever blocks another)
+        for key, call in waiting.items():
+            results[key] = self._wait(call)
+
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """Request / execution / dedup-hit counters since process start"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+# Global instance
+single_flight = SingleFlight()
@@ -2,41 +2,106 @@
 Upstox Base API Service
 """
 
-import requests
 import logging
-from typing import Dict
+import time
+from typing import Dict, List, Optional, Tuple
+from config import UPSTOX_BACKOFF
 from .upstox_auth import UpstoxAuth
+from .upstox_transport import UpstoxTransport, upstox_transport
+from .rate_limiter import upstox_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Upstox reports throttling either as HTTP 429 or with this error code
+RATE_LIMIT_ERROR_CODE = "UDAPI10005"
+
 class UpstoxBaseService:
-    def __init__(self, auth: UpstoxAuth):
+    def __init__(self, auth: UpstoxAuth, transport: Optional[UpstoxTransport] = None):
         self.auth = auth
         self.base_url = "https://api.upstox.com/v2"
-    
+        # Shared pooled session (keep-alive across services and fetcher instances)
+        self.transport = transport or upstox_transport
+        # Shared per-endpoint limiter (all plugins draw from the same buckets)
+        self.rate_limiter = upstox_rate_limiter
+
     def get_headers(self) -> Dict:
         access_token = self.auth.get_access_token()
         return {
             "Authorization": f"Bearer {access_token}",
             "Accept": "application/json"
         }
-    
-    def _make_api_call(self, url: str, params: Dict) -> Dict:
+
+    def _make_api_call(self, url: str, params: Dict, priority: Optional[int] = None) -> Dict:
         headers = self.get_headers()
+        priority = self.rate_limiter.resolve_priority(priority)
         try:
-            response = requests.get(url, headers=headers, params=params)
-            data = response.json()
-            
+            data = self._rate_limited_get(url, headers, params, priority)
+
             if data.get("status") == "error":
                 errors = data.get("errors", [])
                 if errors and errors[0].get("errorCode") == "UDAPI100050":
                     logger.warning("Token invalid. Retrying...")
                     self.auth.invalidate_token()
-                    headers = self.get_headers() 
-                    response = requests.get(url, headers=headers, params=params)
-                    data = response.json()
-            
+                    headers = self.get_headers()
+                    data = self._rate_limited_get(url, headers, params, priority)
+
             return data
         except Exception as e:
             logger.error(f"API call failed: {e}")
             raise
+
+    def _rate_limited_get(self, url: str, headers: Dict, params: Dict, priority: int) -> Dict:
+        """GET through the endpoint's token bucket, backing off and retrying on 429"""
+        endpoint = self.rate_limiter.endpoint_for(url)
+
+        for attempt in range(UPSTOX_BACKOFF['max_retries'] + 1):
+            self.rate_limiter.acquire(endpoint, priority)
+            response = self.transport.get_response(url, headers, params)
+
+            try:
+                data = response.json()
+            except ValueError:
+                data = {"status": "error", "errors": [{"message": f"HTTP {response.status_code}"}]}
+
+            errors = (data.get("errors") if isinstance(data, dict) else None) or [{}]
+            if response.status_code != 429 and errors[0].get("errorCode") != RATE_LIMIT_ERROR_CODE:
+                self.rate_limiter.succeeded(endpoint)
+                return data
+
+            retry_after = response.headers.get("Retry-After")
+            pause = self.rate_limiter.throttled(endpoint, float(retry_after) if retry_after and retry_after.isdigit() else None)
+            if attempt < UPSTOX_BACKOFF['max_retries']:
+                time.sleep(pause)
+
+        logger.error(f"Upstox rate limit: giving up on {endpoint} after {UPSTOX_BACKOFF['max_retries']} retries")
+        return data
+
+    async def _make_api_call_async(self, url: str, params: Dict, priority: Optional[int] = None) -> Dict:
+        """Async variant of _make_api_call (same token-retry handling)"""
+        return await self.transport.run(self._make_api_call, url, params, priority)
+
+    async def _gather_api_calls(self, calls: List[Tuple[str, Dict]], priority: Optional[int] = None) -> List[Dict]:
+        responses = await self.transport.gather([self._make_api_call_async(url, params, priority) for url, params in calls])
+
+        # A failed request becomes an error payload so sibling requests still count
+        return [
+            {"status": "error", "errors": [{"message": str(r)}]} if isinstance(r, Exception) else r
+            for r in responses
+        ]
+
+    def _make_api_calls(self, calls: List[Tuple[str, Dict]], priority: Optional[int] = None) -> List[Dict]:
+        """
+        Fan out independent (url, params) requests concurrently.
+        Responses come back in request order.
+        """
+        if not calls:
+            return []
+        # Resolve here: worker threads don't inherit the caller's priority() block
+        priority = self.rate_limiter.resolve_priority(priority)
+        if len(calls) == 1:
+            url, params = calls[0]
+            try:
+                return [self._make_api_call(url, params, priority)]
+            except Exception as e:
+                return [{"status": "error", "errors": [{"message": str(e)}]}]
+        return self.transport.run_sync(self._gather_api_calls(calls, priority))
@@ -0,0 +1,128 @@
+"""
+Upstox Candle History Service
+Daily and intraday OHLCV from the v3 historical-candle API, backfilled into the bar store.
+- Ranges are split into date chunks (per-interval API limits) and requested concurrently
+- Only the parts of a range the bar store has never covered are requested
+- Today's partial session comes from the intraday endpoint
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+
+from config import UPSTOX_HISTORY_INTERVALS
+from .upstox_base import UpstoxBaseService
+from .rate_limiter import PRIORITY_BULK
+from .bar_store import bar_store, MARKET_TZ
+
+logger = logging.getLogger(__name__)
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi']
+
+
+class UpstoxHistoryService(UpstoxBaseService):
+
+    def _candle_calls(self, key: str, interval: str, start_date, end_date) -> List[Tuple[str, Dict]]:
+        """
+        (url, params) per date chunk of [start_date, end_date).
+        Upstox dates are inclusive: /historical-candle/{key}/{unit}/{n}/{to_date}/{from_date}
+        """
+        unit, n, chunk_days = UPSTOX_HISTORY_INTERVALS[interval]
+        base = self.base_url.replace("/v2", "/v3")
+        encoded = quote(key, safe="")
+
+        today = pd.Timestamp.now().normalize()
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+        last_day = min(end, today) - pd.Timedelta(days=1)  # Completed sessions only
+
+        calls = []
+        chunk_start = start
+        while chunk_start <= last_day:
+            chunk_end = min(chunk_start + pd.Timedelta(days=chunk_days - 1), last_day)
+            calls.append((
+                f"{base}/historical-candle/{encoded}/{unit}/{n}/"
+                f"{chunk_end.strftime('%Y-%m-%d')}/{chunk_start.strftime('%Y-%m-%d')}",
+                {}
+            ))
+            chunk_start = chunk_end + pd.Timedelta(days=1)
+
+        # Today's session (still forming) lives on the intraday endpoint
+        if start <= today < end:
+            calls.append((f"{base}/historical-candle/intraday/{encoded}/{unit}/{n}", {}))
+
+        return calls
+
+    @staticmethod
+    def _parse_candles(responses: List[Dict]) -> pd.DataFrame:
+        """
+        Candle payloads -> bar store frame (oldest first).
+        Stamps ("2024-01-02T09:15:00+05:30") become IST wall-clock, tz-naive (bar_store.MARKET_TZ),
+        so they line up with the bars bar_aggregator builds from streamed ticks.
+        """
+        rows = []
+        for data in responses:
+            if data.get("status") != "success":
+                logger.warning(f"Candle request failed: {data.get('errors')}")
+                continue
+            rows.extend(data.get("data", {}).get("candles", []))
+
+        if not rows:
+            return pd.DataFrame()
+
+        df = pd.DataFrame([r[:len(CANDLE_COLUMNS)] for r in rows], columns=CANDLE_COLUMNS[:len(rows[0])])
+        stamps = pd.DatetimeIndex(pd.to_datetime(df.pop('timestamp'), utc=True))
+        df.index = stamps.tz_convert(MARKET_TZ).tz_localize(None)
+        if 'oi' in df.columns and not df['oi'].any():
+            df = df.drop(columns='oi')  # Only meaningful for F&O contracts
+        return bar_store.normalize(df.astype(float))
+
+    def get_candles(self, key: str, interval: str = '1d', start_date=None, end_date=None) -> pd.DataFrame:
+        """OHLCV for one instrument_key over [start_date, end_date), chunks fetched concurrently"""
+        calls = self._candle_calls(key, interval, start_date, end_date)
+        df = self._parse_candles(self._make_api_calls(calls))
+        return bar_store.slice(df, start_date, end_date) if not df.empty else df
+
+    def backfill(
+        self,
+        keys: Dict[str, str],
+        start_date,
+        end_date,
+        interval: str = '1d',
+        priority: Optional[int] = None
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Fill the bar store for {store_symbol: instrument_key} over [start_date, end_date).
+        Every symbol's uncovered chunks go out in one concurrent fan-out (the shared rate
+        limiter paces the historical-candle bucket). Returns {store_symbol: stored slice}.
+        """
+        # 1. Plan: uncovered ranges -> chunked calls, remembering which symbol owns each
+        calls, owners, spans = [], [], {}
+        for sym, key in keys.items():
+            for range_start, range_end in bar_store.missing_ranges(sym, start_date, end_date, interval):
+                sym_calls = self._candle_calls(key, interval, range_start, range_end)
+                calls.extend(sym_calls)
+                owners.extend([sym] * len(sym_calls))
+                span = spans.get(sym)
+                spans[sym] = (range_start, range_end) if span is None else (min(span[0], range_start), max(span[1], range_end))
+
+        # 2. Fetch
+        if calls:
+            logger.info(f"Upstox candle backfill: {len(calls)} requests for {len(spans)} symbols ({interval})")
+            responses = self._make_api_calls(calls, priority=PRIORITY_BULK if priority is None else priority)
+
+            by_symbol: Dict[str, List[Dict]] = {}
+            for sym, data in zip(owners, responses):
+                by_symbol.setdefault(sym, []).append(data)
+
+            # 3. Store (coverage only recorded when every chunk for the symbol succeeded)
+            for sym, sym_responses in by_symbol.items():
+                df = self._parse_candles(sym_responses)
+                if not df.empty:
+                    bar_store.merge(sym, df, interval)
+                if all(r.get("status") == "success" for r in sym_responses):
+                    bar_store.record_coverage(sym, *spans[sym], interval)
+
+        return {sym: bar_store.slice(bar_store.read(sym, interval), start_date, end_date) for sym in keys}
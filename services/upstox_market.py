@@ -1,15 +1,34 @@
 """
 Upstox Market Data Service
+Quotes are served from the streaming last-quote table (services/market_feed.py) when
+fresh; HTTP is only used for keys the feed does not hold yet, and those results seed it.
 """
 
 import logging
 from typing import Dict, List, Optional
+from config import MARKET_FEED_SETTINGS
 from .upstox_base import UpstoxBaseService
+from .rate_limiter import PRIORITY_BULK
 from .instrument_service import instrument_service
+from .market_feed import market_feed, UpstoxFeedSource
 
 logger = logging.getLogger(__name__)
 
 class UpstoxMarketService(UpstoxBaseService):
+
+    def start_market_feed(self) -> bool:
+        """Start the shared websocket feed (once per process) using this client's auth"""
+        if not MARKET_FEED_SETTINGS['enabled'] or market_feed.running:
+            return False
+        return market_feed.start(UpstoxFeedSource(self))
+
+    def get_live_quotes(self, keys: List[str]) -> Dict[str, Dict]:
+        """
+        Memory-only read of the last-quote table: {instrument_key: quote} for the keys
+        that are fresh. Keys are subscribed so later reads stay live.
+        """
+        market_feed.subscribe(keys)
+        return market_feed.snapshot(keys)
     
     def get_spot_price(self, symbol: str) -> Optional[float]:
         """Get real-time spot price"""
@@ -18,6 +37,9 @@ class UpstoxMarketService(UpstoxBaseService):
         key = instrument_service.resolve_instrument_key(symbol)
         
         if key:
+            cached = self.get_live_quotes([key]).get(key)
+            if cached:
+                return cached['ltp']
             return self._fetch_quote_ltp(key)
         
         # 2. Fallback Logic (simplified from original)
@@ -34,6 +56,16 @@ class UpstoxMarketService(UpstoxBaseService):
              key = symbol
 
         if key:
+            cached = self.get_live_quotes([key]).get(key)
+            if cached:
+                return {
+                    "symbol": symbol,
+                    "ltp": cached['ltp'],
+                    "change": cached['change'],
+                    "change_pct": cached['change_pct'],
+                    "previous_close": cached.get('close'),
+                    "volume": cached.get('volume')
+                }
             return self._fetch_full_quote(key, symbol)
             
         return {}
@@ -68,17 +100,32 @@ class UpstoxMarketService(UpstoxBaseService):
         if not keys_to_fetch:
             return {}
 
-        # 2. Batch Fetch (Chunk size 50 to be safe)
+        # 2. Serve what the live quote table already holds
+        for key, quote in self.get_live_quotes(keys_to_fetch).items():
+            results[key_to_symbol[key]] = {
+                "ltp": quote['ltp'],
+                "close": quote.get('close', 0.0),
+                "change": quote['change'],
+                "change_pct": quote['change_pct'],
+                "volume": quote.get('volume', 0)
+            }
+        keys_to_fetch = [k for k in keys_to_fetch if key_to_symbol[k] not in results]
+        if not keys_to_fetch:
+            return results
+        symbol_to_key = {sym: key for key, sym in key_to_symbol.items()}
+
+        # 3. Batch Fetch the rest (Chunk size 50 to be safe), chunks requested concurrently
         chunk_size = 50
-        for i in range(0, len(keys_to_fetch), chunk_size):
-            chunk = keys_to_fetch[i:i + chunk_size]
-            keys_str = ",".join(chunk)
-            
+        url = f"{self.base_url}/market-quote/quotes"
+        calls = [
+            (url, {"instrument_key": ",".join(keys_to_fetch[i:i + chunk_size])})
+            for i in range(0, len(keys_to_fetch), chunk_size)
+        ]
+        
+        for data in self._make_api_calls(calls, priority=PRIORITY_BULK):
             try:
-                url = f"{self.base_url}/market-quote/quotes"
-                params = {"instrument_key": keys_str}
-                
-                data = self._make_api_call(url, params)
+                if data.get("status") != "success":
+                    logger.error(f"Batch fetch failed for chunk: {data.get('errors')}")
                 
                 if data.get("status") == "success":
                     quotes = data.get("data", {})
@@ -126,6 +173,7 @@ class UpstoxMarketService(UpstoxBaseService):
                                 "change_pct": pct_change,
                                 "volume": quote.get("volume", 0)
                             }
+                            market_feed.seed(symbol_to_key[original_sym], dict(results[original_sym], close=ltp - change))
             except Exception as e:
                 logger.error(f"Batch fetch failed for chunk: {e}")
                 
@@ -137,6 +185,9 @@ class UpstoxMarketService(UpstoxBaseService):
         data = self._make_api_call(url, params)
         if data.get("status") == "success":
             for k, v in data["data"].items():
+                net_change = v.get("net_change")
+                prev_close = v["last_price"] - net_change if net_change is not None else v.get("ohlc", {}).get("close")
+                market_feed.seed(key, {"ltp": v["last_price"], "close": prev_close})
                 return float(v["last_price"])
         return None
 
@@ -160,6 +211,7 @@ class UpstoxMarketService(UpstoxBaseService):
                     change = ltp - prev_close if ltp and prev_close else 0.0
                     change_pct = (change / prev_close) * 100 if prev_close else 0.0
                 
+                market_feed.seed(key, {"ltp": ltp, "close": prev_close, "volume": v.get("volume")})
                 return {
                     "symbol": symbol,
                     "ltp": ltp,
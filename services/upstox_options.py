@@ -5,14 +5,55 @@ Upstox Options & Futures Service
 import pandas as pd
 import numpy as np
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from calendar import monthrange
 from typing import Dict, Optional, Tuple, List
 from .upstox_base import UpstoxBaseService
+from .rate_limiter import PRIORITY_BULK
 from .instrument_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
+# Per-strike fields collected into an option surface
+SURFACE_FIELDS = [
+    "CE_IV", "PE_IV", "CE_OI", "PE_OI", "CE_OI_Change", "PE_OI_Change",
+    "CE_Delta", "PE_Delta", "CE_Gamma", "PE_Gamma", "CE_Theta", "PE_Theta",
+    "CE_Vega", "PE_Vega", "CE_LTP", "PE_LTP"
+]
+
+
+@dataclass
+class OptionSurface:
+    """Columnar option data: values[strike, expiry, field]"""
+    symbol: str
+    spot: float
+    expiries: List[str]
+    strikes: np.ndarray
+    fields: List[str]
+    values: np.ndarray
+
+    def field(self, name: str) -> np.ndarray:
+        """strike x expiry matrix for one field"""
+        return self.values[:, :, self.fields.index(name)]
+
+    def to_frame(self, name: str) -> pd.DataFrame:
+        """One field as a DataFrame (strikes as index, expiries as columns)"""
+        return pd.DataFrame(self.field(name), index=self.strikes, columns=self.expiries)
+
+    def atm_index(self) -> int:
+        return int(np.argmin(np.abs(self.strikes - self.spot))) if len(self.strikes) else -1
+
+    def term_structure(self, name: str = "CE_IV") -> np.ndarray:
+        """Field at the ATM strike for each expiry (e.g. ATM IV term structure)"""
+        idx = self.atm_index()
+        return self.field(name)[idx] if idx >= 0 else np.full(len(self.expiries), np.nan)
+
+    def totals(self, name: str) -> np.ndarray:
+        """Field summed over strikes per expiry (e.g. OI by expiry)"""
+        return np.nansum(self.field(name), axis=0)
+
+
 class UpstoxOptionsService(UpstoxBaseService):
     
     def get_option_chain(
@@ -25,13 +66,7 @@ class UpstoxOptionsService(UpstoxBaseService):
         url = f"{self.base_url}/option/chain"
         
         # 1. Resolve Instrument Key
-        instrument_key = instrument_service.resolve_instrument_key(symbol)
-        
-        if not instrument_key:
-            # Fallback for indices if not in Master
-            if symbol == "Nifty 50": instrument_key = "NSE_INDEX|Nifty 50"
-            elif symbol == "Bank Nifty": instrument_key = "NSE_INDEX|Nifty Bank"
-            else: instrument_key = f"NSE_EQ|{symbol.replace('.NS', '')}"
+        instrument_key = self._resolve_chain_key(symbol)
 
         if not expiry_date:
             expiry_date = self._get_next_expiry(symbol)
@@ -64,6 +99,154 @@ class UpstoxOptionsService(UpstoxBaseService):
         if hasattr(self, 'get_spot_price'):
             spot_price = self.get_spot_price(symbol) or 0.0
         
+        df = self._parse_option_chain(data)
+        
+        if spot_price and not df.empty:
+            df_filtered = self._filter_liquid_strikes(df, spot_price, max_distance_pct)
+            return df_filtered, spot_price
+            
+        return df, spot_price
+
+    def get_option_chains(
+        self,
+        symbol: str = "Nifty 50",
+        expiry_dates: Optional[List[str]] = None,
+        max_distance_pct: float = 12.0
+    ) -> Dict[str, Tuple[pd.DataFrame, float]]:
+        """
+        Option chains for several expiries, requested concurrently.
+        The spot quote rides in the same fan-out and is shared. Returns {expiry: (df, spot)}.
+        """
+        url = f"{self.base_url}/option/chain"
+        instrument_key = self._resolve_chain_key(symbol)
+        
+        if not expiry_dates:
+            expiry_dates = [self._get_next_expiry(symbol)]
+        
+        calls = [(url, {"instrument_key": instrument_key, "expiry_date": expiry}) for expiry in expiry_dates]
+        calls.append((f"{self.base_url}/market-quote/quotes", {"instrument_key": instrument_key}))
+        *responses, spot_data = self._make_api_calls(calls)
+        
+        spot_price = 0.0
+        if spot_data.get("status") == "success" and spot_data.get("data"):
+            spot_price = float(next(iter(spot_data["data"].values())).get("last_price") or 0.0)
+        elif hasattr(self, 'get_spot_price'):
+            spot_price = self.get_spot_price(symbol) or 0.0
+        
+        chains = {}
+        for expiry, data in zip(expiry_dates, responses):
+            if data.get("status") != "success" or not data.get("data"):
+                logger.warning(f"Option Chain API failed for {symbol} (Key: {instrument_key}, Expiry: {expiry}): {data}")
+                chains[expiry] = (pd.DataFrame(), spot_price)
+                continue
+            
+            df = self._parse_option_chain(data)
+            if spot_price and not df.empty:
+                df = self._filter_liquid_strikes(df, spot_price, max_distance_pct)
+            chains[expiry] = (df, spot_price)
+        
+        return chains
+
+    def get_option_surface(
+        self,
+        symbol: str = "Nifty 50",
+        expiries: Optional[List[str]] = None,
+        max_distance_pct: float = 12.0,
+        fields: Optional[List[str]] = None
+    ) -> "OptionSurface":
+        """
+        Strike x expiry x field surface in one concurrent round trip.
+        expiries defaults to the next 4 listed expiries; strikes are the union across expiries
+        (NaN where an expiry does not list a strike).
+        """
+        fields = list(fields or SURFACE_FIELDS)
+        if not expiries:
+            expiries = instrument_service.get_upcoming_expiries(symbol, limit=4) or [self._get_next_expiry(symbol)]
+        
+        chains = self.get_option_chains(symbol, expiry_dates=expiries, max_distance_pct=max_distance_pct)
+        spot_price = next((spot for _, spot in chains.values() if spot), 0.0)
+        
+        frames = [chains[e][0] for e in expiries]
+        strikes = np.unique(np.concatenate([df['strike'].to_numpy(dtype=float) for df in frames if not df.empty] or [np.empty(0)]))
+        values = np.full((len(strikes), len(expiries), len(fields)), np.nan)
+        
+        for j, df in enumerate(frames):
+            if df.empty:
+                continue
+            rows = np.searchsorted(strikes, df['strike'].to_numpy(dtype=float))
+            block = df.reindex(columns=fields).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            values[rows, j, :] = block
+        
+        return OptionSurface(
+            symbol=symbol,
+            spot=spot_price,
+            expiries=list(expiries),
+            strikes=strikes,
+            fields=fields,
+            values=values
+        )
+
+    def get_atm_option_quotes(
+        self,
+        symbol: str,
+        spot_price: float,
+        n_strikes: int = 5,
+        expiry_date: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Live quotes for the n strikes either side of ATM only.
+        Contract keys come from the instrument index, so this is one small quote call
+        instead of the full /option/chain payload. Columns match get_option_chain.
+        """
+        strikes = instrument_service.get_option_strikes(symbol, expiry_date)
+        if not strikes or not spot_price:
+            return pd.DataFrame()
+        
+        # 1. Strike window around ATM
+        atm_idx = int(np.argmin(np.abs(np.asarray(strikes) - spot_price)))
+        window = strikes[max(0, atm_idx - n_strikes):atm_idx + n_strikes + 1]
+        contracts = instrument_service.get_option_keys(symbol, expiry_date, (window[0], window[-1]))
+        if not contracts:
+            return pd.DataFrame()
+        
+        # 2. One batch quote for ~2 * (2n + 1) contracts
+        by_key = {c['key']: c for c in contracts}
+        url = f"{self.base_url}/market-quote/quotes"
+        data = self._make_api_call(url, {"instrument_key": ",".join(by_key)})
+        if data.get("status") != "success":
+            logger.warning(f"ATM option quotes failed for {symbol}: {data}")
+            return pd.DataFrame()
+        
+        # 3. Pivot to one row per strike
+        rows = {}
+        for resp_key, quote in data.get("data", {}).items():
+            contract = by_key.get(quote.get('instrument_token')) or by_key.get(resp_key.replace(":", "|"))
+            if not contract:
+                continue
+            side = contract['option_type']
+            row = rows.setdefault(contract['strike'], {"strike": contract['strike']})
+            row[f"{side}_LTP"] = quote.get("last_price")
+            row[f"{side}_Volume"] = quote.get("volume", 0)
+            row[f"{side}_OI"] = quote.get("oi", 0)
+        
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(list(rows.values())).sort_values("strike").reset_index(drop=True)
+
+    def _resolve_chain_key(self, symbol: str) -> str:
+        """Underlying instrument key for the option chain API"""
+        instrument_key = instrument_service.resolve_instrument_key(symbol)
+        
+        if not instrument_key:
+            # Fallback for indices if not in Master
+            if symbol == "Nifty 50": instrument_key = "NSE_INDEX|Nifty 50"
+            elif symbol == "Bank Nifty": instrument_key = "NSE_INDEX|Nifty Bank"
+            else: instrument_key = f"NSE_EQ|{symbol.replace('.NS', '')}"
+        
+        return instrument_key
+
+    def _parse_option_chain(self, data: Dict) -> pd.DataFrame:
+        """Flatten the option chain API payload into one row per strike"""
         rows = []
         for item in data.get("data", []):
             try:
@@ -110,13 +293,9 @@ class UpstoxOptionsService(UpstoxBaseService):
                 logger.error(f"Error parsing option item: {e}. Item keys: {item.keys()}")
                 continue
         
-        df = pd.DataFrame(rows).sort_values("strike").reset_index(drop=True)
-        
-        if spot_price and not df.empty:
-            df_filtered = self._filter_liquid_strikes(df, spot_price, max_distance_pct)
-            return df_filtered, spot_price
-            
-        return df, spot_price
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows).sort_values("strike").reset_index(drop=True)
 
     def get_futures_data(self, symbol: str) -> Dict:
         """Get nearest futures contract data"""
@@ -261,44 +440,37 @@ class UpstoxOptionsService(UpstoxBaseService):
     def calculate_max_pain(self, df: pd.DataFrame, spot: float) -> Dict:
         """
         Calculate Max Pain strike
+        Writer payout if expiry settles at each listed strike, via prefix sums over the
+        strike-sorted chain (O(n log n) instead of a strike x row Python loop).
+        Also returns the full pain curve (strike, call_pain, put_pain, total_pain).
         """
+        empty_curve = pd.DataFrame(columns=['strike', 'call_pain', 'put_pain', 'total_pain'])
         if df.empty:
-            return {"max_pain_strike": 0, "distance_pct": 0}
-            
-        strikes = df['strike'].unique()
-        # To save compute, we can check pain only at strikes with significant OI
-        # But for robustness, check all listed strikes in the chain
+            return {"max_pain_strike": 0, "distance_pct": 0, "pain_curve": empty_curve}
         
-        pain_data = []
+        # 1. OI per sorted unique strike (missing OI pays nothing)
+        strikes, inverse = np.unique(df['strike'].to_numpy(dtype=float), return_inverse=True)
+        ce_oi = np.bincount(inverse, weights=np.nan_to_num(pd.to_numeric(df['CE_OI'], errors='coerce').to_numpy(dtype=float)), minlength=len(strikes))
+        pe_oi = np.bincount(inverse, weights=np.nan_to_num(pd.to_numeric(df['PE_OI'], errors='coerce').to_numpy(dtype=float)), minlength=len(strikes))
         
-        for expiration_price in strikes:
-            # Calculate intrinsic value for Calls and Puts if market settles at expiration_price
-            
-            # Call Intrinsic: max(0, expiration_price - strike)
-            # Put Intrinsic: max(0, strike - expiration_price)
-            
-            # We can use vectorized operations since df has all strikes
-            
-            # Loss for Call Writers at this expiration price
-            # If strike < expiration_price, Call is ITM. Loss = (expiration_price - strike) * CE_OI
-            call_pain = df.apply(
-                lambda row: max(0, expiration_price - row['strike']) * row['CE_OI'], axis=1
-            ).sum()
-            
-            # Loss for Put Writers at this expiration price
-            # If strike > expiration_price, Put is ITM. Loss = (strike - expiration_price) * PE_OI
-            put_pain = df.apply(
-                lambda row: max(0, row['strike'] - expiration_price) * row['PE_OI'], axis=1
-            ).sum()
-            
-            total_pain = call_pain + put_pain
-            pain_data.append({'strike': expiration_price, 'pain': total_pain})
-            
-        if not pain_data:
-            return {"max_pain_strike": 0, "distance_pct": 0}
-            
-        pain_df = pd.DataFrame(pain_data)
-        max_pain_strike = pain_df.loc[pain_df['pain'].idxmin()]['strike']
+        # 2. Call writers lose (S - K) * CE_OI on every strike K <= S
+        #    sum = S * cum(CE_OI) - cum(K * CE_OI)
+        call_pain = strikes * np.cumsum(ce_oi) - np.cumsum(strikes * ce_oi)
+        
+        # 3. Put writers lose (K - S) * PE_OI on every strike K >= S
+        #    sum = rev_cum(K * PE_OI) - S * rev_cum(PE_OI)
+        put_pain = np.cumsum((strikes * pe_oi)[::-1])[::-1] - strikes * np.cumsum(pe_oi[::-1])[::-1]
+        
+        total_pain = call_pain + put_pain
+        pain_curve = pd.DataFrame({
+            'strike': strikes,
+            'call_pain': call_pain,
+            'put_pain': put_pain,
+            'total_pain': total_pain
+        })
+        
+        # Lowest strike wins ties (same as scanning the sorted chain)
+        max_pain_strike = float(strikes[int(np.argmin(total_pain))])
         
         distance_pct = 0
         if spot > 0:
@@ -306,7 +478,8 @@ class UpstoxOptionsService(UpstoxBaseService):
             
         return {
             "max_pain_strike": max_pain_strike,
-            "distance_pct": distance_pct
+            "distance_pct": distance_pct,
+            "pain_curve": pain_curve
         }
 
     def get_oi_analysis(self, df: pd.DataFrame) -> Dict:
@@ -356,19 +529,19 @@ class UpstoxOptionsService(UpstoxBaseService):
         if not valid_futures_keys:
             return {}
 
-        # 2. Batch Fetch (Chunk size 50 to be safe with URL length)
+        # 2. Batch Fetch (Chunk size 50 to be safe with URL length), chunks requested concurrently
         keys_list = list(valid_futures_keys.keys())
         chunk_size = 50
+        url = f"{self.base_url}/market-quote/quotes"
+        calls = [
+            (url, {"instrument_key": ",".join(keys_list[i:i + chunk_size])})
+            for i in range(0, len(keys_list), chunk_size)
+        ]
         
-        for i in range(0, len(keys_list), chunk_size):
-            chunk = keys_list[i:i + chunk_size]
-            keys_str = ",".join(chunk)
-            
+        for data in self._make_api_calls(calls, priority=PRIORITY_BULK):
             try:
-                url = f"{self.base_url}/market-quote/quotes"
-                params = {"instrument_key": keys_str}
-                
-                data = self._make_api_call(url, params)
+                if data.get("status") != "success":
+                    logger.error(f"Batch Futures fetch failed: {data.get('errors')}")
                 
                 if data.get("status") == "success":
                     quotes = data.get("data", {})
@@ -0,0 +1,105 @@
+"""
+Upstox HTTP Transport
+Pooled keep-alive session shared by every Upstox service, with an asyncio layer
+for fanning out independent requests (quote chunks, option chains for several
+expiries) and a sync facade so existing callers stay synchronous.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Connection pool / concurrency limits
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 10  # seconds
+
+
+class UpstoxTransport:
+    """
+    Shared HTTP layer.
+    - One requests.Session with a bounded keep-alive pool (no TCP+TLS handshake per call)
+    - get(): plain sync GET returning decoded JSON
+    - aget() / gather(): asyncio wrappers running on a bounded worker pool
+    - run_sync(): drive a coroutine from sync code (works inside or outside a running loop)
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def session(self) -> requests.Session:
+        """Lazily built pooled session"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="upstox-http")
+        return self._executor
+
+    def get(self, url: str, headers: Dict, params: Dict) -> Dict:
+        """Blocking GET on the pooled session"""
+        return self.get_response(url, headers, params).json()
+
+    def get_response(self, url: str, headers: Dict, params: Dict) -> requests.Response:
+        """Blocking GET returning the raw response (status code / headers needed for 429 handling)"""
+        return self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable (usually an API call) on the transport's worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def aget(self, url: str, headers: Dict, params: Dict) -> Dict:
+        return await self.run(self.get, url, headers, params)
+
+    async def gather(self, calls: List[Awaitable]) -> List[Any]:
+        """Await all calls concurrently; failures are returned as exceptions, not raised"""
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    def run_sync(self, coro: Awaitable) -> Any:
+        """Sync facade: run a coroutine to completion from plain (Streamlit) code"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        # Already inside an event loop (e.g. notebook): run on a helper thread
+        with ThreadPoolExecutor(max_workers=1) as helper:
+            return helper.submit(asyncio.run, coro).result()
+
+    def close(self):
+        """Release pooled connections and worker threads"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# Global instance
+upstox_transport = UpstoxTransport()
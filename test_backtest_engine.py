@@ -0,0 +1,116 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import make_ohlcv
+from feature_frame import FeatureFrame
+from services.backtest_engine import BacktestEngine, RuleError, compile_rule, parse_range
+
+
+def ohlcv(n=900, seed=1):
+    return make_ohlcv(n, seed, start="2020-01-01", drift=0.0003)
+
+
+def test_preset_rules_match_signal_shift_backtest():
+    df = ohlcv()
+    features = FeatureFrame(df)
+    engine = BacktestEngine(df)
+    for rule, signal in [
+        ("SMA20 > SMA50", features.sma(20) > features.sma(50)),
+        ("close > SMA200", df['close'] > features.sma(200)),
+        ("RSI < 30", features.rsi(14) < 30),
+        ("EMA(12) > EMA(26)", features.ema(12) > features.ema(26)),
+    ]:
+        expected = (1 + df['close'].pct_change() * signal.astype(int).shift(1)).cumprod()
+        curve = engine.run(rule).curve()
+        assert np.allclose(curve['strategy_equity'].values[1:], expected.values[1:])
+
+
+def test_grid_is_every_combination_in_one_pass():
+    df = ohlcv()
+    engine = BacktestEngine(df, cost_bps=5, slippage_bps=5, stop_loss=0.04)
+    params = {'fast': [5, 10, 20], 'slow': [50, 100], 'rsi_max': [60, 80]}
+    result = engine.run("SMA(fast) > SMA(slow) and RSI(14) < rsi_max", "close < SMA(fast) * 0.97", params)
+
+    assert result.equity.shape == (3, 2, 2, len(df))
+    assert len(result.grid) == 12
+    assert list(result.grid['Sharpe']) == sorted(result.grid['Sharpe'], reverse=True)
+
+    # Same numbers as running each combination on its own
+    for _, row in result.grid.iterrows():
+        fast, slow, rsi_max = int(row['fast']), int(row['slow']), row['rsi_max']
+        single = engine.run(f"SMA({fast}) > SMA({slow}) and RSI(14) < {rsi_max}", f"close < SMA({fast}) * 0.97")
+        assert single.grid['Total Return'][0] == pytest.approx(row['Total Return'])
+        assert np.allclose(single.curve()['strategy_equity'],
+                           result.curve(fast=fast, slow=slow, rsi_max=rsi_max)['strategy_equity'])
+
+
+def test_costs_sizing_and_stop_loss():
+    df = ohlcv()
+    free = BacktestEngine(df).run("SMA(fast) > SMA50", params={'fast': [5, 10]})
+    costly = BacktestEngine(df, cost_bps=10, slippage_bps=5).run("SMA(fast) > SMA50", params={'fast': [5, 10]})
+    merged = free.grid.merge(costly.grid, on='fast', suffixes=('', '_cost'))
+    assert (merged['Total Return_cost'] < merged['Total Return']).all()
+    assert (merged['Trades_cost'] == merged['Trades']).all()
+
+    half = BacktestEngine(df, size=0.5).run("SMA20 > SMA50")
+    full = BacktestEngine(df).run("SMA20 > SMA50")
+    assert half.grid['Max Drawdown'][0] > full.grid['Max Drawdown'][0]
+
+    # A stop that never triggers changes nothing; a tight one caps single-trade losses
+    never = BacktestEngine(df, stop_loss=0.999).run("SMA20 > SMA50")
+    assert np.allclose(never.equity, full.equity)
+    tight = BacktestEngine(df, stop_loss=0.02).run("SMA20 > SMA50")
+    assert tight.grid['Exposure'][0] < full.grid['Exposure'][0]
+
+    vol = BacktestEngine(df, sizing='volatility', target_vol=0.05).run("SMA20 > SMA50")
+    assert vol.grid['Max Drawdown'][0] > full.grid['Max Drawdown'][0]
+
+
+def test_rule_language_is_whitelisted():
+    assert compile_rule("CROSS_ABOVE(SMA(fast), SMA(slow)) and not RSI > hi").params == ['fast', 'slow', 'hi']
+    for rule in ["__import__('os').system('ls')", "close.mean() > 1", "SMA(2.5) > close", "[1][0]", "  "]:
+        with pytest.raises(RuleError):
+            compile_rule(rule)
+    with pytest.raises(RuleError):
+        BacktestEngine(ohlcv(100)).run("SMA(fast) > close")
+    assert parse_range("10:30:10") == [10, 20, 30]
+    assert parse_range("0.5, 1") == [0.5, 1]
+
+
+def test_quant_lab_loads_enough_history_for_the_default_sweep(monkeypatch):
+    import plugins_backtester
+
+    calls = []
+
+    class FakeFetcher:
+        def fetch_asset(self, symbol, start_date, end_date):
+            calls.append((symbol, start_date, end_date))
+            return make_ohlcv(int(252 * plugins_backtester.DEFAULT_HISTORY_YEARS), seed=5, end=end_date)
+
+    monkeypatch.setattr(plugins_backtester, 'MultiAssetDataFetcher', FakeFetcher)
+    plugin = plugins_backtester.BacktesterPlugin()
+    result = plugin.analyze({'price_data': ohlcv(250), 'symbol': "^NSEI"})
+    assert result.data['symbol'] == "^NSEI"
+
+    years = plugins_backtester.DEFAULT_HISTORY_YEARS
+    df = plugin.load_history("^NSEI", years)
+    (symbol, start, end), = calls
+    assert symbol == "^NSEI" and (pd.Timestamp(end) - pd.Timestamp(start)).days >= 365 * years
+
+    # Every default window leaves most of the loaded history tradable
+    params = {name: parse_range(spec) for name, spec in plugins_backtester.PARAM_DEFAULTS.items()}
+    assert max(max(v) for v in params.values()) < len(df) / 2
+    res = plugin.run_backtest(df, "SMA Cross + RSI Filter (sweep)",
+                              params={k: params[k] for k in ('fast', 'slow', 'rsi_max')})
+    assert len(res['grid']) == 1000 and res['metrics']['Trades'] > 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,84 @@
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.bar_aggregator import BarAggregator, BarRing
+from services.bar_store import BarStore
+from services.market_feed import MarketFeed, ReplaySource
+
+KEY = "NSE_EQ|INE002A01018"
+T0 = 1_700_000_100  # 5m-aligned epoch (and 1m-aligned)
+
+
+def test_quotes_become_ohlcv_bars(tmp_path):
+    agg = BarAggregator(BarStore(str(tmp_path)))
+    # (seconds after T0, ltp, cumulative day volume)
+    for offset, ltp, vol in [(0, 100, 1000), (20, 103, 1100), (50, 99, 1150), (61, 101, 1200), (330, 104, 1500)]:
+        agg.on_quote(KEY, {'ltp': ltp, 'volume': vol, 'ts': T0 + offset})
+
+    one = agg.bars(KEY, '1m')
+    assert list(one['open']) == [100, 101, 104]
+    assert list(one['high']) == [103, 101, 104]
+    assert list(one['low']) == [99, 101, 104]
+    assert list(one['volume']) == [150, 50, 300]  # first quote only sets the volume baseline
+
+    five = agg.bars(KEY, '5m')
+    assert list(five['close']) == [101, 104]
+    assert list(five['high']) == [103, 104]
+
+    # Only completed bars are persisted; the open bar stays in memory
+    assert agg.flush() == 2 + 1 + 0  # 1m: two closed, 5m: one closed, 15m: still open
+    stored = agg.store.read(KEY, '1m')
+    assert list(stored['close']) == [99, 101]
+    assert agg.flush() == 0  # incremental: nothing new
+
+    # A fresh aggregator (e.g. after restart) still serves the persisted history
+    restarted = BarAggregator(agg.store)
+    assert list(restarted.bars(KEY, '1m')['close']) == [99, 101]
+
+
+def test_ring_keeps_latest_bars():
+    ring = BarRing(3)
+    for i in range(5):
+        ring.add(i * 60, float(i), 0.0)
+    ring.add(0, 42.0, 0.0)  # Late quote for an evicted bar is ignored
+
+    buckets, ohlcv = ring.arrays()
+    assert list(buckets) == [120, 180, 240]
+    assert list(ohlcv[:, 3]) == [2.0, 3.0, 4.0]
+
+
+def test_feed_ticks_reach_aggregator(tmp_path):
+    feed = MarketFeed()
+    agg = BarAggregator(BarStore(str(tmp_path)), intervals=['1m'])
+    feed.add_listener(agg.on_quote)
+
+    source = ReplaySource([{"instrument_key": KEY, "ltp": 100 + i, "ts": T0 + i * 30} for i in range(6)])
+    feed.start(source)
+    assert source.done.wait(2)
+    feed.stop()
+
+    bars = agg.bars(KEY, '1m')
+    assert len(bars) == 3
+    assert list(bars['close']) == [101, 103, 105]
+
+
+def test_bars_are_stamped_in_exchange_time(tmp_path, host_tz):
+    agg = BarAggregator(BarStore(str(tmp_path)), intervals=['1m'])
+    open_bell = int(pd.Timestamp("2024-01-02 09:15", tz="Asia/Kolkata").timestamp())
+    for offset in (0, 60, 120):
+        agg.on_quote(KEY, {'ltp': 100 + offset, 'ts': open_bell + offset})
+    agg.flush(include_open=True)
+
+    expected = pd.date_range("2024-01-02 09:15", periods=3, freq="min")
+    assert list(agg.bars(KEY, '1m').index) == list(expected)
+    assert list(agg.store.read(KEY, '1m').index) == list(expected)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,284 @@
+import sys
+import os
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import data_fetcher
+from services.bar_store import BarStore
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_bars(start, end, columns=('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume')):
+    """Synthetic daily yfinance-style frame for [start, end)"""
+    idx = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+    close = np.linspace(100, 100 + len(idx), len(idx))
+    data = {c: close for c in columns}
+    data['Volume'] = np.full(len(idx), 1000.0)
+    return pd.DataFrame(data, index=idx)
+
+
+class FakeYF:
+    """Records every yf.download call and answers with synthetic bars"""
+    def __init__(self):
+        self.calls = []
+
+    def download(self, tickers, start=None, end=None, **kwargs):
+        self.calls.append((tickers, start, end))
+        if isinstance(tickers, str):
+            return make_bars(start, end)
+        frames = {t: make_bars(start, end) for t in tickers}
+        return pd.concat(frames, axis=1)
+
+
+def make_fetcher(tmp_path, monkeypatch):
+    fake = FakeYF()
+    monkeypatch.setattr(data_fetcher, 'bar_store', BarStore(str(tmp_path)))
+    monkeypatch.setattr(data_fetcher.yf, 'download', fake.download)
+    fetcher = data_fetcher.MultiAssetDataFetcher.__new__(data_fetcher.MultiAssetDataFetcher)
+    fetcher.upstox = None
+    return fetcher, fake
+
+
+def test_fetch_asset_reuses_store(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+
+    first = fetcher.fetch_asset("^NSEI", "2024-01-01", "2024-03-01")
+    assert len(fake.calls) == 1
+    assert 'close' in first.columns
+
+    # Same window again: served locally
+    again = fetcher.fetch_asset("^NSEI", "2024-01-01", "2024-03-01")
+    assert len(fake.calls) == 1
+    pd.testing.assert_frame_equal(first, again)
+
+    # Wider window: only the head is downloaded
+    wider = fetcher.fetch_asset("^NSEI", "2023-12-01", "2024-03-01")
+    assert len(fake.calls) == 2
+    assert fake.calls[-1][1:] == ("2023-12-01", "2024-01-01")
+    assert wider.index[0] == pd.Timestamp("2023-12-01")
+
+
+def test_fetch_multiple_assets_downloads_only_uncached(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+
+    fetcher.fetch_multiple_assets(["A.NS", "B.NS"], "2024-01-01", "2024-03-01")
+    assert len(fake.calls) == 1
+
+    results = fetcher.fetch_multiple_assets(["A.NS", "B.NS", "C.NS"], "2024-01-01", "2024-03-01")
+    assert len(fake.calls) == 2
+    assert fake.calls[-1][0] == ["C.NS"]
+    for sym in ["A.NS", "B.NS", "C.NS"]:
+        df, err = results[sym]
+        assert err is None and not df.empty
+
+
+def test_batch_downloads_each_symbol_over_its_own_gap(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+    fetcher.fetch_multiple_assets(["A.NS", "B.NS"], "2024-01-01", "2024-03-01")
+    fake.calls.clear()
+
+    # C is new and needs the whole year; A and B only miss the head
+    results = fetcher.fetch_multiple_assets(["A.NS", "B.NS", "C.NS"], "2023-06-01", "2024-03-01")
+    calls = sorted((sorted(tickers), start, end) for tickers, start, end in fake.calls)
+    assert calls == [
+        (["A.NS", "B.NS"], "2023-06-01", "2024-01-01"),
+        (["C.NS"], "2023-06-01", "2024-03-01"),
+    ]
+    assert all(err is None for _, err in results.values())
+    for sym in ["A.NS", "B.NS", "C.NS"]:
+        assert data_fetcher.bar_store.missing_ranges(sym, "2023-06-01", "2024-03-01") == []
+
+
+def test_coverage_tracks_holes_and_gaps(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+    holiday = pd.Timestamp("2024-01-26")
+
+    def download_with_holiday(tickers, start=None, end=None, **kwargs):
+        fake.calls.append((tickers, start, end))
+        bars = make_bars(start, end)
+        return bars.drop(holiday, errors='ignore')
+
+    monkeypatch.setattr(data_fetcher.yf, 'download', download_with_holiday)
+
+    fetcher.fetch_asset("^NSEI", "2024-01-01", "2024-02-01")
+    fetcher.fetch_asset("^NSEI", "2024-03-01", "2024-04-01")
+    meta = data_fetcher.bar_store.coverage("^NSEI")
+    assert meta['holes'] == ["2024-01-26"]
+    assert len(meta['covered']) == 2
+
+    # Holiday is known: re-reading January never hits the network
+    fetcher.fetch_asset("^NSEI", "2024-01-01", "2024-02-01")
+    assert len(fake.calls) == 2
+
+    # Spanning both windows only fetches the February gap
+    assert data_fetcher.bar_store.missing_ranges("^NSEI", "2024-01-01", "2024-04-01") == [
+        (pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01"))
+    ]
+    full = fetcher.fetch_asset("^NSEI", "2024-01-01", "2024-04-01")
+    assert fake.calls[-1][1:] == ("2024-02-01", "2024-03-01")
+    assert data_fetcher.bar_store.coverage("^NSEI")['covered'] == [["2024-01-01", "2024-04-01"]]
+    assert full.index.is_monotonic_increasing and holiday not in full.index
+
+
+def test_download_batch_shards_and_retries_failed_chunks(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+    monkeypatch.setitem(data_fetcher.DATA_FETCH_SETTINGS, 'batch_chunk_size', 2)
+    monkeypatch.setitem(data_fetcher.DATA_FETCH_SETTINGS, 'retry_backoff', 0)
+    failures = {'E.NS': 1}
+
+    def flaky_download(tickers, start=None, end=None, **kwargs):
+        fake.calls.append((list(tickers), start, end))
+        for t in tickers:
+            if failures.get(t):
+                failures[t] -= 1
+                raise ConnectionError("shard timeout")
+        return pd.concat({t: make_bars(start, end) for t in tickers}, axis=1)
+
+    monkeypatch.setattr(data_fetcher.yf, 'download', flaky_download)
+
+    symbols = ["A.NS", "B.NS", "C.NS", "D.NS", "E.NS"]
+    results = fetcher.fetch_multiple_assets(symbols, "2024-01-01", "2024-03-01")
+
+    # 3 shards, only the failing one is retried
+    assert len(fake.calls) == 4
+    assert sorted(sum((c[0] for c in fake.calls[:3]), [])) == symbols
+    assert "E.NS" in fake.calls[-1][0] and len(fake.calls[-1][0]) <= 2
+    assert set(results) == set(symbols)
+    assert all(err is None and not df.empty for df, err in results.values())
+
+
+def test_empty_or_failed_download_is_not_covered(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+
+    def empty(tickers, start=None, end=None, **kwargs):
+        fake.calls.append((tickers, start, end))
+        return pd.DataFrame()
+
+    # yfinance answers a failed download with an empty frame: a weekday without bars is not covered
+    monkeypatch.setattr(data_fetcher.yf, 'download', empty)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            fetcher._fetch_asset("^NSEI", "2024-01-26", "2024-01-27")
+    assert len(fake.calls) == 2
+    assert data_fetcher.bar_store.missing_ranges("^NSEI", "2024-01-26", "2024-01-27") != []
+
+    def failing(tickers, start=None, end=None, **kwargs):
+        fake.calls.append((tickers, start, end))
+        raise ConnectionError("timeout")
+
+    monkeypatch.setattr(data_fetcher.yf, 'download', failing)
+    with pytest.raises(ConnectionError):
+        fetcher._fetch_asset("^NSEI", "2024-02-01", "2024-02-02")
+    assert data_fetcher.bar_store.missing_ranges("^NSEI", "2024-02-01", "2024-02-02") != []
+
+
+def test_batch_covers_only_symbols_with_bars(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+
+    def partial_download(tickers, start=None, end=None, **kwargs):
+        # A traded; B came back without bars (failed upstream or delisted)
+        fake.calls.append((list(tickers), start, end))
+        bars = make_bars(start, end)
+        return pd.concat({"A.NS": bars, "B.NS": bars * np.nan}, axis=1)
+
+    monkeypatch.setattr(data_fetcher.yf, 'download', partial_download)
+
+    results = fetcher.fetch_multiple_assets(["A.NS", "B.NS"], "2024-01-01", "2024-03-01")
+    assert results["A.NS"][1] is None
+    assert results["B.NS"] == (None, "yfinance: no bars")
+
+    store = data_fetcher.bar_store
+    assert store.missing_ranges("A.NS", "2024-01-01", "2024-03-01") == []
+    assert store.missing_ranges("B.NS", "2024-01-01", "2024-03-01") != []
+
+    # Only the symbol without bars is downloaded again
+    fetcher.fetch_multiple_assets(["A.NS", "B.NS"], "2024-01-01", "2024-03-01")
+    assert fake.calls[-1][0] == ["B.NS"] and len(fake.calls) == 2
+
+
+def test_rate_limited_download_leaves_the_range_uncovered(tmp_path, monkeypatch):
+    real_download = data_fetcher.yf.download
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+    monkeypatch.setitem(data_fetcher.DATA_FETCH_SETTINGS, 'retry_backoff', 0)
+
+    def rate_limited(self, *args, **kwargs):
+        raise Exception("429 Too Many Requests")
+
+    monkeypatch.setattr(data_fetcher.yf.Ticker, 'history', rate_limited)
+    monkeypatch.setattr(data_fetcher.yf, 'download', real_download)
+
+    results = fetcher.fetch_multiple_assets(["AAA.NS", "BBB.NS"], "2024-01-01", "2024-02-01")
+    assert all(df is None for df, _ in results.values())
+    with pytest.raises(ValueError):
+        fetcher._fetch_asset("CCC.NS", "2024-01-01", "2024-02-01")
+
+    # Nothing was downloaded, so the next request fetches the whole window again
+    for sym in ["AAA.NS", "BBB.NS", "CCC.NS"]:
+        assert data_fetcher.bar_store.missing_ranges(sym, "2024-01-01", "2024-02-01") == [
+            (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01"))
+        ]
+
+
+def test_rate_limited_shard_is_retried(tmp_path, monkeypatch):
+    real_download = data_fetcher.yf.download
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+    monkeypatch.setitem(data_fetcher.DATA_FETCH_SETTINGS, 'retry_backoff', 0)
+
+    def rate_limited(self, *args, **kwargs):
+        raise Exception("429 Too Many Requests")
+
+    def counting_download(tickers, start=None, end=None, **kwargs):
+        fake.calls.append((list(tickers), start, end))
+        return real_download(tickers, start=start, end=end, **kwargs)
+
+    # Real yf.download: it swallows the per-ticker exception and returns an empty frame
+    monkeypatch.setattr(data_fetcher.yf.Ticker, 'history', rate_limited)
+    monkeypatch.setattr(data_fetcher.yf, 'download', counting_download)
+
+    results, ok = fetcher._download_chunk(["AAA.NS", "BBB.NS"], "2024-01-01", "2024-02-01")
+    assert not ok
+    assert all(df is None and err != data_fetcher.NO_DATA for df, err in results.values())
+
+    fake.calls.clear()
+    fetcher._download_batch(["AAA.NS", "BBB.NS"], "2024-01-01", "2024-02-01")
+    assert len(fake.calls) == 1 + data_fetcher.DATA_FETCH_SETTINGS['shard_retries']
+
+    # A weekend has no sessions: the empty reply is clean and not retried
+    results, ok = fetcher._download_chunk(["AAA.NS"], "2024-01-27", "2024-01-29")
+    assert ok and results == {"AAA.NS": (None, data_fetcher.NO_DATA)}
+
+
+def test_single_and_batch_fetches_of_one_range_overlap(tmp_path, monkeypatch):
+    fetcher, fake = make_fetcher(tmp_path, monkeypatch)
+    started = threading.Event()
+
+    def slow_download(tickers, start=None, end=None, **kwargs):
+        started.set()
+        time.sleep(0.2)
+        return fake.download(tickers, start, end, **kwargs)
+
+    monkeypatch.setattr(data_fetcher.yf, 'download', slow_download)
+    results = {}
+    single = threading.Thread(target=lambda: results.update(single=fetcher.fetch_asset("A.NS", "2024-01-01", "2024-03-01")))
+    single.start()
+    started.wait()
+    results['batch'] = fetcher.fetch_multiple_assets(["A.NS"], "2024-01-01", "2024-03-01")
+    single.join()
+
+    # Each path gets its own result type, never the other path's
+    assert isinstance(results['single'], pd.DataFrame) and not results['single'].empty
+    df, err = results['batch']["A.NS"]
+    assert err is None and isinstance(df, pd.DataFrame) and not df.empty
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,66 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import make_ohlcv
+from feature_frame import FeatureFrame, get_feature_frame
+
+
+def ohlcv(n=300, seed=3):
+    df = make_ohlcv(n, seed, vol=0.01, open_ratio=0.999)
+    df.iloc[50, :4] = df.iloc[49, :4]  # an unchanged close: OBV must stay flat
+    return df
+
+
+def test_matches_inline_formulas():
+    df = ohlcv()
+    features = FeatureFrame(df)
+
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    pd.testing.assert_series_equal(features.rsi(14), 100 - (100 / (1 + gain / loss)))
+    pd.testing.assert_series_equal(features.sma(20), df['close'].rolling(20).mean())
+
+    tr = pd.concat([df['high'] - df['low'], (df['high'] - df['close'].shift()).abs(),
+                    (df['low'] - df['close'].shift()).abs()], axis=1).max(axis=1)
+    pd.testing.assert_series_equal(features.atr(14), tr.rolling(14).mean())
+
+    obv = [0]
+    for i in range(1, len(df)):
+        step = np.sign(df['close'].iloc[i] - df['close'].iloc[i - 1])
+        obv.append(obv[-1] + step * df['volume'].iloc[i])
+    assert np.allclose(features.obv().values, obv)
+
+
+def test_memoized_per_symbol_and_version():
+    df = ohlcv()
+    a = get_feature_frame(df, "RELIANCE.NS")
+    assert get_feature_frame(df.copy(), "RELIANCE.NS") is a   # same bars, same frame
+    assert a.sma(50) is a.sma(50)                              # computed once
+
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc('close')] += 1
+    assert get_feature_frame(changed, "RELIANCE.NS") is not a  # new bar data -> new version
+
+
+def test_title_case_and_multiindex_columns():
+    df = ohlcv(60)
+    titled = df.rename(columns=str.capitalize)
+    multi = titled.copy()
+    multi.columns = pd.MultiIndex.from_tuples([(c, "X.NS") for c in titled.columns])
+
+    for frame in (FeatureFrame(titled), FeatureFrame(multi)):
+        pd.testing.assert_series_equal(frame.sma(10).rename(None), df['close'].rolling(10).mean().rename(None))
+    with pytest.raises(KeyError):
+        FeatureFrame(df[['close']]).obv()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,88 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import make_ohlcv
+from feature_frame import FeatureFrame
+from indicator_panel import IndicatorPanel
+
+
+def ohlcv(n=260, seed=0, start="2023-01-02"):
+    return make_ohlcv(n, seed, start=start, open_ratio=0.999)
+
+
+@pytest.fixture
+def universe():
+    frames = {f"S{i}.NS": ohlcv(seed=i) for i in range(12)}
+    frames["LATE.NS"] = ohlcv(120, seed=42, start="2023-06-01")  # listed mid-panel
+    # Misaligned calendars: a symbol that skipped sessions (one in its last 20 bars),
+    # and one with a special Saturday session nobody else has
+    gappy = ohlcv(seed=13)
+    frames["GAPPY.NS"] = gappy.drop(gappy.index[[30, 31, 200, -5]])
+    extra = ohlcv(seed=14)
+    friday = extra.index[extra.index.dayofweek == 4][-2]
+    saturday = extra.loc[[friday]].set_axis([friday + pd.Timedelta(days=1)]) * 1.01
+    frames["EXTRA.NS"] = pd.concat([extra, saturday]).sort_index()
+    return frames
+
+
+def test_rows_match_feature_frame(universe):
+    panel = IndicatorPanel(universe)
+    assert panel.close.shape == (len(universe), len(panel.index))
+
+    for sym, df in universe.items():
+        i = panel.row(sym)
+        features = FeatureFrame(df)
+        own = panel.index.get_indexer(df.index)  # the symbol's own bars in the shared index
+        for got, expected in [
+            (panel.sma(20), features.sma(20)),
+            (panel.ema(20), features.ema(20)),
+            (panel.rsi(14), features.rsi(14)),
+            (panel.atr(14), features.atr(14)),
+            (panel.sma(20, 'volume'), features.sma(20, 'volume')),
+        ]:
+            assert np.allclose(got[i, own], expected.values, equal_nan=True)
+
+        mid, upper, lower = panel.bollinger(20, 2.0)
+        std = df['close'].rolling(20).std()
+        assert np.allclose(upper[i, own], (features.sma(20) + 2 * std).values, equal_nan=True)
+        assert np.allclose(lower[i, own], (features.sma(20) - 2 * std).values, equal_nan=True)
+        assert np.allclose(panel.rvol(20)[i, own], (df['volume'] / features.sma(20, 'volume')).values, equal_nan=True)
+
+
+def test_gaps_in_the_shared_index_are_skipped(universe):
+    panel = IndicatorPanel(universe)
+    gappy = universe["GAPPY.NS"]
+    i = panel.row("GAPPY.NS")
+    # Another symbol's extra session and this symbol's skipped ones are not NaN holes in its windows
+    assert not np.isnan(panel.last(panel.sma(20))[i])
+    assert panel.last(panel.sma(20))[i] == pytest.approx(gappy['close'].rolling(20).mean().iloc[-1])
+    assert panel.last(panel.rsi(14))[i] == pytest.approx(FeatureFrame(gappy).rsi(14).iloc[-1])
+    # Dates a symbol has no bar stay NaN
+    missing = panel.index.get_indexer(panel.index.difference(gappy.index))
+    assert np.isnan(panel.sma(20)[i, missing]).all() and np.isnan(panel.ema(20)[i, missing]).all()
+
+
+def test_snapshot_uses_each_symbols_last_bar(universe):
+    universe["STALE.NS"] = ohlcv(200, seed=7)  # stops trading before the others
+    panel = IndicatorPanel(universe)
+    snap = panel.snapshot()
+
+    assert list(snap.index) == list(universe)
+    stale = universe["STALE.NS"]
+    assert snap.loc["STALE.NS", 'close'] == stale['close'].iloc[-1]
+    assert snap.loc["STALE.NS", 'change_pct'] == pytest.approx((stale['close'].iloc[-1] / stale['close'].iloc[-2] - 1) * 100)
+    assert snap.loc["LATE.NS", 'bars'] == 120
+    assert snap.loc["S0.NS", 'rsi14'] == pytest.approx(FeatureFrame(universe["S0.NS"]).rsi(14).iloc[-1])
+
+    assert len(IndicatorPanel.from_data_map({"X.NS": (None, "no data")})) == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,166 @@
+import sys
+import os
+import json
+import time
+
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.instrument_index import InstrumentIndex, load_instrument_index, write_instrument_index
+
+MASTER = {
+    "EQ_MAP": {
+        "RELIANCE": {"key": "NSE_EQ|INE002A01018", "name": "RELIANCE INDUSTRIES LTD"},
+        "INFY": {"key": "NSE_EQ|INE009A01021", "name": "INFOSYS LIMITED"},
+    },
+    "INDICES": {"NIFTY": "NSE_INDEX|Nifty 50", "Nifty 50": "NSE_INDEX|Nifty 50"},
+    "FUTURES": {
+        "NIFTY": [
+            {"key": "NSE_FO|2", "expiry": 1900000000000},
+            {"key": "NSE_FO|1", "expiry": 1000000000000},
+        ]
+    },
+    "EXPIRIES": {"NIFTY": ["2024-01-25", "2024-01-04", "2024-02-29"]},
+}
+
+
+def test_lookups_match_master(tmp_path):
+    path = str(tmp_path / "master.bin")
+    write_instrument_index(MASTER, path)
+    index = InstrumentIndex(path)
+
+    assert index.equity_key("RELIANCE") == "NSE_EQ|INE002A01018"
+    assert index.equity("INFY")["name"] == "INFOSYS LIMITED"
+    assert index.equity_key("TCS") is None
+    assert index.equity_symbols() == sorted(MASTER["EQ_MAP"])
+    assert index.index_key("Nifty 50") == "NSE_INDEX|Nifty 50"
+
+    # Futures come back expiry-sorted, optionally filtered
+    assert [f["key"] for f in index.futures("NIFTY")] == ["NSE_FO|1", "NSE_FO|2"]
+    assert index.futures("NIFTY", after_ms=1500000000000) == [{"key": "NSE_FO|2", "expiry": 1900000000000}]
+    assert index.futures("BANKNIFTY") == []
+
+    assert index.next_expiry("NIFTY", 20240105) == "2024-01-25"
+    assert index.next_expiry("NIFTY", 20240125) == "2024-01-25"
+    assert index.next_expiry("NIFTY", 20240301) is None
+
+
+def test_index_rebuilt_when_json_changes(tmp_path):
+    source = tmp_path / "master.json"
+    path = str(tmp_path / "master.bin")
+    source.write_text(json.dumps(MASTER))
+
+    index = load_instrument_index(path, str(source))
+    assert index.equity_key("TCS") is None
+
+    updated = dict(MASTER, EQ_MAP=dict(MASTER["EQ_MAP"], TCS={"key": "NSE_EQ|INE467B01029", "name": "TCS"}))
+    time.sleep(0.01)
+    source.write_text(json.dumps(updated))
+
+    index = load_instrument_index(path, str(source))
+    assert index.equity_key("TCS") == "NSE_EQ|INE467B01029"
+    assert index.is_current(str(source))
+
+
+def test_option_index_from_nse_samples(tmp_path, monkeypatch):
+    import preprocess_nse_data
+
+    # nifty_samples.json is a UTF-16 slice of NSE.json (NIFTY options + futures)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "nifty_samples.json"), "rb") as f:
+        samples = json.loads(f.read().decode("utf-16"))
+    nse_path = tmp_path / "NSE.json"
+    nse_path.write_text(json.dumps(samples))
+
+    monkeypatch.setattr(preprocess_nse_data, "NSE_JSON_PATH", str(nse_path))
+    monkeypatch.setattr(preprocess_nse_data, "OUTPUT_PATH", str(tmp_path / "master.json"))
+    monkeypatch.setattr(preprocess_nse_data, "INDEX_PATH", str(tmp_path / "master.bin"))
+    monkeypatch.setattr(preprocess_nse_data, "META_PATH", str(tmp_path / "master.meta.json"))
+    preprocess_nse_data.preprocess_nse_data(parallel=False)
+
+    index = InstrumentIndex(str(tmp_path / "master.bin"))
+    expiry = json.loads((tmp_path / "master.json").read_text())["EXPIRIES"]["NIFTY"][0]
+    expiry_int = int(expiry.replace("-", ""))
+
+    strikes = index.option_strikes("NIFTY", expiry_int)
+    assert len(strikes) > 10
+
+    # Targeted window: every contract is inside the range, both sides present, matches the raw dump
+    low, high = strikes[len(strikes) // 2 - 2], strikes[len(strikes) // 2 + 2]
+    contracts = index.option_contracts("NIFTY", expiry_int, low, high)
+    assert len(contracts) == 10
+    assert set(contracts['type']) == {0, 1}
+    assert ((contracts['strike'] >= low) & (contracts['strike'] <= high)).all()
+
+    raw = {(s['strike_price'], s['instrument_type']): s['instrument_key'] for s in samples
+           if s['instrument_type'] in ('CE', 'PE') and time.strftime('%Y-%m-%d', time.localtime(s['expiry'] / 1000)) == expiry}
+    for c in contracts:
+        assert raw[(float(c['strike']), ('CE', 'PE')[c['type']])] == index.string(int(c['key']))
+
+
+
+def test_sharded_preprocess_matches_serial_and_skips_unchanged(tmp_path, monkeypatch):
+    import preprocess_nse_data
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "nifty_samples.json"), "rb") as f:
+        samples = json.loads(f.read().decode("utf-16"))
+    samples += [
+        {"segment": "NSE_EQ", "instrument_type": "EQ", "trading_symbol": "INFY", "instrument_key": "NSE_EQ|INE009A01021", "name": "INFOSYS"},
+        {"segment": "NSE_INDEX", "trading_symbol": "NIFTY", "instrument_key": "NSE_INDEX|Nifty 50", "name": "Nifty 50"},
+    ]
+    nse_path = tmp_path / "NSE.json"
+    nse_path.write_text(json.dumps(samples, indent=1))
+
+    serial = preprocess_nse_data._build_master(preprocess_nse_data._parse_serial(str(nse_path)))
+
+    # Many small shards; parse them in-process the same way the pool would
+    ranges = preprocess_nse_data._shard_ranges(str(nse_path), shard_size=20000)
+    assert len(ranges) > 5
+    partials = [preprocess_nse_data._parse_shard(str(nse_path), start, end) for start, end in ranges]
+    sharded = preprocess_nse_data._build_master(preprocess_nse_data._merge_partials(partials))
+    assert sharded == serial
+    assert sum(p['count'] for p in partials) == len(samples)
+
+    # Second run on the same bytes is skipped without touching the master
+    monkeypatch.setattr(preprocess_nse_data, "NSE_JSON_PATH", str(nse_path))
+    monkeypatch.setattr(preprocess_nse_data, "OUTPUT_PATH", str(tmp_path / "master.json"))
+    monkeypatch.setattr(preprocess_nse_data, "INDEX_PATH", str(tmp_path / "master.bin"))
+    monkeypatch.setattr(preprocess_nse_data, "META_PATH", str(tmp_path / "master.meta.json"))
+    preprocess_nse_data.preprocess_nse_data(parallel=False)
+    mtime = os.path.getmtime(tmp_path / "master.json")
+    time.sleep(0.01)
+    preprocess_nse_data.preprocess_nse_data(parallel=False)
+    assert os.path.getmtime(tmp_path / "master.json") == mtime
+
+    # Reformatted but equivalent input: parsed again, master not rewritten
+    nse_path.write_text(json.dumps(samples))
+    preprocess_nse_data.preprocess_nse_data(parallel=False)
+    assert os.path.getmtime(tmp_path / "master.json") == mtime
+
+
+def test_shard_split_inside_a_record_falls_back_to_serial(tmp_path, monkeypatch):
+    import preprocess_nse_data
+
+    records = [
+        {"segment": "NSE_EQ", "instrument_type": "EQ", "trading_symbol": f"S{i}", "instrument_key": f"NSE_EQ|{i}",
+         "name": "A},{B" if i % 7 == 0 else f"STOCK {i}", "legs": [{"x": i}, {"y": i}]}
+        for i in range(400)
+    ]
+    nse_path = tmp_path / "NSE.json"
+    nse_path.write_text(json.dumps(records))
+    serial = preprocess_nse_data._build_master(preprocess_nse_data._parse_serial(str(nse_path)))
+
+    # Compact JSON: most candidate boundaries fall inside "legs" or the name string
+    ranges = preprocess_nse_data._shard_ranges(str(nse_path), shard_size=3000)
+    with pytest.raises(preprocess_nse_data.ShardBoundaryError):
+        for start, end in ranges:
+            preprocess_nse_data._parse_shard(str(nse_path), start, end)
+
+    monkeypatch.setattr(preprocess_nse_data, "SHARD_SIZE", 3000)
+    assert preprocess_nse_data._build_master(preprocess_nse_data._parse_parallel(str(nse_path), workers=2)) == serial
+    assert len(serial["EQ_MAP"]) == 400
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
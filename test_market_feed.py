@@ -0,0 +1,153 @@
+import sys
+import os
+import struct
+
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import upstox_market
+from services.market_feed import MarketFeed, ReplaySource, decode_feed_response
+from upstox_fo_complete import UpstoxFOData
+
+TICKS = [
+    {"instrument_key": "NSE_INDEX|Nifty 50", "ltp": 24000.0, "cp": 23800.0},
+    {"instrument_key": "NSE_EQ|INE002A01018", "ltp": 2900.0, "cp": 2950.0, "volume": 1200},
+    {"instrument_key": "NSE_INDEX|Nifty 50", "ltp": 24100.0},
+]
+
+
+class NoHTTP:
+    """Transport that fails the test if anything goes over the wire"""
+
+    def get_response(self, *args, **kwargs):
+        raise AssertionError("quote was not served from memory")
+
+
+class FakeAuth:
+    def get_access_token(self):
+        return "token"
+
+
+@pytest.fixture
+def live_feed(monkeypatch):
+    feed = MarketFeed(max_age=0.0)  # only the stream itself may keep a quote fresh
+    monkeypatch.setattr(upstox_market, "market_feed", feed)
+    source = ReplaySource(TICKS)
+    feed.subscribe(t["instrument_key"] for t in TICKS)
+    feed.start(source)
+    assert source.done.wait(2)
+    yield feed
+    feed.stop()
+
+
+def test_replay_populates_quote_table(live_feed):
+    nifty = live_feed.get("NSE_INDEX|Nifty 50")
+    assert nifty["ltp"] == 24100.0
+    assert nifty["close"] == 23800.0                 # previous close kept from the first tick
+    assert nifty["change_pct"] == pytest.approx(300 / 23800 * 100)
+    assert live_feed.stats()["ticks"] == 3
+
+    # Stream gone: quotes fall back to the age rule
+    live_feed.stop()
+    assert live_feed.get("NSE_INDEX|Nifty 50") is None
+    assert live_feed.get("NSE_INDEX|Nifty 50", max_age=60)["ltp"] == 24100.0
+
+
+def test_market_service_reads_from_memory(live_feed, monkeypatch):
+    keys = {"Nifty 50": "NSE_INDEX|Nifty 50", "RELIANCE": "NSE_EQ|INE002A01018"}
+    monkeypatch.setattr(upstox_market.instrument_service, "resolve_instrument_key", keys.get)
+    client = UpstoxFOData(FakeAuth(), NoHTTP())
+
+    quotes = client.get_batch_stock_quotes(["Nifty 50", "RELIANCE.NS"])
+    assert quotes["RELIANCE.NS"]["ltp"] == 2900.0
+    assert quotes["RELIANCE.NS"]["volume"] == 1200
+    assert quotes["Nifty 50"]["close"] == 23800.0
+
+    assert client.get_spot_price("Nifty 50") == 24100.0
+    assert client.get_spot_quote("RELIANCE")["change"] == pytest.approx(-50.0)
+
+
+def test_market_breadth_plugin_reads_from_memory(monkeypatch):
+    import plugins_core
+
+    feed = MarketFeed()
+    monkeypatch.setattr(upstox_market, "market_feed", feed)
+    keys = {
+        "Nifty 50": "NSE_INDEX|Nifty 50",
+        "Bank Nifty": "NSE_INDEX|Nifty Bank",
+        "Nifty Midcap 100": "NSE_INDEX|NIFTY MIDCAP 100",
+    }
+    monkeypatch.setattr(upstox_market.instrument_service, "resolve_instrument_key", keys.get)
+    feed.on_tick(keys["Nifty 50"], 24100.0, 23800.0)
+    feed.on_tick(keys["Bank Nifty"], 51000.0, 51500.0)
+    feed.on_tick(keys["Nifty Midcap 100"], 56000.0, 55000.0)
+
+    monkeypatch.setattr(plugins_core, "UpstoxAuth", lambda key, secret: FakeAuth())
+    monkeypatch.setattr(plugins_core, "UpstoxFOData", lambda auth: UpstoxFOData(auth, NoHTTP()))
+    monkeypatch.setattr(plugins_core.yf, "Ticker", lambda symbol: pytest.fail("breadth went to yfinance"))
+
+    plugin = plugins_core.MarketBreadthPlugin()
+    assert plugin.name == "Market Breadth"
+    result = plugin.analyze({'config': {'UPSTOX_API_KEY': "key", 'UPSTOX_API_SECRET': "secret"}})
+
+    assert result.success and result.data['source'] == "Upstox (Real-time)"
+    indices = result.data['indices']
+    assert indices['NIFTY 50']['price'] == 24100.0
+    assert indices['Bank Nifty']['change'] == pytest.approx(-500 / 51500 * 100)
+    assert indices['Smallcap 100'] == {'price': None, 'change': None}  # not in the master
+    assert result.data['breadth_pct'] == pytest.approx(200 / 3)
+
+
+def _field(number, wire, payload):
+    tag = bytes([number << 3 | wire])
+    if wire == 2:
+        return tag + bytes([len(payload)]) + payload
+    return tag + payload
+
+
+def test_decode_feed_response():
+    ltpc = _field(1, 1, struct.pack("<d", 101.5)) + _field(2, 0, bytes([0x01])) + _field(4, 1, struct.pack("<d", 100.0))
+    ltpc_feed = _field(1, 2, ltpc)
+    full_feed = _field(2, 2, _field(2, 2, _field(1, 2, ltpc)))  # fullFeed.indexFF.ltpc
+    frame = (
+        _field(1, 0, bytes([1]))
+        + _field(2, 2, _field(1, 2, b"NSE_EQ|A") + _field(2, 2, ltpc_feed))
+        + _field(2, 2, _field(1, 2, b"NSE_INDEX|B") + _field(2, 2, full_feed))
+    )
+
+    ticks = decode_feed_response(frame)
+    assert [t[:3] for t in ticks] == [("NSE_EQ|A", 101.5, 100.0), ("NSE_INDEX|B", 101.5, 100.0)]
+    assert [t[4] for t in ticks] == [None, None]  # ltpc and index feeds carry no volume
+
+
+def test_full_feed_volume_reaches_bars(tmp_path):
+    from services.bar_aggregator import BarAggregator
+    from services.bar_store import BarStore
+
+    def frame(ltp, vtt):
+        ltpc = _field(1, 1, struct.pack("<d", ltp)) + _field(4, 1, struct.pack("<d", 100.0))
+        varint = bytes([vtt & 0x7F | 0x80, vtt >> 7])
+        market_ff = _field(1, 2, ltpc) + _field(6, 0, varint)  # fullFeed.marketFF {ltpc, vtt}
+        greeks = _field(1, 2, ltpc) + _field(4, 0, varint)     # firstLevelWithGreeks {ltpc, vtt}
+        return (
+            _field(2, 2, _field(1, 2, b"NSE_EQ|A") + _field(2, 2, _field(2, 2, _field(1, 2, market_ff))))
+            + _field(2, 2, _field(1, 2, b"NSE_FO|C") + _field(2, 2, _field(3, 2, greeks)))
+        )
+
+    feed = MarketFeed()
+    agg = BarAggregator(BarStore(str(tmp_path)), intervals=['1m'])
+    feed.add_listener(agg.on_quote)
+    for ltp, vtt in [(101.0, 1000), (102.0, 1500), (103.0, 1700)]:
+        ticks = decode_feed_response(frame(ltp, vtt))
+        assert [t[4] for t in ticks] == [vtt, vtt]
+        for key, ltp, close, _, volume in ticks:
+            feed.on_tick(key, ltp, close, volume)
+
+    assert feed.quotes.get("NSE_EQ|A")["volume"] == 1700
+    assert agg.bars("NSE_EQ|A", '1m')['volume'].sum() == 700  # first tick sets the baseline
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,51 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.upstox_options import UpstoxOptionsService
+from bench_max_pain import legacy_max_pain, synthetic_chain
+
+
+@pytest.fixture
+def service():
+    return UpstoxOptionsService.__new__(UpstoxOptionsService)
+
+
+def test_matches_legacy_on_random_chains(service):
+    rng = np.random.default_rng(7)
+    for _ in range(10):
+        n = int(rng.integers(5, 60))
+        df = synthetic_chain(rng.choice(np.arange(18000, 26000, 50), n, replace=False), rng)
+        df.loc[rng.integers(0, n), 'CE_OI'] = np.nan  # API sometimes omits OI
+        spot = float(df['strike'].iloc[n // 2])
+
+        new = service.calculate_max_pain(df, spot)
+        old = legacy_max_pain(df, spot)
+
+        assert new['max_pain_strike'] == old['max_pain_strike']
+        assert new['distance_pct'] == pytest.approx(old['distance_pct'])
+
+
+def test_pain_curve(service):
+    df = pd.DataFrame({
+        'strike': [100.0, 110.0, 120.0],
+        'CE_OI': [0, 10, 0],
+        'PE_OI': [0, 0, 5],
+    })
+    result = service.calculate_max_pain(df, 110.0)
+    curve = result['pain_curve']
+
+    # Settle at 100: puts at 120 pay 20*5; at 120: calls at 110 pay 10*10
+    assert list(curve['total_pain']) == [100.0, 50.0, 100.0]
+    assert result['max_pain_strike'] == 110.0
+    assert service.calculate_max_pain(pd.DataFrame(), 0)['pain_curve'].empty
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,107 @@
+import sys
+import os
+import textwrap
+
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from architecture_modular import REGISTRY, PluginSpec
+from import_profile import parse_importtime
+from plugin_manifest import PLUGIN_MANIFEST
+
+PLUGIN_SOURCE = textwrap.dedent('''
+    from architecture_modular import AnalysisPlugin, AnalysisResult, register_plugin
+
+    @register_plugin
+    class LazyPlugin(AnalysisPlugin):
+        name = property(lambda self: "{name}")
+        icon = property(lambda self: "")
+        description = property(lambda self: "")
+        category = property(lambda self: "test")
+
+        def analyze(self, context):
+            return AnalysisResult(True, {{}})
+
+        def render(self, result):
+            pass
+''')
+
+
+@pytest.fixture
+def lazy_modules(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    created = []
+
+    def make(module, name):
+        (tmp_path / f"{module}.py").write_text(PLUGIN_SOURCE.format(name=name))
+        created.append((module, name))
+
+    yield make
+
+    for module, name in created:
+        sys.modules.pop(module, None)
+        REGISTRY.plugins.pop(name, None)
+        REGISTRY.manifest.pop(name, None)
+        REGISTRY.load_profile.pop(module, None)
+        if name in REGISTRY.categories.get("test", []):
+            REGISTRY.categories["test"].remove(name)
+
+
+def test_manifest_imports_on_first_use(lazy_modules):
+    lazy_modules("lazy_plugin_a", "Lazy A")
+    REGISTRY.add_manifest([PluginSpec("Lazy A", "test", "lazy_plugin_a"), PluginSpec("Broken", "test", "no_such_plugin_module")])
+
+    assert "Lazy A" in REGISTRY.names() and "Lazy A" in REGISTRY.categories["test"]
+    assert "lazy_plugin_a" not in sys.modules
+
+    plugin = REGISTRY.get_plugin("Lazy A")
+    assert plugin is not None and type(plugin).__module__ == "lazy_plugin_a"
+    assert REGISTRY.load_profile["lazy_plugin_a"]['error'] is None
+    assert REGISTRY.get_plugin("Lazy A") is plugin  # imported once
+
+    # A module that fails to import leaves the rest of the app usable
+    assert REGISTRY.get_plugin("Broken") is None
+    assert REGISTRY.load_profile.pop("no_such_plugin_module")['error']
+    REGISTRY.manifest.pop("Broken")
+    REGISTRY.categories["test"].remove("Broken")
+
+
+def test_manifest_module_wins_name_clash(lazy_modules):
+    lazy_modules("lazy_plugin_b", "Lazy Clash")
+    lazy_modules("lazy_plugin_c", "Lazy Clash")
+    REGISTRY.add_manifest([PluginSpec("Lazy Clash", "test", "lazy_plugin_b")])
+
+    assert type(REGISTRY.get_plugin("Lazy Clash")).__module__ == "lazy_plugin_b"
+    __import__("lazy_plugin_c")  # registers the same name later
+    assert type(REGISTRY.get_plugin("Lazy Clash")).__module__ == "lazy_plugin_b"
+
+
+@pytest.mark.parametrize("module", sorted({spec.module for spec in PLUGIN_MANIFEST}))
+def test_manifest_entries_register_from_their_module(module):
+    loaded = pytest.importorskip(module)
+    for spec in (s for s in PLUGIN_MANIFEST if s.module == module):
+        plugin = REGISTRY.get_plugin(spec.name)
+        assert plugin is not None, spec
+        assert type(plugin).__module__ == module and plugin.category == spec.category, spec
+        # The class the module exports under that name, not one it shadowed
+        assert getattr(loaded, type(plugin).__name__) is type(plugin), spec
+
+
+def test_parse_importtime():
+    report = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   _io",
+        "import time:       300 |        300 |     numpy.core",
+        "import time:      1000 |       1500 |   numpy",
+        "import time:        50 |       1550 | plugins_chart",
+    ])
+    df = parse_importtime(report)
+    assert list(df['module']) == ["_io", "numpy.core", "numpy", "plugins_chart"]
+    assert list(df['depth']) == [1, 2, 1, 0]
+    assert df.loc[df['module'] == "numpy", 'cumulative_us'].item() == 1500
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
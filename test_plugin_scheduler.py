@@ -0,0 +1,131 @@
+import sys
+import os
+import time
+
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from architecture_modular import AnalysisPlugin, AnalysisResult, JobManager, PluginRegistry, PluginScheduler
+
+
+class FakePlugin(AnalysisPlugin):
+    """Sleeps, then publishes '<name>:<key>' for each provided key and echoes what it saw"""
+
+    def __init__(self, name, provides=(), requires=(), delay=0.0, fail=False):
+        self._name, self._provides, self._requires = name, list(provides), list(requires)
+        self.delay, self.fail = delay, fail
+
+    name = property(lambda self: self._name)
+    icon = property(lambda self: "")
+    description = property(lambda self: "")
+    category = property(lambda self: "test")
+    provides = property(lambda self: self._provides)
+    requires = property(lambda self: self._requires)
+
+    def analyze(self, context):
+        if 'report_progress' in context:
+            context['report_progress'](0.5, "halfway")
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return AnalysisResult(True, {
+            **{key: f"{self.name}:{key}" for key in self.provides},
+            'seen': {key: context.get(key) for key in self.requires},
+            'finished': time.perf_counter(),
+        })
+
+    def render(self, result):
+        pass
+
+
+def registry_of(*plugins):
+    registry = PluginRegistry()
+    for plugin in plugins:
+        registry.register(plugin)
+    return registry
+
+
+def test_independent_plugins_run_concurrently():
+    names = [f"P{i}" for i in range(5)]
+    scheduler = PluginScheduler(registry_of(*[FakePlugin(n, delay=0.2) for n in names]), max_workers=5)
+
+    start = time.perf_counter()
+    results = scheduler.run(names, {})
+    elapsed = time.perf_counter() - start
+
+    assert set(results) == set(names)
+    assert all(r.success for r in results.values())
+    assert elapsed < 0.6  # ~max(plugin), not sum(plugin) = 1.0s
+
+
+def test_upstream_outputs_flow_through_context():
+    options = FakePlugin("Options", provides=['option_chain', 'pcr'], delay=0.05)
+    state = FakePlugin("State", requires=['option_chain', 'pcr'])
+    registry = registry_of(options, state)
+    scheduler = PluginScheduler(registry)
+
+    assert registry.build_dag(["State", "Options"]) == {"State": {"Options"}, "Options": set()}
+
+    results = scheduler.run(["State", "Options"], {'symbol': 'X'})
+    assert results["State"].data['seen'] == {'option_chain': "Options:option_chain", 'pcr': "Options:pcr"}
+    assert results["State"].data['finished'] > results["Options"].data['finished']
+
+    # Provider outside the run: fed from prior results, or pulled in with include_upstream
+    alone = scheduler.run(["State"], {}, prior_results={"Options": results["Options"]})
+    assert set(alone) == {"State"}
+    assert alone["State"].data['seen']['pcr'] == "Options:pcr"
+    assert set(scheduler.run(["State"], {}, include_upstream=True)) == {"State", "Options"}
+
+
+def test_failures_and_cycles():
+    broken = FakePlugin("Broken", provides=['pcr'], fail=True)
+    consumer = FakePlugin("Consumer", requires=['pcr'])
+    results = PluginScheduler(registry_of(broken, consumer)).run(["Broken", "Consumer"], {})
+    assert not results["Broken"].success and results["Broken"].error == "boom"
+    assert results["Consumer"].success and results["Consumer"].data['seen'] == {'pcr': None}
+
+    a = FakePlugin("A", provides=['x'], requires=['y'])
+    b = FakePlugin("B", provides=['y'], requires=['x'])
+    with pytest.raises(ValueError):
+        registry_of(a, b).build_dag(["A", "B"])
+
+
+def test_background_job_reports_partial_results():
+    fast = FakePlugin("Fast", provides=['pcr'], delay=0.05)
+    slow = FakePlugin("Slow", requires=['pcr'], delay=0.3)
+    jobs = JobManager(PluginScheduler(registry_of(fast, slow)), max_jobs=2)
+
+    start = time.perf_counter()
+    job = jobs.submit(["Fast", "Slow"], {'symbol': 'X'})
+    assert time.perf_counter() - start < 0.05  # submit never waits on analyze()
+    assert job.symbol == 'X'
+
+    deadline = time.time() + 2
+    # Slow is submitted once Fast's result lands; wait for its first progress report too
+    while ('Fast' not in job.results or "Slow" not in job.progress) and time.time() < deadline:
+        time.sleep(0.01)
+    partial = job.take_results()
+    assert set(partial) == {"Fast"} and not job.done()
+    assert job.status["Slow"] == 'running' and job.progress["Slow"] == (0.5, "halfway")
+
+    job.future.result(timeout=2)
+    assert set(job.take_results()) == {"Slow"}  # only what is new
+    assert job.status == {"Fast": 'done', "Slow": 'done'}
+
+
+def test_cancelled_job_starts_nothing_new():
+    first = FakePlugin("First", provides=['pcr'], delay=0.2)
+    second = FakePlugin("Second", requires=['pcr'])
+    job = JobManager(PluginScheduler(registry_of(first, second))).submit(["First", "Second"], {})
+    time.sleep(0.05)
+    job.cancel()
+
+    results = job.future.result(timeout=2)
+    assert set(results) == {"First"}  # already running: finishes, but Second never starts
+    assert job.status["Second"] == 'skipped'
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,128 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import make_ohlcv
+from indicator_panel import IndicatorPanel
+from services.alpha_engine import AlphaEngine, alpha_score_panel
+from services.portfolio_backtest import PortfolioBacktester, momentum_score
+
+
+def ohlcv(n, seed, start="2018-01-01"):
+    return make_ohlcv(n, seed, start=start, drift=0.0004, vol=0.015)
+
+
+def universe():
+    frames = {f"S{i}": ohlcv(700, i) for i in range(12)}
+    frames["LATE"] = ohlcv(300, 99, start="2019-06-03")
+    return IndicatorPanel(frames)
+
+
+def naive_equity(bt, targets, bars):
+    """Share-by-share reference: revalue daily, trade to targets at rebalance closes"""
+    prices = bt.prices
+    shares, cash = np.zeros(len(prices)), 1.0
+    equity, turnover = np.ones(prices.shape[1]), []
+    rebalances = {bar: k for k, bar in enumerate(bars)}
+    for t in range(prices.shape[1]):
+        px = np.nan_to_num(prices[:, t])
+        value = cash + (shares * px).sum()
+        if t in rebalances:
+            w = targets[:, rebalances[t]]
+            traded = np.abs(w - shares * px / value).sum()
+            turnover.append(traded)
+            value *= 1 - bt.cost * traded
+            shares = np.where(w > 0, w * value / np.where(px > 0, px, 1), 0.0)
+            cash = value * (1 - w.sum())
+        equity[t] = value
+    return equity, np.array(turnover)
+
+
+def test_simulate_matches_share_level_loop():
+    panel = universe()
+    bt = PortfolioBacktester(panel, cost_bps=10, slippage_bps=5)
+    bars = bt.rebalance_bars('weekly')
+    targets = bt.select_top_k(momentum_score(panel, 126), bars, 4)
+
+    equity, turnover = bt.simulate(targets, bars)
+    expected_equity, expected_turnover = naive_equity(bt, targets, bars)
+    assert np.allclose(equity, expected_equity, rtol=1e-12)
+    assert np.allclose(turnover, expected_turnover, atol=1e-12)
+
+
+def test_top_k_selection_skips_unlisted_and_unscored():
+    panel = universe()
+    bt = PortfolioBacktester(panel)
+    bars = bt.rebalance_bars('monthly')
+    scores = momentum_score(panel, 126)
+    weights = bt.select_top_k(scores, bars, 5)
+
+    late = panel.row("LATE")
+    before_listing = panel.index[bars] < pd.Timestamp("2019-06-03") + pd.offsets.BDay(126)
+    assert (weights[late, before_listing] == 0).all()
+    # Nothing is scored during the lookback: the portfolio stays in cash
+    assert (weights[:, panel.index[bars] < panel.index[126]] == 0).all()
+
+    at = scores[:, bars[-1]]
+    assert set(np.flatnonzero(weights[:, -1])) == set(np.argsort(-at)[:5])
+    assert np.allclose(weights[:, -1].sum(), 1.0)
+
+
+def test_costs_and_turnover():
+    panel = universe()
+    free = PortfolioBacktester(panel, cost_bps=0, slippage_bps=0).run('Momentum 6M', top_k=4)
+    costly = PortfolioBacktester(panel, cost_bps=20, slippage_bps=10).run('Momentum 6M', top_k=4)
+    assert costly.equity.iloc[-1] < free.equity.iloc[-1]
+    assert np.allclose(costly.turnover, free.turnover)
+    # First invested rebalance buys the whole book; later turnover is bounded by a full swap
+    first = np.flatnonzero(free.weights.sum(axis=1).to_numpy() > 0)[0]
+    assert free.turnover.iloc[first] == pytest.approx(1.0)
+    assert (free.turnover <= 2.0 + 1e-12).all()
+    assert free.holdings().iloc[-1] and len(free.holdings().iloc[-1]) == 4
+
+    with pytest.raises(ValueError):
+        PortfolioBacktester(panel).run('Momentum 6M', schedule='hourly')
+
+
+def test_benchmark_invests_alongside_the_strategy():
+    panel = universe()
+    result = PortfolioBacktester(panel).run('Momentum 6M', top_k=4)
+    first = panel.index.get_loc(result.weights.index[result.weights.sum(axis=1) > 0][0])
+    # Both curves hold cash through the score warm-up and start trading on the same bar
+    assert (result.benchmark.iloc[:first] == 1).all() and (result.equity.iloc[:first] == 1).all()
+    assert result.benchmark.iloc[first] < 1                     # buy-in costs on the same bar
+
+
+def test_metrics_start_at_the_first_invested_rebalance():
+    panel = universe()
+    bt = PortfolioBacktester(panel, cost_bps=0, slippage_bps=0)
+    result = bt.run('Momentum 6M', top_k=4)
+    invested = result.weights.sum(axis=1).to_numpy() > 0
+    first = panel.index.get_loc(result.weights.index[invested][0])
+
+    years = (len(panel.index) - first) / bt.periods_per_year
+    assert result.metrics['CAGR'] == pytest.approx((result.equity.iloc[-1] ** (1 / years) - 1) * 100)
+    # Turnover after the buy-in only: the warm-up and the 100% initial purchase are excluded
+    later = result.turnover[invested].iloc[1:].sum()
+    assert result.metrics['Annual Turnover'] == pytest.approx(later / years * 100)
+    assert result.metrics['Avg Holdings'] == pytest.approx(4.0)
+
+
+def test_alpha_score_panel_matches_alpha_engine():
+    frames = {f"S{i}": ohlcv(320, i) for i in range(3)}
+    panel = IndicatorPanel(frames)
+    scores = alpha_score_panel(panel)
+    for row, (sym, df) in enumerate(frames.items()):
+        for t in (250, 300, 319):
+            expected = AlphaEngine(df.iloc[:t + 1].rename(columns=str.title)).analyze()['total_score']
+            assert scores[row, t] == pytest.approx(expected), (sym, t)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
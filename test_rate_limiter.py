@@ -0,0 +1,102 @@
+import sys
+import os
+import time
+import threading
+
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import UPSTOX_BACKOFF
+from services.rate_limiter import RateLimiter, PRIORITY_BULK, PRIORITY_INTERACTIVE
+from services.upstox_base import UpstoxBaseService
+
+
+def test_endpoint_families():
+    assert RateLimiter.endpoint_for("https://api.upstox.com/v2/market-quote/quotes") == "market-quote"
+    assert RateLimiter.endpoint_for("https://api.upstox.com/v2/option/chain") == "option"
+    assert RateLimiter.endpoint_for("http://127.0.0.1:5000/") == "default"
+
+
+def test_bucket_limits_throughput():
+    limiter = RateLimiter({'default': {'rate': 20, 'burst': 1}})
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire("quotes")
+    assert time.monotonic() - start >= 0.2
+    assert limiter.metrics()["quotes"]['requests'] == 6
+
+
+def test_interactive_jumps_bulk_queue():
+    limiter = RateLimiter({'default': {'rate': 5, 'burst': 1}})
+    limiter.acquire("quotes")  # drain the bucket
+    order = []
+
+    def worker(name, priority):
+        limiter.acquire("quotes", priority)
+        order.append(name)
+
+    threads = [threading.Thread(target=worker, args=(f"bulk{i}", PRIORITY_BULK)) for i in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    assert limiter.metrics()["quotes"]['queue_depth'] == 3
+
+    hud = threading.Thread(target=worker, args=("hud", PRIORITY_INTERACTIVE))
+    hud.start()
+    for t in threads + [hud]:
+        t.join()
+
+    assert order[0] == "hud"
+    assert limiter.metrics()["quotes"]['max_queue_depth'] == 4
+
+
+class FakeResponse:
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self._body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self._body
+
+
+class ScriptedTransport:
+    """Answers with a fixed sequence of responses"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get_response(self, url, headers, params):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class FakeAuth:
+    def get_access_token(self):
+        return "token"
+
+
+def test_429_backs_off_and_retries(monkeypatch):
+    monkeypatch.setitem(UPSTOX_BACKOFF, 'base_delay', 0.05)
+    transport = ScriptedTransport([
+        FakeResponse(429, {"status": "error", "errors": [{"errorCode": "UDAPI10005"}]}),
+        FakeResponse(200, {"status": "success", "data": {}}),
+    ])
+    service = UpstoxBaseService(FakeAuth(), transport)
+    service.rate_limiter = RateLimiter({'default': {'rate': 10, 'burst': 10}})
+
+    start = time.monotonic()
+    data = service._make_api_call("https://api.upstox.com/v2/option/chain", {})
+
+    assert data["status"] == "success"
+    assert transport.calls == 2
+    assert time.monotonic() - start >= 0.05
+    metrics = service.rate_limiter.metrics()["option"]
+    assert metrics['throttled'] == 1
+    assert metrics['rate'] < 10  # adaptive: slowed down after the 429
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,133 @@
+import sys
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from architecture_modular import AnalysisPlugin, AnalysisResult, ResultCache
+
+
+class CountingPlugin(AnalysisPlugin):
+    """Counts analyze() calls; payload size is configurable for eviction tests"""
+
+    def __init__(self, name="Forensic Lab", ttl=60, payload=0, delay=0.0):
+        self._name, self._ttl, self.payload, self.delay = name, ttl, payload, delay
+        self.calls = 0
+
+    name = property(lambda self: self._name)
+    icon = property(lambda self: "")
+    description = property(lambda self: "")
+    category = property(lambda self: "test")
+    cache_ttl = property(lambda self: self._ttl)
+
+    def analyze(self, context):
+        self.calls += 1
+        time.sleep(self.delay)
+        return AnalysisResult(True, {'symbol': context['symbol'], 'blob': np.zeros(self.payload, dtype=np.uint8)})
+
+    def render(self, result):
+        pass
+
+
+def context(symbol="^NSEI", start="2024-01-01", key="k"):
+    return {'symbol': symbol, 'date_range': {'start': start, 'end': "2024-06-01"}, 'config': {'UPSTOX_API_KEY': key}}
+
+
+def test_hits_are_flagged_and_keyed_by_inputs():
+    cache = ResultCache(max_bytes=10_000_000)
+    plugin = CountingPlugin()
+
+    first = cache.get_or_run(plugin, context())
+    assert not first.cached and first.timestamp is not None
+    second = cache.get_or_run(plugin, context())
+    assert second.cached and second.timestamp == first.timestamp
+    assert plugin.calls == 1
+
+    cache.get_or_run(plugin, context(symbol="RELIANCE.NS"))   # different symbol
+    cache.get_or_run(plugin, context(start="2023-01-01"))     # different date range
+    cache.get_or_run(plugin, context(key="other"))            # different config
+    assert plugin.calls == 4
+
+    assert not cache.get_or_run(plugin, context(), refresh=True).cached
+    assert plugin.calls == 5
+
+
+def test_ttl_and_lru_memory_cap():
+    cache = ResultCache(max_bytes=2_500)
+    short = CountingPlugin("Options Analysis", ttl=0.1)
+    cache.get_or_run(short, context())
+    time.sleep(0.15)
+    assert not cache.get_or_run(short, context()).cached       # expired
+    never = CountingPlugin("My Portfolio", ttl=0)
+    cache.get_or_run(never, context())
+    cache.get_or_run(never, context())
+    assert never.calls == 2
+
+    big = CountingPlugin(payload=1_000)
+    for symbol in ["A", "B", "C"]:
+        cache.get_or_run(big, context(symbol=symbol))
+    assert cache.stats()['bytes'] <= 2_500
+    assert cache.stats()['evictions'] >= 1
+    assert cache.get_or_run(big, context(symbol="C")).cached      # newest kept
+    assert not cache.get_or_run(big, context(symbol="A")).cached  # oldest went first
+
+
+def test_upstream_values_are_part_of_the_key():
+    import pandas as pd
+
+    class DependentPlugin(CountingPlugin):
+        requires = property(lambda self: ['option_chain', 'pcr'])
+
+    cache = ResultCache(max_bytes=10_000_000)
+    plugin = DependentPlugin("Market State")
+    chain = pd.DataFrame({'strike': [24000, 24100], 'ce_oi': [100, 200]})
+
+    cache.get_or_run(plugin, context())
+    cache.get_or_run(plugin, {**context(), 'option_chain': chain, 'pcr': {'pcr': 0.9}})
+    assert plugin.calls == 2
+    # Equal values (a fresh copy) hit; another chain or PCR for the same symbol and range misses
+    assert cache.get_or_run(plugin, {**context(), 'option_chain': chain.copy(), 'pcr': {'pcr': 0.9}}).cached
+    other = chain.assign(ce_oi=[100, 250])
+    assert not cache.get_or_run(plugin, {**context(), 'option_chain': other, 'pcr': {'pcr': 0.9}}).cached
+    assert not cache.get_or_run(plugin, {**context(), 'option_chain': chain, 'pcr': {'pcr': 1.1}}).cached
+    assert plugin.calls == 4
+
+
+def test_concurrent_sessions_share_one_run():
+    cache = ResultCache(max_bytes=10_000_000)
+    plugin = CountingPlugin(delay=0.2)
+    threads = [threading.Thread(target=cache.get_or_run, args=(plugin, context())) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert plugin.calls == 1
+    assert cache.stats()['coalesced'] == 9
+
+
+def test_sessions_get_their_own_payload():
+    from services.single_flight import single_flight
+
+    cache = ResultCache(max_bytes=10_000_000)
+    plugin = CountingPlugin(payload=10)
+    fetch_requests = single_flight.stats()['requests']
+
+    first = cache.get_or_run(plugin, context())
+    first.data['blob'][:] = 7          # one session edits its result in place
+    first.data['extra'] = "scribble"
+    second = cache.get_or_run(plugin, context())
+    assert second.cached and not second.data['blob'].any() and 'extra' not in second.data
+    second.data['blob'][:] = 1
+    assert not cache.get_or_run(plugin, context()).data['blob'].any()
+
+    # Result-cache coalescing stays out of the fetch dedup stats
+    assert single_flight.stats()['requests'] == fetch_requests
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+import threading
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+    results = []
+
+    def slow_fetch():
+        executions.append(1)
+        time.sleep(0.2)
+        return "bars"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do(("^NSEI", "1d", "a", "b"), slow_fetch))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["bars"] * 5
+    assert len(executions) == 1
+    stats = flight.stats()
+    assert stats['executions'] == 1 and stats['dedup_hits'] == 4 and stats['in_flight'] == 0
+
+
+def test_do_many_only_fetches_unclaimed_keys():
+    flight = SingleFlight()
+    batches = []
+    started = threading.Event()
+
+    def slow_batch(keys):
+        batches.append(sorted(keys))
+        started.set()
+        time.sleep(0.2)
+        return {k: f"df-{k}" for k in keys}
+
+    first = threading.Thread(target=lambda: flight.do_many(["A", "B"], slow_batch))
+    first.start()
+    started.wait()
+    second = flight.do_many(["B", "C"], slow_batch)
+    first.join()
+
+    assert batches == [["A", "B"], ["C"]]
+    assert second == {"B": "df-B", "C": "df-C"}
+    assert flight.stats()['dedup_hits'] == 1
+
+
+def test_errors_propagate_to_followers():
+    flight = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("No data")
+
+    def call():
+        try:
+            flight.do("X", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == ["No data"] * 3
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
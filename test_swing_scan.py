@@ -0,0 +1,107 @@
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import make_ohlcv
+import plugins_sector_rotation
+from feature_frame import FeatureFrame
+from indicator_panel import IndicatorPanel
+from plugins_sector_rotation import relative_rotation, scan_universe, universe_symbols
+from services.bar_store import BarStore
+
+
+def ohlcv(n=45, seed=0):
+    # Uptrend with a varying daily range, ending on a fixed date
+    return make_ohlcv(n, seed, end="2024-06-28", drift=0.003, vol=0.015, spread=(0.002, 0.03))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BarStore(str(tmp_path))
+    for i in range(40):
+        df = ohlcv(seed=i)
+        # Illiquid names: no trade on a day inside their last 20 bars
+        store.write(f"S{i:02d}.NS", df.drop(df.index[-3 - i % 10]) if i % 4 == 0 else df)
+    store.write("THIN.NS", ohlcv(10, seed=99))   # too short for SMA20
+    return store
+
+
+def expected_survivors(store, symbols):
+    """The per-symbol loop the scan replaces"""
+    passed = {}
+    for sym in symbols:
+        df = store.read(sym)
+        if len(df) < 20:
+            continue
+        features = FeatureFrame(df)
+        rsi = features.rsi(14).iloc[-1]
+        if df['close'].iloc[-1] > features.sma(20).iloc[-1] and 50 <= rsi <= 75:
+            passed[sym] = df['volume'].iloc[-1] / features.sma(20, 'volume').iloc[-1]
+    return passed
+
+
+def test_batched_scan_matches_per_symbol_filters(store):
+    symbols = store.symbols()
+    calls = []
+
+    def futures_oi(syms):
+        calls.append(list(syms))
+        return {syms[0]: {'interpretation': 'Long Buildup', 'oi': 1}}
+
+    ranked, stages = scan_universe(symbols, "2024-01-01", "2024-07-01", store=store,
+                                   futures_oi=futures_oi, batch_size=7)
+
+    expected = expected_survivors(store, symbols)
+    assert expected and sorted(ranked['Symbol']) == sorted(expected)
+    assert any(sym in expected for sym in ["S00.NS", "S04.NS", "S08.NS", "S12.NS", "S16.NS", "S20.NS",
+                                           "S24.NS", "S28.NS", "S32.NS", "S36.NS"])  # gappy survivors kept
+    for row in ranked.itertuples():
+        assert row.RVOL == pytest.approx(expected[row.Symbol])
+
+    # One OI call for the survivors of every batch; confirmed setups get the bonus
+    assert calls == [calls[0]] and sorted(calls[0]) == sorted(expected)
+    assert ranked.loc[ranked['Symbol'] == calls[0][0], 'OI Signal'].item() == "Bullish (Long Buildup)"
+    assert list(ranked['Setup Score']) == sorted(ranked['Setup Score'], reverse=True)
+
+    stages = stages.set_index('Stage')
+    assert stages.loc["Load + align local bars", 'In'] == len(symbols)
+    assert stages.loc["Trend: Price > SMA20", 'In'] == len(symbols)
+    assert stages.loc["RSI 50-75", 'In'] == stages.loc["Trend: Price > SMA20", 'Out']
+    assert stages.loc["RSI 50-75", 'Out'] == len(expected)
+    assert (stages['Pruned'] >= 0).all() and (stages['Time (ms)'] >= 0).all()
+
+
+def test_universe_is_local_eq_symbols(store, monkeypatch):
+    monkeypatch.setattr(plugins_sector_rotation.instrument_service, "get_equity_symbols",
+                        lambda: ["S00", "S01", "THIN", "NOTSTORED"])
+    assert universe_symbols(store) == ["S00.NS", "S01.NS", "THIN.NS"]
+
+    ranked, stages = scan_universe([], "2024-01-01", "2024-07-01", store=store)
+    assert ranked.empty and list(ranked.columns)[:2] == ['Symbol', 'Sector']
+
+
+def test_relative_rotation_uses_dates_shared_with_benchmark():
+    bench = ohlcv(60, seed=1)['close']
+    sectors = {
+        "ALIGNED": ohlcv(60, seed=2),
+        "EXTRA": pd.concat([ohlcv(60, seed=3), ohlcv(1, seed=4).set_axis([bench.index[-1] + pd.Timedelta(days=1)])]).sort_index(),
+        "GAPPY": ohlcv(60, seed=5).drop(bench.index[[-4, -12]]),
+    }
+    ratios, moms = relative_rotation(IndicatorPanel(sectors), bench)
+
+    for i, df in enumerate(sectors.values()):
+        # The per-sector inner join the panel replaces
+        merged = pd.concat([df['close'], bench], axis=1, join='inner')
+        rs = 100 * (merged.iloc[:, 0] / merged.iloc[:, 1])
+        rs_ratio = 100 + ((rs - rs.rolling(10).mean()) / rs.rolling(10).std())
+        assert ratios[i] == pytest.approx(rs_ratio.iloc[-1])
+        assert moms[i] == pytest.approx(100 + (rs_ratio.iloc[-1] - rs_ratio.iloc[-2]) * 10)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,137 @@
+import sys
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import upstox_history
+from services.bar_store import BarStore
+from services.upstox_transport import UpstoxTransport
+from upstox_fo_complete import UpstoxFOData
+
+
+class StubCandles(BaseHTTPRequestHandler):
+    """v3 historical-candle stand-in: one daily candle per business day in [from, to], newest first"""
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def do_GET(self):
+        state = self.state
+        with state['lock']:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            state['paths'].append(unquote(self.path))
+
+        time.sleep(0.05)
+        # /v3/historical-candle/{key}/{unit}/{n}/{to}/{from}
+        parts = urlparse(self.path).path.split("/")
+        days = pd.bdate_range(parts[-1], parts[-2])[::-1]
+        body = {"status": "success", "data": {"candles": [
+            [f"{d.strftime('%Y-%m-%d')}T00:00:00+05:30", 100.0, 102.0, 99.0, 101.0 + i, 1000, 0]
+            for i, d in enumerate(days)
+        ]}}
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+        with state['lock']:
+            state['active'] -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeAuth:
+    def get_access_token(self):
+        return "token"
+
+
+@pytest.fixture
+def candle_client(tmp_path, monkeypatch):
+    StubCandles.state = {'lock': threading.Lock(), 'active': 0, 'peak': 0, 'paths': []}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCandles)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(upstox_history, "bar_store", BarStore(str(tmp_path)))
+
+    transport = UpstoxTransport(pool_size=4)
+    client = UpstoxFOData(FakeAuth(), transport)
+    client.base_url = f"http://127.0.0.1:{server.server_address[1]}/v2"
+    yield client, StubCandles.state
+
+    transport.close()
+    server.shutdown()
+
+
+def test_calls_are_chunked_per_interval_limit(candle_client):
+    client, _ = candle_client
+    daily = client._candle_calls("NSE_EQ|INE002A01018", "1d", "2022-01-01", "2024-03-01")
+    assert len(daily) == 3                      # 365-day chunks
+    assert daily[0][0].endswith("/v3/historical-candle/NSE_EQ%7CINE002A01018/days/1/2022-12-31/2022-01-01")
+    assert daily[-1][0].endswith("/2024-02-29/2024-01-01")
+
+    five = client._candle_calls("NSE_EQ|X", "5m", "2024-01-01", "2024-03-01")
+    assert len(five) == 3                       # 28-day chunks
+    assert "/minutes/5/" in five[0][0]
+
+
+def test_backfill_fills_store_and_skips_covered(candle_client):
+    client, state = candle_client
+    keys = {"RELIANCE.NS": "NSE_EQ|INE002A01018", "INFY.NS": "NSE_EQ|INE009A01021"}
+
+    stored = client.backfill(keys, "2022-01-01", "2024-01-01")
+
+    expected_days = pd.bdate_range("2022-01-01", "2023-12-31")
+    for sym in keys:
+        assert list(stored[sym].index) == list(expected_days)
+        assert {'open', 'high', 'low', 'close', 'volume'} <= set(stored[sym].columns)
+        assert 'oi' not in stored[sym].columns
+    assert len(state['paths']) == 4             # 2 symbols x 2 yearly chunks, one fan-out
+    assert state['peak'] > 1
+
+    # Covered now: nothing goes over the wire
+    client.backfill(keys, "2022-06-01", "2023-06-01")
+    assert len(state['paths']) == 4
+
+    # Extending the range only requests the gap
+    client.backfill({"INFY.NS": keys["INFY.NS"]}, "2021-10-01", "2023-06-01")
+    assert state['paths'][-1].endswith("/days/1/2021-12-31/2021-10-01")
+
+
+def test_history_and_streamed_bars_share_ist_naive_stamps(tmp_path, host_tz):
+    from services.bar_aggregator import BarAggregator
+
+    store = BarStore(str(tmp_path))
+    key = "NSE_EQ|INE002A01018"
+    # Downloaded 1m candles for 09:15 / 09:16 IST, then live ticks for 09:17 / 09:18
+    history = upstox_history.UpstoxHistoryService._parse_candles([{"status": "success", "data": {"candles": [
+        ["2024-01-02T09:16:00+05:30", 101.0, 101.0, 101.0, 101.0, 10, 0],
+        ["2024-01-02T09:15:00+05:30", 100.0, 100.0, 100.0, 100.0, 10, 0],
+    ]}}])
+    store.merge(key, history, '1m')
+
+    agg = BarAggregator(store, intervals=['1m'])
+    live_start = int(pd.Timestamp("2024-01-02 09:17", tz="Asia/Kolkata").timestamp())
+    for offset in (0, 60):
+        agg.on_quote(key, {'ltp': 102 + offset / 60, 'ts': live_start + offset})
+    agg.flush(include_open=True)
+
+    bars = store.read(key, '1m')
+    assert bars.index.tz is None
+    assert list(bars.index) == list(pd.date_range("2024-01-02 09:15", periods=4, freq="min"))
+    assert list(bars['close']) == [100, 101, 102, 103]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,192 @@
+import sys
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import upstox_market, upstox_options
+from services.upstox_transport import UpstoxTransport
+from upstox_fo_complete import UpstoxFOData
+
+
+class StubUpstox(BaseHTTPRequestHandler):
+    """Minimal Upstox v2 stand-in: quotes + option chain, records concurrency and connections"""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    state = None
+
+    def do_GET(self):
+        state = self.state
+        with state['lock']:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            state['ports'].add(self.client_address[1])
+            state['paths'].append(self.path)
+
+        time.sleep(0.1)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if url.path.endswith("/market-quote/quotes"):
+            keys = query['instrument_key'][0].split(",")
+            body = {"status": "success", "data": {
+                k.replace("|", ":"): {"instrument_token": k, "last_price": 101.0, "net_change": 1.0,
+                                      "ohlc": {"close": 100.0}, "volume": 10}
+                for k in keys
+            }}
+        elif url.path.endswith("/option/chain"):
+            body = {"status": "success", "data": [
+                {"strike_price": strike,
+                 "call_options": {"market_data": {"ltp": 5, "oi": 100, "prev_oi": 90}, "option_greeks": {"iv": 12}},
+                 "put_options": {"market_data": {"ltp": 6, "oi": 200, "prev_oi": 150}, "option_greeks": {"iv": 13}}}
+                for strike in ((100.0, 105.0, 110.0) if query.get('expiry_date') == ['2024-01-25'] else (95.0, 100.0, 105.0))
+            ]}
+        else:
+            body = {"status": "error", "errors": [{"errorCode": "404"}]}
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+        with state['lock']:
+            state['active'] -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeAuth:
+    def get_access_token(self):
+        return "token"
+
+    def invalidate_token(self):
+        pass
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    StubUpstox.state = {'lock': threading.Lock(), 'active': 0, 'peak': 0, 'ports': set(), 'paths': []}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUpstox)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    resolve = lambda sym: f"NSE_EQ|{sym}"
+    monkeypatch.setattr(upstox_market.instrument_service, 'resolve_instrument_key', resolve)
+    monkeypatch.setattr(upstox_options.instrument_service, 'resolve_instrument_key', resolve)
+
+    transport = UpstoxTransport(pool_size=4)
+    client = UpstoxFOData(FakeAuth(), transport)
+    client.base_url = f"http://127.0.0.1:{server.server_address[1]}/v2"
+    yield client, StubUpstox.state
+
+    transport.close()
+    server.shutdown()
+
+
+def test_batch_quotes_fan_out_chunks(stub_client):
+    client, state = stub_client
+    symbols = [f"S{i}.NS" for i in range(120)]
+
+    quotes = client.get_batch_stock_quotes(symbols)
+
+    assert set(quotes) == set(symbols)
+    assert quotes["S0.NS"]["change_pct"] == pytest.approx(1.0)
+    assert len(state['paths']) == 3      # 50 + 50 + 20
+    assert state['peak'] > 1             # chunks were in flight together
+
+
+def test_option_chains_share_spot_and_reuse_connections(stub_client):
+    client, state = stub_client
+    expiries = ["2024-01-04", "2024-01-11", "2024-01-18"]
+
+    chains = client.get_option_chains("NIFTY", expiry_dates=expiries)
+
+    assert list(chains) == expiries
+    for df, spot in chains.values():
+        assert spot == 101.0
+        assert list(df['strike']) == [95.0, 100.0, 105.0]
+        assert df['PE_OI_Change'].iloc[0] == 50
+
+    # 3 chains + 1 shared spot quote
+    assert sum('/option/chain' in p for p in state['paths']) == 3
+    assert sum('/market-quote/quotes' in p for p in state['paths']) == 1
+
+    # Sequential calls ride the pooled keep-alive connections
+    before = len(state['ports'])
+    for _ in range(5):
+        client.get_spot_price("NIFTY")
+    assert len(state['ports']) == before
+
+
+def test_option_surface_single_round_trip(stub_client):
+    client, state = stub_client
+    expiries = ["2024-01-18", "2024-01-25"]
+
+    surface = client.get_option_surface("NIFTY", expiries=expiries)
+
+    assert surface.spot == 101.0
+    assert list(surface.strikes) == [95.0, 100.0, 105.0, 110.0]
+    assert surface.values.shape == (4, 2, len(surface.fields))
+    assert np.isnan(surface.field("CE_OI")[3, 0])         # 110 not listed for the first expiry
+    assert list(surface.totals("PE_OI")) == [600.0, 600.0]
+    assert list(surface.term_structure("PE_IV")) == [13.0, 13.0]
+    assert len(state['paths']) == 3                        # 2 chains + 1 spot, all in one fan-out
+    assert state['peak'] > 1
+
+
+def test_atm_quotes_request_only_window(stub_client, monkeypatch):
+    client, state = stub_client
+    strikes = [float(s) for s in range(90, 111)]
+    contracts = [
+        {"strike": s, "option_type": t, "key": f"NSE_FO|{int(s)}{t}", "lot_size": 65, "expiry": "2024-01-25"}
+        for s in strikes for t in ("CE", "PE")
+    ]
+    monkeypatch.setattr(upstox_options.instrument_service, 'get_option_strikes', lambda sym, expiry=None: strikes)
+    monkeypatch.setattr(
+        upstox_options.instrument_service, 'get_option_keys',
+        lambda sym, expiry=None, strike_range=None: [c for c in contracts if strike_range[0] <= c['strike'] <= strike_range[1]]
+    )
+
+    atm = client.get_atm_option_quotes("NIFTY", spot_price=100.4, n_strikes=2)
+
+    assert list(atm['strike']) == [98.0, 99.0, 100.0, 101.0, 102.0]
+    assert {'CE_LTP', 'PE_LTP', 'CE_OI', 'PE_OI'} <= set(atm.columns)
+    requested = parse_qs(urlparse(state['paths'][-1]).query)['instrument_key'][0].split(",")
+    assert len(requested) == 10
+
+
+def test_atm_refresh_client_uses_session_keys(monkeypatch):
+    plugins_advanced = pytest.importorskip("plugins_advanced")
+    built = []
+
+    class RecordingAuth:
+        def __init__(self, api_key=None, api_secret=None):
+            built.append((api_key, api_secret))
+
+    monkeypatch.setattr(plugins_advanced, 'UpstoxAuth', RecordingAuth)
+    monkeypatch.setattr(plugins_advanced, 'UpstoxFOData', lambda auth: None)
+    monkeypatch.setattr(plugins_advanced.st, 'session_state', {})
+    plugin = plugins_advanced.OptionsAnalysisPlugin()
+
+    assert not plugin.analyze({'config': {}}).success
+    assert built == []
+
+    # analyze() leaves nothing on the shared instance; the render-time refresh reads this session's keys
+    plugin.analyze({'config': {'UPSTOX_API_KEY': "other", 'UPSTOX_API_SECRET': "session"}})
+    assert not hasattr(plugin, '_config')
+    plugins_advanced.st.session_state['context_config'] = {'UPSTOX_API_KEY': "key", 'UPSTOX_API_SECRET': "secret"}
+    plugin._upstox_client(plugin._session_config())
+    assert built == [("other", "session"), ("key", "secret")]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
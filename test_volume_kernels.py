@@ -0,0 +1,96 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import make_ohlcv
+from volume_kernels import divergence_pairs, obv_kernel, scan_obv_divergence, swing_pivots
+
+
+def ohlcv(n=400, seed=0):
+    return make_ohlcv(n, seed, start="2022-01-03", vol=0.015, max_volume=9_000)
+
+
+def test_obv_and_pivots_match_pandas():
+    df = ohlcv()
+    obv = [0.0]
+    for i in range(1, len(df)):
+        obv.append(obv[-1] + np.sign(df['close'].iloc[i] - df['close'].iloc[i - 1]) * df['volume'].iloc[i])
+    assert np.allclose(obv_kernel(df['close'].values, df['volume'].values), obv)
+
+    for window in (20, 15):
+        peaks, troughs = swing_pivots(df['close'].values, window)
+        rolling = df['close'].rolling(window, center=True)
+        assert (peaks == (df['close'] == rolling.max()).values).all()
+        assert (troughs == (df['close'] == rolling.min()).values).all()
+
+
+def test_divergences_pair_consecutive_pivots():
+    df = ohlcv(seed=2)
+    close = df['close'].values
+    obv = obv_kernel(close, df['volume'].values)
+    pairs = divergence_pairs(close, obv, window=20)
+
+    _, troughs = swing_pivots(close, 20)
+    idx = np.flatnonzero(troughs)
+    expected = [b for a, b in zip(idx[:-1], idx[1:]) if close[b] < close[a] and obv[b] > obv[a]]
+    assert list(np.flatnonzero(pairs['bullish'])) == expected
+    assert all(pairs['prev_trough'][b] == a for a, b in zip(idx[:-1], idx[1:]))
+
+
+def test_universe_scan_matches_per_symbol():
+    frames = {f"S{i}.NS": ohlcv(seed=i) for i in range(8)}
+    frames["SHORT.NS"] = ohlcv(seed=99).iloc[-120:]  # listed later: NaN-padded in the matrix
+
+    signals = scan_obv_divergence(frames, window=10, sensitivity=0.0, lookback=400)
+    assert not signals.empty
+
+    for sym, df in frames.items():
+        close = df['close'].values
+        pairs = divergence_pairs(close, obv_kernel(close, df['volume'].values), 10, 0.0, relative_obv=True)
+        hits = np.flatnonzero(pairs['bullish'] | pairs['bearish'])
+        row = signals[signals['symbol'] == sym]
+        bull = np.flatnonzero(pairs['bullish'])
+        bear = np.flatnonzero(pairs['bearish'])
+        assert (not row.empty) == (len(hits) > 0)
+        if len(bull):
+            assert row[row['type'] == 'BULLISH']['date'].item() == df.index[bull[-1]]
+        if len(bear):
+            assert row[row['type'] == 'BEARISH']['date'].item() == df.index[bear[-1]]
+
+
+def test_universe_scan_skips_dates_a_symbol_did_not_trade():
+    frames = {f"S{i}.NS": ohlcv(seed=i) for i in range(4)}
+    gappy = ohlcv(seed=11)
+    frames["GAPPY.NS"] = gappy.drop(gappy.index[[-7, -23, -41, -60, -90]])   # no-trade days
+    extra = ohlcv(seed=12)
+    fridays = extra.index[extra.index.dayofweek == 4]
+    saturdays = extra.loc[fridays[-8:]].set_axis(fridays[-8:] + pd.Timedelta(days=1)) * 1.01
+    frames["EXTRA.NS"] = pd.concat([extra, saturdays]).sort_index()        # bars no one else has
+
+    lookback = 80
+    signals = scan_obv_divergence(frames, window=10, sensitivity=0.0, lookback=lookback)
+    for sym, df in frames.items():
+        close = df['close'].values
+        obv = obv_kernel(close, df['volume'].values)
+        pairs = divergence_pairs(close, obv, 10, 0.0, relative_obv=True)
+        for kind, prev_key in (('bullish', 'prev_trough'), ('bearish', 'prev_peak')):
+            hits = np.flatnonzero(pairs[kind][-lookback:]) + len(df) - lookback
+            row = signals[(signals['symbol'] == sym) & (signals['type'] == kind.upper())]
+            assert len(row) == (len(hits) > 0), (sym, kind)
+            if len(hits):
+                t = hits[-1]
+                t0 = pairs[prev_key][t]
+                assert row['date'].item() == df.index[t]
+                assert row['bars_ago'].item() == len(df) - 1 - t
+                assert row['price_change_pct'].item() == pytest.approx((close[t] / close[t0] - 1) * 100)
+                assert row['obv_change_pct'].item() == pytest.approx((obv[t] - obv[t0]) / abs(obv[t0]) * 100)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,92 @@
+import sys
+import os
+import datetime
+
+import pandas as pd
+import pytest
+
+# Ensure we can import from local directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import warmup_daemon
+from warmup_daemon import WarmupDaemon, read_hud_snapshot, read_warmup_status
+from index_composition import INDEX_WEIGHTS
+from market_symbols import get_sector_indices
+
+
+class FakeFetcher:
+    """Records requested symbols; symbols in `fail` come back empty"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.requested = []
+
+    def fetch_multiple_assets(self, symbols, start_date, end_date):
+        self.requested.extend(symbols)
+        bars = pd.DataFrame({'close': [1.0]})
+        return {s: (None, "No data") if s in self.fail else (bars, None) for s in symbols}
+
+    def fetch_asset(self, symbol, start_date, end_date):
+        self.requested.append(symbol)
+        return pd.DataFrame({'close': [1.0]})
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    monkeypatch.setattr(warmup_daemon, "HUD_SNAPSHOT_PATH", str(tmp_path / "hud_snapshot.json"))
+    monkeypatch.setattr(warmup_daemon, "download_hud_quotes", lambda symbols: {s: (100.0, 1.5) for s in symbols})
+    return tmp_path
+
+
+def test_one_pass_warms_default_workspace(offline):
+    fetcher = FakeFetcher()
+    daemon = WarmupDaemon(fetcher, status_path=str(offline / "warmup_status.json"))
+    daemon.run_once()
+
+    assert set(INDEX_WEIGHTS['NIFTY_50']) <= set(fetcher.requested)
+    assert set(get_sector_indices().values()) <= set(fetcher.requested)
+    assert {'RELIANCE.NS', '^NSEI'} <= set(fetcher.requested)
+
+    status = read_warmup_status(str(offline / "warmup_status.json"))
+    assert status['ready'] is True
+    assert set(status['tasks']) == {'hud', 'watchlists', 'primary', 'nifty50', 'sectors'}
+    assert read_hud_snapshot()['quotes']['^GSPC'] == [100.0, 1.5]
+    assert daemon.due_tasks() == []  # everything just ran
+
+
+def test_failed_task_is_not_ready(offline):
+    sectors = list(get_sector_indices().values())
+    daemon = WarmupDaemon(FakeFetcher(fail=sectors), status_path=str(offline / "warmup_status.json"))
+    daemon.run_once()
+
+    status = read_warmup_status(str(offline / "warmup_status.json"))
+    assert status['ready'] is False
+    assert status['tasks']['sectors']['status'] == 'error'
+    assert status['tasks']['nifty50']['status'] == 'ok'
+    assert daemon.due_tasks(now_ts=10 ** 12) == list(daemon.tasks)
+
+
+def test_market_hours_schedule(offline):
+    daemon = WarmupDaemon(FakeFetcher(), status_path=str(offline / "s.json"))
+    ist = daemon.tz
+    assert daemon.is_market_hours(datetime.datetime(2024, 6, 3, 10, 0, tzinfo=ist))       # Monday
+    assert not daemon.is_market_hours(datetime.datetime(2024, 6, 3, 20, 0, tzinfo=ist))
+    assert not daemon.is_market_hours(datetime.datetime(2024, 6, 8, 10, 0, tzinfo=ist))   # Saturday
+
+
+@pytest.mark.parametrize("market_hours", [True, False])
+def test_hud_snapshot_lives_until_the_next_scheduled_refresh(offline, monkeypatch, market_hours):
+    daemon = WarmupDaemon(FakeFetcher(), status_path=str(offline / "s.json"))
+    monkeypatch.setattr(daemon, "is_market_hours", lambda now=None: market_hours)
+    daemon.run_task('hud')
+
+    snapshot = read_hud_snapshot()
+    interval = daemon.settings['intervals']['hud'][0 if market_hours else 1]
+    assert snapshot['expires'] - snapshot['ts'] > interval
+    # Just before the next pass (off hours: 30 min later) the app still reads it, not the network
+    assert read_hud_snapshot(now=snapshot['ts'] + interval + daemon.settings['tick']) is not None
+    assert read_hud_snapshot(now=snapshot['expires'] + 1) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -3,21 +3,25 @@ Upstox F&O Complete - Facade
 Compiles all services into a single class for backward compatibility.
 """
 
+from typing import Optional
 from services.upstox_auth import UpstoxAuth
+from services.upstox_transport import UpstoxTransport
 from services.upstox_market import UpstoxMarketService
 from services.upstox_options import UpstoxOptionsService
 from services.upstox_portfolio import UpstoxPortfolioService
+from services.upstox_history import UpstoxHistoryService
 from services.instrument_service import instrument_service
 
 # Facade Class
-class UpstoxFOData(UpstoxMarketService, UpstoxOptionsService, UpstoxPortfolioService):
+class UpstoxFOData(UpstoxMarketService, UpstoxOptionsService, UpstoxPortfolioService, UpstoxHistoryService):
     """
     Unified Upstox Data Client
     Inherits from:
     - UpstoxMarketService (Spot, Quotes, Batch)
     - UpstoxOptionsService (Chain, Greeks)
     - UpstoxPortfolioService (Holdings, Positions)
+    - UpstoxHistoryService (Daily / Intraday Candles)
     """
-    def __init__(self, auth: UpstoxAuth):
+    def __init__(self, auth: UpstoxAuth, transport: Optional[UpstoxTransport] = None):
         # Initialize Base (which they all share)
-        super().__init__(auth)
\ No newline at end of file
+        super().__init__(auth, transport)
\ No newline at end of file
@@ -11,6 +11,8 @@ from typing import Optional, Dict
 from dataclasses import dataclass
 import logging
 
+from feature_frame import FeatureFrame, get_feature_frame
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -34,27 +36,23 @@ class ValidatedIndicators:
     Compute indicators only when data is sufficient
     All methods return IndicatorResult with quality info
     """
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, features: Optional[FeatureFrame] = None):
         self.data = data
         self.bars = len(data)
+        self.features = features or get_feature_frame(data)
     
     def rsi(self, period: int = 14) -> IndicatorResult:
         min_bars = period * 3
         if self.bars < min_bars:
             return IndicatorResult(None, False, f"Need {min_bars} bars", "N/A")
         
-        delta = self.data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi_value = 100 - (100 / (1 + rs))
-        current_rsi = rsi_value.iloc[-1]
+        current_rsi = self.features.rsi(period).iloc[-1]
         
         if pd.isna(current_rsi):
             return IndicatorResult(None, False, "Calculation failed", "N/A")
             
         # Confidence based on trend (RSI less reliable in strong trends)
-        ma20 = self.data['close'].rolling(20).mean().iloc[-1]
+        ma20 = self.features.sma(20).iloc[-1]
         current_price = self.data['close'].iloc[-1]
         confidence = "LOW" if abs((current_price/ma20)-1) > 0.1 else "HIGH"
         
@@ -64,11 +62,7 @@ class ValidatedIndicators:
         if self.bars < period + 1:
             return IndicatorResult(None, False, f"Need {period+1} bars", "N/A")
             
-        high_low = self.data['high'] - self.data['low']
-        high_close = np.abs(self.data['high'] - self.data['close'].shift())
-        low_close = np.abs(self.data['low'] - self.data['close'].shift())
-        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr_value = true_range.rolling(period).mean().iloc[-1]
+        atr_value = self.features.atr(period).iloc[-1]
         
         return IndicatorResult(float(atr_value) if not pd.isna(atr_value) else None, True, None, "HIGH")
 
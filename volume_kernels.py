@@ -0,0 +1,171 @@
+"""
+Volume Kernels
+NumPy kernels for OBV and swing-pivot divergences, shared by VolumeAnalyzer,
+WhaleHunter and FeatureFrame.
+- Arrays are 1-D (one symbol) or 2-D (symbols x time); time is always the last axis
+- Pivots match pandas rolling(window, center=True).max()/.min() equality (edges never pivot)
+- scan_obv_divergence runs the whole universe (e.g. INDEX_WEIGHTS constituents) in one matrix pass,
+  each symbol over its own bars (indicator_panel.on_bars), so gaps never shift or block pivots
+"""
+
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicator_panel import column_map, on_bars
+
+logger = logging.getLogger(__name__)
+
+
+def obv_kernel(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """On-Balance Volume: cumsum(sign(diff(close)) * volume), starting at 0. Missing bars add nothing."""
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    step = np.zeros_like(close)
+    step[..., 1:] = np.sign(np.diff(close, axis=-1)) * volume[..., 1:]
+    return np.cumsum(np.nan_to_num(step), axis=-1)
+
+
+def swing_pivots(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (peaks, troughs) boolean masks: x equals the max/min of the centered window.
+    Windows that run past either end (or contain NaN) never produce a pivot.
+    """
+    x = np.asarray(x, dtype=float)
+    peaks = np.zeros(x.shape, dtype=bool)
+    troughs = np.zeros(x.shape, dtype=bool)
+    if x.shape[-1] < window:
+        return peaks, troughs
+
+    windows = sliding_window_view(x, window, axis=-1)
+    # Window starting at s is centered (pandas convention) on s + window // 2
+    center = slice(window // 2, window // 2 + windows.shape[-2])
+    with np.errstate(invalid='ignore'):
+        peaks[..., center] = x[..., center] == windows.max(axis=-1)
+        troughs[..., center] = x[..., center] == windows.min(axis=-1)
+    return peaks, troughs
+
+
+def previous_pivot(mask: np.ndarray) -> np.ndarray:
+    """For each position, the index of the last pivot strictly before it (-1 if none)"""
+    mask = np.asarray(mask, dtype=bool)
+    positions = np.where(mask, np.arange(mask.shape[-1]), -1)
+    last = np.maximum.accumulate(positions, axis=-1)
+    prev = np.full(mask.shape, -1, dtype=np.int64)
+    prev[..., 1:] = last[..., :-1]
+    return prev
+
+
+def divergence_pairs(
+    close: np.ndarray,
+    obv: np.ndarray,
+    window: int = 20,
+    sensitivity: float = 0.0,
+    relative_obv: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    Consecutive-pivot OBV divergences.
+    - bullish: price trough lower than the previous trough, OBV trough higher
+    - bearish: price peak higher than the previous peak, OBV peak lower
+    Price moves must exceed `sensitivity` (fraction). With relative_obv the OBV move
+    must also exceed it, measured against |previous OBV| (0 never qualifies).
+    Returns {'bullish', 'bearish'} masks at the later pivot plus {'prev_trough', 'prev_peak'} indices.
+    """
+    close = np.asarray(close, dtype=float)
+    obv = np.asarray(obv, dtype=float)
+    peaks, troughs = swing_pivots(close, window)
+    prev_peak = previous_pivot(peaks)
+    prev_trough = previous_pivot(troughs)
+
+    def moves(prev):
+        has_prev = prev >= 0
+        p1 = np.take_along_axis(close, np.where(has_prev, prev, 0), axis=-1)
+        o1 = np.take_along_axis(obv, np.where(has_prev, prev, 0), axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_move = (close - p1) / p1
+            obv_move = np.where(o1 != 0, (obv - o1) / np.abs(o1), np.nan) if relative_obv else obv - o1
+        return has_prev, price_move, obv_move
+
+    obv_threshold = sensitivity if relative_obv else 0.0
+    has_prev, price_move, obv_move = moves(prev_trough)
+    with np.errstate(invalid='ignore'):
+        bullish = troughs & has_prev & (price_move < -sensitivity) & (obv_move > obv_threshold)
+    has_prev, price_move, obv_move = moves(prev_peak)
+    with np.errstate(invalid='ignore'):
+        bearish = peaks & has_prev & (price_move > sensitivity) & (obv_move < -obv_threshold)
+
+    return {'bullish': bullish, 'bearish': bearish, 'prev_trough': prev_trough, 'prev_peak': prev_peak}
+
+
+def scan_obv_divergence(
+    frames: Dict[str, pd.DataFrame],
+    window: int = 20,
+    sensitivity: float = 0.02,
+    lookback: int = 30
+) -> pd.DataFrame:
+    """
+    Universe scan: latest OBV divergence per symbol within its last `lookback` bars.
+    frames: {symbol: OHLCV frame with close/volume (any case)}. Bars are aligned on the
+    union of dates into symbols x time matrices and evaluated in one pass; OBV, pivot
+    windows and bars_ago count each symbol's own bars, as if it were scanned alone.
+    """
+    closes, volumes = {}, {}
+    for sym, df in frames.items():
+        if df is None or df.empty:
+            continue
+        cols = column_map(df)
+        if 'close' not in cols or 'volume' not in cols:
+            continue
+        closes[sym] = df[cols['close']]
+        volumes[sym] = df[cols['volume']]
+
+    columns = ['symbol', 'type', 'date', 'price_change_pct', 'obv_change_pct', 'bars_ago']
+    if not closes:
+        return pd.DataFrame(columns=columns)
+
+    close_df = pd.DataFrame(closes).sort_index()
+    volume_df = pd.DataFrame(volumes).reindex(close_df.index)
+    symbols = list(close_df.columns)
+    close = close_df.to_numpy(dtype=float).T   # symbols x time
+    volume = volume_df.to_numpy(dtype=float).T
+
+    has_bar = ~np.isnan(close)
+    n_time = close.shape[1]
+    position = np.broadcast_to(np.arange(n_time, dtype=float), close.shape)
+    obv = on_bars(obv_kernel, close, np.nan_to_num(volume), valid=has_bar)
+
+    def signals(kind: str, prev_key: str) -> np.ndarray:
+        """Shared-index position of the previous pivot where a `kind` divergence fires, else NaN"""
+        def kernel(c, o, pos):
+            pairs = divergence_pairs(c, o, window, sensitivity, relative_obv=True)
+            prev = np.take_along_axis(pos, np.maximum(pairs[prev_key], 0), axis=-1)
+            return np.where(pairs[kind], prev, np.nan)
+        return on_bars(kernel, close, obv, position, valid=has_bar)
+
+    own = np.cumsum(has_bar, axis=1)
+    bars_ago = own[:, -1:] - own
+    recent = has_bar & (bars_ago < lookback)
+    rows = []
+    for kind, prev_key in (('BULLISH', 'prev_trough'), ('BEARISH', 'prev_peak')):
+        prev = signals(kind.lower(), prev_key)
+        mask = ~np.isnan(prev) & recent
+        # Latest qualifying bar per symbol
+        has_any = mask.any(axis=1)
+        latest = n_time - 1 - np.argmax(mask[:, ::-1], axis=1)
+        for i in np.flatnonzero(has_any):
+            t = latest[i]
+            t0 = int(prev[i, t])
+            rows.append({
+                'symbol': symbols[i],
+                'type': kind,
+                'date': close_df.index[t],
+                'price_change_pct': (close[i, t] / close[i, t0] - 1) * 100,
+                'obv_change_pct': (obv[i, t] - obv[i, t0]) / abs(obv[i, t0]) * 100,
+                'bars_ago': int(bars_ago[i, t]),
+            })
+
+    logger.info(f"OBV divergence scan: {len(symbols)} symbols x {n_time} bars, {len(rows)} signals")
+    return pd.DataFrame(rows, columns=columns).sort_values(['bars_ago', 'symbol']).reset_index(drop=True)
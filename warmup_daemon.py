@@ -0,0 +1,263 @@
+"""
+Warm-up Daemon
+Background prefetch for the default workspace, run as its own process:
+    python warmup_daemon.py          # loop on the market-hours schedule
+    python warmup_daemon.py --once   # one pass (cron / container start-up)
+- HUD metrics -> data_cache/hud_snapshot.json (read by the app instead of yf.download)
+- Top Stocks / Major Indices watchlists, NIFTY 50 constituents, sector indices and the
+  primary symbol's 365-day history -> the shared bar store (services/bar_store.py)
+- Readiness per task -> data_cache/warmup_status.json, so the app can tell whether its
+  first paint will be served from local data
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import WARMUP_SETTINGS
+from index_composition import INDEX_WEIGHTS
+from market_symbols import HUD_METRICS, WATCHLIST_TOP_STOCKS, get_major_indices, get_sector_indices
+
+logger = logging.getLogger(__name__)
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WARMUP_STATUS_PATH = os.path.join(BASE_DIR, "data_cache", "warmup_status.json")
+HUD_SNAPSHOT_PATH = os.path.join(BASE_DIR, "data_cache", "hud_snapshot.json")
+
+
+# ----------------------------------------------------------------------------
+# Shared helpers (also used by app_modular)
+# ----------------------------------------------------------------------------
+
+def _write_json(path: str, payload: Dict):
+    """Atomic write (tmp file + os.replace): readers never see a half-written file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def download_hud_quotes(symbols: List[str]) -> Dict[str, Tuple[float, float]]:
+    """{ticker: (last close, % change vs previous close)} from a 2-day yfinance download"""
+    import yfinance as yf
+
+    hud_data = yf.download(symbols, period="2d", progress=False)['Close']
+    quotes = {}
+    for sym in symbols:
+        val = 0.0
+        delta = 0.0
+        if sym in hud_data.columns:
+            series = hud_data[sym].dropna()
+            if len(series) >= 2:
+                val = series.iloc[-1]
+                prev = series.iloc[-2]
+                delta = ((val - prev) / prev) * 100
+            elif len(series) == 1:
+                val = series.iloc[-1]
+        quotes[sym] = (float(val), float(delta))
+    return quotes
+
+
+def read_hud_snapshot(now: Optional[float] = None) -> Optional[Dict]:
+    """
+    The daemon's HUD snapshot {'ts', 'expires', 'quotes': {ticker: [value, delta_pct]}} until it expires.
+    The daemon sets 'expires' from the HUD interval of the current phase (60 s in market hours,
+    30 min otherwise), so an off-hours snapshot is not rejected between two scheduled refreshes.
+    """
+    snapshot = _read_json(HUD_SNAPSHOT_PATH)
+    now = time.time() if now is None else now
+    if not snapshot or now > snapshot.get('expires', 0):
+        return None
+    return snapshot
+
+
+def read_warmup_status(path: str = WARMUP_STATUS_PATH) -> Optional[Dict]:
+    """Last status published by the daemon (None if it never ran)"""
+    return _read_json(path)
+
+
+# ----------------------------------------------------------------------------
+# Daemon
+# ----------------------------------------------------------------------------
+
+class WarmupDaemon:
+    """
+    Runs the warm-up tasks on a schedule: every task has a market-hours interval and a
+    (longer) off-hours interval. Tasks reuse MultiAssetDataFetcher, so what they fetch
+    lands in the same bar store the app reads.
+    """
+
+    def __init__(self, fetcher=None, status_path: str = WARMUP_STATUS_PATH, settings: Dict = WARMUP_SETTINGS):
+        if fetcher is None:
+            from data_fetcher import MultiAssetDataFetcher
+            fetcher = MultiAssetDataFetcher()
+        self.fetcher = fetcher
+        self.status_path = status_path
+        self.settings = settings
+        self.tz = ZoneInfo(settings['timezone'])
+        self._stop = threading.Event()
+        self.tasks: Dict[str, Callable[[], int]] = {
+            'hud': self.warm_hud,
+            'watchlists': self.warm_watchlists,
+            'primary': self.warm_primary,
+            'nifty50': self.warm_nifty50,
+            'sectors': self.warm_sectors,
+        }
+        # Task -> {'status', 'last_run', 'seconds', 'symbols', 'error'}
+        self.status: Dict[str, Dict] = {name: {'status': 'pending'} for name in self.tasks}
+        self._last_run: Dict[str, float] = {}
+
+    # ------------------------------------------------------------------
+    # Schedule
+    # ------------------------------------------------------------------
+
+    def _now(self) -> datetime.datetime:
+        return datetime.datetime.now(self.tz)
+
+    def is_market_hours(self, now: Optional[datetime.datetime] = None) -> bool:
+        """Weekday between pre_open and post_close (exchange time)"""
+        now = now or self._now()
+        if now.weekday() >= 5:
+            return False
+        hhmm = now.strftime('%H:%M')
+        return self.settings['pre_open'] <= hhmm < self.settings['post_close']
+
+    def interval(self, name: str) -> int:
+        """Seconds between runs of task `name` in the current phase (market hours or not)"""
+        return self.settings['intervals'][name][0 if self.is_market_hours() else 1]
+
+    def due_tasks(self, now_ts: Optional[float] = None) -> List[str]:
+        now_ts = time.time() if now_ts is None else now_ts
+        return [
+            name for name in self.tasks
+            if now_ts - self._last_run.get(name, 0) >= self.interval(name)
+        ]
+
+    # ------------------------------------------------------------------
+    # Tasks (each returns the number of symbols warmed)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _window(days: int) -> Tuple[str, str]:
+        """Same date strings the app builds for its requests (so bar store coverage matches)"""
+        now = datetime.datetime.now()
+        return (now - datetime.timedelta(days=days)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')
+
+    def _fetch(self, symbols: List[str], start: str, end: str) -> int:
+        results = self.fetcher.fetch_multiple_assets(symbols, start, end)
+        missing = [s for s in symbols if s not in results or results[s][0] is None]
+        if len(missing) == len(symbols):
+            raise RuntimeError(f"No data for any of {len(symbols)} symbols")
+        if missing:
+            logger.warning(f"Warm-up: no data for {missing}")
+        return len(symbols) - len(missing)
+
+    def warm_hud(self) -> int:
+        symbols = [sym for _, sym in HUD_METRICS]
+        quotes = download_hud_quotes(symbols)
+        # Valid until the next scheduled refresh could have landed (one tick late, plus grace)
+        ts = time.time()
+        expires = ts + self.interval('hud') + self.settings['tick'] + self.settings['hud_grace']
+        _write_json(HUD_SNAPSHOT_PATH, {'ts': ts, 'expires': expires, 'quotes': quotes})
+        return len(quotes)
+
+    def warm_watchlists(self) -> int:
+        # The app's watchlist asks for [now - 5 days, now + 1 day)
+        end = datetime.datetime.now() + datetime.timedelta(days=1)
+        start = end - datetime.timedelta(days=6)
+        symbols = list(dict.fromkeys(WATCHLIST_TOP_STOCKS + get_major_indices()))
+        return self._fetch(symbols, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+
+    def warm_primary(self) -> int:
+        start, end = self._window(365)
+        for sym in self.settings['primary_symbols']:
+            self.fetcher.fetch_asset(sym, start, end)
+        return len(self.settings['primary_symbols'])
+
+    def warm_nifty50(self) -> int:
+        return self._fetch(list(INDEX_WEIGHTS['NIFTY_50']), *self._window(365))
+
+    def warm_sectors(self) -> int:
+        # SectorRotationPlugin's RRG window
+        return self._fetch(list(get_sector_indices().values()), *self._window(150))
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run_task(self, name: str):
+        start = time.perf_counter()
+        try:
+            count = self.tasks[name]()
+            self.status[name] = {'status': 'ok', 'symbols': count, 'error': None}
+        except Exception as e:
+            logger.error(f"Warm-up task {name} failed: {e}")
+            self.status[name] = {'status': 'error', 'symbols': 0, 'error': str(e)}
+        self.status[name]['seconds'] = round(time.perf_counter() - start, 2)
+        self.status[name]['last_run'] = self._now().isoformat(timespec='seconds')
+        self._last_run[name] = time.time()
+        self.write_status()
+
+    def run_once(self, names: Optional[List[str]] = None):
+        for name in names or list(self.tasks):
+            if self._stop.is_set():
+                break
+            self.run_task(name)
+
+    def write_status(self):
+        _write_json(self.status_path, {
+            'ready': all(t['status'] == 'ok' for t in self.status.values()),
+            'updated': self._now().isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'market_hours': self.is_market_hours(),
+            'tasks': self.status,
+        })
+
+    def run_forever(self):
+        logger.info(f"Warm-up daemon started (pid {os.getpid()})")
+        while not self._stop.is_set():
+            due = self.due_tasks()
+            if due:
+                self.run_once(due)
+            self._stop.wait(self.settings['tick'])
+        logger.info("Warm-up daemon stopped")
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch data for the default workspace")
+    parser.add_argument("--once", action="store_true", help="Run every task once and exit")
+    parser.add_argument("--tasks", nargs="*", help="Subset of tasks (hud watchlists primary nifty50 sectors)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    daemon = WarmupDaemon()
+    if args.once or args.tasks:
+        daemon.run_once(args.tasks)
+        return
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()